@@ -17,6 +17,16 @@ setup(
         'requests>=2.20.0',
         'beautifulsoup4>=4.9.0',
     ],
+    extras_require={
+        'zstd': ['zstandard>=0.18'],
+        'images': ['Pillow>=8.0'],
+        'watch': ['PyYAML>=5.1'],
+        'socks': ['PySocks>=1.7.1'],
+        'brotli': [
+            'brotli>=1.0.9; platform_python_implementation == "CPython"',
+            'brotlicffi>=1.0.9; platform_python_implementation != "CPython"',
+        ],
+    },
     entry_points={
         'console_scripts': [
             'wespy = wespy.__main__:main',
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""测试共用的模拟站点夹具"""
+
+import pytest
+
+from wespy import mockserver
+from wespy.main import ArticleFetcher
+
+
+@pytest.fixture
+def mock_site():
+    """
+    启动模拟站点的工厂，测试结束时全部关闭
+
+        proxy = mock_site(paragraphs=3)          # 参数同 mockserver.MockConfig
+        proxy = mock_site(port=port, paragraphs=3)
+
+    Returns:
+        function: 返回代理地址（如 http://127.0.0.1:端口）
+    """
+    servers = []
+
+    def start(port=0, **config):
+        server, proxy = mockserver.start_background(mockserver.MockConfig(**config), port=port)
+        servers.append(server)
+        return proxy
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def mock_fetcher(mock_site):
+    """
+    创建通过模拟站点访问的 ArticleFetcher 的工厂，测试结束时全部关闭
+
+        fetcher = mock_fetcher(paragraphs=5, album_size=6)
+        fetcher = mock_fetcher(proxy=proxy, background_writes=True)
+
+    Args（工厂）:
+        proxy (str, optional): 已启动的模拟站点，默认按其余 MockConfig 参数新启动一个
+        fetcher_args (dict, optional): 传给 ArticleFetcher 的参数
+    """
+    fetchers = []
+
+    def create(proxy=None, fetcher_args=None, **config):
+        if proxy is None:
+            proxy = mock_site(**config)
+        fetcher = ArticleFetcher(**(fetcher_args or {}))
+        mockserver.use_proxy(fetcher, proxy)
+        fetchers.append(fetcher)
+        return fetcher
+
+    yield create
+    for fetcher in fetchers:
+        fetcher.close()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""归档输出：raw 模式直接写入下载到的网页字节，各格式可以读回；出错时归档仍然完整"""
+
+import pytest
+
+from wespy import mockserver
+from wespy.archive import ARCHIVE_FORMATS, list_articles, read_article, zstandard
+from wespy.article import RawHTML
+
+
+@pytest.mark.parametrize('fmt', ARCHIVE_FORMATS)
+def test_raw_html_is_archived_without_decoding(mock_fetcher, tmp_path, monkeypatch, fmt):
+    if fmt == 'tar.zst' and zstandard is None:
+        pytest.skip('需要 zstandard')
+    fetcher = mock_fetcher(paragraphs=12)
+    url = 'http://mp.weixin.qq.com/s/1'
+    page = fetcher.session.get(url).content
+
+    def no_decode(self):
+        raise AssertionError('raw 模式写入归档时不应解码整个网页')
+
+    monkeypatch.setattr(RawHTML, 'text', property(no_decode))
+    fetcher.fetch_articles([url], str(tmp_path), save_html=True, archive=fmt)
+
+    path = str(next(tmp_path.glob(f'*.{fmt}')))
+    assert len(list_articles(path)) == 1
+    article = read_article(path, url)
+    assert article['html'] == page.decode('utf-8')
+    assert article['markdown']
+
+
+def test_album_archive_is_closed_on_error(mock_fetcher, tmp_path):
+    fetcher = mock_fetcher(paragraphs=3, album_size=3)
+    run_batch = fetcher._run_batch
+
+    def failing_batch(run_deadline, items, process, **kwargs):
+        run_batch(run_deadline, items[:1], process, **kwargs)
+        raise RuntimeError('中途出错')
+
+    fetcher._run_batch = failing_batch
+    album_url = (f'http://mp.weixin.qq.com/mp/appmsgalbum?__biz={mockserver.ALBUM_BIZ}'
+                 f'&action=getalbum&album_id={mockserver.ALBUM_ID}')
+    with pytest.raises(RuntimeError):
+        fetcher.fetch_album_articles(album_url, str(tmp_path), archive='zip')
+
+    # 已写入的文章和索引都在，归档可以正常读取
+    path = str(next(tmp_path.glob('*.zip')))
+    assert len(list_articles(path)) == 1
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""ArticleFetcher.fetch / Article / iter_markdown：不写文件、惰性字段、旧字典格式和流式Markdown"""
+
+import io
+import os
+
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+FIXTURE_URL = 'http://mp.weixin.qq.com/s/fixture'
+
+# fetch_article 在引入 Article 之前返回的字典键
+BASE_KEYS = {'title', 'author', 'publish_time', 'url', 'content_html', 'content_text', 'html_content'}
+
+
+@pytest.fixture
+def fetcher(mock_fetcher):
+    # 微信文章使用 tests/data 中的网页，掘金和普通网页使用生成的页面
+    return mock_fetcher(pages_dir=DATA_DIR, paragraphs=5)
+
+
+@pytest.fixture
+def expected():
+    # 由引入流式转换之前的转换器生成
+    with open(os.path.join(DATA_DIR, 'wechat_article.md'), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_fetch_writes_no_files(fetcher, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    article = fetcher.fetch(FIXTURE_URL)
+    assert article.markdown
+    fetcher.writer.flush()
+    assert list(tmp_path.iterdir()) == []
+    assert fetcher.writer.stats['files'] == 0
+    assert capsys.readouterr().out == ''
+
+
+def test_lazy_fields(fetcher):
+    article = fetcher.fetch(FIXTURE_URL)
+    assert (article.title, article.author, article.publish_time) == ('从零实现一个高并发抓取器', '性能工程笔记', '2024-01-01 08:00')
+    # 正文字段在访问前都没有计算，原始网页也没有整体解码
+    assert article._content_html is None and article._text is None and article._markdown is None
+    assert article.page._text is None
+
+    assert '连接复用' in article.text
+    assert article._content_html is None and article._markdown is None
+    assert 'id="js_content"' in article.content_html
+    markdown = article.markdown
+    assert article.markdown is markdown
+    # 字典式访问沿用旧的键名
+    assert article['content_text'] == article.text
+    assert article['html_content'] == article.html
+    assert 'content_html' in article and 'missing' not in article
+    assert article.get('missing', 1) == 1
+
+
+@pytest.mark.parametrize('url, extra', [
+    (FIXTURE_URL, set()),
+    ('http://juejin.cn/post/2', {'tags', 'view_count'}),
+    ('http://blog.example.com/post/3', set()),
+])
+def test_fetch_article_keeps_dict_keys(fetcher, tmp_path, url, extra):
+    info = fetcher.fetch_article(url, str(tmp_path))
+    assert isinstance(info, dict)
+    assert set(info) == BASE_KEYS | extra
+
+
+def test_streamed_markdown_matches(fetcher, tmp_path, expected):
+    article = fetcher.fetch(FIXTURE_URL)
+    assert article.markdown == expected
+    for chunk_size in (0, 16, 8192):
+        assert ''.join(fetcher.iter_markdown(article, chunk_size)) == expected
+
+    fp = io.StringIO()
+    assert fetcher.write_markdown(article, fp, chunk_size=64) == len(expected)
+    assert fp.getvalue() == expected
+
+    # 旧的字典格式（只有 content_html）走重新解析的路径，结果相同
+    info = fetcher.fetch_article(FIXTURE_URL, str(tmp_path))
+    assert ''.join(fetcher.iter_markdown(info)) == expected
+    fetcher.writer.flush()
+    saved = next(tmp_path.glob('*.md')).read_text(encoding='utf-8')
+    assert saved == expected
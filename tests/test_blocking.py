@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""wespy.blocking：受限页面识别、熔断的打开/半开/关闭，以及批量任务中受限文章放回队列重试"""
+
+import pytest
+
+from wespy import blocking, mockserver
+from wespy.article import RawHTML
+from wespy.blocking import (BLOCKED, CLOSED, DELETED, HALF_OPEN, OPEN, VERIFY, CircuitBreaker, CircuitOpen,
+                            PageBlocked, classify_page)
+
+CONFIG = mockserver.MockConfig(paragraphs=3)
+
+
+@pytest.mark.parametrize('site, page, kind', [
+    ('wechat', mockserver.wechat_page(CONFIG, '1'), None),
+    ('wechat', mockserver.WECHAT_VERIFY_PAGE, VERIFY),
+    ('wechat', mockserver.WECHAT_DELETED_PAGE, DELETED),
+    ('wechat', '<html><body>访问过于频繁，请稍后再试</body></html>'.encode('utf-8'), BLOCKED),
+    ('juejin', mockserver.juejin_page(CONFIG, '1'), None),
+    ('juejin', mockserver.JUEJIN_VERIFY_PAGE, VERIFY),
+    ('juejin', mockserver.JUEJIN_DELETED_PAGE, DELETED),
+    ('general', mockserver.WECHAT_VERIFY_PAGE, None),
+])
+def test_classify_page(site, page, kind):
+    # 原始字节、RawHTML 和解码后的文本结果相同
+    assert classify_page(site, page) == kind
+    assert classify_page(site, RawHTML(page, 'utf-8')) == kind
+    assert classify_page(site, page.decode('utf-8')) == kind
+
+
+def test_article_mentioning_markers_is_not_blocked():
+    page = '<div id="js_content"><p>遇到"环境异常"或"该文章已被删除"时怎么办</p></div>'
+    assert classify_page('wechat', page) is None
+    assert classify_page('wechat', '') is None
+
+
+class FakeTime:
+    """代替 blocking 模块中的 time，手动推进时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(blocking, 'time', fake)
+    return fake
+
+
+URL = 'http://mp.weixin.qq.com/s/1'
+HOST = 'mp.weixin.qq.com'
+
+
+def _guard(breaker, page):
+    return breaker.guard(URL, 'wechat', lambda: page)
+
+
+def test_breaker_open_half_open_closed(clock):
+    breaker = CircuitBreaker(threshold=2, cooldown=10, wait=False)
+    article = mockserver.wechat_page(CONFIG, '1')
+    verify = mockserver.WECHAT_VERIFY_PAGE
+
+    # 连续受限达到阈值才打开；中间出现正常页面会清零
+    for _ in range(2):
+        with pytest.raises(PageBlocked):
+            _guard(breaker, verify)
+        assert breaker.state(HOST) == CLOSED
+        assert _guard(breaker, article) == article
+    with pytest.raises(PageBlocked):
+        _guard(breaker, verify)
+    with pytest.raises(PageBlocked) as blocked:
+        _guard(breaker, verify)
+    assert blocked.value.kind == VERIFY
+    assert breaker.state(HOST) == OPEN
+    assert breaker.blocked_for(HOST) == 10
+
+    # 冷却期间不发出请求
+    clock.now += 9
+    with pytest.raises(CircuitOpen) as opened:
+        _guard(breaker, article)
+    assert opened.value.retry_in == pytest.approx(1)
+
+    # 冷却结束：半开，只放行一个试探请求；试探失败时重新打开，冷却时间翻倍
+    clock.now += 1
+    with pytest.raises(PageBlocked):
+        _guard(breaker, verify)
+    assert breaker.state(HOST) == OPEN
+    assert breaker.blocked_for(HOST) == 20
+    assert breaker.snapshot()[HOST] == {'state': OPEN, 'trips': 2, 'cooldown': 20}
+
+    # 试探进行中，其他请求仍然被拒绝；试探成功后关闭并恢复冷却时间
+    clock.now += 20
+
+    def probe():
+        assert breaker.state(HOST) == HALF_OPEN
+        with pytest.raises(CircuitOpen):
+            _guard(breaker, article)
+        return article
+
+    assert breaker.guard(URL, 'wechat', probe) == article
+    assert breaker.state(HOST) == CLOSED
+    assert breaker.snapshot()[HOST]['cooldown'] == 10
+    assert breaker.counts() == {BLOCKED: 0, VERIFY: 5, DELETED: 0}
+
+
+def test_deleted_page_does_not_trip(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10, wait=False)
+    for _ in range(3):
+        with pytest.raises(PageBlocked) as blocked:
+            _guard(breaker, mockserver.WECHAT_DELETED_PAGE)
+        assert blocked.value.kind == DELETED
+    assert breaker.state(HOST) == CLOSED
+
+
+def test_network_error_releases_probe(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10, wait=False)
+    with pytest.raises(PageBlocked):
+        _guard(breaker, mockserver.WECHAT_VERIFY_PAGE)
+    clock.now += 10
+
+    def fail():
+        raise OSError('连接失败')
+
+    with pytest.raises(OSError):
+        breaker.guard(URL, 'wechat', fail)
+    # 网络错误不说明是否受限，下一个请求仍可以试探
+    assert breaker.state(HOST) == HALF_OPEN
+    assert _guard(breaker, b'<div id="js_content"></div>')
+    assert breaker.state(HOST) == CLOSED
+
+
+def test_wait_sleeps_until_half_open(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    with pytest.raises(PageBlocked):
+        _guard(breaker, mockserver.WECHAT_VERIFY_PAGE)
+    breaker.pause(URL)
+    assert clock.now == 1010
+    assert _guard(breaker, b'<div id="js_content"></div>')
+    assert breaker.state(HOST) == CLOSED
+
+
+def test_blocked_articles_are_retried_after_cooldown(mock_fetcher, tmp_path, capsys):
+    # 前两个文章请求返回验证页面：两篇文章放回队列，熔断打开，冷却后半开试探成功，全部完成
+    fetcher = mock_fetcher(paragraphs=3, block_first=2)
+    fetcher.breaker = CircuitBreaker(threshold=2, cooldown=0.2)
+    urls = [f'http://mp.weixin.qq.com/s/{i}' for i in range(1, 4)]
+
+    results = fetcher.fetch_articles(urls, str(tmp_path))
+    assert sorted(result['url'] for result in results) == urls
+    assert fetcher.breaker.counts()[VERIFY] == 2
+    assert fetcher.breaker.snapshot()[HOST]['trips'] == 1
+    assert fetcher.breaker.state(HOST) == CLOSED
+    output = capsys.readouterr().out
+    assert output.count('稍后重试') == 2
+    assert '受限重试 2 次' in output
+
+
+def test_blocked_articles_fail_after_retries(mock_fetcher, tmp_path, capsys):
+    fetcher = mock_fetcher(paragraphs=3, block_first=2)
+    fetcher.breaker = CircuitBreaker(threshold=5)
+    fetcher.blocked_retries = 1
+
+    # 第一次受限放回队列，重试仍然受限后记为失败
+    assert fetcher.fetch_articles(['http://mp.weixin.qq.com/s/1'], str(tmp_path)) == []
+    assert fetcher.breaker.counts()[VERIFY] == 2
+    assert capsys.readouterr().out.count('稍后重试') == 1
+
+    # 已删除的文章不重试
+    assert fetcher.fetch_articles(['http://mp.weixin.qq.com/s/deleted1'], str(tmp_path)) == []
+    assert fetcher.breaker.counts()[DELETED] == 1
+    assert '稍后重试' not in capsys.readouterr().out
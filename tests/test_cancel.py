@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""ArticleFetcher.cancel_token：取消只影响正在进行的任务，获取器可以继续使用"""
+
+import pytest
+
+from wespy.deadline import Cancelled, Deadline
+
+
+@pytest.fixture
+def fetcher(mock_fetcher):
+    return mock_fetcher(paragraphs=3)
+
+
+def test_cancelled_batch_does_not_poison_later_runs(fetcher, tmp_path):
+    fetcher.cancel_token.cancel('用户中断')
+    urls = [f'http://mp.weixin.qq.com/s/{i}' for i in range(3)]
+    # 上一次任务遗留的取消状态在新任务开始时清除
+    assert len(fetcher.fetch_articles(urls, str(tmp_path))) == 3
+    assert fetcher.fetch('http://mp.weixin.qq.com/s/9').title
+
+
+def test_cancel_inside_outer_deadline_is_kept(fetcher):
+    # 外层截止时间（如 watch 的轮询）中的取消由外层负责，不会被清除
+    with Deadline(None, fetcher.cancel_token):
+        fetcher.cancel_token.cancel('停止')
+        with pytest.raises(Cancelled):
+            fetcher.fetch('http://mp.weixin.qq.com/s/1')
+    assert fetcher.cancel_token.cancelled
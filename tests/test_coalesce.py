@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""wespy.coalesce：作为库使用时默认不缓存响应"""
+
+import pytest
+
+
+
+@pytest.fixture
+def fetcher(mock_fetcher):
+    return mock_fetcher(paragraphs=3)
+
+
+def test_library_fetch_is_not_cached(fetcher):
+    for _ in range(2):
+        fetcher.fetch('http://mp.weixin.qq.com/s/1')
+    stats = fetcher.transfer_stats.snapshot()
+    assert stats['requests'] == 2 and stats['cached'] == 0
+
+
+def test_cache_enabled_explicitly(fetcher):
+    # 命令行 --response-cache 的做法
+    fetcher.coalescer.cache.max_bytes = 32 * 1024 * 1024
+    for _ in range(2):
+        fetcher.fetch('http://mp.weixin.qq.com/s/1')
+    stats = fetcher.transfer_stats.snapshot()
+    assert stats['requests'] == 1 and stats['cached'] == 1
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""wespy.concurrency.HostLimiter：耗时突增的判断"""
+
+from wespy.concurrency import OK, THROTTLED, HostLimiter
+
+
+def _request(limiter, seconds, outcome=OK):
+    limiter.acquire('h')
+    limiter.release('h', seconds, outcome)
+
+
+def _warm(limiter, seconds=0.002, count=10):
+    for _ in range(count):
+        _request(limiter, seconds)
+
+
+def test_fast_host_jitter_is_not_a_spike():
+    limiter = HostLimiter(initial=4)
+    _warm(limiter)
+    # 是基线的 25 倍，但只多出几十毫秒
+    for _ in range(5):
+        _request(limiter, 0.05)
+    assert limiter.snapshot()['h']['decreases'] == 0
+
+
+def test_single_slow_response_is_not_a_spike():
+    limiter = HostLimiter(initial=4)
+    _warm(limiter)
+    _request(limiter, 1.0)
+    _request(limiter, 0.002)
+    _request(limiter, 1.0)
+    assert limiter.snapshot()['h']['decreases'] == 0
+
+
+def test_consecutive_slow_responses_halve_the_limit():
+    limiter = HostLimiter(initial=4)
+    _warm(limiter)
+    _request(limiter, 1.0)
+    _request(limiter, 1.0)
+    snapshot = limiter.snapshot()['h']
+    assert snapshot['decreases'] == 1 and snapshot['limit'] == 2
+
+
+def test_throttle_halves_immediately():
+    limiter = HostLimiter(initial=4)
+    _request(limiter, 0.01, THROTTLED)
+    assert limiter.limit('h') == 2
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""wespy.crawler：同站判断、链接提取和 robots.txt"""
+
+from urllib.robotparser import RobotFileParser
+
+import pytest
+
+from wespy.crawler import Crawler
+
+
+@pytest.fixture
+def fetcher(mock_fetcher):
+    return mock_fetcher(paragraphs=5, album_size=6)
+
+
+def test_www_prefix_is_the_same_site(fetcher, tmp_path):
+    crawler = Crawler(fetcher, 'http://example.com/', str(tmp_path), respect_robots=False)
+    try:
+        # example.com 跳转到 www.example.com 后，页面中的链接仍属于本站
+        assert crawler.allowed('http://www.example.com/post/1')
+        assert crawler.allowed('http://example.com/post/1')
+        assert not crawler.allowed('http://blog.example.com/post/1')
+
+        # 只差 www. 的同一页面只加入队列一次
+        crawler._enqueue('http://www.example.com/post/1', 1)
+        crawler._enqueue('http://example.com/post/1', 1)
+        assert len(crawler.frontier) == 1
+    finally:
+        crawler.close()
+
+
+def test_crawl_parses_whole_pages(fetcher, tmp_path):
+    prescan_during_fetch = []
+    fetch = fetcher.fetch
+
+    def recording_fetch(url):
+        prescan_during_fetch.append(fetcher.prescan)
+        return fetch(url)
+
+    fetcher.fetch = recording_fetch
+    crawler = Crawler(fetcher, 'http://blog.example.com/blog/', str(tmp_path), max_depth=1,
+                      min_chars=100, respect_robots=False)
+    try:
+        articles = crawler.run()
+    finally:
+        crawler.close()
+
+    # 抓取期间关闭预扫描，结束后恢复
+    assert prescan_during_fetch and not any(prescan_during_fetch)
+    assert fetcher.prescan
+    assert len(articles) == 6
+
+
+def test_disallowed_seed_leaves_fetcher_unchanged(fetcher, tmp_path, monkeypatch):
+    robots = RobotFileParser()
+    robots.parse(['User-agent: *', 'Disallow: /'])
+    monkeypatch.setattr(Crawler, '_load_robots', lambda self: robots)
+    crawler = Crawler(fetcher, 'http://blog.example.com/blog/', str(tmp_path), max_depth=1)
+    try:
+        assert crawler.run() == []
+    finally:
+        crawler.close()
+
+    # robots.txt 不允许时直接返回，共享的 fetcher 不会留在爬取模式
+    assert crawler.pages == 0
+    assert fetcher.prescan and not fetcher.collect_links
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""wespy.density：按文字和链接密度选出正文，不选导航、侧栏和评论"""
+
+from bs4 import BeautifulSoup
+
+from wespy import mockserver
+from wespy.density import find_main_content
+from wespy.main import ArticleFetcher
+from wespy.rerender import render_markdown
+
+_COMMENT = ('<div class="c"><span>读者{0}</span><p>这篇文章写得很好，尤其是关于连接池的部分，'
+            '我在项目里也遇到过类似问题，谢谢分享。</p><a href="/r/{0}">回复</a></div>')
+PAGE = (
+    '<html><body><ul class="nav">'
+    + ''.join(f'<li><a href="/c/{i}">栏目导航链接文字比较长的一个条目 {i}，点击进入</a></li>' for i in range(30))
+    + '</ul><div class="x"><h1>标题</h1>'
+    + ''.join(f'<p>{mockserver._PARAGRAPH}（第 {i + 1} 段）</p>' for i in range(4))
+    + '</div><div id="comments">' + ''.join(_COMMENT.format(i) for i in range(12)) + '</div>'
+    + '<script>var comments = "这一段脚本里的文字，不是正文，也有很多逗号，逗号，逗号";</script></body></html>'
+)
+
+
+def test_article_beats_nav_and_comments():
+    content = find_main_content(BeautifulSoup(PAGE, 'html.parser').body)
+    assert content.get('class') == ['x']
+
+
+def test_cluttered_pages():
+    config = mockserver.MockConfig(paragraphs=5)
+    for post_id in range(1, 8):
+        body = BeautifulSoup(mockserver.cluttered_page(config, post_id), 'html.parser').body
+        assert find_main_content(body).get('class') == ['post-body'], post_id
+
+
+def test_general_page_markdown_is_the_article():
+    markdown = render_markdown(ArticleFetcher(), 'http://blog.example.com/post', PAGE)
+    assert '（第 4 段）' in markdown
+    assert '栏目导航' not in markdown and '读者' not in markdown and '脚本' not in markdown
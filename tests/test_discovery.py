@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""wespy feed：无日期条目的增量发现，--max-articles 截断的文章留到下次运行"""
+
+import json
+
+import pytest
+
+from wespy import discovery
+from wespy import main as wespy_main
+
+SITEMAP = 'http://blog.example.com/sitemap.xml'
+
+
+@pytest.fixture
+def run(monkeypatch, tmp_path, mock_site, mock_fetcher):
+    # 8 篇带 lastmod 的文章，另有一个没有 lastmod 的首页
+    proxy = mock_site(paragraphs=5, album_size=8)
+    monkeypatch.setattr(wespy_main, 'ArticleFetcher', lambda **kwargs: mock_fetcher(proxy, kwargs))
+    state_path = tmp_path / discovery.STATE_NAME
+
+    def run(*args, source=SITEMAP):
+        discovery.main([source, '-o', str(tmp_path), '--workers', '1'] + list(args))
+        return json.loads(state_path.read_text(encoding='utf-8'))['sources'][source]
+
+    return run
+
+
+def _saved(tmp_path):
+    return len(list((tmp_path / 'blog.example.com').glob('*.md')))
+
+
+def test_truncated_and_undated_entries_are_downloaded_later(run, tmp_path):
+    first = run('--max-articles', '5')
+    assert _saved(tmp_path) == 5
+    # 截断的 3 篇和无日期的首页留到下次
+    assert len(first['retry']) == 4
+    assert len(first['known']) == 5
+
+    second = run('--max-articles', '5')
+    assert _saved(tmp_path) == 9
+    assert second['retry'] == []
+    assert len(second['known']) == 9
+
+    # 之后没有新文章：已下载的无日期条目不会再次下载
+    third = run()
+    assert _saved(tmp_path) == 9
+    assert third['retry'] == [] and third['known'] == second['known']
+
+
+def test_undated_entries_are_found_by_url(run, tmp_path):
+    # 只有一个没有 lastmod 的首页
+    pages = 'http://blog.example.com/sitemap-pages.xml'
+    assert run(source=pages)['known'] == ['http://blog.example.com/blog/']
+    assert _saved(tmp_path) == 1
+
+    # 再次运行：已下载过，不会重复下载
+    for path in (tmp_path / 'blog.example.com').glob('*.md'):
+        path.unlink()
+    run(source=pages)
+    assert _saved(tmp_path) == 0
+
+    # 模拟首页是新出现的条目：有 since 时仍会被发现
+    state_path = tmp_path / discovery.STATE_NAME
+    data = json.loads(state_path.read_text(encoding='utf-8'))
+    data['sources'][pages]['known'] = []
+    state_path.write_text(json.dumps(data), encoding='utf-8')
+    for path in (tmp_path / 'blog.example.com').glob('*.md'):
+        path.unlink()
+    assert run(source=pages)['known'] == ['http://blog.example.com/blog/']
+    assert _saved(tmp_path) == 1
+
+
+def test_undated_entries_with_since_on_first_run(run, tmp_path):
+    # 没有运行记录时无法判断无日期条目是否为新的，按 --since 跳过
+    state = run('--since', '1d')
+    assert _saved(tmp_path) == 0
+    assert state['known'] == []
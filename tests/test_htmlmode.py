@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""wespy.htmlmode：content / compact 重新生成的 Markdown 与原始网页一致，compact 的精简规则和实际节省"""
+
+import json
+import os
+import shutil
+
+from bs4 import BeautifulSoup
+
+from wespy import mockserver
+from wespy.htmlmode import compact_html, measure
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+FIXTURE = os.path.join(DATA_DIR, 'wechat_article.html')
+
+
+def test_fixture_page_sizes_and_markdown():
+    # 带内联脚本、样式和统计代码的微信页面（原文地址取自 og:url）
+    totals = measure([FIXTURE])
+    raw, content, compact = (totals[mode]['bytes'] for mode in ('raw', 'content', 'compact'))
+    assert raw == os.path.getsize(FIXTURE)
+    assert totals['content']['mismatched'] == 0
+    assert totals['compact']['mismatched'] == 0
+    assert content < raw * 0.4
+    assert compact < content * 0.6
+
+
+def test_generated_pages_markdown(tmp_path):
+    # 生成的微信/掘金页面没有原文地址，使用同名的 _info.json
+    config = mockserver.MockConfig(paragraphs=5)
+    pages = {
+        'wechat': ('http://mp.weixin.qq.com/s/1', mockserver.wechat_page(config, '1')),
+        'juejin': ('http://juejin.cn/post/1', mockserver.juejin_page(config, '1')),
+    }
+    paths = []
+    for name, (url, page) in pages.items():
+        path = tmp_path / f'{name}.html'
+        path.write_bytes(page)
+        (tmp_path / f'{name}_info.json').write_text(json.dumps({'url': url}), encoding='utf-8')
+        paths.append(str(path))
+    shutil.copy(FIXTURE, str(tmp_path / 'fixture.html'))
+    paths.append(str(tmp_path / 'fixture.html'))
+
+    totals = measure(paths)
+    assert totals['content']['mismatched'] == 0
+    assert totals['compact']['mismatched'] == 0
+    assert totals['compact']['bytes'] < totals['content']['bytes'] < totals['raw']['bytes']
+
+
+def test_compact_html():
+    content = (
+        '<div id="js_content" class="rich_media_content" style="visibility: hidden;">'
+        '<!-- 注释 --><script>var a = 1;</script><style>p { color: red; }</style><noscript>无脚本</noscript>\n'
+        '  <section style="margin: 0"  data-tools="x">\n  <p class="p1">第一段   文字 <b>加粗</b> 结尾</p>\n  </section>'
+        '<img data-src="http://img.example.com/1.png" src="data:image/svg+xml,x" alt="图" data-w="640">'
+        '<pre class="code-snippet"><code class="language-python">def f():\n    return  1\n</code></pre>'
+        '</div>'
+    )
+    compact = compact_html(content)
+    soup = BeautifulSoup(compact, 'html.parser')
+
+    assert not soup.find_all(['script', 'style', 'noscript'])
+    assert '注释' not in compact
+    # 根节点保留 id，其余样式和 data-* 属性去掉
+    root = soup.find('div')
+    assert root.attrs == {'id': 'js_content'}
+    assert soup.find('section').attrs == {}
+    # 懒加载图片改为 src
+    assert soup.find('img').attrs == {'src': 'http://img.example.com/1.png', 'alt': '图'}
+    # 代码块保留语言 class 和原有空白，其他文字的空白压缩
+    assert soup.find('code')['class'] == ['language-python']
+    assert soup.find('code').string == 'def f():\n    return  1\n'
+    assert soup.find('p').decode() == '<p>第一段 文字 <b>加粗</b> 结尾</p>'
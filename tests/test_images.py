@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""图片本地化：离线重新生成时保留本地图片，后台写入时不重复下载"""
+
+import threading
+
+import pytest
+
+from wespy.images import IMAGE_DIR, ImagePipeline, save_images
+from wespy.rerender import rerender_directory
+from wespy.writer import OutputWriter
+
+
+@pytest.fixture
+def fetcher(mock_fetcher):
+    return mock_fetcher(paragraphs=12)
+
+
+def test_rerender_keeps_local_images(fetcher, tmp_path):
+    fetcher.images = ImagePipeline(fetcher.session, 'original', processes=0)
+    fetcher.fetch_article('http://mp.weixin.qq.com/s/1', str(tmp_path), save_html=True, save_json=True)
+    fetcher.close()
+
+    md_path = next(tmp_path.glob('*.md'))
+    before = md_path.read_text(encoding='utf-8')
+    assert f'({IMAGE_DIR}/' in before
+
+    counts = rerender_directory(str(tmp_path), jobs=1, force=True)
+    assert counts['rendered'] == 1
+    assert md_path.read_text(encoding='utf-8') == before
+
+
+def test_queued_images_are_not_downloaded_twice(fetcher, tmp_path):
+    pipeline = ImagePipeline(fetcher.session, 'original', processes=0)
+    writer = OutputWriter(background=True)
+    # 后台线程暂停写入，第一次保存的图片一直停留在队列中
+    release = threading.Event()
+    write_atomic = writer._write_atomic
+
+    def slow_write(path, data):
+        release.wait(5)
+        write_atomic(path, data)
+
+    writer._write_atomic = slow_write
+    html = '<p><img data-src="http://mmbiz.qpic.cn/mock/1_5.png"/></p>'
+    try:
+        first = save_images(pipeline, writer, str(tmp_path), html)
+        assert not (tmp_path / first['http://mmbiz.qpic.cn/mock/1_5.png']).exists()
+        second = save_images(pipeline, writer, str(tmp_path), html)
+    finally:
+        release.set()
+        writer.close()
+        pipeline.close()
+
+    assert first == second
+    assert pipeline.stats.snapshot()['reused'] == 1
+    assert (tmp_path / first['http://mmbiz.qpic.cn/mock/1_5.png']).exists()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""wespy.jobqueue：租约过期、心跳失效和失败退避（MemoryJobQueue + 模拟站点）"""
+
+import pytest
+
+from wespy.jobqueue import DONE, FAILED, LEASED, PENDING, MemoryJobQueue, Worker, retry_delay
+
+
+class FakeClock:
+    """可以手动拨动的时钟"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_expired_lease_is_taken_over(clock):
+    queue = MemoryJobQueue(clock=clock)
+    queue.put('http://mp.weixin.qq.com/s/1')
+
+    job = queue.lease('a', lease_seconds=30)
+    assert job.attempts == 1
+    # 租约有效期内其他 worker 领不到
+    assert queue.lease('b', lease_seconds=30) is None
+
+    clock.advance(31)
+    taken = queue.lease('b', lease_seconds=30)
+    assert taken.id == job.id
+    assert taken.attempts == 2
+
+
+def test_heartbeat_extends_lease(clock):
+    queue = MemoryJobQueue(clock=clock)
+    queue.put('http://mp.weixin.qq.com/s/1')
+    job = queue.lease('a', lease_seconds=30)
+
+    clock.advance(20)
+    assert queue.heartbeat(job.id, 'a', 30)
+    clock.advance(20)
+    # 续约后原来的过期时间已经过去，但租约仍有效
+    assert queue.lease('b', lease_seconds=30) is None
+    assert queue.complete(job.id, 'a', {'title': 't'})
+    assert queue.stats()[DONE] == 1
+
+
+def test_lost_lease_rejects_heartbeat_and_result(clock):
+    queue = MemoryJobQueue(clock=clock)
+    queue.put('http://mp.weixin.qq.com/s/1')
+    job = queue.lease('a', lease_seconds=30)
+
+    clock.advance(31)
+    queue.lease('b', lease_seconds=30)
+    # 失联的 worker 续约和提交结果都会被拒绝，结果以接手的 worker 为准
+    assert not queue.heartbeat(job.id, 'a', 30)
+    assert not queue.complete(job.id, 'a', {'title': 'stale'})
+    assert not queue.fail(job.id, 'a', 'stale')
+    assert queue.complete(job.id, 'b', {'title': 'fresh'})
+    assert queue.results() == [('http://mp.weixin.qq.com/s/1', {'title': 'fresh'})]
+
+
+def test_failed_job_backs_off_then_fails(clock):
+    queue = MemoryJobQueue(max_attempts=3, clock=clock)
+    queue.put('http://mp.weixin.qq.com/s/1')
+
+    for attempt in (1, 2):
+        job = queue.lease('a', lease_seconds=30)
+        assert job.attempts == attempt
+        assert queue.fail(job.id, 'a', 'boom')
+        assert queue.stats()[PENDING] == 1
+        # 退避时间内不会被重新领取
+        clock.advance(retry_delay(attempt) - 1)
+        assert queue.lease('a', lease_seconds=30) is None
+        clock.advance(1)
+
+    job = queue.lease('a', lease_seconds=30)
+    assert job.attempts == 3
+    queue.fail(job.id, 'a', 'boom')
+    stats = queue.stats()
+    assert stats[FAILED] == 1 and stats[PENDING] == 0
+
+
+def test_retry_delay_is_exponential_and_capped():
+    assert [retry_delay(n) for n in (1, 2, 3, 4)] == [5, 10, 20, 40]
+    assert retry_delay(20) == 300
+
+
+def test_repeatedly_expired_lease_fails(clock):
+    queue = MemoryJobQueue(max_attempts=2, clock=clock)
+    queue.put('http://mp.weixin.qq.com/s/1')
+    for _ in range(2):
+        assert queue.lease('a', lease_seconds=30) is not None
+        clock.advance(31)
+    assert queue.lease('a', lease_seconds=30) is None
+    assert queue.stats()[FAILED] == 1
+
+
+def test_release_does_not_count_as_attempt(clock):
+    queue = MemoryJobQueue(clock=clock)
+    queue.put('http://mp.weixin.qq.com/s/1')
+    job = queue.lease('a', lease_seconds=30)
+    assert queue.release(job.id, 'a', delay=10)
+    assert queue.stats()[LEASED] == 0
+    assert queue.lease('a', lease_seconds=30) is None
+    clock.advance(10)
+    assert queue.lease('a', lease_seconds=30).attempts == 1
+
+
+def test_worker_drains_queue(mock_fetcher, tmp_path):
+    fetcher = mock_fetcher(paragraphs=5)
+    queue = MemoryJobQueue(max_attempts=1)
+    queue.put('http://mp.weixin.qq.com/s/1')
+    queue.put('http://juejin.cn/post/2', group='juejin')
+    # 已删除页面：单次尝试后标记为失败
+    queue.put('http://mp.weixin.qq.com/s/deleted3')
+
+    worker = Worker(queue, fetcher, output_dir=str(tmp_path), worker_id='w1', heartbeat_seconds=0.05)
+    counts = worker.run(exit_when_empty=True, poll_seconds=0.01)
+
+    assert counts['done'] == 2 and counts['failed'] == 1
+    stats = queue.stats()
+    assert stats[DONE] == 2 and stats[FAILED] == 1
+    # 分组的任务保存到以分组命名的子目录
+    assert any(path.suffix == '.md' for path in (tmp_path / 'juejin').iterdir())
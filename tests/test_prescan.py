@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""wespy.prescan：只截取正文和元数据节点，找不到正文时回退到完整解析"""
+
+import pytest
+
+from wespy.main import WECHAT_PRESCAN_TARGETS, ArticleFetcher
+from wespy.prescan import Target, extract_fragments
+from wespy.rerender import render_markdown
+
+URL = 'http://mp.weixin.qq.com/s/1'
+HEAD = '<html><head><script>var a = "<div id=\'js_content\'>";</script><style>p { color: red }</style></head><body>'
+META = ('<h1 class="rich_media_title">标题</h1><a id="js_name">公众号</a>'
+        '<em id="publish_time">2024-01-01</em><!-- <div id="js_content">注释中的节点</div> -->')
+
+
+def test_fragments_keep_targets_only():
+    html = HEAD + META + '<div class="share">分享</div><div id="js_content"><p>正文</p><div>嵌套</div></div></body></html>'
+    fragment = extract_fragments(html, WECHAT_PRESCAN_TARGETS, required=(0,))
+    # 脚本和注释中的同名标签不算；嵌套在目标中的节点不重复输出
+    assert fragment == ('<h1 class="rich_media_title">标题</h1><a id="js_name">公众号</a>'
+                        '<em id="publish_time">2024-01-01</em>'
+                        '<div id="js_content"><p>正文</p><div>嵌套</div></div>')
+    # 直接扫描 UTF-8 字节，结果相同
+    assert extract_fragments(html.encode('utf-8'), WECHAT_PRESCAN_TARGETS, required=(0,)) == fragment.encode('utf-8')
+
+
+def test_all_matches():
+    html = '<p><a class="tag">甲</a><span><a class="tag x">乙</a></span><a class="other">丙</a></p>'
+    targets = [Target('a', class_='tag', all=True)]
+    assert extract_fragments(html, targets) == '<a class="tag">甲</a><a class="tag x">乙</a>'
+
+
+def test_implicitly_closed_content():
+    # 与 BeautifulSoup 一致：外层结束标签隐式关闭正文容器
+    html = HEAD + '<div id="js_content"><p>正文<div>嵌套</body></html>'
+    assert extract_fragments(html, WECHAT_PRESCAN_TARGETS, required=(0,)) == '<div id="js_content"><p>正文<div>嵌套</div></p></div>'
+
+
+@pytest.mark.parametrize('html', [
+    # 没有正文容器
+    HEAD + META + '<div class="rich_media_content"><p>正文放在别的容器中</p></div></body></html>',
+    # 截断的网页，正文容器到结尾都没有闭合
+    HEAD + META + '<div id="js_content"><p>没有闭合的正文</p>',
+])
+def test_missing_content_falls_back_to_full_parse(html):
+    assert extract_fragments(html, WECHAT_PRESCAN_TARGETS, required=(0,)) is None
+
+    fetcher = ArticleFetcher()
+    prescanned = render_markdown(fetcher, URL, html)
+    fetcher.prescan = False
+    assert prescanned == render_markdown(fetcher, URL, html)
+    assert '# 标题' in prescanned
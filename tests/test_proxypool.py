@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""wespy.proxypool：以本地模拟站点作为代理，测试移出、恢复和固定出口"""
+
+import socket
+
+import pytest
+
+from wespy.main import ArticleFetcher
+from wespy.proxypool import Proxy, ProxyPool
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def mock_proxies(mock_site):
+    """两个独立的模拟站点，分别作为两个代理出口"""
+    return [mock_site(paragraphs=3) for _ in range(2)]
+
+
+def _fetcher(pool):
+    fetcher = ArticleFetcher()
+    fetcher.proxy_pool = pool
+    return fetcher
+
+
+def test_dead_proxy_is_ejected(mock_proxies):
+    dead = Proxy(f'http://127.0.0.1:{_free_port()}')
+    live = Proxy(mock_proxies[0])
+    pool = ProxyPool([dead, live], eject_after=2, cooldown=60)
+    fetcher = _fetcher(pool)
+    try:
+        # 连不上的代理换一个重试，所有文章都能下载
+        for i in range(6):
+            assert fetcher.fetch(f'http://mp.weixin.qq.com/s/{i}').title
+    finally:
+        fetcher.close()
+
+    snapshot = pool.snapshot()
+    assert snapshot[dead.name]['failed'] == 2 and snapshot[dead.name]['ejected'] == 1
+    assert snapshot[dead.name]['ejected_seconds'] > 0
+    assert snapshot[live.name]['ok'] == 6
+    # 移出之后不再使用
+    assert snapshot[dead.name]['requests'] == 2
+
+
+def test_health_check_restores_proxy(mock_site):
+    port = _free_port()
+    proxy = Proxy(f'http://127.0.0.1:{port}')
+    pool = ProxyPool([proxy], eject_after=1, cooldown=600, health_url='http://mp.weixin.qq.com/s/1')
+
+    # 代理还没有启动：检查失败并移出
+    assert not pool.check_proxy(proxy)
+    assert pool.snapshot()[proxy.name]['ejected'] == 1
+    assert pool.snapshot()[proxy.name]['ejected_seconds'] > 0
+
+    mock_site(port=port, paragraphs=3)
+    assert pool.check_proxy(proxy)
+    assert pool.snapshot()[proxy.name]['ejected_seconds'] == 0
+
+
+def test_blocked_proxy_waits_for_cooldown(mock_proxies):
+    proxy = Proxy(mock_proxies[0])
+    pool = ProxyPool([proxy], cooldown=600, health_url='http://mp.weixin.qq.com/s/1')
+    pool.acquire('http://mp.weixin.qq.com/s/1')
+    pool.report_blocked('http://mp.weixin.qq.com/s/1')
+    # 验证页面也是正常响应，健康检查通过也不能说明限制已解除
+    assert pool.check_proxy(proxy)
+    assert pool.snapshot()[proxy.name]['ejected_seconds'] > 0
+
+
+def test_sticky_host_keeps_its_proxy(mock_proxies):
+    first, second = Proxy(mock_proxies[0]), Proxy(mock_proxies[1])
+    pool = ProxyPool([first, second], sticky=['mp.weixin.qq.com'])
+    fetcher = _fetcher(pool)
+    try:
+        for i in range(4):
+            fetcher.fetch(f'http://mp.weixin.qq.com/s/{i}')
+        sticky = {name: info['requests'] for name, info in pool.snapshot().items()}
+        # 其他站点轮流使用两个代理
+        for i in range(4):
+            fetcher.fetch(f'http://juejin.cn/post/{i}')
+    finally:
+        fetcher.close()
+
+    assert sorted(sticky.values()) == [0, 4]
+    counts = pool.snapshot()
+    assert counts[first.name]['requests'] + counts[second.name]['requests'] == 8
+    assert min(counts[first.name]['requests'], counts[second.name]['requests']) == 2
+
+
+def test_ejected_sticky_proxy_moves_to_another(mock_proxies):
+    first, second = Proxy(mock_proxies[0]), Proxy(mock_proxies[1])
+    pool = ProxyPool([first, second], sticky=['mp.weixin.qq.com'], cooldown=600)
+    used = pool.acquire('http://mp.weixin.qq.com/s/1')
+    assert pool.acquire('http://mp.weixin.qq.com/s/2') is used
+    pool.report_blocked('http://mp.weixin.qq.com/s/2')
+    other = pool.acquire('http://mp.weixin.qq.com/s/3')
+    assert other is not used
+    assert pool.acquire('http://mp.weixin.qq.com/s/4') is other
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""wespy rerender：按清单跳过没有变化的文件，转换器版本变化或 --force 时重新生成"""
+
+from wespy import main as wespy_main
+from wespy.rerender import MANIFEST_NAME, rerender_directory
+
+
+def test_manifest_skips_unchanged(mock_fetcher, tmp_path, monkeypatch):
+    fetcher = mock_fetcher(paragraphs=5)
+    for url in ('http://mp.weixin.qq.com/s/1', 'http://juejin.cn/post/2'):
+        fetcher.fetch_article(url, str(tmp_path), save_html=True, save_json=True)
+    fetcher.writer.flush()
+    md_paths = sorted(tmp_path.glob('*.md'))
+    saved = [path.read_text(encoding='utf-8') for path in md_paths]
+
+    assert rerender_directory(str(tmp_path), jobs=1) == {'rendered': 2, 'skipped': 0, 'failed': 0}
+    assert (tmp_path / MANIFEST_NAME).exists()
+    # 离线重新生成的结果与下载时保存的一致
+    assert [path.read_text(encoding='utf-8') for path in md_paths] == saved
+    assert rerender_directory(str(tmp_path), jobs=1) == {'rendered': 0, 'skipped': 2, 'failed': 0}
+
+    # 源文件改动：只重新生成这一篇
+    html_path = md_paths[0].with_suffix('.html')
+    html_path.write_bytes(html_path.read_bytes().replace('模拟'.encode('utf-8'), '修改'.encode('utf-8')))
+    assert rerender_directory(str(tmp_path), jobs=1) == {'rendered': 1, 'skipped': 1, 'failed': 0}
+    assert '修改' in md_paths[0].read_text(encoding='utf-8')
+
+    # 删除的 .md 会重新生成
+    md_paths[1].unlink()
+    assert rerender_directory(str(tmp_path), jobs=1) == {'rendered': 1, 'skipped': 1, 'failed': 0}
+    assert md_paths[1].read_text(encoding='utf-8') == saved[1]
+
+
+def test_converter_version_and_force(mock_fetcher, tmp_path, monkeypatch):
+    fetcher = mock_fetcher(paragraphs=5)
+    fetcher.fetch_article('http://mp.weixin.qq.com/s/1', str(tmp_path), save_html=True)
+    fetcher.writer.flush()
+    assert rerender_directory(str(tmp_path), jobs=1)['rendered'] == 1
+    assert rerender_directory(str(tmp_path), jobs=1)['skipped'] == 1
+
+    monkeypatch.setattr(wespy_main, 'CONVERTER_VERSION', wespy_main.CONVERTER_VERSION + 1)
+    assert rerender_directory(str(tmp_path), jobs=1)['rendered'] == 1
+    assert rerender_directory(str(tmp_path), jobs=1)['skipped'] == 1
+    assert rerender_directory(str(tmp_path), jobs=1, force=True)['rendered'] == 1
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""wespy.scheduler：各主机轮流、并发上限、优先级，以及受限任务放回队列"""
+
+from wespy.scheduler import HostScheduler
+
+
+def _take_all(scheduler):
+    """按顺序取出所有任务，每个立即完成"""
+    order = []
+    while True:
+        job = scheduler.next()
+        if job is None:
+            return order
+        scheduler.done(job)
+        order.append(job.url)
+
+
+def _urls(host, count):
+    return [f'http://{host}/{i}' for i in range(count)]
+
+
+def test_round_robin_between_hosts():
+    scheduler = HostScheduler()
+    urls = _urls('a.com', 4) + _urls('b.com', 3) + _urls('c.com', 1)
+    for index, url in enumerate(urls):
+        scheduler.add(index, url, url)
+
+    order = _take_all(scheduler)
+    # 主机数量不均时也轮流，不会先把 a.com 的文章全部取完
+    assert [url.split('/')[2] for url in order] == ['a.com', 'b.com', 'c.com', 'a.com', 'b.com', 'a.com', 'b.com', 'a.com']
+    # 同一主机内按加入顺序
+    assert [url for url in order if 'a.com' in url] == _urls('a.com', 4)
+    assert scheduler.pending() == 0 and scheduler.in_flight() == 0
+    assert {host: info['done'] for host, info in scheduler.snapshot().items()} == {'a.com': 4, 'b.com': 3, 'c.com': 1}
+
+
+def test_capacity_limits_each_host():
+    limits = {'a.com': 2, 'b.com': 1}
+    scheduler = HostScheduler(capacity=lambda host: limits[host])
+    for index, url in enumerate(_urls('a.com', 5) + _urls('b.com', 5)):
+        scheduler.add(index, url, url)
+
+    running = []
+    while True:
+        job = scheduler.next()
+        if job is None:
+            break
+        running.append(job)
+    # 慢站点占满上限后只有其他站点的任务继续开始
+    assert sorted(job.host for job in running) == ['a.com', 'a.com', 'b.com']
+    assert scheduler.in_flight() == 3
+
+    # 上限为 0 表示暂停该主机（熔断中）
+    limits['a.com'] = 0
+    scheduler.done(running[0])
+    assert scheduler.next() is None
+    scheduler.done(next(job for job in running if job.host == 'b.com'))
+    assert scheduler.next().host == 'b.com'
+
+
+def test_priority_first_then_rotation():
+    scheduler = HostScheduler()
+    scheduler.add(0, 'a0', 'http://a.com/0')
+    scheduler.add(1, 'a1', 'http://a.com/1', priority=5)
+    scheduler.add(2, 'b0', 'http://b.com/0')
+    scheduler.add(3, 'c0', 'http://c.com/0', priority=5)
+
+    order = []
+    while scheduler.pending():
+        job = scheduler.next()
+        scheduler.done(job)
+        order.append(job.item)
+    # 优先级高的先开始（同一主机内也是），优先级相同的主机之间轮流
+    assert order == ['a1', 'c0', 'b0', 'a0']
+
+
+def test_retry_goes_behind_same_host_queue():
+    scheduler = HostScheduler()
+    for index, url in enumerate(_urls('a.com', 3) + _urls('b.com', 1)):
+        scheduler.add(index, url, url)
+
+    job = scheduler.next()
+    assert job.url == 'http://a.com/0'
+    scheduler.retry(job)
+    assert job.retries == 1 and scheduler.in_flight() == 0
+    assert _take_all(scheduler) == ['http://b.com/0', 'http://a.com/1', 'http://a.com/2', 'http://a.com/0']
+
+    snapshot = scheduler.snapshot()
+    assert snapshot['a.com']['done'] == 3 and snapshot['a.com']['retried'] == 1
+    assert '受限重试 1 次' in HostScheduler.format(snapshot)[0]
+
+
+def test_drain_returns_unstarted_in_original_order():
+    scheduler = HostScheduler()
+    for index, url in enumerate(['http://b.com/0', 'http://a.com/0', 'http://b.com/1', 'http://a.com/1']):
+        scheduler.add(index, url, url)
+    scheduler.done(scheduler.next())
+
+    assert [job.index for job in scheduler.drain()] == [1, 2, 3]
+    assert scheduler.pending() == 0 and scheduler.next() is None
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""wespy.search：中文分词、单字搜索、增量更新、专辑和按列搜索"""
+
+import os
+
+import pytest
+
+from wespy import mockserver
+from wespy.search import INDEX_NAME, SearchIndex, build_query, segment
+
+ALBUM_URL = (f'http://mp.weixin.qq.com/mp/appmsgalbum?__biz={mockserver.ALBUM_BIZ}'
+             f'&action=getalbum&album_id={mockserver.ALBUM_ID}')
+
+
+def _markdown(title, body, author='张三', tags='数据库'):
+    return (f"# {title}\n\n**作者**: {author}\n**标签**: {tags}\n"
+            f"**原文链接**: http://example.com/{title}\n\n---\n\n{body}\n")
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / INDEX_NAME), root=str(tmp_path))
+    yield index
+    index.close()
+
+
+def _titles(index, query):
+    return [result['title'] for result in index.search(query)]
+
+
+def test_segment():
+    assert segment('数据库 SQLite') == ' 数据 据库 库  SQLite'
+    assert segment('储') == ' 储 '
+    # 查询时不追加段末单字，多字片段按相邻二元组匹配
+    assert segment('数据库', query=True).split() == ['数据', '据库']
+    assert build_query('数据库') == '"数据 据库"'
+    assert build_query('储') == '"储"*'
+    assert build_query('title:存储 sql*') == 'title : "存储" AND "sql"*'
+
+
+def test_single_characters_anywhere_in_a_run(index, tmp_path):
+    _write(tmp_path / 'a.md', _markdown('文章', '介绍数据库存储的原理'))
+    index.update()
+    # 开头、中间和段末的单字，以及跨越段末的片段都能命中
+    for query in ('介', '数', '库', '存', '储', '的', '理', '原理', '库存储', '数据库存储的原理'):
+        assert _titles(index, query) == ['文章'], query
+    assert _titles(index, '据存') == []
+
+
+def test_update_is_incremental(index, tmp_path):
+    _write(tmp_path / 'a.md', _markdown('第一篇', '连接复用'))
+    _write(tmp_path / 'b.md', _markdown('第二篇', '压缩传输'))
+    assert index.update() == {'added': 2, 'updated': 0, 'unchanged': 0, 'removed': 0}
+    assert index.update() == {'added': 0, 'updated': 0, 'unchanged': 2, 'removed': 0}
+
+    # 内容不变、只有修改时间变化：比较哈希后跳过
+    stat = os.stat(tmp_path / 'a.md')
+    os.utime(tmp_path / 'a.md', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert index.update()['unchanged'] == 2
+
+    _write(tmp_path / 'b.md', _markdown('第二篇', '解析开销'))
+    (tmp_path / 'a.md').unlink()
+    assert index.update() == {'added': 0, 'updated': 1, 'unchanged': 0, 'removed': 1}
+    assert _titles(index, '开销') == ['第二篇']
+    assert _titles(index, '压缩') == []
+    assert index.count() == 1
+
+
+def test_title_column(index, tmp_path):
+    _write(tmp_path / 'a.md', _markdown('存储引擎', '正文没有这个词'))
+    _write(tmp_path / 'b.md', _markdown('网络', '正文提到存储引擎'))
+    index.update()
+    assert _titles(index, 'title:存储') == ['存储引擎']
+    # 不限定列时两篇都命中，标题权重更高
+    assert _titles(index, '存储') == ['存储引擎', '网络']
+
+
+def test_album_articles(index, mock_fetcher, tmp_path):
+    fetcher = mock_fetcher(paragraphs=3, album_size=3)
+    fetcher.search_index = index
+    fetcher.fetch_album_articles(ALBUM_URL, str(tmp_path))
+    fetcher.writer.flush()
+    _write(tmp_path / 'other.md', _markdown('专辑以外', '模拟文章'))
+
+    index.update()
+    results = index.search('album:1000', limit=10)
+    assert len(results) == 3
+    assert all(ALBUM_URL in result['album'] for result in results)
+    assert len(index.search('模拟文章', limit=10)) == 4
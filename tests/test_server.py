@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""wespy.server：参数校验、背压、output_dir 限制、失败任务、指标和并发读取Markdown"""
+
+import threading
+
+import pytest
+import requests
+
+from wespy.server import JobRunner, create_server
+
+
+@pytest.fixture
+def serve(mock_fetcher, tmp_path):
+    """启动服务的工厂：serve(**JobRunner参数) 返回 (接口地址, runner)"""
+    started = []
+
+    def start(workers=1, queue_size=10, **config):
+        fetcher = mock_fetcher(**config)
+        runner = JobRunner(fetcher, workers=workers, queue_size=queue_size, output_dir=str(tmp_path / 'out'))
+        server = create_server('127.0.0.1', 0, runner)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        started.append((server, runner))
+        return f"http://127.0.0.1:{server.server_address[1]}", runner
+
+    yield start
+    for server, runner in started:
+        server.shutdown()
+        server.server_close()
+        runner.stop()
+
+
+@pytest.fixture
+def http():
+    session = requests.Session()
+    # 不使用环境变量中的代理访问本机服务
+    session.trust_env = False
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize('params', [
+    {'timeout': 'abc', 'wait': True},
+    {'timeout': -1},
+    {'wait': 'yes'},
+    {'max_articles': 0},
+    {'format': 'pdf'},
+])
+def test_invalid_params_are_rejected(serve, http, params):
+    base, runner = serve(paragraphs=3)
+    response = http.post(f'{base}/jobs', json=dict({'url': 'http://mp.weixin.qq.com/s/1'}, **params))
+    assert response.status_code == 400
+    assert response.json()['error']
+    assert runner.metrics()['jobs']['submitted'] == 0
+
+
+def test_full_queue_returns_503(serve, http):
+    # 没有工作线程，第一个任务占满队列
+    base, runner = serve(workers=0, queue_size=1, paragraphs=3)
+    assert http.post(f'{base}/jobs', json={'url': 'http://mp.weixin.qq.com/s/1'}).status_code == 202
+    response = http.post(f'{base}/jobs', json={'url': 'http://mp.weixin.qq.com/s/2'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+    metrics = http.get(f'{base}/metrics').json()
+    assert metrics['queue_depth'] == 1 and metrics['queue_capacity'] == 1
+    assert metrics['jobs']['submitted'] == 1 and metrics['jobs']['rejected'] == 1
+
+
+def test_output_dir_stays_inside_output_root(serve, http, tmp_path):
+    base, _ = serve(paragraphs=3)
+    for outside in ('../escape', str(tmp_path / 'elsewhere')):
+        response = http.post(f'{base}/jobs', json={'url': 'http://mp.weixin.qq.com/s/1', 'output_dir': outside})
+        assert response.status_code == 400
+
+    response = http.post(f'{base}/jobs', json={
+        'url': 'http://mp.weixin.qq.com/s/1', 'output_dir': 'team-a', 'wait': True, 'timeout': 10,
+    })
+    assert response.status_code == 200
+    assert list((tmp_path / 'out' / 'team-a').glob('*.md'))
+    assert not (tmp_path / 'escape').exists()
+
+
+def test_failed_job_is_502_with_error(serve, http):
+    base, _ = serve(paragraphs=3)
+    response = http.post(f'{base}/jobs', json={'url': 'http://mp.weixin.qq.com/s/deleted1', 'wait': True, 'timeout': 10})
+    assert response.status_code == 502
+    data = response.json()
+    assert data['status'] == 'failed' and data['error']
+    assert http.get(f"{base}/jobs/{data['job_id']}").status_code == 502
+
+
+def test_metrics_and_latency(serve, http):
+    base, _ = serve(paragraphs=3)
+    response = http.post(f'{base}/jobs', json={'url': 'http://mp.weixin.qq.com/s/1', 'wait': True, 'timeout': 10})
+    assert response.status_code == 200 and response.json()['result']['markdown']
+
+    metrics = http.get(f'{base}/metrics').json()
+    assert metrics['jobs']['succeeded'] == 1
+    assert metrics['latency']['article']['count'] == 1
+    assert metrics['transfer']['requests'] == 1
+    assert 'mp.weixin.qq.com' in metrics['concurrency']
+
+
+def test_concurrent_markdown_readers(serve, http):
+    base, runner = serve(paragraphs=2000)
+    response = http.post(f'{base}/jobs', json={'url': 'http://mp.weixin.qq.com/s/1', 'format': 'markdown'})
+    job_id = response.json()['job_id']
+    assert runner.get(job_id).done.wait(10)
+    assert runner.get(job_id).article is not None
+    expected = runner.fetcher.fetch('http://mp.weixin.qq.com/s/1').markdown
+
+    start = threading.Barrier(3)
+    bodies = []
+
+    def read():
+        with requests.Session() as session:
+            session.trust_env = False
+            start.wait()
+            bodies.append(session.get(f'{base}/jobs/{job_id}?format=markdown').text)
+
+    threads = [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert bodies == [expected] * 3
+    assert runner.get(job_id).article is None
+    # 转换后只保留Markdown文本，之后的请求直接返回
+    assert http.get(f'{base}/jobs/{job_id}?format=markdown').text == expected
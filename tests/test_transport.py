@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""wespy.transport：压缩响应的线上/解码字节统计，以及无法解码的 Content-Encoding"""
+
+import gzip
+import zlib
+
+import pytest
+import requests
+
+from wespy import mockserver
+
+URL = 'http://mp.weixin.qq.com/s/1'
+
+
+@pytest.mark.parametrize('encoding, compress', [
+    (None, bytes),
+    ('gzip', gzip.compress),
+    ('deflate', zlib.compress),
+])
+def test_wire_and_decoded_bytes(mock_fetcher, encoding, compress):
+    fetcher = mock_fetcher(paragraphs=20, content_encoding=encoding)
+    page = mockserver.wechat_page(mockserver.MockConfig(paragraphs=20), '1')
+
+    article = fetcher.fetch(URL)
+    assert article.title
+
+    stats = fetcher.transfer_stats.snapshot()
+    name = encoding or 'identity'
+    assert stats['requests'] == 1
+    assert stats['by_encoding'] == {
+        name: {'requests': 1, 'wire_bytes': len(compress(page)), 'decoded_bytes': len(page)},
+    }
+    assert stats['decoded_bytes'] == len(page)
+    if encoding:
+        assert stats['wire_bytes'] < stats['decoded_bytes']
+    else:
+        assert stats['wire_bytes'] == stats['decoded_bytes']
+
+
+def test_compressed_page_converts_like_plain(mock_fetcher):
+    plain = mock_fetcher(paragraphs=5).fetch(URL).markdown
+    assert mock_fetcher(paragraphs=5, content_encoding='gzip').fetch(URL).markdown == plain
+
+
+@pytest.mark.parametrize('encoding', ['compress', 'x-unknown'])
+def test_undeclared_encoding_raises(mock_fetcher, encoding):
+    fetcher = mock_fetcher(paragraphs=3, content_encoding=encoding)
+    assert encoding not in fetcher.session.headers['Accept-Encoding']
+
+    with pytest.raises(requests.exceptions.ContentDecodingError, match=encoding):
+        fetcher.session.get(URL)
+    # 没有把压缩后的字节当作网页内容交给调用方，也不计入统计
+    assert fetcher.transfer_stats.snapshot()['requests'] == 0
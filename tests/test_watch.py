@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""wespy.watch：专辑位置按 (msgid, itemidx) 推进，同一次推送的文章不会丢失"""
+
+import pytest
+
+from wespy import mockserver
+from wespy.watch import ALBUM, Feed, FeedState, Watcher
+
+ALBUM_URL = (f'http://mp.weixin.qq.com/mp/appmsgalbum?__biz={mockserver.ALBUM_BIZ}'
+             f'&action=getalbum&album_id={mockserver.ALBUM_ID}')
+
+
+@pytest.fixture
+def fetcher(mock_fetcher):
+    # 6 次推送，每次 3 篇
+    return mock_fetcher(paragraphs=3, album_size=18, push_size=3)
+
+
+def _watcher(fetcher, tmp_path, max_articles):
+    feed = Feed('album', ALBUM, ALBUM_URL, 3600, 0, str(tmp_path), max_articles, backfill=True)
+    return Watcher(fetcher, [feed], FeedState(str(tmp_path / 'state.json'))), feed
+
+
+def _fail(fetcher, failing):
+    """让 failing 中的文章下载失败"""
+    fetch_articles = fetcher.fetch_articles
+
+    def wrapper(urls, *args, **kwargs):
+        results = fetch_articles(urls, *args, **kwargs)
+        return [result for result in results if result['url'] not in failing]
+
+    fetcher.fetch_articles = wrapper
+
+
+def test_failed_sibling_is_retried(fetcher, tmp_path):
+    watcher, feed = _watcher(fetcher, tmp_path, max_articles=20)
+    newest = mockserver._FIRST_MSGID
+    cursor = (newest - 2, 3)
+    # 最新一次推送中第 2 篇失败，第 3 篇成功
+    failing = {f'http://mp.weixin.qq.com/s/{newest}_2'}
+    _fail(fetcher, failing)
+    new_count, failed_count, cursor = watcher._poll(feed, cursor)
+    assert (new_count, failed_count) == (6, 1)
+    assert cursor == (newest, 1)
+
+    del fetcher.fetch_articles
+    new_count, failed_count, cursor = watcher._poll(feed, list(cursor))
+    assert (new_count, failed_count) == (2, 0)
+    assert cursor == (newest, 3)
+
+
+def test_max_articles_split_inside_a_push(fetcher, tmp_path):
+    watcher, feed = _watcher(fetcher, tmp_path, max_articles=4)
+    newest = mockserver._FIRST_MSGID
+    cursor = (newest - 2, 3)
+    # 两次推送共 6 篇，每次只下载 4 篇，截断发生在最新一次推送的中间
+    assert watcher._poll(feed, cursor)[::2] == (4, (newest, 1))
+    assert watcher._poll(feed, (newest, 1))[::2] == (2, (newest, 3))
+    assert watcher._poll(feed, (newest, 3))[::2] == (0, (newest, 3))
+
+
+def test_legacy_msgid_cursor(fetcher, tmp_path):
+    watcher, feed = _watcher(fetcher, tmp_path, max_articles=20)
+    newest = mockserver._FIRST_MSGID
+    # 旧版本保存的位置只有 msgid
+    new_count, _, cursor = watcher._poll(feed, newest - 1)
+    assert new_count == 3 and cursor == (newest, 3)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""wespy.writer：原子替换、生成片段出错时清理临时文件、后台写入的错误在 flush() 中抛出"""
+
+import pytest
+
+from wespy.writer import OutputWriter, benchmark
+
+
+def _leftovers(directory):
+    return [path.name for path in directory.iterdir() if path.name.endswith('.tmp')]
+
+
+@pytest.mark.parametrize('background', [False, True])
+def test_atomic_replace(tmp_path, background):
+    path = tmp_path / 'a' / 'article.md'
+    writer = OutputWriter(background=background)
+    writer.write_text(str(path), ['# 标题\n\n', '旧内容'])
+    writer.flush()
+    writer.write_text(str(path), ['# 标题\n\n', '新内容'])
+    writer.close()
+
+    assert path.read_text(encoding='utf-8') == '# 标题\n\n新内容'
+    assert _leftovers(path.parent) == []
+    assert writer.stats['files'] == 2
+
+
+def test_failed_stream_keeps_old_file(tmp_path):
+    path = tmp_path / 'article.md'
+    path.write_text('旧内容', encoding='utf-8')
+
+    def chunks():
+        yield '新内容的第一段'
+        raise RuntimeError('转换出错')
+
+    writer = OutputWriter()
+    with pytest.raises(RuntimeError):
+        writer.stream_text(str(path), chunks())
+
+    assert path.read_text(encoding='utf-8') == '旧内容'
+    assert _leftovers(tmp_path) == []
+    assert writer.stats['files'] == 0
+
+
+def test_background_error_is_raised_by_flush(tmp_path):
+    # 目标路径是一个目录，重命名会失败
+    target = tmp_path / 'article.md'
+    target.mkdir()
+    writer = OutputWriter(background=True)
+    writer.write_bytes(str(target), b'data')
+    with pytest.raises(OSError):
+        writer.flush()
+    assert _leftovers(tmp_path) == []
+
+    # 错误只抛出一次，之后的写入正常进行
+    writer.write_bytes(str(tmp_path / 'other.md'), b'data')
+    writer.close()
+    assert (tmp_path / 'other.md').read_bytes() == b'data'
+
+
+def test_benchmark_cleans_up(tmp_path):
+    results = benchmark(str(tmp_path), files=20, size=256, repeat=1)
+    assert set(results) == {'open', 'writer', 'background'}
+    assert all(info['seconds'] > 0 for info in results.values())
+    assert list(tmp_path.iterdir()) == []
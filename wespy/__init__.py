@@ -8,5 +8,6 @@ __author__ = "tianchang"
 __description__ = "A tool for fetching web articles and converting them to Markdown"
 
 from .main import ArticleFetcher
+from .article import Article
 
-__all__ = ['ArticleFetcher']
\ No newline at end of file
+__all__ = ['ArticleFetcher', 'Article']
\ No newline at end of file
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+归档输出
+把整个专辑/批量任务的文章写入单个压缩包，而不是成千上万个散落的小文件
+
+支持的格式:
+    zip       每篇文章的 .md / _info.json / .html 作为独立成员，末尾写入 index.json
+    tar.zst   每篇文章的tar成员压缩为独立的zstd帧（需要安装 zstandard），末尾写入 index.json
+    jsonl.gz  每篇文章一行JSON，每行是独立的gzip成员，末尾一行为索引记录
+
+tar.zst 和 jsonl.gz 额外生成 <归档>.idx.json，记录每篇文章所在帧的偏移，
+读取单篇文章时只需解压对应的一帧
+
+zip 和 tar.zst 可以同时保存文章图片（articles/images/，见 wespy.images），
+每张图片只写入一次
+"""
+
+import argparse
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from wespy.htmlmode import encode_html
+
+ARCHIVE_FORMATS = ('zip', 'tar.zst', 'jsonl.gz')
+INDEX_MEMBER = 'index.json'
+IMAGE_PREFIX = 'articles/images/'
+SIDECAR_SUFFIX = '.idx.json'
+
+
+def detect_format(path):
+    """根据扩展名判断归档格式"""
+    for fmt in ARCHIVE_FORMATS:
+        if path.endswith('.' + fmt):
+            return fmt
+    raise ValueError(f"无法识别的归档格式: {path}")
+
+
+def open_archive(path, fmt=None):
+    """
+    创建归档写入器
+
+    Args:
+        path (str): 归档文件路径
+        fmt (str, optional): zip / tar.zst / jsonl.gz，默认按扩展名判断
+
+    Returns:
+        ArchiveWriter: 写入器，使用完需 close()（支持 with 语句）
+    """
+    fmt = fmt or detect_format(path)
+    if fmt == 'zip':
+        return ZipArchiveWriter(path)
+    if fmt == 'tar.zst':
+        return TarZstArchiveWriter(path)
+    if fmt == 'jsonl.gz':
+        return JsonlGzArchiveWriter(path)
+    raise ValueError(f"不支持的归档格式: {fmt}，可选: {', '.join(ARCHIVE_FORMATS)}")
+
+
+class ArchiveWriter:
+    """归档写入器基类：负责命名、元数据和索引，子类负责具体的容器格式"""
+
+    # 是否可以保存图片，不支持时Markdown中保留图片的远程地址
+    supports_images = False
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = []
+        self._images = set()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self, article, markdown, include_html=False, extra=None, html=None):
+        """
+        写入一篇文章
+
+        Args:
+            article: Article 对象或 fetch_article 返回的字典
+            markdown (str): 完整Markdown文本
+            include_html (bool): 是否同时写入HTML
+            extra (dict, optional): 追加到元数据中的字段（如专辑信息）
+            html (str | bytes | memoryview, optional): include_html 时写入的HTML，字节为 UTF-8 编码；
+                默认为原始网页，直接使用下载到的缓冲区（见 wespy.htmlmode.encode_html）
+
+        Returns:
+            str: 文章在归档中的名称
+        """
+        meta = {
+            'title': article['title'],
+            'author': article['author'],
+            'publish_time': article['publish_time'],
+            'url': article['url'],
+        }
+        for key in ('tags', 'view_count'):
+            if article.get(key):
+                meta[key] = article[key]
+        meta.update(extra or {})
+        meta['fetch_time'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        if not include_html:
+            html = None
+        elif html is None:
+            html = encode_html(article, None)
+
+        with self._lock:
+            safe_title = re.sub(r'[<>:"/\\|?*\s]', '_', article['title'])[:50]
+            name = f"{len(self.entries) + 1:05d}_{safe_title}"
+            entry = {'name': name, 'title': meta['title'], 'url': meta['url']}
+            self._write_entry(entry, name, markdown, meta, html)
+            self.entries.append(entry)
+        return name
+
+    def add_image(self, name, data):
+        """写入一张图片（articles/images/<name>），同名图片只写入一次"""
+        with self._lock:
+            if name in self._images:
+                return
+            self._write_image(IMAGE_PREFIX + name, data)
+            self._images.add(name)
+
+    def has_image(self, name):
+        with self._lock:
+            return name in self._images
+
+    def close(self):
+        raise NotImplementedError
+
+    def _write_entry(self, entry, name, markdown, meta, html):
+        raise NotImplementedError
+
+    def _write_image(self, member, data):
+        raise NotImplementedError
+
+    def _index(self):
+        return {
+            'format': self.format,
+            'created_time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'count': len(self.entries),
+            'entries': self.entries,
+        }
+
+    def _write_sidecar(self):
+        with open(self.path + SIDECAR_SUFFIX, 'w', encoding='utf-8') as f:
+            json.dump(self._index(), f, ensure_ascii=False)
+
+
+class ZipArchiveWriter(ArchiveWriter):
+    format = 'zip'
+    supports_images = True
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def _write_entry(self, entry, name, markdown, meta, html):
+        members = {'markdown': f"articles/{name}.md", 'meta': f"articles/{name}_info.json"}
+        self._zip.writestr(members['markdown'], markdown)
+        self._zip.writestr(members['meta'], json.dumps(meta, ensure_ascii=False, indent=2))
+        if html is not None:
+            # 字节直接写入，不经过解码和重新编码
+            members['html'] = f"articles/{name}.html"
+            self._zip.writestr(members['html'], html)
+        entry['members'] = members
+
+    def _write_image(self, member, data):
+        # 图片已经是压缩格式，不再deflate
+        self._zip.writestr(member, data, compress_type=zipfile.ZIP_STORED)
+
+    def close(self):
+        with self._lock:
+            if self._zip is None:
+                return
+            self._zip.writestr(INDEX_MEMBER, json.dumps(self._index(), ensure_ascii=False, indent=2))
+            self._zip.close()
+            self._zip = None
+
+
+def _tar_member(name, data):
+    """
+    生成单个tar成员（头部 + 按512字节补齐的数据），不含归档结束块
+
+    Returns:
+        list: [头部, 数据, 补齐]，数据（bytes / memoryview）原样放入，不复制
+    """
+    size = memoryview(data).nbytes
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(time.time())
+    info.mode = 0o644
+    padding = (tarfile.BLOCKSIZE - size % tarfile.BLOCKSIZE) % tarfile.BLOCKSIZE
+    return [info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape'), data, b'\0' * padding]
+
+
+class TarZstArchiveWriter(ArchiveWriter):
+    """
+    每篇文章的tar成员压缩为一个独立的zstd帧，多个帧首尾相接仍是合法的zstd流，
+    可以直接用 `zstd -dc bundle.tar.zst | tar x` 解开
+    """
+
+    format = 'tar.zst'
+    supports_images = True
+
+    def __init__(self, path, level=10):
+        if zstandard is None:
+            raise RuntimeError("tar.zst 格式需要安装 zstandard: pip install wespy[zstd]")
+        super().__init__(path)
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._file = open(path, 'wb')
+
+    def _write_frame(self, chunks):
+        """把按顺序排列的数据块压缩为一个zstd帧（逐块送入压缩器，不先拼接），返回 (偏移, 帧长度)"""
+        offset = self._file.tell()
+        compressor = self._compressor.compressobj(size=sum(memoryview(chunk).nbytes for chunk in chunks))
+        for chunk in chunks:
+            self._file.write(compressor.compress(chunk))
+        self._file.write(compressor.flush())
+        return offset, self._file.tell() - offset
+
+    def _write_entry(self, entry, name, markdown, meta, html):
+        members = {'markdown': f"articles/{name}.md", 'meta': f"articles/{name}_info.json"}
+        chunks = (
+            _tar_member(members['markdown'], markdown.encode('utf-8'))
+            + _tar_member(members['meta'], json.dumps(meta, ensure_ascii=False, indent=2).encode('utf-8'))
+        )
+        if html is not None:
+            members['html'] = f"articles/{name}.html"
+            chunks += _tar_member(members['html'], html.encode('utf-8') if isinstance(html, str) else html)
+        entry['members'] = members
+        entry['offset'], entry['length'] = self._write_frame(chunks)
+
+    def _write_image(self, member, data):
+        # 每张图片单独一帧，不影响文章帧的偏移索引
+        self._write_frame(_tar_member(member, data))
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            index = json.dumps(self._index(), ensure_ascii=False, indent=2).encode('utf-8')
+            # 索引成员 + tar结束块（两个全零块）
+            self._write_frame(_tar_member(INDEX_MEMBER, index) + [b'\0' * (tarfile.BLOCKSIZE * 2)])
+            self._file.close()
+            self._file = None
+            self._write_sidecar()
+
+
+class JsonlGzArchiveWriter(ArchiveWriter):
+    """每篇文章一行JSON，每行单独压缩为一个gzip成员；整个文件仍可用 zcat 顺序读取"""
+
+    format = 'jsonl.gz'
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = open(path, 'wb')
+
+    def _write_record(self, record):
+        offset = self._file.tell()
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        member = gzip.compress(line)
+        self._file.write(member)
+        return offset, len(member)
+
+    def _write_entry(self, entry, name, markdown, meta, html):
+        record = {'type': 'article', 'name': name, 'meta': meta, 'markdown': markdown}
+        if html is not None:
+            # JSON 只能保存文本，字节在这里解码
+            record['html'] = html if isinstance(html, str) else str(html, 'utf-8', errors='replace')
+        entry['offset'], entry['length'] = self._write_record(record)
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._write_record(dict(self._index(), type='index'))
+            self._file.close()
+            self._file = None
+            self._write_sidecar()
+
+
+def list_articles(path):
+    """
+    读取归档索引
+
+    Returns:
+        list: 索引条目 [{'name', 'title', 'url', ...}, ...]
+    """
+    fmt = detect_format(path)
+    if fmt == 'zip':
+        with zipfile.ZipFile(path) as zf:
+            return json.loads(zf.read(INDEX_MEMBER).decode('utf-8'))['entries']
+
+    sidecar = path + SIDECAR_SUFFIX
+    if os.path.exists(sidecar):
+        with open(sidecar, encoding='utf-8') as f:
+            return json.load(f)['entries']
+
+    # 没有索引文件时顺序扫描
+    return [entry for entry, _ in _scan(path, fmt)]
+
+
+def read_article(path, key):
+    """
+    从归档中读取单篇文章，只解压该文章所在的成员/帧
+
+    Args:
+        path (str): 归档路径
+        key (str): 文章名称、URL或序号（从1开始）
+
+    Returns:
+        dict: {'name', 'meta', 'markdown', 'html'}，找不到时返回 None
+    """
+    fmt = detect_format(path)
+    entry = _find_entry(list_articles(path), key)
+    if entry is None:
+        return None
+
+    if fmt == 'zip':
+        with zipfile.ZipFile(path) as zf:
+            members = entry['members']
+            return {
+                'name': entry['name'],
+                'meta': json.loads(zf.read(members['meta']).decode('utf-8')),
+                'markdown': zf.read(members['markdown']).decode('utf-8'),
+                'html': zf.read(members['html']).decode('utf-8') if 'html' in members else None,
+            }
+
+    if 'offset' not in entry:
+        # 来自顺序扫描的条目没有偏移，直接从扫描结果取
+        for scanned, article in _scan(path, fmt):
+            if scanned['name'] == entry['name']:
+                return article
+        return None
+
+    with open(path, 'rb') as f:
+        f.seek(entry['offset'])
+        frame = f.read(entry['length'])
+    if fmt == 'jsonl.gz':
+        return _record_to_article(json.loads(gzip.decompress(frame).decode('utf-8')))
+    return _tar_frame_to_article(entry, _zstd_decompress(frame))
+
+
+def _find_entry(entries, key):
+    key = str(key)
+    if key.isdigit() and 0 < int(key) <= len(entries):
+        return entries[int(key) - 1]
+    for entry in entries:
+        if key in (entry['name'], entry['url']):
+            return entry
+    return None
+
+
+def _record_to_article(record):
+    return {
+        'name': record['name'],
+        'meta': record['meta'],
+        'markdown': record['markdown'],
+        'html': record.get('html'),
+    }
+
+
+def _zstd_decompress(data):
+    if zstandard is None:
+        raise RuntimeError("读取 tar.zst 需要安装 zstandard: pip install wespy[zstd]")
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def _tar_frame_to_article(entry, data):
+    contents = {}
+    with tarfile.open(fileobj=io.BytesIO(data), mode='r:') as tf:
+        for member in tf:
+            contents[member.name] = tf.extractfile(member).read().decode('utf-8')
+    members = entry['members']
+    return {
+        'name': entry['name'],
+        'meta': json.loads(contents[members['meta']]),
+        'markdown': contents[members['markdown']],
+        'html': contents.get(members.get('html')),
+    }
+
+
+def _scan(path, fmt):
+    """顺序扫描归档（无索引文件时使用），产出 (索引条目, 文章)"""
+    if fmt == 'jsonl.gz':
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get('type') == 'article':
+                    meta = record['meta']
+                    yield {'name': record['name'], 'title': meta['title'], 'url': meta['url']}, _record_to_article(record)
+        return
+
+    if zstandard is None:
+        raise RuntimeError("读取 tar.zst 需要安装 zstandard: pip install wespy[zstd]")
+    with open(path, 'rb') as raw:
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        with tarfile.open(fileobj=reader, mode='r|') as tf:
+            # 同一篇文章的成员是连续写入的，遇到下一篇时产出上一篇
+            current_name = None
+            current = {}
+            for member in tf:
+                if member.name == INDEX_MEMBER or member.name.startswith(IMAGE_PREFIX):
+                    continue
+                name, kind = _split_member_name(member.name)
+                if name != current_name and current:
+                    yield _scanned_tar_article(current_name, current)
+                    current = {}
+                current_name = name
+                current[kind] = tf.extractfile(member).read().decode('utf-8')
+            if current:
+                yield _scanned_tar_article(current_name, current)
+
+
+def _scanned_tar_article(name, contents):
+    meta = json.loads(contents['meta'])
+    return {'name': name, 'title': meta['title'], 'url': meta['url']}, {
+        'name': name,
+        'meta': meta,
+        'markdown': contents['markdown'],
+        'html': contents.get('html'),
+    }
+
+
+def _split_member_name(member_name):
+    base = member_name[len('articles/'):]
+    if base.endswith('_info.json'):
+        return base[:-len('_info.json')], 'meta'
+    if base.endswith('.md'):
+        return base[:-len('.md')], 'markdown'
+    return base[:-len('.html')], 'html'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='wespy archive', description='查看或提取归档中的文章')
+    subparsers = parser.add_subparsers(dest='command')
+    list_parser = subparsers.add_parser('list', help='列出归档中的文章')
+    list_parser.add_argument('path', help='归档文件路径')
+    extract_parser = subparsers.add_parser('extract', help='提取单篇文章的Markdown')
+    extract_parser.add_argument('path', help='归档文件路径')
+    extract_parser.add_argument('key', help='文章名称、URL或序号')
+    extract_parser.add_argument('-o', '--output', help='输出文件（默认打印到标准输出）')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for i, entry in enumerate(list_articles(args.path), 1):
+            print(f"{i:4d}. {entry['title']}")
+            print(f"      {entry['url']}")
+    elif args.command == 'extract':
+        article = read_article(args.path, args.key)
+        if article is None:
+            print(f"归档中没有找到文章: {args.key}")
+            sys.exit(1)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(article['markdown'])
+            print(f"已提取到: {args.output}")
+        else:
+            sys.stdout.write(article['markdown'])
+    else:
+        parser.print_help()
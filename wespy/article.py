@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结构化的文章对象
+供库调用使用：正文HTML、纯文本和Markdown都在第一次访问时才生成
+"""
+
+import codecs
+
+
+class RawHTML:
+    """
+    下载到的原始网页：响应体字节和检测到的编码
+
+    解析器直接读取字节，保存原始网页时直接写出原始缓冲区；
+    只有在需要网页文本时（text）才整体解码一次并缓存
+
+    Args:
+        data (bytes): 响应体
+        encoding (str): 编码，None 时按 UTF-8 处理
+    """
+
+    __slots__ = ('data', 'encoding', '_text')
+
+    def __init__(self, data, encoding=None):
+        self.data = data
+        self.encoding = encoding or 'utf-8'
+        self._text = None
+
+    @classmethod
+    def from_response(cls, response, encoding=None):
+        """
+        从响应构建
+
+        Args:
+            response (requests.Response): 已读完响应体的响应
+            encoding (str, optional): 指定编码；不指定时使用响应头中的编码，
+                没有声明编码（ISO-8859-1 为 requests 的默认值）时按内容检测
+
+        Returns:
+            RawHTML: 原始网页
+        """
+        if encoding is None:
+            encoding = response.encoding
+            if encoding is None or encoding == 'ISO-8859-1':
+                encoding = response.apparent_encoding
+        return cls(response.content, encoding)
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def is_utf8(self):
+        """原始编码是否为 UTF-8（此时可以直接按字节扫描和保存）"""
+        try:
+            return codecs.lookup(self.encoding).name == 'utf-8'
+        except LookupError:
+            return False
+
+    @property
+    def text(self):
+        """网页文本（与 requests 的 response.text 一致，无法解码的字节替换为 U+FFFD）"""
+        if self._text is None:
+            try:
+                self._text = str(self.data, self.encoding, errors='replace')
+            except (LookupError, TypeError):
+                self._text = str(self.data, 'utf-8', errors='replace')
+        return self._text
+
+    def encoded(self):
+        """
+        UTF-8 编码的网页，用于写入文件
+
+        Returns:
+            memoryview | bytes: 原始编码就是 UTF-8 时为原始缓冲区的视图（不复制），否则为转码后的字节
+        """
+        if self.is_utf8:
+            return memoryview(self.data)
+        return self.text.encode('utf-8')
+
+
+class Article:
+    """
+    一篇已获取的文章
+
+    元数据（标题、作者等）在解析时确定；content_html / text / markdown 为惰性字段，
+    只在访问时根据正文节点计算并缓存。同时支持 article['title'] / article.get('tags')
+    的字典式访问，可以直接传给 ArticleFetcher 的保存和Markdown接口。
+    """
+
+    __slots__ = (
+        'url', 'title', 'author', 'publish_time', 'source', 'tags', 'view_count', 'links',
+        '_raw_html', '_content_elem', '_content_html', '_text', '_markdown', '_renderer',
+    )
+
+    # 字典式访问时，旧的键名 -> 属性名
+    _KEY_ALIASES = {
+        'html_content': 'html',
+        'content_text': 'text',
+    }
+
+    def __init__(self, url, title, author, publish_time, source='general', raw_html='',
+                 content_elem=None, renderer=None, tags=None, view_count='', links=None):
+        self.url = url
+        self.title = title
+        self.author = author
+        self.publish_time = publish_time
+        self.source = source
+        self.tags = tags
+        self.view_count = view_count
+        # 页面中的链接（绝对地址），只在 ArticleFetcher.collect_links 打开时提取，否则为 None
+        self.links = links
+        self._raw_html = raw_html
+        self._content_elem = content_elem
+        self._content_html = None
+        self._text = None
+        self._markdown = None
+        self._renderer = renderer
+
+    def __repr__(self):
+        return f"Article(title={self.title!r}, url={self.url!r})"
+
+    @property
+    def html(self):
+        """原始网页HTML（从原始字节构建时在首次访问时解码）"""
+        if isinstance(self._raw_html, RawHTML):
+            return self._raw_html.text
+        return self._raw_html
+
+    @property
+    def page(self):
+        """下载到的原始网页（RawHTML），由HTML文本构建时为 None"""
+        return self._raw_html if isinstance(self._raw_html, RawHTML) else None
+
+    @property
+    def content_elem(self):
+        """正文节点（BeautifulSoup Tag），没有找到正文时为 None"""
+        return self._content_elem
+
+    @property
+    def content_html(self):
+        """正文区域的HTML"""
+        if self._content_html is None:
+            self._content_html = str(self._content_elem) if self._content_elem is not None else ""
+        return self._content_html
+
+    @property
+    def text(self):
+        """正文纯文本"""
+        if self._text is None:
+            self._text = self._content_elem.get_text().strip() if self._content_elem is not None else ""
+        return self._text
+
+    @property
+    def markdown(self):
+        """完整的Markdown文档（元数据头部 + 正文），与保存的 .md 文件内容一致"""
+        if self._markdown is None:
+            if self._renderer is None:
+                raise ValueError("Article 没有关联的转换器，无法生成Markdown")
+            self._markdown = ''.join(self._renderer.iter_markdown(self))
+        return self._markdown
+
+    def __getitem__(self, key):
+        name = self._KEY_ALIASES.get(key, key)
+        if name.startswith('_') or not hasattr(self, name):
+            raise KeyError(key)
+        return getattr(self, name)
+
+    def __contains__(self, key):
+        name = self._KEY_ALIASES.get(key, key)
+        return not name.startswith('_') and hasattr(self, name)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        """转换为 fetch_article 返回的字典格式（会计算所有惰性字段）"""
+        info = {
+            'title': self.title,
+            'author': self.author,
+            'publish_time': self.publish_time,
+            'content_html': self.content_html,
+            'content_text': self.text,
+        }
+        if self.tags is not None:
+            info['tags'] = self.tags
+            info['view_count'] = self.view_count
+        info['url'] = self.url
+        info['html_content'] = self.html
+        return info
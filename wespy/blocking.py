@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+受限页面识别与按主机熔断
+微信限流时返回状态码为200的"环境异常"验证页面，直接解析只会得到"未知标题"和空白正文。
+classify_page 识别微信/掘金的限流、验证和文章已删除页面；CircuitBreaker 在某个站点连续返回
+限流或验证页面后暂停访问该站点（打开），冷却后只放行一个试探请求（半开），试探成功才恢复（关闭）
+
+    breaker = CircuitBreaker()
+    html = breaker.guard(url, 'wechat', lambda: download(url))   # 受限页面抛出 PageBlocked
+
+熔断打开期间，breaker.wait 为 True 时请求等待冷却结束（批量/专辑任务暂停），
+为 False 时立即抛出 CircuitOpen，由调用方安排稍后重试（如共享队列的 worker）
+"""
+
+import threading
+import time
+from urllib.parse import urlparse
+
+from wespy.article import RawHTML
+from wespy.deadline import check, current
+
+# 页面类型
+BLOCKED = 'blocked'
+VERIFY = 'verify'
+DELETED = 'deleted'
+PAGE_KINDS = (BLOCKED, VERIFY, DELETED)
+KIND_NAMES = {BLOCKED: '访问频繁', VERIFY: '环境异常/验证', DELETED: '文章已删除'}
+
+# 熔断状态
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 站点 -> (正常文章页面才有的标记, [(页面类型, 特征文本), ...])
+# 先确认正文容器不存在再查找特征文本，避免正文中恰好出现这些字样时误判
+_PAGE_MARKERS = {
+    'wechat': (('id="js_content"',), [
+        (DELETED, '该内容已被发布者删除'),
+        (DELETED, '此内容因违规无法查看'),
+        (DELETED, '此内容被投诉且经审核涉嫌侵权'),
+        (DELETED, '该文章已被删除'),
+        (VERIFY, '环境异常'),
+        (VERIFY, '完成验证后即可继续访问'),
+        (VERIFY, 'wappoc_appmsgcaptcha'),
+        (BLOCKED, '访问过于频繁'),
+        (BLOCKED, '操作频繁'),
+    ]),
+    'juejin': (('id="article-root"', 'markdown-body'), [
+        (DELETED, '文章不存在'),
+        (DELETED, '该文章已被删除'),
+        (DELETED, '内容已删除'),
+        (VERIFY, '验证码中间页'),
+        (VERIFY, '请完成安全验证'),
+        (BLOCKED, '访问过于频繁'),
+        (BLOCKED, '请求过于频繁'),
+    ]),
+}
+# 直接在原始字节（微信和掘金页面都是 UTF-8）中查找时使用的标记
+_PAGE_MARKERS_BYTES = {
+    site: (
+        tuple(marker.encode('utf-8') for marker in content_markers),
+        [(kind, text.encode('utf-8')) for kind, text in patterns],
+    )
+    for site, (content_markers, patterns) in _PAGE_MARKERS.items()
+}
+
+
+class PageBlocked(Exception):
+    """下载到的是限流、验证或已删除页面，而不是文章"""
+
+    def __init__(self, kind, url):
+        super().__init__(f"{KIND_NAMES[kind]}页面: {url}")
+        self.kind = kind
+        self.url = url
+
+
+class CircuitOpen(Exception):
+    """该站点处于熔断状态，retry_in 秒后可以再试"""
+
+    def __init__(self, host, retry_in):
+        super().__init__(f"{host} 访问受限，{max(1, round(retry_in))} 秒后重试")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def classify_page(site, html):
+    """
+    识别受限页面
+
+    Args:
+        site (str): 'wechat' / 'juejin'，其他站点总是返回 None
+        html (str | bytes | RawHTML): 网页文本，或 UTF-8 编码的原始网页
+
+    Returns:
+        str: BLOCKED / VERIFY / DELETED，正常页面返回 None
+    """
+    if isinstance(html, RawHTML):
+        html = html.data if html.is_utf8 else html.text
+    markers = (_PAGE_MARKERS if isinstance(html, str) else _PAGE_MARKERS_BYTES).get(site)
+    if markers is None or not html:
+        return None
+    content_markers, patterns = markers
+    if any(marker in html for marker in content_markers):
+        return None
+    for kind, text in patterns:
+        if text in html:
+            return kind
+    return None
+
+
+class _Circuit:
+    def __init__(self, cooldown):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.cooldown = cooldown
+        self.probing = False
+        self.trips = 0
+
+
+class CircuitBreaker:
+    """
+    按主机的熔断器
+
+    Args:
+        threshold (int): 连续多少次限流/验证页面后打开
+        cooldown (float): 打开后的冷却秒数，试探失败时翻倍
+        max_cooldown (float): 冷却时间上限
+        wait (bool): 熔断期间等待（True）还是立即抛出 CircuitOpen（False）
+    """
+
+    def __init__(self, threshold=2, cooldown=60, max_cooldown=900, wait=True):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.wait = wait
+        self._lock = threading.Lock()
+        self._circuits = {}
+        self._counts = {kind: 0 for kind in PAGE_KINDS}
+
+    def _circuit(self, host):
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = _Circuit(self.cooldown)
+        return circuit
+
+    def guard(self, url, site, download):
+        """
+        在熔断器保护下下载并识别页面
+
+        Args:
+            url (str): 地址
+            site (str): 站点类型，用于 classify_page
+            download (function): 无参数，返回网页文本或原始网页（RawHTML）
+
+        Returns:
+            str | RawHTML: download 的返回值
+
+        Raises:
+            PageBlocked: 限流、验证或已删除页面
+            CircuitOpen: 熔断打开且 wait 为 False
+        """
+        host = urlparse(url).hostname or url
+        self._enter(host)
+        try:
+            html = download()
+        except BaseException:
+            # 网络错误不说明是否被限制，让出试探名额
+            self._release(host)
+            raise
+        kind = classify_page(site, html)
+        if kind in (BLOCKED, VERIFY):
+            self._failure(host, kind)
+            raise PageBlocked(kind, url)
+        # 已删除的页面说明站点正常响应
+        self._success(host, kind)
+        if kind == DELETED:
+            raise PageBlocked(kind, url)
+        return html
+
+    def pause(self, url):
+        """熔断打开时等待冷却结束（wait 为 False 时立即返回），在开始处理一篇文章之前调用"""
+        if not self.wait:
+            return
+        host = urlparse(url).hostname or url
+        while True:
+            with self._lock:
+                circuit = self._circuit(host)
+                remaining = circuit.opened_at + circuit.cooldown - time.monotonic()
+                if circuit.state != OPEN or remaining <= 0:
+                    return
+            _sleep(min(remaining, 5))
+
+    def _enter(self, host):
+        while True:
+            try:
+                self._acquire(host)
+                return
+            except CircuitOpen as e:
+                if not self.wait:
+                    raise
+                _sleep(min(e.retry_in, 5))
+
+    def _acquire(self, host):
+        with self._lock:
+            circuit = self._circuit(host)
+            if circuit.state == CLOSED:
+                return
+            now = time.monotonic()
+            if circuit.state == OPEN and now >= circuit.opened_at + circuit.cooldown:
+                circuit.state = HALF_OPEN
+                circuit.probing = False
+            if circuit.state == HALF_OPEN:
+                if not circuit.probing:
+                    # 半开：只放行一个试探请求
+                    circuit.probing = True
+                    return
+                raise CircuitOpen(host, 1.0)
+            raise CircuitOpen(host, circuit.opened_at + circuit.cooldown - now)
+
+    def _release(self, host):
+        with self._lock:
+            circuit = self._circuit(host)
+            if circuit.state == HALF_OPEN:
+                circuit.probing = False
+
+    def _success(self, host, kind=None):
+        with self._lock:
+            if kind:
+                self._counts[kind] += 1
+            circuit = self._circuit(host)
+            if circuit.state == OPEN:
+                # 打开之前已经发出的请求，不能说明站点已恢复
+                return
+            recovered = circuit.state == HALF_OPEN
+            circuit.state = CLOSED
+            circuit.failures = 0
+            circuit.probing = False
+            circuit.cooldown = self.cooldown
+        if recovered:
+            print(f"✅ {host} 已恢复访问")
+
+    def _failure(self, host, kind):
+        with self._lock:
+            self._counts[kind] += 1
+            circuit = self._circuit(host)
+            if circuit.state == HALF_OPEN:
+                # 试探失败：重新打开，冷却时间翻倍
+                circuit.cooldown = min(self.max_cooldown, circuit.cooldown * 2)
+            elif circuit.state == CLOSED:
+                circuit.failures += 1
+                if circuit.failures < self.threshold:
+                    return
+            else:
+                return
+            circuit.state = OPEN
+            circuit.opened_at = time.monotonic()
+            circuit.probing = False
+            circuit.trips += 1
+            cooldown = circuit.cooldown
+        print(f"⛔ {host} 返回{KIND_NAMES[kind]}页面，暂停访问 {cooldown:.0f} 秒")
+
+    def blocked_for(self, host):
+        """该主机熔断打开时距离冷却结束的秒数，否则为 0"""
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None or circuit.state != OPEN:
+                return 0
+            return max(0.0, circuit.opened_at + circuit.cooldown - time.monotonic())
+
+    def state(self, host):
+        """该主机的熔断状态 CLOSED / OPEN / HALF_OPEN"""
+        with self._lock:
+            return self._circuit(host).state
+
+    def counts(self):
+        """至今识别到的各类受限页面数量"""
+        with self._lock:
+            return dict(self._counts)
+
+    def snapshot(self):
+        """各主机的熔断状态"""
+        with self._lock:
+            return {
+                host: {'state': circuit.state, 'trips': circuit.trips, 'cooldown': circuit.cooldown}
+                for host, circuit in self._circuits.items()
+            }
+
+    @staticmethod
+    def delta(after, before):
+        """两次 counts() 之间新增的数量"""
+        return {kind: after.get(kind, 0) - before.get(kind, 0) for kind in PAGE_KINDS}
+
+    @staticmethod
+    def format(counts):
+        """格式化 counts()/delta() 的结果，没有受限页面时返回空字符串"""
+        return '，'.join(f"{KIND_NAMES[kind]} {counts[kind]} 篇" for kind in PAGE_KINDS if counts.get(kind))
+
+
+def _sleep(seconds):
+    """等待期间响应当前线程的截止时间和取消"""
+    deadline = current()
+    if deadline is None:
+        time.sleep(seconds)
+        return
+    seconds = deadline.timeout(seconds)
+    if deadline.token is not None:
+        deadline.token.wait(seconds)
+    else:
+        time.sleep(seconds)
+    check('blocked')
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重复请求合并
+并发的专辑/批量任务中，同一个资源经常被多个工作线程同时请求：文章共用的页眉页脚图片、
+同时出现在两个专辑中的文章、重复的掘金标签页。RequestCoalescer 让同一URL的并发 GET 请求
+只下载一次，其余请求等待这次下载并共享结果；启用响应缓存时，下载完成的响应在一个容量很小的缓存中
+保留一段时间，稍后再请求同一URL时直接使用
+
+    coalescer = RequestCoalescer()              # 只合并并发请求，不缓存
+    coalescer = RequestCoalescer(ResponseCache(max_bytes=32 * 1024 * 1024))   # 同时缓存最近的响应
+    session.coalescer = coalescer               # timed_get 自动使用，可以在多个会话之间共用
+
+库默认不缓存：长时间运行的调用方（wespy serve / watch）再次请求同一URL时应当得到最新的内容；
+命令行通过 --response-cache 启用
+
+合并和缓存命中的次数记入会话的传输统计（TransferStats 的 coalesced / cached）。
+等待中的请求仍受自己的截止时间和取消令牌约束；首个请求因自身的截止时间或取消而中断时，
+等待的请求改为自己下载，不会跟着失败
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urldefrag
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from wespy.deadline import Cancelled, DeadlineExceeded, current
+
+# 只有这些参数时才合并，其他参数（认证、cookies、流式读取等）可能改变响应
+_COALESCE_KWARGS = frozenset(['headers', 'params'])
+# 等待首个请求时检查截止时间和取消的间隔（秒）
+_POLL_INTERVAL = 0.2
+
+
+def _canonical(url, params=None):
+    """规范化的URL：requests 实际请求的地址（含查询参数），去掉 #锚点"""
+    prepared = requests.PreparedRequest()
+    prepared.prepare_url(url, params)
+    return urldefrag(prepared.url)[0]
+
+
+def _clone(response):
+    """复制已读完响应体的响应，每个调用方得到自己的对象（调用方会修改 encoding 等属性）"""
+    clone = requests.Response()
+    clone.status_code = response.status_code
+    clone.headers = CaseInsensitiveDict(response.headers)
+    clone.url = response.url
+    clone.encoding = response.encoding
+    clone.reason = response.reason
+    clone.history = list(response.history)
+    clone.request = response.request
+    clone.elapsed = response.elapsed
+    clone.cookies = response.cookies.copy()
+    clone._content = response.content
+    clone._content_consumed = True
+    return clone
+
+
+class ResponseCache:
+    """
+    按条目数和总字节数限制的 LRU 响应缓存，条目在 ttl 秒后过期
+
+    Args:
+        max_bytes (int): 缓存的响应体总大小上限，0 表示不缓存
+        max_entries (int): 条目数上限
+        ttl (float): 条目的有效期（秒）
+        max_item_bytes (int): 超过该大小的响应不缓存
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_entries=256, ttl=300, max_item_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_item_bytes = max_item_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key):
+        """未命中或已过期时返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, response = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def put(self, key, response):
+        size = len(response.content)
+        cache_control = response.headers.get('Cache-Control', '').lower()
+        if (not self.max_bytes or response.status_code != 200 or size > min(self.max_item_bytes, self.max_bytes)
+                or 'no-store' in cache_control):
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._bytes += size
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                self._remove(next(iter(self._entries)))
+
+    def forget(self, url):
+        """丢弃某个URL的所有缓存条目（例如该页面被识别为验证页，之后需要重新下载）"""
+        url = _canonical(url)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == url]:
+                self._remove(key)
+
+    def _remove(self, key):
+        _, response = self._entries.pop(key)
+        self._bytes -= len(response.content)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _Call:
+    """一次正在进行的下载"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+        # 首个请求因自身的截止时间或取消而中断，等待的请求需要自己重新下载
+        self.abandoned = False
+
+
+class RequestCoalescer:
+    """
+    同一URL的并发 GET 请求只下载一次（single-flight），并缓存最近的响应
+
+    Args:
+        cache (ResponseCache, optional): 响应缓存，默认为 max_bytes 为 0 的缓存（只合并不缓存）
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else ResponseCache(max_bytes=0)
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    @staticmethod
+    def key(session, url, kwargs):
+        """
+        请求的规范化键：带查询参数的完整URL（去掉 #锚点）和 User-Agent（不同站点的会话使用不同的UA）
+
+        Returns:
+            tuple: 键，请求不适合合并时返回 None
+        """
+        if not set(kwargs) <= _COALESCE_KWARGS:
+            return None
+        headers = kwargs.get('headers') or {}
+        if 'Range' in headers or 'range' in headers:
+            return None
+        user_agent = headers.get('User-Agent') or session.headers.get('User-Agent', '')
+        return _canonical(url, kwargs.get('params')), user_agent
+
+    def get(self, session, url, kwargs, download):
+        """
+        合并执行一个 GET 请求
+
+        Args:
+            session (requests.Session): 发出请求的会话（用于生成键和记录统计）
+            url (str): 地址
+            kwargs (dict): 请求参数
+            download (function): 无参数，实际下载并返回已读完响应体的响应
+
+        Returns:
+            requests.Response: 响应（每个调用方得到各自的副本）
+        """
+        key = self.key(session, url, kwargs)
+        if key is None:
+            return download()
+        while True:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._record(session, cached=True)
+                return _clone(cached)
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+            if leader:
+                return self._lead(key, call, download)
+            self._wait(call)
+            if call.abandoned:
+                continue
+            self._record(session, cached=False)
+            if call.error is not None:
+                raise call.error
+            return _clone(call.response)
+
+    def forget(self, url):
+        self.cache.forget(url)
+
+    def _lead(self, key, call, download):
+        try:
+            response = download()
+        except (Cancelled, DeadlineExceeded):
+            call.abandoned = True
+            raise
+        except Exception as e:
+            # 网络错误和HTTP错误状态与等待的请求共享
+            call.error = e
+            raise
+        except BaseException:
+            call.abandoned = True
+            raise
+        else:
+            # 保存调用方修改之前的副本
+            call.response = _clone(response)
+            self.cache.put(key, call.response)
+            return response
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    @staticmethod
+    def _wait(call):
+        deadline = current()
+        if deadline is None:
+            call.done.wait()
+            return
+        while not call.done.wait(_POLL_INTERVAL):
+            deadline.check('download')
+
+    @staticmethod
+    def _record(session, cached):
+        stats = getattr(session, 'stats', None)
+        if stats is not None:
+            stats.record_shared(cached)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应并发控制
+按主机分别限制同时进行的请求数，上限按 AIMD（加性增、乘性减）调整：
+请求成功且耗时正常时缓慢增加，遇到 429/503、超时或耗时突增时减半。
+批量和专辑任务的工作线程数只是上限，实际对每个站点的并发由这里决定
+
+    limiter = HostLimiter(initial=1, maximum=8)
+    session.limiter = limiter      # wespy.deadline.timed_get 的请求都会经过 limiter.slot(url)
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+
+from wespy.deadline import Cancelled, DeadlineExceeded, check
+
+# 请求结果
+OK = 'ok'
+THROTTLED = 'throttled'
+TIMEOUT = 'timeout'
+ERROR = 'error'
+CANCELLED = 'cancelled'
+
+
+class _HostState:
+    def __init__(self, limit):
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.peak_limit = float(limit)
+        self.latency = None
+        self.samples = 0
+        self.slow = 0
+        self.counts = {OK: 0, THROTTLED: 0, TIMEOUT: 0, ERROR: 0, CANCELLED: 0}
+        self.decreases = 0
+        self.last_decrease = 0.0
+        self.blocked_until = 0.0
+        self.recorded_limit = int(limit)
+
+
+class HostLimiter:
+    """
+    按主机的自适应并发上限
+
+    Args:
+        initial (int): 每个主机的初始并发上限
+        minimum (int): 最小并发上限
+        maximum (int): 最大并发上限
+        latency_factor (float): 耗时超过基线（成功请求耗时的指数移动平均）的多少倍视为突增
+        min_spike (float): 视为突增时耗时至少比基线多出的秒数，避免本地或很快的站点上正常的抖动被当作突增
+        spike_samples (int): 连续多少个突增的请求才降低上限
+        backoff (float): 降低时乘以的系数
+        history (int): 每个主机保留的上限变化记录条数
+    """
+
+    def __init__(self, initial=1, minimum=1, maximum=8, latency_factor=3.0, backoff=0.5, history=100,
+                 min_spike=0.25, spike_samples=2):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_factor = latency_factor
+        self.min_spike = min_spike
+        self.spike_samples = max(1, spike_samples)
+        self.backoff = backoff
+        self.history_size = history
+        self._cond = threading.Condition()
+        self._hosts = {}
+        self._history = {}
+        self._start = time.monotonic()
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.initial)
+            self._history[host] = deque([(0.0, int(state.limit), 'initial')], maxlen=self.history_size)
+        return state
+
+    def acquire(self, host):
+        """等待该主机有空闲的并发名额；等待期间响应当前线程的截止时间和取消"""
+        with self._cond:
+            state = self._state(host)
+            while True:
+                now = time.monotonic()
+                if state.in_flight < int(state.limit) and now >= state.blocked_until:
+                    state.in_flight += 1
+                    return
+                check('queue')
+                wait = 0.2
+                if state.blocked_until > now:
+                    wait = min(wait, state.blocked_until - now)
+                self._cond.wait(wait)
+
+    @contextmanager
+    def slot(self, url):
+        """占用 url 所在主机的一个并发名额，退出时根据耗时和异常类型调整上限"""
+        host = urlparse(url).hostname or url
+        self.acquire(host)
+        start = time.monotonic()
+        outcome, retry_after = OK, None
+        try:
+            yield
+        except BaseException as e:
+            outcome, retry_after = classify(e)
+            raise
+        finally:
+            self.release(host, time.monotonic() - start, outcome, retry_after)
+
+    def release(self, host, seconds, outcome, retry_after=None):
+        """
+        归还名额并根据结果调整上限
+
+        Args:
+            host (str): 主机名
+            seconds (float): 请求耗时（含读取响应体）
+            outcome (str): OK / THROTTLED / TIMEOUT / ERROR / CANCELLED
+            retry_after (float, optional): 服务器要求的等待秒数（Retry-After）
+        """
+        with self._cond:
+            state = self._state(host)
+            state.in_flight -= 1
+            state.counts[outcome] = state.counts.get(outcome, 0) + 1
+            if outcome == OK:
+                self._on_success(host, state, seconds)
+            elif outcome in (THROTTLED, TIMEOUT):
+                self._decrease(host, state, outcome)
+                if retry_after:
+                    state.blocked_until = max(state.blocked_until, time.monotonic() + retry_after)
+            self._cond.notify_all()
+
+    def _on_success(self, host, state, seconds):
+        if (state.latency is not None and state.samples >= 5 and seconds > state.latency * self.latency_factor
+                and seconds - state.latency > self.min_spike):
+            # 单个慢响应可能只是抖动，连续多个才降低
+            state.slow += 1
+            if state.slow >= self.spike_samples:
+                state.slow = 0
+                self._decrease(host, state, 'latency')
+            return
+        state.slow = 0
+        # 基线只用正常的样本更新
+        state.latency = seconds if state.latency is None else state.latency * 0.9 + seconds * 0.1
+        state.samples += 1
+        # 只有上限被用满时才增加，避免空闲时上限虚高
+        if state.in_flight + 1 >= int(state.limit):
+            state.limit = min(float(self.maximum), state.limit + 1.0 / state.limit)
+            state.peak_limit = max(state.peak_limit, state.limit)
+            self._record(host, state, 'increase')
+
+    def _decrease(self, host, state, reason):
+        now = time.monotonic()
+        # 同一批并发请求的失败只降低一次
+        if now - state.last_decrease < max(1.0, state.latency or 0):
+            return
+        state.last_decrease = now
+        state.decreases += 1
+        state.limit = max(float(self.minimum), state.limit * self.backoff)
+        self._record(host, state, reason)
+
+    def _record(self, host, state, reason):
+        limit = int(state.limit)
+        if limit != state.recorded_limit:
+            state.recorded_limit = limit
+            self._history[host].append((round(time.monotonic() - self._start, 3), limit, reason))
+
+    def limit(self, host):
+        """该主机当前的并发上限"""
+        with self._cond:
+            return int(self._state(host).limit)
+
+    def snapshot(self):
+        """各主机的当前上限、请求结果统计和上限变化记录"""
+        with self._cond:
+            return {
+                host: {
+                    'limit': int(state.limit),
+                    'peak_limit': int(state.peak_limit),
+                    'in_flight': state.in_flight,
+                    'latency_ms': round(state.latency * 1000, 1) if state.latency is not None else None,
+                    'decreases': state.decreases,
+                    'requests': dict(state.counts),
+                    'history': [list(entry) for entry in self._history[host]],
+                }
+                for host, state in self._hosts.items()
+            }
+
+    @staticmethod
+    def format(snapshot):
+        """把 snapshot() 的结果格式化为每个主机一行"""
+        lines = []
+        for host, info in sorted(snapshot.items()):
+            requests = info['requests']
+            lines.append(
+                f"{host}: 当前上限 {info['limit']}，最高 {info['peak_limit']}，降低 {info['decreases']} 次"
+                f"（成功 {requests.get(OK, 0)}，限流 {requests.get(THROTTLED, 0)}，超时 {requests.get(TIMEOUT, 0)}）"
+            )
+        return lines
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(error):
+    """
+    把请求抛出的异常归类为并发控制使用的结果
+
+    Returns:
+        tuple: (结果, Retry-After 秒数或 None)
+    """
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        if error.response.status_code in (429, 503):
+            return THROTTLED, _retry_after(error.response)
+        return ERROR, None
+    if isinstance(error, (requests.Timeout, DeadlineExceeded)):
+        return TIMEOUT, None
+    if isinstance(error, (Cancelled, KeyboardInterrupt)):
+        return CANCELLED, None
+    return ERROR, None
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+同站链接爬取
+从一个起始页面出发，沿着同一域名下的链接逐层抓取（广度优先），像文章的页面交给通用提取器保存
+
+    wespy crawl https://example.com/blog/ --max-depth 3 --max-pages 500
+    wespy crawl https://example.com/ --include '/blog/' --article-pattern '/blog/\\d+'
+
+链接在解析文章时顺带提取（ArticleFetcher.collect_links），不需要再解析一遍页面。
+已见过的URL用 Bloom 过滤器加磁盘上的 SQLite 表去重：过滤器未命中的一定是新URL，
+命中时再查表确认，结果是精确的；待抓取队列超过内存上限的部分顺序写入磁盘文件。
+百万级URL的站点只需要几MB内存（100万URL、误判率0.1%时过滤器约1.8MB）
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+
+from bs4 import BeautifulSoup
+
+from wespy.deadline import Deadline, timed_get
+
+# 不是网页的链接（按扩展名判断），不加入队列
+SKIP_EXTENSIONS = frozenset([
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'svg', 'ico', 'bmp', 'avif',
+    'pdf', 'zip', 'gz', 'tgz', 'rar', '7z', 'tar', 'exe', 'dmg', 'apk',
+    'mp3', 'mp4', 'avi', 'mov', 'webm', 'wav', 'flac',
+    'css', 'js', 'json', 'xml', 'rss', 'txt', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx',
+])
+# 查询参数中去掉的跟踪参数前缀
+_TRACKING_PREFIXES = ('utm_',)
+# 判断页面是否像文章：正文中链接文字占比的上限
+MAX_LINK_DENSITY = 0.5
+
+
+class BloomFilter:
+    """
+    Bloom 过滤器：判断"一定没见过"或"可能见过"
+
+    Args:
+        capacity (int): 预计的元素数，超过后误判率逐渐升高（只影响去重时查表的次数）
+        error_rate (float): 达到 capacity 时的误判率
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        capacity = max(1, int(capacity))
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # 双重哈希：一次 blake2b 得到两个64位哈希，组合出 k 个位置
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        """
+        加入元素
+
+        Returns:
+            bool: 加入前是否可能已经存在（所有位都已置位）
+        """
+        present = True
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            mask = 1 << bit
+            if not self._bits[byte] & mask:
+                present = False
+                self._bits[byte] |= mask
+        return present
+
+    def __contains__(self, key):
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                return False
+        return True
+
+    @property
+    def nbytes(self):
+        return len(self._bits)
+
+
+class SeenSet:
+    """
+    已见过的URL集合：Bloom 过滤器在内存中，完整的URL在磁盘上的 SQLite 表中，
+    只有过滤器命中（已见过或误判）时才查表
+
+    Args:
+        path (str): SQLite 文件路径
+        capacity (int): 预计的URL数
+        error_rate (float): 过滤器的误判率
+    """
+
+    # 每插入这么多条提交一次
+    COMMIT_EVERY = 1000
+
+    def __init__(self, path, capacity=1000000, error_rate=0.001):
+        self.bloom = BloomFilter(capacity, error_rate)
+        self._db = sqlite3.connect(path)
+        self._db.execute('PRAGMA journal_mode=OFF')
+        self._db.execute('PRAGMA synchronous=OFF')
+        self._db.execute('CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY) WITHOUT ROWID')
+        self._uncommitted = 0
+        self.count = 0
+        # 过滤器命中后查表的次数和其中确实是新URL（误判）的次数
+        self.lookups = 0
+        self.false_positives = 0
+
+    def add(self, url):
+        """
+        加入URL
+
+        Returns:
+            bool: 是否是新URL
+        """
+        if self.bloom.add(url):
+            self.lookups += 1
+            if self._db.execute('SELECT 1 FROM seen WHERE url = ?', (url,)).fetchone():
+                return False
+            self.false_positives += 1
+        self._db.execute('INSERT INTO seen (url) VALUES (?)', (url,))
+        self.count += 1
+        self._uncommitted += 1
+        if self._uncommitted >= self.COMMIT_EVERY:
+            self._db.commit()
+            self._uncommitted = 0
+        return True
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+
+class Frontier:
+    """
+    待抓取队列（先进先出）：前 memory_limit 个在内存中，其余按顺序写入磁盘文件，
+    内存中的取完后再从文件中按顺序读回
+
+    Args:
+        path (str): 溢出文件路径
+        memory_limit (int): 内存中最多保留的条目数
+    """
+
+    def __init__(self, path, memory_limit=10000):
+        self.path = path
+        self.memory_limit = max(1, int(memory_limit))
+        self._memory = deque()
+        self._writer = None
+        self._read_offset = 0
+        self._spilled = 0
+
+    def push(self, depth, url):
+        # 文件中还有条目时新条目也写入文件，保持先进先出
+        if not self._spilled and len(self._memory) < self.memory_limit:
+            self._memory.append((depth, url))
+            return
+        if self._writer is None:
+            self._writer = open(self.path, 'a', encoding='utf-8')
+        self._writer.write(f"{depth}\t{url}\n")
+        self._spilled += 1
+
+    def pop(self):
+        """取出下一个 (深度, URL)，队列为空时返回 None"""
+        if not self._memory and self._spilled:
+            self._refill()
+        return self._memory.popleft() if self._memory else None
+
+    def _refill(self):
+        self._writer.flush()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            f.seek(self._read_offset)
+            while len(self._memory) < self.memory_limit:
+                line = f.readline()
+                if not line:
+                    break
+                depth, url = line.rstrip('\n').split('\t', 1)
+                self._memory.append((int(depth), url))
+                self._spilled -= 1
+            self._read_offset = f.tell()
+        if not self._spilled:
+            # 文件已经读完，清空后重新开始
+            self._writer.seek(0)
+            self._writer.truncate()
+            self._read_offset = 0
+
+    def __len__(self):
+        return len(self._memory) + self._spilled
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def normalize_url(url):
+    """
+    规范化URL用于去重：协议和域名小写，去掉 #锚点、默认端口和 utm_* 跟踪参数
+
+    Returns:
+        str: 规范化后的URL，不是 http(s) 链接时返回 None
+    """
+    try:
+        parsed = urlparse(url)
+        port = parsed.port
+    except ValueError:
+        # 无效的端口或IPv6地址
+        return None
+    scheme = parsed.scheme.lower()
+    if scheme not in ('http', 'https') or not parsed.hostname:
+        return None
+    netloc = parsed.hostname
+    if port and port != {'http': 80, 'https': 443}[scheme]:
+        netloc = f"{netloc}:{port}"
+    query = parsed.query
+    if query:
+        params = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True)
+                  if not k.lower().startswith(_TRACKING_PREFIXES)]
+        query = urlencode(params)
+    return urlunparse((scheme, netloc, parsed.path or '/', parsed.params, query, ''))
+
+
+def site_host(hostname):
+    """站点主机名：去掉 www. 前缀，example.com 跳转到 www.example.com 时仍视为同一站点"""
+    hostname = hostname or ''
+    return hostname[4:] if hostname.startswith('www.') else hostname
+
+
+def _seen_key(url):
+    """去重用的键：只差 www. 前缀的同一页面只抓取一次"""
+    parsed = urlparse(url)
+    if not parsed.netloc.startswith('www.'):
+        return url
+    return urlunparse(parsed._replace(netloc=parsed.netloc[4:]))
+
+
+def link_density(content_html):
+    """正文中链接文字占全部文字的比例"""
+    soup = BeautifulSoup(content_html or '', 'html.parser')
+    text = len(soup.get_text(strip=True))
+    if not text:
+        return 1.0
+    linked = sum(len(a.get_text(strip=True)) for a in soup.find_all('a'))
+    return linked / text
+
+
+class Crawler:
+    """
+    同站爬虫：主线程维护队列和去重集合，工作线程（fetcher.workers 个）下载和解析页面
+
+    Args:
+        fetcher (ArticleFetcher): 文章获取器，共用其会话、限流和熔断
+        seed (str): 起始URL
+        output_dir (str): 文章输出目录
+        max_depth (int): 最大链接深度，起始页面为 0
+        max_pages (int, optional): 最多抓取的页面数
+        include (list, optional): 正则表达式，设置时URL至少匹配其中一个才抓取（起始页面除外）
+        exclude (list, optional): 正则表达式，URL匹配其中任意一个时不抓取
+        article_pattern (str, optional): 正则表达式，设置时只保存URL匹配的页面；
+            否则按正文长度和链接密度判断
+        min_chars (int): 判断为文章的最小正文字数
+        respect_robots (bool): 是否遵守 robots.txt
+        work_dir (str, optional): 存放去重表和溢出队列的目录，默认为系统临时目录，结束后删除
+        memory_limit (int): 内存中保留的待抓取URL数
+        capacity (int): 预计的URL总数（决定 Bloom 过滤器的大小）
+        save_html (bool): 同时保存HTML
+        save_json (bool): 同时保存JSON
+    """
+
+    def __init__(self, fetcher, seed, output_dir, max_depth=3, max_pages=None, include=None, exclude=None,
+                 article_pattern=None, min_chars=500, respect_robots=True, work_dir=None, memory_limit=10000,
+                 capacity=1000000, save_html=False, save_json=False):
+        self.fetcher = fetcher
+        self.seed = normalize_url(seed)
+        if self.seed is None:
+            raise ValueError(f"不是有效的网页地址: {seed}")
+        self.host = site_host(urlparse(self.seed).hostname)
+        self.output_dir = output_dir
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.include = [re.compile(pattern) for pattern in include or ()]
+        self.exclude = [re.compile(pattern) for pattern in exclude or ()]
+        self.article_pattern = re.compile(article_pattern) if article_pattern else None
+        self.min_chars = min_chars
+        self.respect_robots = respect_robots
+        self.save_html = save_html
+        self.save_json = save_json
+        self._work_dir = tempfile.mkdtemp(prefix='wespy-crawl-', dir=work_dir)
+        self.seen = SeenSet(os.path.join(self._work_dir, 'seen.db'), capacity)
+        self.frontier = Frontier(os.path.join(self._work_dir, 'frontier.txt'), memory_limit)
+        self.robots = None
+        self.pages = 0
+        self.articles = []
+        self.failed = 0
+
+    def close(self):
+        self.frontier.close()
+        self.seen.close()
+        shutil.rmtree(self._work_dir, ignore_errors=True)
+
+    def allowed(self, url):
+        """URL是否属于本站（只差 www. 前缀的主机视为同一站点）且符合 include / exclude 和 robots.txt"""
+        parsed = urlparse(url)
+        if site_host(parsed.hostname) != self.host:
+            return False
+        extension = parsed.path.rsplit('/', 1)[-1].rpartition('.')[2].lower()
+        if extension in SKIP_EXTENSIONS:
+            return False
+        if self.include and not any(pattern.search(url) for pattern in self.include):
+            return False
+        if any(pattern.search(url) for pattern in self.exclude):
+            return False
+        if self.robots is not None and not self.robots.can_fetch(self._user_agent(), url):
+            return False
+        return True
+
+    def _user_agent(self):
+        return self.fetcher.session.headers.get('User-Agent', '*')
+
+    def _load_robots(self):
+        parsed = urlparse(self.seed)
+        robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+        robots = RobotFileParser(robots_url)
+        try:
+            response = timed_get(self.fetcher.session, robots_url, default_timeout=10)
+        except Exception:
+            return None
+        if response.status_code >= 400:
+            return None
+        robots.parse(response.text.splitlines())
+        return robots
+
+    def _enqueue(self, url, depth):
+        url = normalize_url(url)
+        if url is None or not self.allowed(url):
+            return
+        if self.seen.add(_seen_key(url)):
+            self.frontier.push(depth, url)
+
+    def is_article(self, url, article):
+        """页面是否像文章：匹配 article_pattern，或正文足够长且不是以链接为主的列表页"""
+        if self.article_pattern is not None:
+            return bool(self.article_pattern.search(url))
+        if len(article.text) < self.min_chars:
+            return False
+        return link_density(article.content_html) < MAX_LINK_DENSITY
+
+    def _visit(self, url, run_deadline):
+        with Deadline(parent=run_deadline):
+            article = self.fetcher.fetch(url)
+            saved = None
+            if self.is_article(url, article):
+                print(f"文章: {article.title} ({url})")
+                self.fetcher.save(article, self.output_dir, self.save_html, self.save_json)
+                saved = url
+            return article.links or [], saved
+
+    def run(self):
+        """
+        开始爬取，直到队列为空、达到 max_pages 或被取消
+
+        Returns:
+            list: 保存的文章URL
+        """
+        fetcher = self.fetcher
+        if self.respect_robots:
+            self.robots = self._load_robots()
+        if self.robots is not None and not self.robots.can_fetch(self._user_agent(), self.seed):
+            print(f"robots.txt 不允许抓取 {self.seed}（可以使用 --ignore-robots）")
+            return []
+        # 起始页面不受 include 限制
+        self.seen.add(_seen_key(self.seed))
+        self.frontier.push(0, self.seed)
+
+        workers = max(1, int(fetcher.workers or 1))
+        run_deadline = Deadline(None, fetcher.cancel_token)
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wespy-crawl')
+        futures = {}
+        # 爬取期间收集链接；结束时（包括出错）恢复，共享的 fetcher 不会留在爬取模式
+        fetcher.collect_links = True
+        # 预扫描只截取正文片段，正文之外的导航和列表链接会丢失
+        prescan = fetcher.prescan
+        fetcher.prescan = False
+        try:
+            while True:
+                while (len(futures) < workers and len(self.frontier) and not run_deadline.stop_reason()
+                       and (not self.max_pages or self.pages < self.max_pages)):
+                    depth, url = self.frontier.pop()
+                    self.pages += 1
+                    print(f"[{self.pages}] 深度 {depth}: {url}")
+                    futures[executor.submit(self._visit, url, run_deadline)] = (depth, url)
+                if not futures:
+                    break
+                try:
+                    done, _ = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+                except KeyboardInterrupt:
+                    fetcher.cancel_token.cancel('用户中断')
+                    continue
+                for future in done:
+                    depth, url = futures.pop(future)
+                    try:
+                        links, saved = future.result()
+                    except Exception as e:
+                        self.failed += 1
+                        print(f"抓取失败: {url}: {e}")
+                        continue
+                    if saved:
+                        self.articles.append(saved)
+                    if depth < self.max_depth:
+                        for link in links:
+                            self._enqueue(link, depth + 1)
+        finally:
+            executor.shutdown(wait=True)
+            fetcher.collect_links = False
+            fetcher.prescan = prescan
+
+        stop_reason = run_deadline.stop_reason()
+        if stop_reason:
+            print(f"\n⏹ {stop_reason}")
+        return self.articles
+
+    def summary(self):
+        line = (f"抓取 {self.pages} 个页面，保存文章 {len(self.articles)} 篇，失败 {self.failed} 个；"
+                f"发现URL {len(self.seen)} 个，队列中剩余 {len(self.frontier)} 个")
+        if self.seen.lookups:
+            line += f"（去重查表 {self.seen.lookups} 次，过滤器误判 {self.seen.false_positives} 次）"
+        return line
+
+
+def main(argv=None):
+    from wespy.main import ArticleFetcher, _install_interrupt_handler
+
+    parser = argparse.ArgumentParser(prog='wespy crawl', description='从起始页面沿同站链接爬取并保存文章')
+    parser.add_argument('url', help='起始页面')
+    parser.add_argument('-o', '--output', default='articles', help='输出目录，文章保存到其中以域名命名的子目录 (默认: articles)')
+    parser.add_argument('--max-depth', type=int, default=3, help='最大链接深度，起始页面为 0 (默认: 3)')
+    parser.add_argument('--max-pages', type=int, help='最多抓取的页面数')
+    parser.add_argument('--include', action='append', metavar='REGEX', help='只抓取匹配的URL，可以重复')
+    parser.add_argument('--exclude', action='append', metavar='REGEX', help='不抓取匹配的URL，可以重复')
+    parser.add_argument('--article-pattern', metavar='REGEX', help='只保存URL匹配的页面（默认按正文长度和链接密度判断）')
+    parser.add_argument('--min-chars', type=int, default=500, help='判断为文章的最小正文字数 (默认: 500)')
+    parser.add_argument('--ignore-robots', action='store_true', help='不读取 robots.txt')
+    parser.add_argument('--work-dir', help='存放去重表和溢出队列的目录 (默认: 系统临时目录)')
+    parser.add_argument('--memory-limit', type=int, default=10000, help='内存中保留的待抓取URL数 (默认: 10000)')
+    parser.add_argument('--workers', type=int, default=4, help='工作线程数 (默认: 4)')
+    parser.add_argument('--html', action='store_true', help='同时保存HTML文件')
+    parser.add_argument('--json', action='store_true', help='同时保存JSON信息文件')
+    args = parser.parse_args(argv)
+
+    for pattern in (args.include or []) + (args.exclude or []) + [args.article_pattern or '']:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            parser.error(f"无效的正则表达式 {pattern!r}: {e}")
+
+    fetcher = ArticleFetcher()
+    fetcher.workers = args.workers
+    _install_interrupt_handler(fetcher.cancel_token)
+    try:
+        output_dir = os.path.join(args.output, urlparse(args.url).hostname or 'site')
+        crawler = Crawler(
+            fetcher, args.url, output_dir,
+            max_depth=args.max_depth,
+            max_pages=args.max_pages,
+            include=args.include,
+            exclude=args.exclude,
+            article_pattern=args.article_pattern,
+            min_chars=args.min_chars,
+            respect_robots=not args.ignore_robots,
+            work_dir=args.work_dir,
+            memory_limit=args.memory_limit,
+            save_html=args.html,
+            save_json=args.json,
+        )
+    except ValueError as e:
+        fetcher.close()
+        parser.error(str(e))
+    try:
+        crawler.run()
+        print(f"\n{crawler.summary()}")
+    finally:
+        crawler.close()
+        fetcher.close()
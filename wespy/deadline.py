@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截止时间与协作式取消
+requests 的 timeout 只限制单次socket操作，缓慢滴流的服务器可以让一篇文章拖上几分钟。
+Deadline 为单篇文章（连接 + 下载 + 解析 + 转换）或整个任务设置总时限；
+CancelToken 用于 Ctrl-C 或库调用方主动停止，已排队的文章不再处理，已完成的结果照常保存
+
+    with Deadline(60, token):                   # 进入后成为当前线程的截止时间
+        html = timed_get(session, url).text     # 下载超时或取消时立即中断连接
+        check('parse')                          # 超时或已取消时抛出异常
+
+截止时间按线程保存，嵌套的 Deadline 取外层和自身中较早的时间
+"""
+
+import socket
+import threading
+import time
+
+
+class Cancelled(Exception):
+    """任务已被取消"""
+
+
+class DeadlineExceeded(Exception):
+    """超过截止时间"""
+
+
+class CancelToken:
+    """
+    取消令牌：cancel() 之后所有检查点抛出 Cancelled，正在进行的下载会被立即中断
+
+    可以跨线程使用，例如在信号处理函数或其他线程中调用 cancel()
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        self._next_key = 0
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason='已取消'):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def reset(self):
+        """清除取消状态，令牌可以用于下一次任务"""
+        with self._lock:
+            self._event.clear()
+            self.reason = None
+
+    def add_callback(self, callback):
+        """注册取消时调用的函数（已取消时立即调用），返回用于 remove_callback 的键"""
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._callbacks[key] = callback
+            cancelled = self._event.is_set()
+        if cancelled:
+            callback()
+        return key
+
+    def remove_callback(self, key):
+        with self._lock:
+            self._callbacks.pop(key, None)
+
+    def wait(self, seconds):
+        """等待指定秒数，期间被取消时立即返回；返回是否已取消"""
+        return self._event.wait(seconds)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled(f"任务已取消（{self.reason}）")
+
+
+_local = threading.local()
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class Deadline:
+    """
+    截止时间，可用作上下文管理器（进入后成为当前线程的截止时间）
+
+    Args:
+        seconds (float, optional): 时限（秒），None 表示不限时（只响应取消）
+        token (CancelToken, optional): 取消令牌，默认沿用外层截止时间的令牌
+        parent (Deadline, optional): 外层截止时间，默认为当前线程的截止时间
+    """
+
+    def __init__(self, seconds=None, token=None, parent=None):
+        parent = parent if parent is not None else current()
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        if parent is not None and parent.expires_at is not None:
+            if self.expires_at is None or parent.expires_at < self.expires_at:
+                self.expires_at = parent.expires_at
+        self.token = token if token is not None else (parent.token if parent is not None else None)
+
+    def __enter__(self):
+        _stack().append(self)
+        return self
+
+    def __exit__(self, *exc):
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        return False
+
+    def remaining(self):
+        """剩余秒数，不限时返回 None"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self, stage=''):
+        """已取消时抛出 Cancelled，超时时抛出 DeadlineExceeded"""
+        if self.token is not None:
+            self.token.raise_if_cancelled()
+        if self.expired:
+            raise DeadlineExceeded(f"超过截止时间（{stage}）" if stage else "超过截止时间")
+
+    def stop_reason(self):
+        """任务应当停止的原因（已取消或已超时），可以继续时返回 None"""
+        if self.token is not None and self.token.cancelled:
+            return f"任务已取消（{self.token.reason}）"
+        if self.expired:
+            return "已超过任务截止时间"
+        return None
+
+    def timeout(self, default):
+        """用于单次网络操作的超时：不超过剩余时间"""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(0.01, min(default, remaining))
+
+    def watch(self, abort):
+        """
+        到期或取消时调用 abort（在其他线程中），用于中断阻塞中的网络读取
+
+        Returns:
+            function: 结束监视时调用
+        """
+        timer = None
+        remaining = self.remaining()
+        if remaining is not None:
+            timer = threading.Timer(remaining, abort)
+            timer.daemon = True
+            timer.start()
+        key = self.token.add_callback(abort) if self.token is not None else None
+
+        def stop():
+            if timer is not None:
+                timer.cancel()
+            if key is not None:
+                self.token.remove_callback(key)
+
+        return stop
+
+
+def current():
+    """当前线程的截止时间，没有时返回 None"""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def check(stage=''):
+    """在当前线程的截止时间上检查一次（没有截止时间时什么也不做）"""
+    deadline = current()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def current_timeout(default):
+    """单次网络操作的超时，不超过当前截止时间的剩余时间"""
+    deadline = current()
+    return deadline.timeout(default) if deadline is not None else default
+
+
+def _shutdown_socket(response):
+    """关闭响应底层的socket，使另一个线程中阻塞的读取立即返回"""
+    raw = response.raw
+    candidates = (
+        lambda: raw._connection.sock,
+        lambda: raw._fp.fp.raw._sock,
+    )
+    for get_sock in candidates:
+        try:
+            sock = get_sock()
+        except AttributeError:
+            continue
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            return
+
+
+def timed_get(session, url, default_timeout=30, **kwargs):
+    """
+    在当前截止时间内完成 GET 请求（包括读取整个响应体），HTTP错误状态抛出异常；
+    session 设置了 limiter 时，请求前等待该主机的并发名额；设置了 coalescer 时，
+    同一URL的并发请求合并为一次，最近的响应直接从缓存返回
+
+    Args:
+        session (requests.Session): 会话
+        url (str): 地址
+        default_timeout (float): 没有截止时间时单次socket操作的超时
+        **kwargs: 传给 session.get 的其他参数
+
+    Returns:
+        requests.Response: 已读取完响应体的响应
+    """
+    return _timed_request(session, 'GET', url, default_timeout, kwargs)
+
+
+def timed_post(session, url, default_timeout=30, **kwargs):
+    """与 timed_get 相同，发送 POST 请求（如掘金的列表接口）"""
+    return _timed_request(session, 'POST', url, default_timeout, kwargs)
+
+
+def _timed_request(session, method, url, default_timeout, kwargs):
+    coalescer = getattr(session, 'coalescer', None)
+    if coalescer is not None and method == 'GET':
+        # 同一URL的并发请求只下载一次（wespy.coalesce.RequestCoalescer），等待的请求不占用并发名额
+        return coalescer.get(session, url, kwargs, lambda: _limited_request(session, method, url, default_timeout, kwargs))
+    return _limited_request(session, method, url, default_timeout, kwargs)
+
+
+def _limited_request(session, method, url, default_timeout, kwargs):
+    limiter = getattr(session, 'limiter', None)
+    if limiter is None:
+        return _request(session, method, url, default_timeout, kwargs)
+    # 按主机的并发控制（wespy.concurrency.HostLimiter）
+    with limiter.slot(url):
+        return _request(session, method, url, default_timeout, kwargs)
+
+
+def _request(session, method, url, default_timeout, kwargs):
+    response = session.request(method, url, timeout=current_timeout(default_timeout), stream=True, **kwargs)
+    try:
+        response.raise_for_status()
+        read_body(response)
+    except BaseException:
+        response.close()
+        raise
+    return response
+
+
+def read_body(response, chunk_size=65536):
+    """
+    在当前截止时间内读取 stream=True 的响应体；超时或取消时中断连接并抛出异常，
+    读取完成后 response.content / response.text 可以照常使用
+
+    Args:
+        response (requests.Response): 以 stream=True 发出的请求的响应
+
+    Returns:
+        requests.Response: 同一个响应
+    """
+    deadline = current()
+    if deadline is None:
+        response.content
+        return response
+
+    stop_watch = deadline.watch(lambda: _shutdown_socket(response))
+    chunks = []
+    try:
+        for chunk in response.iter_content(chunk_size):
+            deadline.check('download')
+            chunks.append(chunk)
+    except Exception:
+        # 被中断的读取表现为各种连接错误，统一换成超时或取消
+        response.close()
+        deadline.check('download')
+        raise
+    finally:
+        stop_watch()
+    deadline.check('download')
+    response._content = b''.join(chunks)
+    response._content_consumed = True
+    return response
+
+
+def timed_stream(session, url, chunk_size=65536, default_timeout=30, **kwargs):
+    """
+    逐块读取 GET 响应体，不在内存中保留整个响应（用于很大的 sitemap 等）；
+    截止时间和取消的处理与 timed_get 相同。读取期间调用方还在解析数据，耗时不能代表站点延迟，
+    所以不占用 limiter 的并发名额
+
+    Args:
+        session (requests.Session): 会话
+        url (str): 地址
+        chunk_size (int): 每块的大小
+        default_timeout (float): 没有截止时间时单次socket操作的超时
+        **kwargs: 传给 session.get 的其他参数
+
+    Yields:
+        bytes: 已按 Content-Encoding 解压的数据块
+    """
+    response = session.get(url, timeout=current_timeout(default_timeout), stream=True, **kwargs)
+    deadline = current()
+    stop_watch = deadline.watch(lambda: _shutdown_socket(response)) if deadline is not None else None
+    try:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size):
+            check('download')
+            yield chunk
+    except Exception:
+        # 被中断的读取表现为各种连接错误，统一换成超时或取消
+        check('download')
+        raise
+    finally:
+        if stop_watch is not None:
+            stop_watch()
+        response.close()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+正文区域识别
+普通网页没有匹配到已知的正文选择器时，按文本密度和链接密度给各个容器打分，
+选出最像正文的子树，代替整个 <body>。所有统计在一次自底向上的遍历中完成，
+耗时与节点数成线性关系；遍历时顺带移除 script/style/nav/aside
+
+    wespy density-bench                     # 在模拟站点生成的杂乱页面上与整个 <body> 比较
+    wespy density-bench saved_pages/        # 使用保存的网页
+"""
+
+import argparse
+import gc
+import os
+import time
+
+from bs4 import BeautifulSoup
+from bs4.element import PreformattedString
+
+# 遍历时直接移除的标签
+PRUNE_TAGS = frozenset(['script', 'style', 'nav', 'aside'])
+
+# 作为"段落"给上层容器加分的标签；div/section 内没有块级子元素时也当作段落，
+# 否则只计算直接包含的文本
+PARAGRAPH_TAGS = frozenset(['p', 'pre', 'td', 'blockquote'])
+TEXT_CONTAINER_TAGS = frozenset(['div', 'section'])
+BLOCK_TAGS = frozenset([
+    'address', 'article', 'blockquote', 'div', 'dl', 'fieldset', 'figure', 'form',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'footer', 'main', 'ol', 'p', 'pre',
+    'section', 'table', 'ul',
+])
+
+# 可以作为正文候选的标签
+CANDIDATE_TAGS = frozenset(['div', 'section', 'article', 'main', 'td', 'blockquote', 'body'])
+
+# 段落的最少有效文字数，太短的多半是按钮、标签之类
+MIN_PARAGRAPH_LENGTH = 25
+
+_POSITIVE_HINTS = ('article', 'content', 'post', 'entry', 'main', 'body', 'text', 'story')
+_NEGATIVE_HINTS = ('comment', 'footer', 'sidebar', 'share', 'related', 'recommend', 'banner', 'menu', 'nav', 'ad-')
+
+
+def select_first(root, selectors):
+    """
+    按优先级返回第一个匹配的节点，等价于依次调用 root.select_one(selector)
+
+    只支持 'tag'、'.class'、'#id' 三种简单选择器，所有选择器在一次文档遍历中一起匹配，
+    代替每个选择器各扫描一遍整棵树
+
+    Args:
+        root: BeautifulSoup 节点
+        selectors (list): 选择器列表，越靠前优先级越高
+
+    Returns:
+        匹配的节点，都没有匹配时返回 None
+    """
+    parsed = []
+    for selector in selectors:
+        if selector.startswith('.'):
+            parsed.append(('class', selector[1:]))
+        elif selector.startswith('#'):
+            parsed.append(('id', selector[1:]))
+        else:
+            parsed.append(('tag', selector))
+
+    found = [None] * len(parsed)
+    limit = len(parsed)  # 只需要检查优先级高于当前最佳结果的选择器
+    for elem in root.find_all(True):
+        classes = None
+        for index in range(limit):
+            kind, value = parsed[index]
+            if kind == 'tag':
+                matched = elem.name == value
+            elif kind == 'id':
+                matched = elem.get('id') == value
+            else:
+                if classes is None:
+                    classes = elem.get('class') or []
+                    if isinstance(classes, str):
+                        classes = classes.split()
+                matched = value in classes
+            if matched:
+                found[index] = elem
+                limit = index
+                break
+        if limit == 0:
+            break
+
+    for elem in found:
+        if elem is not None:
+            return elem
+    return None
+
+
+def _hint_weight(elem):
+    """根据 class/id 名称给出的加减分"""
+    classes = elem.get('class') or []
+    if isinstance(classes, str):
+        classes = [classes]
+    hint = (' '.join(classes) + ' ' + (elem.get('id') or '')).lower()
+    if not hint.strip():
+        return 0
+    weight = 0
+    if any(word in hint for word in _NEGATIVE_HINTS):
+        weight -= 25
+    if any(word in hint for word in _POSITIVE_HINTS):
+        weight += 25
+    return weight
+
+
+def find_main_content(root, prune=True):
+    """
+    在 root 下找出正文所在的子树
+
+    每个段落按文字数和逗号数得分，全部计入父节点、一半计入祖父节点；
+    候选节点的最终得分再乘以 (1 - 链接密度)，导航、目录一类链接堆积的区域会被压低
+
+    Args:
+        root: BeautifulSoup 节点（通常是 <body>）
+        prune (bool): 是否在遍历时移除 script/style/nav/aside
+
+    Returns:
+        得分最高的节点；没有任何段落可评分时返回 root
+    """
+    # id(节点) -> (文字数, 链接文字数, 逗号数)
+    totals = {}
+    candidates = {}
+    scores = {}
+
+    def add_score(elem, value):
+        if elem is None or elem.name not in CANDIDATE_TAGS:
+            return
+        key = id(elem)
+        if key not in scores:
+            candidates[key] = elem
+            scores[key] = _hint_weight(elem) + (10 if elem.name in ('article', 'main') else 0)
+        scores[key] += value
+
+    stack = [(root, False)]
+    while stack:
+        elem, visited = stack.pop()
+        if not visited:
+            stack.append((elem, True))
+            for child in list(elem.children):
+                if child.name is None:
+                    continue
+                if prune and child.name in PRUNE_TAGS:
+                    child.decompose()
+                    continue
+                stack.append((child, False))
+            continue
+
+        # 子节点都已统计完，汇总到当前节点
+        text_length = 0
+        link_length = 0
+        own_length = 0
+        own_commas = 0
+        commas = 0
+        has_block = False
+        for child in elem.children:
+            if child.name is None:
+                if isinstance(child, PreformattedString):
+                    # 注释、CDATA、文档声明等不算正文
+                    continue
+                text = child.strip()
+                if text:
+                    own_length += len(text)
+                    own_commas += text.count(',') + text.count('，')
+            else:
+                child_text, child_link, child_commas = totals[id(child)]
+                text_length += child_text
+                link_length += child_link
+                commas += child_commas
+                if child.name in BLOCK_TAGS:
+                    has_block = True
+        text_length += own_length
+        commas += own_commas
+        if elem.name == 'a':
+            link_length = text_length
+        totals[id(elem)] = (text_length, link_length, commas)
+
+        if elem.name in PARAGRAPH_TAGS:
+            length = text_length - link_length
+        elif elem.name in TEXT_CONTAINER_TAGS:
+            if has_block:
+                length = own_length
+                commas = own_commas
+            else:
+                length = text_length - link_length
+        else:
+            continue
+        if length < MIN_PARAGRAPH_LENGTH:
+            continue
+
+        value = 1 + commas + min(length // 100, 3)
+        if elem.name == 'td':
+            # 表格排版的页面里正文常直接放在单元格中
+            add_score(elem, value)
+        parent = elem.parent
+        add_score(parent, value)
+        if parent is not None:
+            add_score(parent.parent, value / 2)
+
+    best = None
+    best_score = 0
+    for key, elem in candidates.items():
+        text_length, link_length, _ = totals.get(key, (0, 0, 0))
+        if not text_length:
+            continue
+        score = scores[key] * (1 - link_length / text_length)
+        if score > best_score:
+            best = elem
+            best_score = score
+
+    return best if best is not None else root
+
+
+def benchmark(pages, repeat=3):
+    """
+    比较正文识别与直接使用整个 <body> 的转换耗时和Markdown大小
+
+    find_main_content 会修改解析树，每种方式每次都重新解析；解析耗时单独统计，
+    seconds 只包含正文识别和转换，取 repeat 次中最快的一次
+
+    Args:
+        pages (list): 网页HTML（str 或 bytes）
+        repeat (int): 重复次数
+
+    Returns:
+        dict: 方式（'body' / 'density'）-> {'seconds': 识别和转换耗时, 'parse_seconds': 解析耗时, 'chars': Markdown总字数}
+    """
+    from wespy.main import ArticleFetcher
+
+    fetcher = ArticleFetcher()
+    results = {}
+    for method in ('body', 'density'):
+        best = None
+        best_parse = None
+        chars = 0
+        for _ in range(max(1, repeat)):
+            # 上一轮的解析树先回收，不计入这一轮的解析耗时
+            bodies = None
+            gc.collect()
+            start = time.perf_counter()
+            bodies = [BeautifulSoup(page, 'html.parser').find('body') for page in pages]
+            parsed = time.perf_counter()
+            chars = 0
+            for body in bodies:
+                if body is None:
+                    continue
+                content = find_main_content(body) if method == 'density' else body
+                chars += len(fetcher._html_to_markdown_recursive(content))
+            elapsed = time.perf_counter() - parsed
+            best = elapsed if best is None else min(best, elapsed)
+            best_parse = parsed - start if best_parse is None else min(best_parse, parsed - start)
+        results[method] = {'seconds': best, 'parse_seconds': best_parse, 'chars': chars}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='wespy density-bench', description='比较正文识别与整个 <body> 的转换耗时和输出大小')
+    parser.add_argument('path', nargs='*', help='HTML文件或目录；不指定时使用模拟站点生成的页面')
+    parser.add_argument('--pages', type=int, default=50, help='生成的模拟页面数 (默认: 50)')
+    parser.add_argument('--paragraphs', type=int, default=30, help='模拟页面的正文段落数 (默认: 30)')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快的一次 (默认: 3)')
+    args = parser.parse_args(argv)
+
+    if args.path:
+        pages = []
+        for path in args.path:
+            names = [path]
+            if os.path.isdir(path):
+                names = [os.path.join(root, name) for root, _, files in os.walk(path)
+                         for name in sorted(files) if name.endswith('.html')]
+            for name in names:
+                with open(name, 'rb') as f:
+                    pages.append(f.read())
+    else:
+        from wespy import mockserver
+        config = mockserver.MockConfig(paragraphs=args.paragraphs)
+        pages = [mockserver.cluttered_page(config, i) for i in range(args.pages)]
+    if not pages:
+        print("没有找到HTML文件")
+        return
+
+    results = benchmark(pages, args.repeat)
+    body, density = results['body'], results['density']
+    print(f"{len(pages)} 个页面")
+    for name, label in (('body', '整个 <body>'), ('density', '正文识别')):
+        info = results[name]
+        print(f"{label:10s} 识别和转换 {info['seconds']:.3f} 秒（解析另需 {info['parse_seconds']:.3f} 秒），"
+              f"Markdown {info['chars']} 字")
+    if body['seconds'] and body['chars']:
+        print(f"正文识别的识别和转换耗时为 <body> 的 {density['seconds'] / body['seconds']:.0%}，"
+              f"含解析为 {(density['seconds'] + density['parse_seconds']) / (body['seconds'] + body['parse_seconds']):.0%}，"
+              f"输出为 {density['chars'] / body['chars']:.0%}")
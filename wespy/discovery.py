@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSS/Atom 和 sitemap 发现
+从博客首页、RSS/Atom 订阅或 sitemap.xml（包括 sitemap 索引和 .xml.gz）中找出文章URL，
+按 lastmod / 发布时间筛选出上次运行之后更新的文章，交给通用提取器并发下载
+
+    wespy feed https://example.com/blog/                 # 首页中的订阅链接，没有时查找 robots.txt 和 /sitemap.xml
+    wespy feed https://example.com/sitemap.xml --since 7d --max-articles 100
+    wespy feed https://example.com/feed.xml --list       # 只列出URL
+
+XML 边读边解析（每个条目处理完即释放），几十MB的 sitemap 也不会整体读入内存。
+每个来源上次运行的时间、下载失败（或超出 --max-articles 留到下次）的URL和已下载的URL
+记录在 <输出目录>/.wespy_feeds.json 中，下次运行只下载更新过的文章和新出现的无日期条目，并重试失败的
+"""
+
+import argparse
+import calendar
+import json
+import os
+import re
+import time
+import zlib
+from email.utils import parsedate_tz, mktime_tz
+from urllib.parse import urljoin, urlparse
+from xml.etree.ElementTree import XMLPullParser
+
+from bs4 import BeautifulSoup
+
+from wespy.deadline import Cancelled, Deadline, DeadlineExceeded, timed_get, timed_stream
+
+STATE_NAME = '.wespy_feeds.json'
+# sitemap 索引的最大嵌套层数
+MAX_DEPTH = 4
+
+_FEED_TYPES = ('application/rss+xml', 'application/atom+xml', 'application/feed+json', 'application/rdf+xml')
+_ISO_DATE = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?)?\s*(Z|[+-]\d{2}:?\d{2})?$'
+)
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class Entry:
+    """发现的一篇文章"""
+
+    __slots__ = ('url', 'updated', 'source')
+
+    def __init__(self, url, updated, source):
+        self.url = url
+        self.updated = updated
+        self.source = source
+
+    def __repr__(self):
+        return f"Entry(url={self.url!r}, updated={self.updated!r})"
+
+
+def parse_date(text):
+    """
+    解析 sitemap 的 W3C 日期（2024-01-01 / 2024-01-01T08:00:00+08:00）和 RSS 的 RFC 822 日期
+
+    Returns:
+        float: Unix时间戳，无法解析时返回 None
+    """
+    text = (text or '').strip()
+    if not text:
+        return None
+    match = _ISO_DATE.match(text)
+    if match:
+        year, month, day, hour, minute, second, zone = match.groups()
+        timestamp = calendar.timegm((int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0)))
+        if zone and zone != 'Z':
+            sign = 1 if zone[0] == '+' else -1
+            digits = zone[1:].replace(':', '')
+            timestamp -= sign * (int(digits[:2]) * 3600 + int(digits[2:]) * 60)
+        return float(timestamp)
+    parsed = parsedate_tz(text)
+    if parsed:
+        return float(mktime_tz(parsed))
+    return None
+
+
+def parse_since(value):
+    """--since 参数：日期（2024-01-01）或相对时间（7d / 12h），返回Unix时间戳"""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhd])', value.strip())
+    if match:
+        return time.time() - float(match.group(1)) * _UNITS[match.group(2)]
+    timestamp = parse_date(value)
+    if timestamp is None:
+        raise ValueError(f"无法识别的时间: {value}")
+    return timestamp
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def _child_text(elem, *names):
+    for name in names:
+        for child in elem:
+            if _local_name(child.tag) == name and child.text and child.text.strip():
+                return child.text.strip()
+    return None
+
+
+def _atom_link(entry):
+    for child in entry:
+        if _local_name(child.tag) == 'link' and child.get('href') and child.get('rel', 'alternate') == 'alternate':
+            return child.get('href')
+    return None
+
+
+def _gunzip(chunks):
+    """.xml.gz 文件（服务器没有用 Content-Encoding 声明时）边读边解压"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+def iter_xml_entries(chunks, base_url=''):
+    """
+    流式解析 sitemap / sitemap 索引 / RSS / Atom
+
+    Args:
+        chunks (iterable): XML数据块（bytes）
+        base_url (str): 用于补全相对地址
+
+    Yields:
+        tuple: ('url', 地址, 时间戳或None) 或 ('sitemap', 子sitemap地址, 时间戳或None)
+    """
+    parser = XMLPullParser(events=('start', 'end'))
+    parents = []
+
+    def handle(events):
+        for event, elem in events:
+            if event == 'start':
+                parents.append(elem)
+                continue
+            parents.pop()
+            name = _local_name(elem.tag)
+            item = None
+            if name in ('url', 'sitemap'):
+                loc = _child_text(elem, 'loc')
+                if loc:
+                    item = ('url' if name == 'url' else 'sitemap', loc, parse_date(_child_text(elem, 'lastmod')))
+            elif name == 'item':
+                link = _child_text(elem, 'link') or _child_text(elem, 'guid')
+                if link:
+                    item = ('url', link, parse_date(_child_text(elem, 'pubDate', 'date', 'updated')))
+            elif name == 'entry':
+                link = _atom_link(elem)
+                if link:
+                    item = ('url', link, parse_date(_child_text(elem, 'updated', 'published')))
+            else:
+                continue
+            # 条目处理完后从父节点移除，内存只保留当前条目
+            if parents:
+                parents[-1].remove(elem)
+            if item is not None:
+                yield item[0], urljoin(base_url, item[1]), item[2]
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from handle(parser.read_events())
+    parser.close()
+    yield from handle(parser.read_events())
+
+
+def find_feeds(html, base_url):
+    """网页中声明的 RSS/Atom 订阅地址（<link rel="alternate" type="application/rss+xml">）"""
+    soup = BeautifulSoup(html, 'html.parser')
+    feeds = []
+    for link in soup.find_all('link', href=True):
+        rel = link.get('rel') or []
+        rel = rel if isinstance(rel, list) else rel.split()
+        if 'alternate' in rel and (link.get('type') or '').lower() in _FEED_TYPES:
+            feeds.append(urljoin(base_url, link['href']))
+    return feeds
+
+
+def find_sitemaps(session, url):
+    """robots.txt 中声明的 sitemap，没有时返回站点的 /sitemap.xml"""
+    root = f"{urlparse(url).scheme}://{urlparse(url).netloc}"
+    try:
+        robots = timed_get(session, root + '/robots.txt').text
+    except Exception:
+        robots = ''
+    sitemaps = [line.split(':', 1)[1].strip() for line in robots.splitlines() if line.lower().startswith('sitemap:')]
+    return sitemaps or [root + '/sitemap.xml']
+
+
+def _looks_like_html(head):
+    head = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    return head.startswith(b'<!doctype html') or head.startswith(b'<html') or b'<html' in head[:1024]
+
+
+def discover(session, url, since=None, known=None):
+    """
+    从一个地址发现文章：订阅或 sitemap 直接解析；普通网页先查找其中的订阅链接，
+    没有订阅时使用 robots.txt 中的 sitemap 或 /sitemap.xml
+
+    Args:
+        session (requests.Session): 会话
+        url (str): 网页、RSS/Atom 或 sitemap 地址
+        since (float, optional): 只返回在该时间之后更新的文章，lastmod 不晚于 since 的子 sitemap 不再读取
+        known (set, optional): 已经下载过的URL；有 since 时，无日期的条目（没有 lastmod 的 sitemap、
+            没有日期的订阅）只返回不在其中的，known 为 None 时全部跳过
+
+    Yields:
+        Entry: 文章（同一URL只产出一次）
+    """
+    pending = [(url, 0)]
+    visited = set()
+    seen = set()
+    while pending:
+        source, depth = pending.pop(0)
+        if source in visited:
+            continue
+        visited.add(source)
+        try:
+            for kind, loc, updated in _read_source(session, source, allow_html=(source == url)):
+                if kind in ('feed', 'sitemap'):
+                    # 网页中的订阅链接，或 sitemap 索引中的子 sitemap
+                    if depth >= MAX_DEPTH:
+                        continue
+                    if since is not None and updated is not None and updated <= since:
+                        continue
+                    pending.append((loc, depth + 1))
+                    continue
+                if loc in seen:
+                    continue
+                if since is not None:
+                    if updated is None and (known is None or loc in known):
+                        continue
+                    if updated is not None and updated <= since:
+                        continue
+                seen.add(loc)
+                yield Entry(loc, updated, source)
+        except (Cancelled, DeadlineExceeded):
+            raise
+        except Exception as e:
+            print(f"读取失败，已跳过 {source}: {e}")
+
+
+def _read_source(session, source, allow_html):
+    """读取一个来源，产出 iter_xml_entries 的结果；网页产出 ('feed', 订阅地址, None)"""
+    chunks = timed_stream(session, source)
+    try:
+        head = b''
+        for head in chunks:
+            if head:
+                break
+        if not head:
+            return
+
+        def body():
+            yield head
+            yield from chunks
+
+        if head.startswith(b'\x1f\x8b'):
+            yield from iter_xml_entries(_gunzip(body()), source)
+        elif _looks_like_html(head):
+            if not allow_html:
+                print(f"不是订阅或 sitemap，已跳过: {source}")
+                return
+            html = b''.join(body())
+            feeds = find_feeds(html, source)
+            if feeds:
+                print(f"发现订阅: {', '.join(feeds)}")
+            else:
+                feeds = find_sitemaps(session, source)
+                print(f"没有找到订阅，使用 sitemap: {', '.join(feeds)}")
+            for feed in feeds:
+                yield 'feed', feed, None
+        else:
+            yield from iter_xml_entries(body(), source)
+    finally:
+        chunks.close()
+
+
+class DiscoveryState:
+    """各来源上次运行的时间、待重试的URL和已下载的URL"""
+
+    def __init__(self, path):
+        self.path = path
+        self.sources = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.sources = json.load(f).get('sources', {})
+
+    def last_run(self, source):
+        return self.sources.get(source, {}).get('last_run')
+
+    def retry(self, source):
+        return list(self.sources.get(source, {}).get('retry', []))
+
+    def known(self, source):
+        """已下载的URL；该来源还没有运行记录时返回 None"""
+        if source not in self.sources:
+            return None
+        return set(self.sources[source].get('known', []))
+
+    def update(self, source, last_run, retry, known=None):
+        """known 为 None 时保留原有记录"""
+        if known is None:
+            known = self.sources.get(source, {}).get('known', [])
+        self.sources[source] = {'last_run': last_run, 'retry': retry, 'known': sorted(known)}
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'sources': self.sources}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def main(argv=None):
+    from wespy.main import ArticleFetcher, _install_interrupt_handler
+
+    parser = argparse.ArgumentParser(prog='wespy feed', description='从 RSS/Atom 订阅或 sitemap 发现文章并批量下载')
+    parser.add_argument('url', nargs='+', help='网站首页、RSS/Atom 订阅或 sitemap.xml 地址')
+    parser.add_argument('-o', '--output', default='articles', help='输出目录，每个站点保存到其中以域名命名的子目录 (默认: articles)')
+    parser.add_argument('--since', help='只下载在该时间之后更新的文章，如 2024-01-01 或 7d（默认: 上次运行的时间）')
+    parser.add_argument('--state', help=f'运行记录文件 (默认: <输出目录>/{STATE_NAME})')
+    parser.add_argument('--max-articles', type=int, help='每个来源每次最多下载的文章数（新的优先，其余留到下次运行）')
+    parser.add_argument('--list', action='store_true', help='只列出发现的文章，不下载')
+    parser.add_argument('--workers', type=int, default=4, help='下载文章的工作线程数 (默认: 4)')
+    parser.add_argument('--html', action='store_true', help='同时保存HTML文件')
+    parser.add_argument('--json', action='store_true', help='同时保存JSON信息文件')
+    args = parser.parse_args(argv)
+
+    try:
+        since = parse_since(args.since) if args.since else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    state = DiscoveryState(args.state or os.path.join(args.output, STATE_NAME))
+    fetcher = ArticleFetcher()
+    fetcher.workers = args.workers
+    _install_interrupt_handler(fetcher.cancel_token)
+    try:
+        for source in args.url:
+            started = time.time()
+            source_since = since if since is not None else state.last_run(source)
+            known = state.known(source)
+            if source_since is not None:
+                print(f"\n{source}: 查找 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(source_since))} 之后更新的文章")
+            else:
+                print(f"\n{source}: 首次运行，查找全部文章")
+            try:
+                with Deadline(None, fetcher.cancel_token):
+                    entries = list(discover(fetcher.session, source, source_since, known))
+            except Exception as e:
+                print(f"发现文章失败: {e}")
+                continue
+            # 新的在前，然后是上次失败或留到这次的文章
+            entries.sort(key=lambda entry: entry.updated or 0, reverse=True)
+            urls = [entry.url for entry in entries]
+            found = set(urls)
+            retry = [url for url in state.retry(source) if url not in found]
+            print(f"发现 {len(urls)} 篇文章" + (f"，另有 {len(retry)} 篇上次失败或未下载的文章" if retry else ''))
+            # 超出 --max-articles 的文章留到下次运行（last_run 照常推进，不会再被发现，只能从这里找回）
+            queue = urls + retry
+            deferred = []
+            if args.max_articles and len(queue) > args.max_articles:
+                queue, deferred = queue[:args.max_articles], queue[args.max_articles:]
+                print(f"本次下载 {len(queue)} 篇，其余 {len(deferred)} 篇留到下次运行")
+
+            if args.list:
+                listed = {entry.url: entry for entry in entries}
+                for url in queue:
+                    entry = listed.get(url)
+                    updated = time.strftime('%Y-%m-%d', time.localtime(entry.updated)) if entry and entry.updated else '----------'
+                    print(f"{updated}  {url}")
+                continue
+            if not queue:
+                state.update(source, started, [])
+                continue
+
+            output_dir = os.path.join(args.output, urlparse(source).hostname or 'site')
+            results = fetcher.fetch_articles(queue, output_dir, args.html, args.json)
+            succeeded = {result.get('url') for result in results}
+            state.update(source, started, [url for url in queue if url not in succeeded] + deferred,
+                         (known or set()) | (succeeded & set(queue)))
+            if fetcher.cancel_token.cancelled:
+                break
+    finally:
+        if not args.list:
+            state.save()
+        fetcher.close()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML 输出模式
+--html 默认保存完整的原始网页（raw），其中的脚本、内联样式和统计代码往往是正文的十倍大小。
+
+    raw       原始网页，与下载到的内容完全一致
+    content   只保存元数据和清理后的正文节点
+    compact   在 content 的基础上去掉脚本、样式、注释和多余的属性，懒加载图片改为 src，压缩空白
+
+content / compact 按原站点的页面结构（标题、作者、时间和正文容器）生成，wespy rerender 和
+各站点的提取器可以照常解析，重新生成的 Markdown 与从原始网页生成的一致（compact 去掉了正文中的
+HTML注释，从原始网页转换时注释文字会混入 Markdown，这是唯一的差别，html-size 比较时忽略这些行）
+
+    wespy "https://mp.weixin.qq.com/s/xxxxx" --html --html-mode compact
+    wespy html-size recorded_pages/          # 比较目录中保存的原始网页在各模式下的大小
+"""
+
+import argparse
+import html
+import json
+import os
+import re
+
+from bs4 import BeautifulSoup, Comment
+
+from wespy.transport import _format_size
+
+HTML_MODES = ('raw', 'content', 'compact')
+
+# compact 模式直接删除的标签
+DROP_TAGS = ('script', 'style', 'noscript', 'template', 'link', 'meta')
+# compact 模式保留的属性，其余（style、class、data-*、事件等）全部去掉
+KEEP_ATTRS = frozenset(['href', 'src', 'alt', 'title', 'colspan', 'rowspan', 'start', 'datetime'])
+# 代码块还保留用于识别语言的属性（见 ArticleFetcher._detect_code_language）
+CODE_ATTRS = frozenset(['class', 'data-language', 'lang'])
+# 懒加载图片的真实地址
+LAZY_SRC_ATTRS = ('data-src', 'data-original', 'data-actualsrc', 'data-lazy-src')
+# 保留空白的标签
+PRESERVE_WHITESPACE = frozenset(['pre', 'code', 'textarea'])
+# 其中只有空白的文本可以删除的容器（行内元素之间的空格会影响显示，不删除）
+BLOCK_CONTAINERS = frozenset([
+    'article', 'blockquote', 'body', 'div', 'dl', 'figure', 'ol', 'section', 'table', 'tbody', 'thead',
+    'tfoot', 'tr', 'ul',
+])
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def compact_html(content_html):
+    """
+    精简正文HTML：去掉脚本、样式、注释和多余的属性，懒加载图片改为 src，压缩空白；
+    根节点的 id 保留（微信正文容器 js_content 依赖它）
+
+    Args:
+        content_html (str): 正文HTML
+
+    Returns:
+        str: 精简后的HTML
+    """
+    soup = BeautifulSoup(content_html or '', 'html.parser')
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    for tag in soup.find_all(DROP_TAGS):
+        tag.decompose()
+
+    root = soup.find(True)
+    for tag in soup.find_all(True):
+        if tag.name == 'img':
+            src = next((tag.get(name) for name in LAZY_SRC_ATTRS if tag.get(name)), None)
+            if src:
+                tag['src'] = src
+        keep = KEEP_ATTRS | CODE_ATTRS if tag.name in ('pre', 'code') else KEEP_ATTRS
+        attrs = {name: value for name, value in tag.attrs.items() if name in keep}
+        if tag is root and tag.get('id'):
+            attrs['id'] = tag['id']
+        tag.attrs = attrs
+
+    for text in soup.find_all(string=True):
+        if any(parent.name in PRESERVE_WHITESPACE for parent in text.parents):
+            continue
+        collapsed = _WHITESPACE.sub(' ', text)
+        if collapsed == ' ' and text.parent is not None and text.parent.name in BLOCK_CONTAINERS:
+            text.extract()
+        elif collapsed != text:
+            text.replace_with(collapsed)
+    return str(soup)
+
+
+def _escape(value):
+    return html.escape(str(value or ''), quote=True)
+
+
+def build_content_html(article_info, site, compact=False):
+    """
+    生成只含元数据和正文的HTML文档，结构与原站点一致，提取器可以重新解析
+
+    Args:
+        article_info: Article 对象或 fetch_article 返回的字典
+        site (str): 'wechat' / 'juejin' / 'general'
+        compact (bool): 是否同时精简正文
+
+    Returns:
+        str: HTML文档
+    """
+    title = _escape(article_info['title'])
+    author = _escape(article_info['author'])
+    publish_time = _escape(article_info['publish_time'])
+    url = _escape(article_info['url'])
+    content = article_info['content_html'] or ''
+    if compact:
+        content = compact_html(content)
+
+    head = (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>'
+        f'<meta name="author" content="{author}"><link rel="canonical" href="{url}"></head><body>'
+    )
+    if site == 'wechat':
+        # 正文HTML本身就是 div#js_content
+        body = (
+            f'<h1 class="rich_media_title">{title}</h1><a id="js_name">{author}</a>'
+            f'<em id="publish_time">{publish_time}</em>{content}'
+        )
+    elif site == 'juejin':
+        tags = ''.join(f'<a class="tag">{_escape(tag)}</a>' for tag in article_info.get('tags') or [])
+        view_count = article_info.get('view_count')
+        views = f'<span class="view-count">{_escape(view_count)}</span>' if view_count else ''
+        body = (
+            f'<h1 class="article-title">{title}</h1><span class="name">{author}</span>'
+            f'<span class="time">{publish_time}</span>{views}{tags}<div id="article-root">{content}</div>'
+        )
+    else:
+        body = f'<h1>{title}</h1><time>{publish_time}</time><article>{content}</article>'
+    return f'{head}{body}</body></html>\n'
+
+
+def render_html(article_info, site, mode='raw'):
+    """
+    按输出模式生成要保存的HTML
+
+    Args:
+        article_info: Article 对象或 fetch_article 返回的字典
+        site (str): 'wechat' / 'juejin' / 'general'
+        mode (str): HTML_MODES 之一
+
+    Returns:
+        str: HTML
+    """
+    if mode == 'raw':
+        return article_info['html_content']
+    if mode not in HTML_MODES:
+        raise ValueError(f"不支持的HTML模式: {mode}，可选: {', '.join(HTML_MODES)}")
+    return build_content_html(article_info, site, compact=(mode == 'compact'))
+
+
+def encode_html(article_info, site, mode='raw', page=None):
+    """
+    生成要写入文件的HTML字节：raw 模式下直接使用下载到的原始缓冲区，不经过解码和重新编码
+
+    Args:
+        article_info: Article 对象或 fetch_article 返回的字典
+        site (str): 'wechat' / 'juejin' / 'general'
+        mode (str): HTML_MODES 之一
+        page (RawHTML, optional): 原始网页，默认取 Article.page
+
+    Returns:
+        memoryview | bytes: UTF-8 编码的HTML
+    """
+    if mode == 'raw':
+        if page is None:
+            page = getattr(article_info, 'page', None)
+        if page is not None:
+            return page.encoded()
+    return render_html(article_info, site, mode).encode('utf-8')
+
+
+def measure(paths):
+    """
+    比较原始网页在各模式下的大小，并检查从各模式重新生成的 Markdown 是否与原始网页一致
+
+    Args:
+        paths (list): 原始网页文件路径（原文地址取自同名的 _info.json 或页面中的 canonical 链接）
+
+    Returns:
+        dict: 模式 -> {'bytes': 总字节数, 'mismatched': Markdown不一致的文件数}
+            （compact 去掉了正文中的注释，比较时忽略原始网页的 Markdown 中来自注释的行）
+    """
+    from wespy.rerender import _guess_site, render_markdown, _get_fetcher
+
+    fetcher = _get_fetcher()
+    totals = {mode: {'bytes': 0, 'mismatched': 0} for mode in HTML_MODES}
+    for path in paths:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            raw = f.read()
+        url = _info_url(path) or _page_url(raw)
+        site = _guess_site(fetcher, url, raw)
+        article = fetcher._parse_article(url, site, raw)
+        expected = render_markdown(fetcher, url, raw)
+        comments = _comment_texts(article['content_html'])
+        for mode in HTML_MODES:
+            output = render_html(article, site, mode)
+            totals[mode]['bytes'] += len(output.encode('utf-8'))
+            if mode == 'raw':
+                continue
+            markdown = render_markdown(fetcher, url, output)
+            if mode == 'compact':
+                same = _without_lines(markdown, comments) == _without_lines(expected, comments)
+            else:
+                same = markdown == expected
+            if not same:
+                totals[mode]['mismatched'] += 1
+    return totals
+
+
+def _comment_texts(content_html):
+    """正文HTML中注释的文字"""
+    soup = BeautifulSoup(content_html or '', 'html.parser')
+    return {text.strip() for text in soup.find_all(string=lambda text: isinstance(text, Comment))}
+
+
+def _without_lines(markdown, texts):
+    """去掉空行和内容属于 texts 的行"""
+    return [line for line in markdown.splitlines() if line.strip() and line.strip() not in texts]
+
+
+def _info_url(path):
+    """下载时同时保存的 _info.json 中记录的原文地址"""
+    info_path = path[:-len('.html')] + '_info.json'
+    try:
+        with open(info_path, encoding='utf-8') as f:
+            return json.load(f).get('url') or ''
+    except (OSError, ValueError):
+        return ''
+
+
+def _page_url(page):
+    """页面中记录的原文地址（canonical 或 og:url），没有时返回空字符串"""
+    soup = BeautifulSoup(page, 'html.parser')
+    link = soup.find('link', rel='canonical') or soup.find('meta', property='og:url')
+    if link is None:
+        return ''
+    return link.get('href') or link.get('content') or ''
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='wespy html-size', description='比较保存的原始网页在各HTML模式下的大小')
+    parser.add_argument('path', nargs='+', help='HTML文件或目录（包含子目录中的 .html 文件）')
+    args = parser.parse_args(argv)
+
+    paths = []
+    for path in args.path:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                paths.extend(os.path.join(root, name) for name in sorted(names) if name.endswith('.html'))
+        else:
+            paths.append(path)
+    if not paths:
+        print("没有找到HTML文件")
+        return
+
+    totals = measure(paths)
+    raw_bytes = totals['raw']['bytes']
+    print(f"{len(paths)} 个页面")
+    for mode in HTML_MODES:
+        info = totals[mode]
+        line = f"{mode:8s} {_format_size(info['bytes'])}"
+        if mode != 'raw' and raw_bytes:
+            line += f"（原始的 {info['bytes'] / raw_bytes:.1%}）"
+            line += f"，Markdown 不一致 {info['mismatched']} 篇" if info['mismatched'] else "，Markdown 一致"
+        print(line)
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片本地化
+并发下载文章中的图片，在进程池中缩放和重新压缩（WebP / AVIF / JPEG，GIF 保持原样），
+Markdown 中的图片链接改为指向本地文件。需要安装 Pillow（pip install wespy[images]），
+未安装时图片按原样保存
+
+    wespy "https://mp.weixin.qq.com/s/xxxxx" --images webp --image-max-width 1280
+
+图片按URL的哈希命名，保存在输出目录的 images/ 下，同一专辑中重复出现的图片只下载一次；
+已存在的图片不再下载
+"""
+
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from wespy.deadline import Cancelled, Deadline, DeadlineExceeded, current, current_timeout, timed_get
+from wespy.transport import _format_size
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_FORMATS = ('webp', 'avif', 'jpeg', 'original')
+IMAGE_DIR = 'images'
+
+# 文件头 -> 扩展名
+_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'RIFF', 'webp'),
+)
+_EXTENSIONS = ('webp', 'avif', 'jpg', 'png', 'gif', 'img')
+_PIL_FORMATS = {'webp': 'WEBP', 'avif': 'AVIF', 'jpeg': 'JPEG'}
+
+# 当前线程正在转换的文章：图片URL -> 本地相对路径
+_local = threading.local()
+
+
+def sniff_extension(data):
+    """根据文件头判断图片扩展名，无法识别时返回 'img'"""
+    for signature, ext in _SIGNATURES:
+        if data.startswith(signature):
+            return ext
+    if data[4:12] in (b'ftypavif', b'ftypavis'):
+        return 'avif'
+    return 'img'
+
+
+def optimize_image(data, fmt='webp', max_width=1280, quality=80):
+    """
+    缩放并重新压缩一张图片（在进程池中执行，只使用可序列化的参数）
+
+    GIF、动图、无法识别的图片和重新压缩后反而更大的图片保持原样
+
+    Args:
+        data (bytes): 原始图片
+        fmt (str): 'webp' / 'avif' / 'jpeg' / 'original'
+        max_width (int): 最大宽度（像素），0 表示不缩放
+        quality (int): 压缩质量 1-100
+
+    Returns:
+        tuple: (图片数据, 扩展名)
+    """
+    original = (data, sniff_extension(data))
+    if Image is None or fmt == 'original' or original[1] == 'gif':
+        return original
+    try:
+        image = Image.open(io.BytesIO(data))
+        if getattr(image, 'is_animated', False):
+            return original
+        resized = bool(max_width) and image.width > max_width
+        if resized:
+            height = max(1, round(image.height * max_width / image.width))
+            image = image.resize((max_width, height), Image.LANCZOS)
+        if fmt == 'jpeg':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.mode or 'transparency' in image.info else 'RGB')
+        output = io.BytesIO()
+        image.save(output, _PIL_FORMATS[fmt], quality=quality)
+    except Exception:
+        # 损坏的图片或当前 Pillow 不支持的格式
+        return original
+    optimized = output.getvalue()
+    if len(optimized) >= len(data) and not resized:
+        return original
+    return optimized, 'jpg' if fmt == 'jpeg' else fmt
+
+
+def image_urls(content_html):
+    """正文中的图片地址（与 Markdown 转换时使用的 data-src / src 一致），按出现顺序去重"""
+    urls = []
+    seen = set()
+    soup = BeautifulSoup(content_html or '', 'html.parser', parse_only=SoupStrainer('img'))
+    for img in soup.find_all('img'):
+        src = img.get('data-src') or img.get('src', '')
+        if src.startswith('http') and src not in seen:
+            seen.add(src)
+            urls.append(src)
+    return urls
+
+
+def image_name(url):
+    """图片文件名（不含扩展名）：URL的哈希"""
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+
+
+class ImageStats:
+    """图片统计：数量、失败数、原始大小和保存后的大小"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.images = 0
+        self.failed = 0
+        self.reused = 0
+        self.original_bytes = 0
+        self.saved_bytes = 0
+
+    def record(self, original_bytes, saved_bytes):
+        with self._lock:
+            self.images += 1
+            self.original_bytes += original_bytes
+            self.saved_bytes += saved_bytes
+
+    def record_failure(self):
+        with self._lock:
+            self.failed += 1
+
+    def record_reused(self):
+        with self._lock:
+            self.reused += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'images': self.images,
+                'failed': self.failed,
+                'reused': self.reused,
+                'original_bytes': self.original_bytes,
+                'saved_bytes': self.saved_bytes,
+            }
+
+    def delta(self, before):
+        """从某次 snapshot() 之后新增的统计"""
+        now = self.snapshot()
+        return {key: value - before.get(key, 0) for key, value in now.items()}
+
+    @staticmethod
+    def format(stats):
+        """把 snapshot()/delta() 的结果格式化为一行说明"""
+        parts = []
+        if stats['images'] or not (stats['reused'] or stats['failed']):
+            line = f"{stats['images']} 张，原始 {_format_size(stats['original_bytes'])}，保存 {_format_size(stats['saved_bytes'])}"
+            if stats['original_bytes'] > stats['saved_bytes']:
+                line += f"（节省 {1 - stats['saved_bytes'] / stats['original_bytes']:.1%}）"
+            parts.append(line)
+        if stats['reused']:
+            parts.append(f"已存在 {stats['reused']} 张")
+        if stats['failed']:
+            parts.append(f"失败 {stats['failed']} 张")
+        return '，'.join(parts)
+
+
+class ImagePipeline:
+    """
+    图片下载和压缩流水线，可以在多篇文章（多个线程）之间共用
+
+    Args:
+        session (requests.Session): 下载图片使用的会话
+        fmt (str): 输出格式，见 IMAGE_FORMATS
+        max_width (int): 最大宽度（像素），0 表示不缩放
+        quality (int): 压缩质量
+        threads (int): 并发下载的线程数
+        processes (int, optional): 压缩图片的进程数，默认为CPU核数；0 表示在下载线程中直接压缩
+    """
+
+    def __init__(self, session, fmt='webp', max_width=1280, quality=80, threads=8, processes=None):
+        if fmt not in IMAGE_FORMATS:
+            raise ValueError(f"不支持的图片格式: {fmt}，可选: {', '.join(IMAGE_FORMATS)}")
+        if Image is None and fmt != 'original':
+            print("未安装 Pillow，图片按原样保存（pip install wespy[images]）")
+            fmt = 'original'
+        elif fmt == 'avif' and not _pil_supports('AVIF'):
+            print("当前 Pillow 不支持 AVIF，改用 WebP")
+            fmt = 'webp'
+        self.session = session
+        self.fmt = fmt
+        self.max_width = max_width
+        self.quality = quality
+        self.stats = ImageStats()
+        self._downloads = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wespy-image')
+        self._processes = None
+        if fmt != 'original' and processes != 0:
+            self._processes = ProcessPoolExecutor(max_workers=processes)
+
+    def close(self):
+        self._downloads.shutdown(wait=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=True)
+
+    def fetch(self, urls, exists=None):
+        """
+        下载并压缩一组图片
+
+        Args:
+            urls (list): 图片地址
+            exists (function, optional): exists(文件名) 返回该图片是否已经保存过，已保存的不再下载
+
+        Returns:
+            tuple: (结果, 统计)，结果为 URL -> (文件名, 图片数据)，已保存过的图片数据为 None，
+                失败的图片不在结果中；统计为这组图片的 ImageStats.snapshot()
+        """
+        deadline = current()
+        stats = ImageStats()
+        results = {}
+        pending = []
+        for url in urls:
+            name = _existing_name(url, exists)
+            if name is not None:
+                for target in (stats, self.stats):
+                    target.record_reused()
+                results[url] = (name, None)
+            else:
+                pending.append((url, self._downloads.submit(self._fetch_one, url, deadline)))
+        for url, future in pending:
+            try:
+                name, data, original_bytes = future.result()
+            except (Cancelled, DeadlineExceeded):
+                raise
+            except Exception:
+                for target in (stats, self.stats):
+                    target.record_failure()
+                continue
+            for target in (stats, self.stats):
+                target.record(original_bytes, len(data))
+            results[url] = (name, data)
+        return results, stats.snapshot()
+
+    def _fetch_one(self, url, deadline):
+        # 下载线程继承调用线程的截止时间和取消令牌
+        with Deadline(parent=deadline):
+            data = timed_get(self.session, url).content
+            if self._processes is not None:
+                future = self._processes.submit(optimize_image, data, self.fmt, self.max_width, self.quality)
+                optimized, ext = future.result(timeout=current_timeout(120))
+            else:
+                optimized, ext = optimize_image(data, self.fmt, self.max_width, self.quality)
+        return f"{image_name(url)}.{ext}", optimized, len(data)
+
+
+def save_images(pipeline, writer, output_dir, content_html):
+    """
+    下载正文中的图片并保存到 output_dir/images/
+
+    Args:
+        pipeline (ImagePipeline): 图片流水线
+        writer (OutputWriter): 文件输出器
+        output_dir (str): 文章所在目录
+        content_html (str): 正文HTML
+
+    Returns:
+        dict: 图片URL -> Markdown中使用的相对路径，传给 use_local_images()
+    """
+    urls = image_urls(content_html)
+    if not urls:
+        return {}
+    image_dir = os.path.join(output_dir, IMAGE_DIR)
+    writer.ensure_dir(image_dir)
+    # 后台写入时，排队中的图片还不在磁盘上，同样视为已保存
+    results, stats = pipeline.fetch(urls, exists=lambda name: writer.exists(os.path.join(image_dir, name)))
+    mapping = {}
+    for url, (name, data) in results.items():
+        if data is not None:
+            writer.write_bytes(os.path.join(image_dir, name), data)
+        mapping[url] = f"{IMAGE_DIR}/{name}"
+    print(f"图片: {ImageStats.format(stats)}")
+    return mapping
+
+
+def local_images(output_dir, content_html):
+    """
+    查找已经保存在 output_dir/images/ 中的图片（不下载），供离线重新生成Markdown使用
+
+    Returns:
+        dict: 图片URL -> Markdown中使用的相对路径，没有保存的图片不在其中
+    """
+    image_dir = os.path.join(output_dir, IMAGE_DIR)
+    try:
+        names = set(os.listdir(image_dir))
+    except FileNotFoundError:
+        return {}
+    mapping = {}
+    for url in image_urls(content_html):
+        name = _existing_name(url, names.__contains__)
+        if name is not None:
+            mapping[url] = f"{IMAGE_DIR}/{name}"
+    return mapping
+
+
+@contextmanager
+def use_local_images(mapping):
+    """在当前线程中把 mapping 里的图片URL替换为本地路径（供Markdown转换使用）"""
+    previous = getattr(_local, 'mapping', None)
+    _local.mapping = mapping
+    try:
+        yield
+    finally:
+        _local.mapping = previous
+
+
+def local_image(url):
+    """当前线程中图片URL对应的本地路径，没有时返回 None"""
+    mapping = getattr(_local, 'mapping', None)
+    return mapping.get(url) if mapping else None
+
+
+def _existing_name(url, exists):
+    if exists is None:
+        return None
+    base = image_name(url)
+    for ext in _EXTENSIONS:
+        if exists(f"{base}.{ext}"):
+            return f"{base}.{ext}"
+    return None
+
+
+def _pil_supports(format_name):
+    try:
+        from PIL import features
+        return bool(features.check(format_name.lower()))
+    except Exception:
+        return format_name in Image.registered_extensions().values()
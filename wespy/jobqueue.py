@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式任务队列
+多台机器上的 wespy worker 从共享队列中领取文章URL，下载结果写回共享的输出目录
+
+领取任务时获得一个有时限的租约，处理期间定时续约（心跳）；worker 崩溃或失联时租约过期，
+任务会被其他 worker 重新领取。失败的任务按退避时间重试，超过最大次数后标记为失败
+
+    wespy enqueue --queue /shared/queue.db "https://mp.weixin.qq.com/mp/appmsgalbum?..."
+    wespy worker --queue /shared/queue.db -o /shared/articles
+
+队列后端可替换：SQLiteJobQueue 适合放在共享文件系统上，MemoryJobQueue 用于单进程和测试
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+from wespy.blocking import CircuitOpen
+
+# 任务状态
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+STATUSES = (PENDING, LEASED, DONE, FAILED)
+
+
+class LeasedJob:
+    """已领取的任务"""
+
+    def __init__(self, id, url, group='', meta=None, attempts=0):
+        self.id = id
+        self.url = url
+        self.group = group or ''
+        self.meta = meta or {}
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"LeasedJob(id={self.id!r}, url={self.url!r}, attempts={self.attempts})"
+
+
+def retry_delay(attempts):
+    """第 n 次失败后等待的秒数（指数退避，最长5分钟）"""
+    return min(300, 5 * 2 ** max(0, attempts - 1))
+
+
+class JobQueue:
+    """
+    任务队列接口
+
+    Args:
+        max_attempts (int): 每个任务最多尝试的次数（包括租约过期的情况）
+    """
+
+    def __init__(self, max_attempts=3):
+        self.max_attempts = max_attempts
+
+    def put(self, url, group='', meta=None):
+        """添加任务，URL已在队列中时忽略；返回是否新增"""
+        raise NotImplementedError
+
+    def put_many(self, items):
+        """
+        批量添加任务
+
+        Args:
+            items (list): (url, group, meta) 元组
+
+        Returns:
+            int: 新增的任务数
+        """
+        return sum(1 for url, group, meta in items if self.put(url, group, meta))
+
+    def lease(self, worker_id, lease_seconds):
+        """领取一个可执行的任务（等待中的，或租约已过期的），没有时返回 None"""
+        raise NotImplementedError
+
+    def heartbeat(self, job_id, worker_id, lease_seconds):
+        """续约；租约已被其他 worker 接手时返回 False"""
+        raise NotImplementedError
+
+    def complete(self, job_id, worker_id, result):
+        """标记任务完成并写入结果；租约已失效时返回 False"""
+        raise NotImplementedError
+
+    def fail(self, job_id, worker_id, error):
+        """标记本次尝试失败：未超过最大次数时退避后重试，否则标记为失败"""
+        raise NotImplementedError
+
+    def release(self, job_id, worker_id, delay=0):
+        """放弃租约（worker 正常退出或站点暂时受限时），任务 delay 秒后可以被重新领取，不计入尝试次数"""
+        raise NotImplementedError
+
+    def stats(self):
+        """各状态的任务数，以及按分组（专辑）的统计"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryJobQueue(JobQueue):
+    """进程内队列，接口与 SQLiteJobQueue 相同，用于单机多线程和测试"""
+
+    def __init__(self, max_attempts=3, clock=time.time):
+        super().__init__(max_attempts)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._by_url = {}
+        self._next_id = 1
+
+    def put(self, url, group='', meta=None):
+        with self._lock:
+            if url in self._by_url:
+                return False
+            job_id = self._next_id
+            self._next_id += 1
+            self._jobs[job_id] = {
+                'id': job_id, 'url': url, 'group': group or '', 'meta': meta or {},
+                'status': PENDING, 'attempts': 0, 'available_at': 0.0,
+                'lease_owner': None, 'lease_expires': 0.0, 'result': None, 'error': None,
+            }
+            self._by_url[url] = job_id
+            return True
+
+    def lease(self, worker_id, lease_seconds):
+        with self._lock:
+            now = self._clock()
+            for job in self._jobs.values():
+                expired = job['status'] == LEASED and job['lease_expires'] < now
+                ready = job['status'] == PENDING and job['available_at'] <= now
+                if not (expired or ready):
+                    continue
+                if job['attempts'] >= self.max_attempts:
+                    job['status'] = FAILED
+                    job['error'] = job['error'] or '租约多次过期'
+                    continue
+                job['status'] = LEASED
+                job['attempts'] += 1
+                job['lease_owner'] = worker_id
+                job['lease_expires'] = now + lease_seconds
+                return LeasedJob(job['id'], job['url'], job['group'], dict(job['meta']), job['attempts'])
+        return None
+
+    def _owned(self, job_id, worker_id):
+        job = self._jobs.get(job_id)
+        if job and job['status'] == LEASED and job['lease_owner'] == worker_id:
+            return job
+        return None
+
+    def heartbeat(self, job_id, worker_id, lease_seconds):
+        with self._lock:
+            job = self._owned(job_id, worker_id)
+            if job is None:
+                return False
+            job['lease_expires'] = self._clock() + lease_seconds
+            return True
+
+    def complete(self, job_id, worker_id, result):
+        with self._lock:
+            job = self._owned(job_id, worker_id)
+            if job is None:
+                return False
+            job.update(status=DONE, result=result, error=None, lease_owner=None)
+            return True
+
+    def fail(self, job_id, worker_id, error):
+        with self._lock:
+            job = self._owned(job_id, worker_id)
+            if job is None:
+                return False
+            job['error'] = error
+            job['lease_owner'] = None
+            if job['attempts'] >= self.max_attempts:
+                job['status'] = FAILED
+            else:
+                job['status'] = PENDING
+                job['available_at'] = self._clock() + retry_delay(job['attempts'])
+            return True
+
+    def release(self, job_id, worker_id, delay=0):
+        with self._lock:
+            job = self._owned(job_id, worker_id)
+            if job is None:
+                return False
+            job.update(status=PENDING, lease_owner=None, available_at=self._clock() + delay if delay else 0.0)
+            job['attempts'] -= 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            return _summarize((job['status'], job['group'], 1) for job in self._jobs.values())
+
+    def results(self):
+        """已完成任务的 (url, 结果)"""
+        with self._lock:
+            return [(job['url'], job['result']) for job in self._jobs.values() if job['status'] == DONE]
+
+
+def _summarize(rows):
+    """把 (状态, 分组, 数量) 汇总为 stats() 的结果"""
+    stats = {status: 0 for status in STATUSES}
+    groups = {}
+    for status, group, count in rows:
+        stats[status] += count
+        if group:
+            groups.setdefault(group, {name: 0 for name in STATUSES})[status] += count
+    stats['groups'] = groups
+    return stats
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    基于SQLite文件的共享队列
+
+    多个进程/机器打开同一个数据库文件，领取任务在 BEGIN IMMEDIATE 事务中完成，
+    同一任务不会同时租给两个 worker。放在网络文件系统上时，该文件系统需要支持文件锁
+
+    Args:
+        path (str): 数据库文件路径
+        max_attempts (int): 每个任务最多尝试的次数
+    """
+
+    def __init__(self, path, max_attempts=3):
+        super().__init__(max_attempts)
+        self.path = path
+        self._lock = threading.Lock()
+        # 自己管理事务；等待其他进程释放锁最多30秒
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                grp TEXT NOT NULL DEFAULT '',
+                meta TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                updated_at REAL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS jobs_lease ON jobs (status, lease_expires)')
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _transaction(self, work):
+        """在写事务中执行 work(conn)，出错时回滚"""
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = work(self.conn)
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+            return result
+
+    def put(self, url, group='', meta=None):
+        return self.put_many([(url, group, meta)]) == 1
+
+    def put_many(self, items):
+        """批量添加任务（一个事务）"""
+        now = time.time()
+
+        def work(conn):
+            added = 0
+            for url, group, meta in items:
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO jobs (url, grp, meta, updated_at) VALUES (?, ?, ?, ?)',
+                    (url, group or '', json.dumps(meta or {}, ensure_ascii=False), now),
+                )
+                added += cursor.rowcount
+            return added
+
+        return self._transaction(work)
+
+    def lease(self, worker_id, lease_seconds):
+        def work(conn):
+            now = time.time()
+            while True:
+                # 先接手租约过期的任务，再取等待中的任务
+                row = conn.execute(
+                    'SELECT id, url, grp, meta, attempts FROM jobs WHERE status = ? AND lease_expires < ? ORDER BY id LIMIT 1',
+                    (LEASED, now),
+                ).fetchone() or conn.execute(
+                    'SELECT id, url, grp, meta, attempts FROM jobs WHERE status = ? AND available_at <= ? ORDER BY id LIMIT 1',
+                    (PENDING, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                job_id, url, group, meta, attempts = row
+                if attempts >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = COALESCE(error, '租约多次过期'), lease_owner = NULL, updated_at = ? WHERE id = ?",
+                        (FAILED, now, job_id),
+                    )
+                    continue
+                conn.execute(
+                    'UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?, updated_at = ? WHERE id = ?',
+                    (LEASED, worker_id, now + lease_seconds, now, job_id),
+                )
+                return LeasedJob(job_id, url, group, json.loads(meta or '{}'), attempts + 1)
+
+        return self._transaction(work)
+
+    def _update_owned(self, job_id, worker_id, assignments, params):
+        """只在任务仍由该 worker 持有时更新，返回是否更新成功"""
+        def work(conn):
+            cursor = conn.execute(
+                f'UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?',
+                tuple(params) + (time.time(), job_id, LEASED, worker_id),
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(work)
+
+    def heartbeat(self, job_id, worker_id, lease_seconds):
+        return self._update_owned(job_id, worker_id, 'lease_expires = ?', (time.time() + lease_seconds,))
+
+    def complete(self, job_id, worker_id, result):
+        return self._update_owned(
+            job_id, worker_id, 'status = ?, result = ?, error = NULL, lease_owner = NULL',
+            (DONE, json.dumps(result, ensure_ascii=False)),
+        )
+
+    def fail(self, job_id, worker_id, error):
+        def work(conn):
+            row = conn.execute(
+                'SELECT attempts FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?',
+                (job_id, LEASED, worker_id),
+            ).fetchone()
+            if row is None:
+                return False
+            now = time.time()
+            if row[0] >= self.max_attempts:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, updated_at = ? WHERE id = ?',
+                    (FAILED, error, now, job_id),
+                )
+            else:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, available_at = ?, updated_at = ? WHERE id = ?',
+                    (PENDING, error, now + retry_delay(row[0]), now, job_id),
+                )
+            return True
+
+        return self._transaction(work)
+
+    def release(self, job_id, worker_id, delay=0):
+        return self._update_owned(
+            job_id, worker_id, 'status = ?, lease_owner = NULL, available_at = ?, attempts = attempts - 1',
+            (PENDING, time.time() + delay if delay else 0),
+        )
+
+    def stats(self):
+        with self._lock:
+            rows = self.conn.execute('SELECT status, grp, COUNT(*) FROM jobs GROUP BY status, grp').fetchall()
+        return _summarize(rows)
+
+    def failures(self, limit=20):
+        """最近失败的任务 (url, 错误信息)"""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT url, error FROM jobs WHERE status = ? ORDER BY updated_at DESC LIMIT ?', (FAILED, limit)
+            ).fetchall()
+
+
+def album_group(album_url):
+    """专辑任务的分组名，同时作为输出子目录名"""
+    album_id = parse_qs(urlparse(album_url).query).get('album_id', [''])[0]
+    return f"album_{album_id}" if album_id else 'album'
+
+
+def expand_urls(urls, album_fetcher, max_articles=None):
+    """
+    把URL展开为任务：专辑URL通过 WeChatAlbumFetcher 展开为其中的每篇文章
+
+    Returns:
+        list: (url, group, meta) 元组
+    """
+    items = []
+    for url in urls:
+        if album_fetcher.is_album_url(url):
+            group = album_group(url)
+            for article in album_fetcher.fetch_album_articles(url, max_articles):
+                if not article.get('url'):
+                    continue
+                meta = {
+                    'album_url': url,
+                    'title': article.get('title', ''),
+                    'msgid': article.get('msgid', ''),
+                    'create_time': article.get('create_time', ''),
+                }
+                items.append((article['url'], group, meta))
+        else:
+            items.append((url, '', {}))
+    return items
+
+
+class Worker:
+    """
+    从队列领取并执行任务
+
+    Args:
+        job_queue (JobQueue): 任务队列
+        fetcher (ArticleFetcher): 文章获取器
+        output_dir (str): 共享的输出目录，专辑文章保存到其中以分组命名的子目录
+        lease_seconds (float): 租约时长
+        heartbeat_seconds (float): 续约间隔，应明显小于租约时长
+        save_html / save_json (bool): 额外保存的格式
+        worker_id (str, optional): 默认为 "主机名:进程号"
+    """
+
+    def __init__(self, job_queue, fetcher, output_dir='articles', lease_seconds=120, heartbeat_seconds=30,
+                 save_html=False, save_json=False, worker_id=None):
+        self.queue = job_queue
+        self.fetcher = fetcher
+        self.output_dir = output_dir
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.save_html = save_html
+        self.save_json = save_json
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.counts = {'done': 0, 'failed': 0, 'lost': 0, 'rescheduled': 0}
+        # 站点熔断时不在本机等待，把任务放回队列稍后重试（期间可以处理其他站点的任务）
+        fetcher.breaker.wait = False
+
+    def run(self, exit_when_empty=False, poll_seconds=5, max_jobs=None):
+        """
+        循环领取任务
+
+        Args:
+            exit_when_empty (bool): 队列中没有等待或执行中的任务时退出
+            poll_seconds (float): 没有可领取的任务时的等待间隔
+            max_jobs (int, optional): 最多执行的任务数
+        """
+        handled = 0
+        while max_jobs is None or handled < max_jobs:
+            job = self.queue.lease(self.worker_id, self.lease_seconds)
+            if job is None:
+                if exit_when_empty:
+                    stats = self.queue.stats()
+                    if not stats[PENDING] and not stats[LEASED]:
+                        break
+                time.sleep(poll_seconds)
+                continue
+            handled += 1
+            try:
+                self.run_job(job)
+            except KeyboardInterrupt:
+                # 交还租约，其他 worker 可以立即接手
+                self.queue.release(job.id, self.worker_id)
+                raise
+        return self.counts
+
+    def run_job(self, job):
+        """执行单个任务，执行期间由后台线程定时续约"""
+        print(f"\n[{self.worker_id}] 任务 {job.id}（第 {job.attempts} 次）: {job.url}")
+        stop = threading.Event()
+        lost = threading.Event()
+
+        def keep_alive():
+            while not stop.wait(self.heartbeat_seconds):
+                if not self.queue.heartbeat(job.id, self.worker_id, self.lease_seconds):
+                    lost.set()
+                    return
+
+        heartbeat = threading.Thread(target=keep_alive, name=f"wespy-heartbeat-{job.id}", daemon=True)
+        heartbeat.start()
+        try:
+            output_dir = os.path.join(self.output_dir, job.group) if job.group else self.output_dir
+            try:
+                info = self.fetcher.fetch_article(job.url, output_dir, self.save_html, self.save_json, True)
+                error = None if info else '文章获取失败'
+            except CircuitOpen as e:
+                info, error = None, e
+            except Exception as e:
+                info, error = None, str(e)
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        if isinstance(error, CircuitOpen):
+            self.queue.release(job.id, self.worker_id, error.retry_in)
+            print(f"⏸ {error}，任务 {job.id} 已放回队列")
+            self.counts['rescheduled'] += 1
+            return
+
+        if info:
+            result = {
+                'title': info.get('title', ''),
+                'author': info.get('author', ''),
+                'publish_time': info.get('publish_time', ''),
+                'output_dir': output_dir,
+                'worker': self.worker_id,
+            }
+            accepted = self.queue.complete(job.id, self.worker_id, result)
+        else:
+            accepted = self.queue.fail(job.id, self.worker_id, error)
+
+        if not accepted or lost.is_set():
+            # 租约已过期并被其他 worker 接手，本次结果不再记录
+            print(f"任务 {job.id} 的租约已失效，结果由其他 worker 负责")
+            self.counts['lost'] += 1
+        elif info:
+            self.counts['done'] += 1
+        else:
+            print(f"❌ 任务 {job.id} 失败: {error}")
+            self.counts['failed'] += 1
+
+
+def open_queue(path, max_attempts=3):
+    """按路径打开共享队列（目前只有SQLite文件后端）"""
+    return SQLiteJobQueue(path, max_attempts)
+
+
+def _print_stats(stats):
+    print(f"等待: {stats[PENDING]}  执行中: {stats[LEASED]}  完成: {stats[DONE]}  失败: {stats[FAILED]}")
+    for group, counts in sorted(stats['groups'].items()):
+        total = sum(counts.values())
+        print(f"  {group}: {counts[DONE]}/{total} 完成，{counts[FAILED]} 失败")
+
+
+def enqueue_main(argv=None):
+    from wespy.main import WeChatAlbumFetcher, read_url_file
+
+    parser = argparse.ArgumentParser(prog='wespy enqueue', description='把文章/专辑URL加入共享任务队列')
+    parser.add_argument('url', nargs='*', help='文章URL或微信专辑URL（专辑会展开为其中的每篇文章）')
+    parser.add_argument('--queue', required=True, help='队列文件路径（多台机器共享）')
+    parser.add_argument('--url-file', help='从文件读取URL列表，每行一个')
+    parser.add_argument('--max-articles', type=int, help='每个专辑最多加入的文章数 (默认: 全部)')
+    parser.add_argument('--max-attempts', type=int, default=3, help='每个任务最多尝试的次数 (默认: 3)')
+    parser.add_argument('--status', action='store_true', help='只显示队列状态')
+    args = parser.parse_args(argv)
+
+    job_queue = open_queue(args.queue, args.max_attempts)
+    try:
+        if not args.status:
+            urls = list(args.url)
+            if args.url_file:
+                urls.extend(read_url_file(args.url_file)[0])
+            if not urls:
+                parser.error('请提供URL或 --url-file')
+            items = expand_urls(urls, WeChatAlbumFetcher(), args.max_articles)
+            added = job_queue.put_many(items)
+            print(f"已加入 {added} 个任务（{len(items) - added} 个已在队列中）")
+        _print_stats(job_queue.stats())
+    finally:
+        job_queue.close()
+
+
+def worker_main(argv=None):
+    from wespy.main import ArticleFetcher
+
+    parser = argparse.ArgumentParser(prog='wespy worker', description='从共享任务队列领取并下载文章')
+    parser.add_argument('--queue', required=True, help='队列文件路径（多台机器共享）')
+    parser.add_argument('-o', '--output', default='articles', help='共享输出目录 (默认: articles)')
+    parser.add_argument('--html', action='store_true', help='同时保存HTML文件')
+    parser.add_argument('--json', action='store_true', help='同时保存JSON信息文件')
+    parser.add_argument('--lease', type=float, default=120, help='租约时长（秒，默认: 120）')
+    parser.add_argument('--heartbeat', type=float, help='续约间隔（秒，默认: 租约的1/4）')
+    parser.add_argument('--max-attempts', type=int, default=3, help='每个任务最多尝试的次数 (默认: 3)')
+    parser.add_argument('--exit-when-empty', action='store_true', help='队列处理完后退出（默认一直等待新任务）')
+    parser.add_argument('--poll', type=float, default=5, help='没有任务时的轮询间隔（秒，默认: 5）')
+    args = parser.parse_args(argv)
+
+    job_queue = open_queue(args.queue, args.max_attempts)
+    fetcher = ArticleFetcher()
+    worker = Worker(
+        job_queue, fetcher, args.output,
+        lease_seconds=args.lease,
+        heartbeat_seconds=args.heartbeat or args.lease / 4,
+        save_html=args.html,
+        save_json=args.json,
+    )
+    print(f"worker {worker.worker_id} 已启动，队列: {args.queue}")
+    try:
+        counts = worker.run(exit_when_empty=args.exit_when_empty, poll_seconds=args.poll)
+    except KeyboardInterrupt:
+        print("\n已停止，当前任务已交还队列")
+        counts = worker.counts
+        sys.exit(130)
+    finally:
+        fetcher.close()
+        job_queue.close()
+    print(f"\nworker 结束: 完成 {counts['done']}，失败 {counts['failed']}，租约失效 {counts['lost']}，"
+          f"因站点受限放回队列 {counts['rescheduled']} 次")
@@ -7,21 +7,66 @@
 
 import os
 import re
-import requests
 import urllib.parse
 from bs4 import BeautifulSoup
 import time
 import json
+from wespy.writer import OutputWriter
+from wespy.transport import TransferSession, ACCEPT_ENCODING
+from wespy.prescan import Target, extract_fragments
+from wespy.profiling import stage, staged
+from wespy.deadline import Cancelled, DeadlineExceeded, check, timed_get, timed_post
+from wespy.blocking import BLOCKED, VERIFY, CircuitOpen, PageBlocked
+from wespy.images import local_image, save_images, use_local_images
+from wespy.article import RawHTML
+from wespy.htmlmode import encode_html
+
+# 掘金文章提取只会读取的节点，前5个为正文容器的候选
+JUEJIN_PRESCAN_TARGETS = [
+    Target('div', id='article-root'),
+    Target('div', class_='article-content'),
+    Target('div', class_='markdown-body'),
+    Target('article'),
+    Target('div', id='article-content'),
+    Target('h1', class_='article-title'),
+    Target('h1', class_='article-title-text'),
+    Target('h1'),
+    Target('span', class_='name'),
+    Target('span', class_='time'),
+    Target('time'),
+    Target('span', class_='date'),
+    Target('a', class_='tag', all=True),
+    Target('span', class_='tag', all=True),
+    Target('span', class_='view-count'),
+    Target('span', class_='read-count'),
+]
+JUEJIN_CONTENT_TARGETS = (0, 1, 2, 3, 4)
 
 class JuejinFetcher:
+    # 作者文章列表接口和翻页间隔，测试时可指向本地模拟站点（见 wespy.mockserver）
+    AUTHOR_API_URL = "https://api.juejin.cn/content_api/v1/article/query_list"
+    PAGE_DELAY = 0.5
+
     def __init__(self):
-        self.session = requests.Session()
+        self.session = TransferSession()
+        # 文件输出器（由 ArticleFetcher 调用时替换为共用实例）
+        self.writer = OutputWriter()
+        # 全文索引（由 ArticleFetcher 设置）
+        self.search_index = None
+        # 熔断器（wespy.blocking.CircuitBreaker，由 ArticleFetcher 设置），None 时不识别受限页面
+        self.breaker = None
+        # 图片流水线（wespy.images.ImagePipeline，由 ArticleFetcher 设置），None 时图片使用远程地址
+        self.images = None
+        # 保存HTML时的内容（wespy.htmlmode.HTML_MODES，由 ArticleFetcher 设置）
+        self.html_mode = 'raw'
+        # 解析前只截取提取器需要的节点（与 ArticleFetcher.prescan 同步），关闭后总是完整解析
+        self.prescan = True
         # 设置请求头，模拟浏览器
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': ACCEPT_ENCODING,
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
             'Referer': 'https://juejin.cn/'
@@ -47,10 +92,66 @@ class JuejinFetcher:
             
             return self._fetch_juejin_article(url, output_dir, save_html, save_json, save_markdown)
                 
+        except CircuitOpen:
+            raise
         except Exception as e:
             print(f"获取掘金文章失败: {e}")
             return None
     
+    def fetch_author_articles(self, user_id, max_articles=None, since=None):
+        """
+        获取掘金作者的文章列表（按发布时间从新到旧）
+
+        Args:
+            user_id (str): 作者ID（主页地址 https://juejin.cn/user/<ID> 中的数字）
+            max_articles (int, optional): 最大获取文章数量，None表示获取所有
+            since (int, optional): 只获取发布时间（Unix时间戳）晚于该值的文章，遇到更早的文章时停止翻页
+
+        Returns:
+            list: 文章信息列表 [{'title', 'url', 'article_id', 'create_time'}, ...]
+        """
+        print(f"正在获取掘金作者文章列表: {user_id}")
+        articles = []
+        cursor = '0'
+        while True:
+            payload = {'user_id': str(user_id), 'sort_type': 2, 'cursor': cursor}
+            try:
+                check('author')
+                data = timed_post(self.session, self.AUTHOR_API_URL, json=payload).json()
+            except (Cancelled, DeadlineExceeded):
+                raise
+            except Exception as e:
+                print(f"获取作者文章列表失败: {e}")
+                break
+            if data.get('err_no') != 0:
+                print(f"API返回错误: {data.get('err_msg', data.get('err_no'))}")
+                break
+
+            for item in data.get('data') or []:
+                info = item.get('article_info', {})
+                article_id = item.get('article_id') or info.get('article_id', '')
+                create_time = int(info.get('ctime') or 0)
+                if since is not None and create_time <= since:
+                    print(f"已获取所有新文章，共 {len(articles)} 篇")
+                    return articles
+                articles.append({
+                    'title': info.get('title', ''),
+                    'url': f"https://juejin.cn/post/{article_id}",
+                    'article_id': article_id,
+                    'create_time': create_time,
+                })
+                if max_articles and len(articles) >= max_articles:
+                    print(f"已达到最大文章数量限制: {max_articles}")
+                    return articles
+
+            if not data.get('has_more'):
+                break
+            cursor = str(data.get('cursor', ''))
+            time.sleep(self.PAGE_DELAY)
+
+        print(f"总共获取到 {len(articles)} 篇文章")
+        return articles
+
     def _fetch_juejin_article(self, url, output_dir, save_html=False, save_json=False, save_markdown=True):
         """获取掘金文章"""
         print(f"正在获取掘金文章: {url}")
@@ -59,24 +160,59 @@ class JuejinFetcher:
         headers = self.session.headers.copy()
         headers['Referer'] = 'https://juejin.cn/'
         
-        response = self.session.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        response.encoding = 'utf-8'
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # 提取文章信息
-        article_info = self._extract_juejin_info(soup)
+        def download():
+            # 保留响应体字节，解析和保存原始网页都直接使用
+            return RawHTML.from_response(timed_get(self.session, url, headers=headers), 'utf-8')
+
+        with stage('fetch'):
+            try:
+                page = self.breaker.guard(url, 'juejin', download) if self.breaker is not None else download()
+            except PageBlocked as e:
+                # 受限页面不留在响应缓存中，稍后重试时重新下载
+                if self.session.coalescer is not None:
+                    self.session.coalescer.forget(url)
+                if self.session.proxy_pool is not None and e.kind in (BLOCKED, VERIFY):
+                    self.session.proxy_pool.report_blocked(url)
+                raise
+        
+        check('parse')
+        with stage('parse'):
+            soup = self._build_soup(page)
+            
+            # 提取文章信息
+            article_info = self._extract_juejin_info(soup)
         article_info['url'] = url
-        article_info['html_content'] = response.text
         
-        # 保存文章
-        self._save_article(article_info, output_dir, save_html, save_json, save_markdown)
+        # 保存文章（原始网页直接从下载到的缓冲区写出）
+        self._save_article(article_info, output_dir, save_html, save_json, save_markdown, page=page)
         
+        article_info['html_content'] = page.text
         return article_info
     
+    def _build_soup(self, page):
+        """构建解析树：先在原始字节上预扫描，只对正文容器和元数据节点建树，找不到正文容器时完整解析"""
+        if self.prescan:
+            fragment = extract_fragments(page.data, JUEJIN_PRESCAN_TARGETS, JUEJIN_CONTENT_TARGETS)
+            if fragment is not None:
+                return BeautifulSoup(fragment, 'html.parser', from_encoding=page.encoding)
+        return BeautifulSoup(page.data, 'html.parser', from_encoding=page.encoding)
+
     def _extract_juejin_info(self, soup):
         """提取掘金文章信息"""
+        info = self._extract_juejin_meta(soup)
+        
+        content_elem = self._find_juejin_content(soup)
+        if content_elem:
+            info['content_html'] = str(content_elem)
+            info['content_text'] = content_elem.get_text().strip()
+        else:
+            info['content_html'] = ""
+            info['content_text'] = ""
+        
+        return info
+    
+    def _extract_juejin_meta(self, soup):
+        """提取掘金文章的标题、作者、时间、标签和阅读数"""
         info = {}
         
         # 标题 - 掘金标题通常在h1.article-title
@@ -95,22 +231,6 @@ class JuejinFetcher:
                     soup.find('span', {'class': 'date'}))
         info['publish_time'] = time_elem.get_text().strip() if time_elem else ""
         
-        # 内容区域 - 掘金文章内容
-        content_elem = (soup.find('div', {'id': 'article-root'}) or
-                       soup.find('div', {'class': 'article-content'}) or
-                       soup.find('div', {'class': 'markdown-body'}) or
-                       soup.find('article') or
-                       soup.find('div', {'id': 'article-content'}))
-        
-        if content_elem:
-            # 清理内容，移除CSS样式标签
-            cleaned_content = self._clean_content(content_elem)
-            info['content_html'] = str(cleaned_content)
-            info['content_text'] = cleaned_content.get_text().strip()
-        else:
-            info['content_html'] = ""
-            info['content_text'] = ""
-        
         # 提取标签
         tags = []
         tag_elems = soup.find_all('a', {'class': 'tag'}) or soup.find_all('span', {'class': 'tag'})
@@ -126,11 +246,25 @@ class JuejinFetcher:
         
         return info
     
-    def _save_article(self, article_info, output_dir, save_html=False, save_json=False, save_markdown=True):
-        """保存文章到文件"""
-        # 创建输出目录
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+    def _find_juejin_content(self, soup):
+        """定位掘金文章正文节点（已清理样式）"""
+        # 内容区域 - 掘金文章内容
+        content_elem = (soup.find('div', {'id': 'article-root'}) or
+                       soup.find('div', {'class': 'article-content'}) or
+                       soup.find('div', {'class': 'markdown-body'}) or
+                       soup.find('article') or
+                       soup.find('div', {'id': 'article-content'}))
+        
+        if content_elem:
+            # 清理内容，移除CSS样式标签
+            return self._clean_content(content_elem)
+        return None
+    
+    @staged('save')
+    def _save_article(self, article_info, output_dir, save_html=False, save_json=False, save_markdown=True, page=None):
+        """保存文章到文件（page 为下载到的原始网页，保存原始HTML时直接写出）"""
+        # 创建输出目录（同一目录只创建一次）
+        self.writer.ensure_dir(output_dir)
         
         # 生成安全的文件名
         safe_title = re.sub(r'[<>:"/\\|?*]', '_', article_info['title'])[:50]
@@ -143,8 +277,7 @@ class JuejinFetcher:
             html_filename = f"{safe_title}_{timestamp}.html"
             html_path = os.path.join(output_dir, html_filename)
             
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(article_info['html_content'])
+            self.writer.write_bytes(html_path, encode_html(article_info, 'juejin', self.html_mode, page))
             
             print(f"HTML文件已保存: {html_path}")
             saved_files.append(('HTML', html_path))
@@ -165,8 +298,7 @@ class JuejinFetcher:
                 'fetch_time': time.strftime('%Y-%m-%d %H:%M:%S')
             }
             
-            with open(info_path, 'w', encoding='utf-8') as f:
-                json.dump(info_to_save, f, ensure_ascii=False, indent=2)
+            self.writer.write_text(info_path, json.dumps(info_to_save, ensure_ascii=False, indent=2))
             
             print(f"文章信息已保存: {info_path}")
             saved_files.append(('JSON', info_path))
@@ -174,27 +306,47 @@ class JuejinFetcher:
         # 转换为Markdown (默认保存)
         if save_markdown:
             try:
-                markdown_content = self._convert_to_markdown(article_info['content_html'])
+                check('convert')
+                mapping = {}
+                if self.images is not None:
+                    with stage('images'):
+                        mapping = save_images(self.images, self.writer, output_dir, article_info['content_html'])
+                with stage('convert'), use_local_images(mapping):
+                    markdown_content = self._convert_to_markdown(article_info['content_html'])
+                check('convert')
                 md_filename = f"{safe_title}_{timestamp}.md"
                 md_path = os.path.join(output_dir, md_filename)
                 
-                with open(md_path, 'w', encoding='utf-8') as f:
-                    f.write(f"# {article_info['title']}\n\n")
-                    f.write(f"**作者**: {article_info['author']}\n")
-                    f.write(f"**发布时间**: {article_info['publish_time']}\n")
-                    if article_info.get('view_count'):
-                        f.write(f"**阅读量**: {article_info['view_count']}\n")
-                    if article_info.get('tags'):
-                        f.write(f"**标签**: {', '.join(article_info['tags'])}\n")
-                    f.write(f"**原文链接**: {article_info['url']}\n\n")
-                    f.write("---\n\n")
-                    f.write(markdown_content)
+                # 在内存中组装完整内容后一次写入
+                parts = [
+                    f"# {article_info['title']}\n\n",
+                    f"**作者**: {article_info['author']}\n",
+                    f"**发布时间**: {article_info['publish_time']}\n",
+                ]
+                if article_info.get('view_count'):
+                    parts.append(f"**阅读量**: {article_info['view_count']}\n")
+                if article_info.get('tags'):
+                    parts.append(f"**标签**: {', '.join(article_info['tags'])}\n")
+                parts.append(f"**原文链接**: {article_info['url']}\n\n")
+                parts.append("---\n\n")
+                parts.append(markdown_content)
+                markdown_content = ''.join(parts)
+                self.writer.write_text(md_path, markdown_content)
                 
                 print(f"Markdown文件已保存: {md_path}")
                 saved_files.append(('Markdown', md_path))
                 
+            except (Cancelled, DeadlineExceeded):
+                raise
             except Exception as e:
                 print(f"转换Markdown失败: {e}")
+            else:
+                if self.search_index is not None:
+                    try:
+                        self.search_index.add_markdown(md_path, markdown_content)
+                        self.search_index.commit()
+                    except Exception as e:
+                        print(f"更新搜索索引失败: {e}")
         
         return saved_files
     
@@ -393,9 +545,12 @@ class JuejinFetcher:
         return None
     
     def _get_proxy_image_url(self, original_url):
-        """获取代理图片URL，解决防盗链问题"""
+        """获取代理图片URL，解决防盗链问题；图片已保存到本地时返回本地路径"""
         if not original_url or not original_url.startswith('http'):
             return original_url
+        local_path = local_image(original_url)
+        if local_path:
+            return local_path
         
         encoded_url = urllib.parse.quote(original_url, safe='')
         base_url = f"https://images.weserv.nl/?url={encoded_url}"
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端压测
+用本地模拟站点（wespy.mockserver）驱动 ArticleFetcher，统计每秒文章数、单篇耗时分位数和内存占用，
+用于比较不同并发设置、发现性能回退
+
+    wespy loadtest --articles 500 --concurrency 1,4,16 --latency 80 --jitter 40
+    wespy loadtest --album --articles 300 --json result.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+from wespy import mockserver
+from wespy.blocking import CircuitBreaker
+from wespy.concurrency import HostLimiter
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，不统计峰值内存
+    resource = None
+
+
+def _rss_mb():
+    """当前进程的常驻内存（MB），无法获取时返回 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb():
+    """进程启动以来的峰值常驻内存（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为KB，macOS 为字节
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def make_urls(count, site='wechat'):
+    """生成模拟站点上的文章URL，site 为 mixed 时微信和掘金交替"""
+    urls = []
+    for i in range(1, count + 1):
+        if site == 'juejin' or (site == 'mixed' and i % 2 == 0):
+            urls.append(f'http://juejin.cn/post/{i}')
+        else:
+            urls.append(f'http://mp.weixin.qq.com/s/{i}')
+    return urls
+
+
+def run_once(urls, proxy, concurrency, output_dir, save_html=False, background_writes=False, album_size=None):
+    """
+    用指定并发数下载一组文章
+
+    Args:
+        urls (list): 文章URL；album_size 不为空时忽略，改为先通过专辑接口翻页获取
+        proxy (str): 模拟站点地址
+        concurrency (int): 并发下载的线程数
+        output_dir (str): 输出目录
+        save_html (bool): 同时保存HTML
+        background_writes (bool): 使用后台线程写文件
+        album_size (int, optional): 从模拟专辑获取的文章数
+
+    Returns:
+        dict: 本轮的统计结果
+    """
+    from wespy.main import ArticleFetcher
+    from wespy.server import LatencyStats
+    from wespy.transport import TransferStats
+
+    fetcher = ArticleFetcher(background_writes=background_writes)
+    mockserver.use_proxy(fetcher, proxy)
+    latency = LatencyStats(window=None)
+    failed = 0
+    list_seconds = None
+
+    def fetch(url):
+        start = time.perf_counter()
+        try:
+            ok = fetcher.fetch_article(url, output_dir, save_html, False, True) is not None
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    # fetch_article 的进度输出在压测中没有意义，统一丢弃
+    stdout = sys.stdout
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, 'w', encoding='utf-8') as devnull:
+            sys.stdout = devnull
+            if album_size:
+                album_url = (f'http://mp.weixin.qq.com/mp/appmsgalbum?__biz={mockserver.ALBUM_BIZ}'
+                             f'&action=getalbum&album_id={mockserver.ALBUM_ID}')
+                articles = fetcher.album_fetcher.fetch_album_articles(album_url, album_size)
+                urls = [article['url'] for article in articles]
+                list_seconds = time.perf_counter() - start
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for ok, seconds in executor.map(fetch, urls):
+                    latency.add(seconds)
+                    failed += 0 if ok else 1
+            fetcher.close()
+    finally:
+        sys.stdout = stdout
+    elapsed = time.perf_counter() - start
+
+    stats = latency.snapshot()
+    transfer = fetcher.transfer_stats.snapshot()
+    result = {
+        'concurrency': concurrency,
+        'articles': len(urls),
+        'failed': failed,
+        'seconds': round(elapsed, 3),
+        'articles_per_sec': round((len(urls) - failed) / elapsed, 2) if elapsed else None,
+        'p50': stats['p50'],
+        'p95': stats['p95'],
+        'p99': stats['p99'],
+        'rss_mb': _rss_mb(),
+        'peak_rss_mb': _peak_rss_mb(),
+        'transfer': transfer,
+        'transfer_text': TransferStats.format(transfer),
+        # 各站点的自适应并发上限及其变化，线程数超过上限时多出的线程在排队
+        'host_limits': fetcher.limiter.snapshot(),
+        'blocked_pages': fetcher.breaker.counts(),
+    }
+    if list_seconds is not None:
+        result['album_list_seconds'] = round(list_seconds, 3)
+    return result
+
+
+def _format_mb(value):
+    return f"{value:.1f}MB" if value is not None else '-'
+
+
+def _format_ms(value):
+    return f"{value * 1000:.0f}ms" if value is not None else '-'
+
+
+def _rjust(text, width):
+    """按显示宽度右对齐（中文字符占两列）"""
+    text = str(text)
+    display = sum(2 if unicodedata.east_asian_width(ch) in 'WF' else 1 for ch in text)
+    return ' ' * max(0, width - display) + text
+
+
+_COLUMNS = (('并发', 6), ('文章数', 8), ('失败', 6), ('篇/秒', 9), ('p50', 8), ('p95', 8), ('p99', 8),
+            ('内存', 9), ('峰值内存', 10))
+
+
+def print_report(results):
+    print('\n' + ''.join(_rjust(name, width) for name, width in _COLUMNS))
+    for r in results:
+        values = (r['concurrency'], r['articles'], r['failed'], r['articles_per_sec'],
+                  _format_ms(r['p50']), _format_ms(r['p95']), _format_ms(r['p99']),
+                  _format_mb(r['rss_mb']), _format_mb(r['peak_rss_mb']))
+        print(''.join(_rjust(value, width) for value, (_, width) in zip(values, _COLUMNS)))
+    for r in results:
+        line = f"并发 {r['concurrency']}: {r['transfer_text']}"
+        if 'album_list_seconds' in r:
+            line += f"，专辑列表耗时 {r['album_list_seconds']} 秒"
+        blocked = CircuitBreaker.format(r.get('blocked_pages', {}))
+        if blocked:
+            line += f"，受限页面: {blocked}"
+        print(line)
+        for host_line in HostLimiter.format(r.get('host_limits', {})):
+            print(f"    {host_line}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='wespy loadtest', description='用本地模拟站点压测文章下载')
+    parser.add_argument('--articles', type=int, default=200, help='每轮下载的文章数 (默认: 200)')
+    parser.add_argument('--concurrency', default='1,4,8', help='并发线程数，逗号分隔表示依次测试多种设置 (默认: 1,4,8)')
+    parser.add_argument('--site', choices=('wechat', 'juejin', 'mixed'), default='wechat', help='文章来源 (默认: wechat)')
+    parser.add_argument('--album', action='store_true', help='先通过模拟专辑接口翻页获取文章列表（数量为 --articles）')
+    parser.add_argument('--proxy', help='使用已启动的 wespy mockserver（如 http://127.0.0.1:8900），默认在本进程内启动')
+    parser.add_argument('--html', action='store_true', help='同时保存HTML文件')
+    parser.add_argument('--background-writes', action='store_true', help='使用后台线程写文件')
+    parser.add_argument('-o', '--output', help='输出目录 (默认: 临时目录，结束后删除)')
+    parser.add_argument('--json', help='把结果写入JSON文件，便于比较不同版本')
+    mockserver.add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        levels = [int(value) for value in args.concurrency.split(',') if value.strip()]
+    except ValueError:
+        parser.error(f"无效的并发设置: {args.concurrency}")
+    if args.album:
+        args.album_size = max(args.album_size, args.articles)
+
+    server = None
+    proxy = args.proxy
+    if not proxy:
+        server, proxy = mockserver.start_background(mockserver.config_from_args(args))
+        print(f"模拟站点: {proxy}")
+
+    results = []
+    try:
+        for concurrency in levels:
+            output_dir = args.output or tempfile.mkdtemp(prefix='wespy-loadtest-')
+            print(f"并发 {concurrency}: 下载 {args.articles} 篇文章...")
+            try:
+                results.append(run_once(
+                    make_urls(args.articles, args.site), proxy, concurrency, output_dir,
+                    save_html=args.html,
+                    background_writes=args.background_writes,
+                    album_size=args.articles if args.album else None,
+                ))
+            finally:
+                if not args.output:
+                    shutil.rmtree(output_dir, ignore_errors=True)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'argv': argv if argv is not None else sys.argv[1:], 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
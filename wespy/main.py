@@ -8,25 +8,72 @@
 import os
 import sys
 import re
-import requests
 import urllib.parse
 from bs4 import BeautifulSoup
 import time
 import json
 import argparse
-from wespy.juejin import JuejinFetcher
+import signal
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from wespy.juejin import JuejinFetcher, JUEJIN_PRESCAN_TARGETS, JUEJIN_CONTENT_TARGETS
+from wespy.article import Article, RawHTML
+from wespy.writer import OutputWriter
+from wespy.transport import TransferSession, TransferStats, ACCEPT_ENCODING
+from wespy.archive import open_archive, ARCHIVE_FORMATS
+from wespy.prescan import Target, extract_fragments
+from wespy.density import find_main_content, select_first
+from wespy.search import SearchIndex, INDEX_NAME
+from wespy.profiling import Profiler, PROFILE_MODES, stage, staged
+from wespy.deadline import CancelToken, Cancelled, Deadline, DeadlineExceeded, check, current, timed_get
+from wespy.concurrency import HostLimiter
+from wespy.blocking import BLOCKED, VERIFY, CircuitBreaker, CircuitOpen, PageBlocked
+from wespy.coalesce import RequestCoalescer
+from wespy.proxypool import ProxyPool, load_pool
+from wespy.htmlmode import HTML_MODES, encode_html
+from wespy.scheduler import HostScheduler
+from wespy.images import ImagePipeline, ImageStats, IMAGE_DIR, IMAGE_FORMATS, image_urls, local_image, save_images, use_local_images
+
+# 微信文章提取只会读取的节点：正文容器（必需）和标题、作者、发布时间
+WECHAT_PRESCAN_TARGETS = [
+    Target('div', id='js_content'),
+    Target('h1', class_='rich_media_title'),
+    Target('h1'),
+    Target('a', id='js_name'),
+    Target('a', class_='profile_nickname'),
+    Target('span', class_='profile_nickname'),
+    Target('em', id='publish_time'),
+    Target('span', class_='publish_time'),
+]
+
+# 站点 -> (预扫描目标, 至少要找到一个的正文目标下标)
+PRESCAN_TARGETS = {
+    'wechat': (WECHAT_PRESCAN_TARGETS, (0,)),
+    'juejin': (JUEJIN_PRESCAN_TARGETS, JUEJIN_CONTENT_TARGETS),
+}
+
+# 正文提取和Markdown转换的版本号，转换结果有变化时加一，wespy rerender 据此判断是否需要重新生成
+CONVERTER_VERSION = 2
+
+# _process_item 的返回值：条目遇到限流/验证页面，放回队列稍后重试
+_RETRY = object()
 
 class WeChatAlbumFetcher:
     """微信公众号专辑文章列表获取器"""
 
+    # 专辑列表接口地址和翻页间隔，压测时可指向本地模拟站点（见 wespy.mockserver）
+    API_URL = "https://mp.weixin.qq.com/mp/appmsgalbum"
+    PAGE_DELAY = 0.5
+
     def __init__(self):
-        self.session = requests.Session()
+        self.session = TransferSession()
         # 使用微信浏览器的请求头
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148 MicroMessenger/8.0.5',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.8,en;q=0.6',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': ACCEPT_ENCODING,
             'Connection': 'keep-alive',
             'Referer': 'https://mp.weixin.qq.com/'
         })
@@ -58,13 +105,17 @@ class WeChatAlbumFetcher:
             print(f"解析专辑URL失败: {e}")
             return None
 
-    def fetch_album_articles(self, album_url, max_articles=None):
+    def fetch_album_articles(self, album_url, max_articles=None, since_msgid=None):
         """
         获取专辑中的所有文章列表
 
         Args:
             album_url (str): 微信专辑URL
             max_articles (int, optional): 最大获取文章数量，None表示获取所有
+            since_msgid (int | tuple, optional): 只获取该位置之后的文章（用于增量获取新文章）。
+                为 (msgid, itemidx) 时只跳过不大于该位置的文章，同一次推送中 itemidx 更大的文章仍会获取；
+                为整数时跳过 msgid 不大于该值的所有文章。专辑按发布时间从新到旧排列，
+                遇到更早推送的文章时停止翻页
 
         Returns:
             list: 文章信息列表
@@ -84,7 +135,7 @@ class WeChatAlbumFetcher:
 
         while True:
             # 构建API请求URL
-            api_url = f"https://mp.weixin.qq.com/mp/appmsgalbum"
+            api_url = self.API_URL
             params = {
                 'action': 'getalbum',
                 '__biz': album_info['biz'],
@@ -96,8 +147,8 @@ class WeChatAlbumFetcher:
             }
 
             try:
-                response = self.session.get(api_url, params=params, timeout=30)
-                response.raise_for_status()
+                check('album')
+                response = timed_get(self.session, api_url, params=params)
 
                 # 解析JSON响应
                 data = response.json()
@@ -117,6 +168,17 @@ class WeChatAlbumFetcher:
 
                 # 处理文章信息
                 for article_data in article_list:
+                    if since_msgid is not None:
+                        msgid = int(article_data.get('msgid') or 0)
+                        if isinstance(since_msgid, (list, tuple)):
+                            if msgid < since_msgid[0]:
+                                print(f"已获取所有新文章，共 {len(articles)} 篇")
+                                return articles
+                            if (msgid, int(article_data.get('itemidx') or 0)) <= tuple(since_msgid):
+                                continue
+                        elif msgid <= since_msgid:
+                            print(f"已获取所有新文章，共 {len(articles)} 篇")
+                            return articles
                     article_info = {
                         'title': article_data.get('title', ''),
                         'url': article_data.get('url', ''),
@@ -153,7 +215,7 @@ class WeChatAlbumFetcher:
                     begin_itemidx = last_article.get('itemidx', 0)
 
                 # 添加延迟避免请求过快
-                time.sleep(0.5)
+                time.sleep(self.PAGE_DELAY)
 
             except Exception as e:
                 print(f"获取文章列表失败: {e}")
@@ -163,14 +225,19 @@ class WeChatAlbumFetcher:
         return articles
 
 class ArticleFetcher:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, background_writes=False):
+        """
+        Args:
+            background_writes (bool): 由后台线程写文件，使磁盘IO与网络获取并行；
+                使用后需调用 close() 确保所有文件写完
+        """
+        self.session = TransferSession()
         # 设置请求头，模拟浏览器
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': ACCEPT_ENCODING,
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         })
@@ -178,8 +245,109 @@ class ArticleFetcher:
         self.juejin_fetcher = JuejinFetcher()
         # 初始化微信专辑获取器
         self.album_fetcher = WeChatAlbumFetcher()
+        # 所有会话共用一份传输统计
+        self.transfer_stats = self.session.stats
+        self.juejin_fetcher.session.stats = self.transfer_stats
+        self.album_fetcher.session.stats = self.transfer_stats
+        # 所有会话共用按主机的自适应并发上限
+        self.limiter = HostLimiter()
+        for session in (self.session, self.juejin_fetcher.session, self.album_fetcher.session):
+            session.limiter = self.limiter
+        # 文章和图片会话共用重复请求合并（专辑列表每次都要取最新的，不使用）；
+        # 响应缓存默认关闭，命令行通过 --response-cache 设置 coalescer.cache.max_bytes 启用
+        self.coalescer = RequestCoalescer()
+        for session in (self.session, self.juejin_fetcher.session):
+            session.coalescer = self.coalescer
+        # 按主机的熔断器：识别限流/验证/已删除页面，站点持续受限时暂停访问
+        self.breaker = CircuitBreaker()
+        self.juejin_fetcher.breaker = self.breaker
+        # 批量/专辑任务中遇到限流或验证页面的文章放回队列、熔断冷却后重试的次数，超过后记为失败
+        self.blocked_retries = 3
+        # 批量/专辑任务的工作线程数，实际对每个站点的并发由 limiter 根据延迟和错误自动调整
+        self.workers = 1
+        # 解析前只截取提取器需要的节点，关闭后总是完整解析（见 prescan 属性）
+        self._prescan = True
+        # 解析时同时提取页面中的链接（Article.links，供 wespy.crawler 使用）；
+        # 预扫描的站点只能提取到正文中的链接，需要整页的链接时同时关闭 prescan
+        self.collect_links = False
+        # 文件输出器，与掘金获取器共用
+        self.writer = OutputWriter(background=background_writes)
+        self.juejin_fetcher.writer = self.writer
+        # 全文索引（wespy.search.SearchIndex），设置后保存的文章会同时加入索引
+        self._search_index = None
+        # 图片流水线（wespy.images.ImagePipeline），设置后保存Markdown时同时下载并压缩图片
+        self._images = None
+        # 多出口代理池（wespy.proxypool.ProxyPool），设置后所有会话的请求分散到池中的代理
+        self._proxy_pool = None
+        # 保存HTML时的内容（wespy.htmlmode）：raw 原始网页 / content 元数据和正文 / compact 精简后的正文
+        self._html_mode = 'raw'
+        # 单篇文章的总时限（秒，含连接、下载、解析和转换），None 表示不限
+        self.article_timeout = None
+        # 取消令牌：cancel() 后正在下载的文章立即中断，批量/专辑任务不再处理剩余文章；
+        # 取消状态在下一次任务开始时清除（见 _run_deadline），同一个获取器可以继续使用
+        self.cancel_token = CancelToken()
+        self._runs = 0
+        self._runs_lock = threading.Lock()
+
+    @property
+    def search_index(self):
+        return self._search_index
+
+    @search_index.setter
+    def search_index(self, index):
+        self._search_index = index
+        self.juejin_fetcher.search_index = index
+
+    @property
+    def images(self):
+        return self._images
+
+    @images.setter
+    def images(self, pipeline):
+        self._images = pipeline
+        self.juejin_fetcher.images = pipeline
+
+    @property
+    def prescan(self):
+        return self._prescan
 
-    def fetch_album_articles(self, album_url, output_dir="articles", max_articles=None, save_html=False, save_json=False, save_markdown=True):
+    @prescan.setter
+    def prescan(self, enabled):
+        self._prescan = enabled
+        self.juejin_fetcher.prescan = enabled
+
+    @property
+    def html_mode(self):
+        return self._html_mode
+
+    @html_mode.setter
+    def html_mode(self, mode):
+        if mode not in HTML_MODES:
+            raise ValueError(f"不支持的HTML模式: {mode}，可选: {', '.join(HTML_MODES)}")
+        self._html_mode = mode
+        self.juejin_fetcher.html_mode = mode
+
+    @property
+    def proxy_pool(self):
+        return self._proxy_pool
+
+    @proxy_pool.setter
+    def proxy_pool(self, pool):
+        self._proxy_pool = pool
+        for session in (self.session, self.juejin_fetcher.session, self.album_fetcher.session):
+            session.proxy_pool = pool
+        if pool is not None:
+            pool.start_health_checks()
+
+    def close(self):
+        """等待后台写入完成并释放资源"""
+        self.writer.close()
+        if self.images is not None:
+            self.images.close()
+        if self.proxy_pool is not None:
+            self.proxy_pool.close()
+
+    def fetch_album_articles(self, album_url, output_dir="articles", max_articles=None, save_html=False, save_json=False, save_markdown=True, archive=None, deadline=None):
         """
         批量获取微信专辑中的所有文章
 
@@ -190,10 +358,21 @@ class ArticleFetcher:
             save_html (bool): 是否保存HTML文件
             save_json (bool): 是否保存JSON文件
             save_markdown (bool): 是否保存Markdown文件
+            archive (str, optional): 归档格式 zip / tar.zst / jsonl.gz，指定后所有文章写入单个归档文件
+            deadline (float, optional): 整个任务的时限（秒）；超时或 cancel_token 取消后不再处理剩余文章，
+                已完成的文章和汇总照常保存
 
         Returns:
             list: 成功获取的文章信息列表
         """
+        with self._run_deadline(deadline) as run_deadline:
+            return self._fetch_album_articles(run_deadline, album_url, output_dir, max_articles, save_html, save_json, save_markdown, archive)
+
+    def _fetch_album_articles(self, run_deadline, album_url, output_dir, max_articles, save_html, save_json, save_markdown, archive):
+        transfer_before = self.transfer_stats.snapshot()
+        blocked_before = self.breaker.counts()
+        images_before = self.images.stats.snapshot() if self.images is not None else None
+
         # 获取专辑文章列表
         articles = self.album_fetcher.fetch_album_articles(album_url, max_articles)
 
@@ -208,14 +387,25 @@ class ArticleFetcher:
 
         # 创建专辑专用目录
         album_name = f"album_{int(time.time())}"
+        if self.search_index is not None:
+            self.search_index.register_album(album_name, album_url)
         album_output_dir = os.path.join(output_dir, album_name)
+        archive_writer = None
+        if archive:
+            album_output_dir = os.path.join(output_dir, f"{album_name}.{archive}")
+            archive_writer = open_archive(album_output_dir, archive)
 
-        for i, article in enumerate(articles, 1):
+        def download(i, article):
             print(f"\n[{i}/{len(articles)}] 正在下载: {article['title']}")
-
-            try:
-                # 下载单篇文章
-                article_result = self.fetch_article(
+            if archive_writer:
+                article_result = self._archive_article(archive_writer, article['url'], save_html, {
+                    'album_url': album_url,
+                    'msgid': article.get('msgid', ''),
+                    'create_time': article.get('create_time', ''),
+                })
+            else:
+                # 限流/验证页面抛出 PageBlocked，由 _run_batch 放回队列稍后重试
+                article_result = self._fetch_article(
                     article['url'],
                     album_output_dir,
                     save_html,
@@ -223,48 +413,315 @@ class ArticleFetcher:
                     save_markdown
                 )
 
+            if article_result:
+                # 合并专辑信息
+                article_result.update({
+                    'album_title': article.get('title', ''),
+                    'album_url': album_url,
+                    'msgid': article.get('msgid', ''),
+                    'create_time': article.get('create_time', ''),
+                    'cover_img': article.get('cover_img', '')
+                })
+                print(f"✅ 下载成功")
+            else:
+                print(f"❌ 下载失败")
+            return article_result
+
+        # 单线程时每篇之间等待1秒避免请求过快；多线程时由 limiter 控制请求速度
+        try:
+            results, skipped_articles, stop_reason, hosts = self._run_batch(
+                run_deadline, articles, download, delay=1, url_of=lambda article: article['url'])
+            for article, article_result in results:
                 if article_result:
-                    # 合并专辑信息
-                    article_result.update({
-                        'album_title': article.get('title', ''),
-                        'album_url': album_url,
-                        'msgid': article.get('msgid', ''),
-                        'create_time': article.get('create_time', ''),
-                        'cover_img': article.get('cover_img', '')
-                    })
                     successful_articles.append(article_result)
-                    print(f"✅ 下载成功")
                 else:
-                    print(f"❌ 下载失败")
                     failed_articles.append(article)
-
-                # 添加延迟避免请求过快
-                time.sleep(1)
-
-            except Exception as e:
-                print(f"❌ 下载失败: {e}")
-                failed_articles.append(article)
+        finally:
+            # 确保归档和后台写入已全部完成再生成汇总；出错时也写完归档的索引
+            if archive_writer:
+                archive_writer.close()
+            self.writer.flush()
 
         # 保存专辑汇总信息
-        self._save_album_summary(successful_articles, failed_articles, album_url, output_dir, album_name)
+        transfer = self.transfer_stats.delta(transfer_before)
+        concurrency = {'limits': self.limiter.snapshot(), 'hosts': hosts}
+        blocked = CircuitBreaker.delta(self.breaker.counts(), blocked_before)
+        images = self.images.stats.delta(images_before) if self.images is not None else None
+        self._save_album_summary(successful_articles, failed_articles, album_url, output_dir, album_name, transfer,
+                                 skipped_articles, stop_reason, concurrency, blocked, images,
+                                 self.proxy_pool.snapshot() if self.proxy_pool is not None else None)
 
-        print(f"\n批量下载完成!")
+        print(f"\n批量下载完成!" if not stop_reason else f"\n批量下载已停止: {stop_reason}")
         print(f"成功: {len(successful_articles)} 篇")
         print(f"失败: {len(failed_articles)} 篇")
+        if skipped_articles:
+            print(f"未下载: {len(skipped_articles)} 篇")
+        if any(blocked.values()):
+            print(f"受限页面: {CircuitBreaker.format(blocked)}")
+        print(f"传输: {TransferStats.format(transfer)}")
+        if images and any(images.values()):
+            print(f"图片: {ImageStats.format(images)}")
+        self._print_concurrency(concurrency['limits'], hosts)
+        self._print_proxies()
         print(f"文章保存在: {album_output_dir}")
 
         return successful_articles
 
-    def _save_album_summary(self, successful_articles, failed_articles, album_url, output_dir, album_name):
-        """保存专辑下载汇总信息"""
+    def fetch_articles(self, urls, output_dir="articles", save_html=False, save_json=False, save_markdown=True, archive=None, deadline=None,
+                       priorities=None):
+        """
+        批量获取多篇文章
+
+        Args:
+            urls (list): 文章URL列表
+            output_dir (str): 输出目录
+            save_html (bool): 是否保存HTML文件
+            save_json (bool): 是否保存JSON文件
+            save_markdown (bool): 是否保存Markdown文件
+            archive (str, optional): 归档格式 zip / tar.zst / jsonl.gz，指定后所有文章写入单个归档文件
+            deadline (float, optional): 整个任务的时限（秒）；超时或 cancel_token 取消后不再处理剩余文章
+            priorities (dict, optional): URL -> 优先级，数值越大越先下载（默认 0）
+
+        Returns:
+            list: 成功获取的文章信息列表
+        """
+        print(f"开始批量下载 {len(urls)} 篇文章...")
+        with self._run_deadline(deadline) as run_deadline:
+            return self._fetch_articles(run_deadline, urls, output_dir, save_html, save_json, save_markdown, archive, priorities)
+
+    def _fetch_articles(self, run_deadline, urls, output_dir, save_html, save_json, save_markdown, archive, priorities=None):
+        transfer_before = self.transfer_stats.snapshot()
+        blocked_before = self.breaker.counts()
+        images_before = self.images.stats.snapshot() if self.images is not None else None
+        successful_articles = []
+        failed_urls = []
+        skipped_urls = []
+        stop_reason = None
+        hosts = {}
+        archive_writer = None
+        if archive:
+            archive_path = os.path.join(output_dir, f"batch_{int(time.time())}.{archive}")
+            archive_writer = open_archive(archive_path, archive)
+
+        def download(i, url):
+            print(f"\n[{i}/{len(urls)}] {url}")
+            if archive_writer:
+                return self._archive_article(archive_writer, url, save_html)
+            # 限流/验证页面抛出 PageBlocked，由 _run_batch 放回队列稍后重试
+            return self._fetch_article(url, output_dir, save_html, save_json, save_markdown)
+
+        try:
+            results, skipped_urls, stop_reason, hosts = self._run_batch(run_deadline, urls, download, priorities=priorities)
+            for url, article_result in results:
+                if article_result:
+                    successful_articles.append(article_result)
+                else:
+                    failed_urls.append(url)
+        finally:
+            if archive_writer:
+                archive_writer.close()
+            self.writer.flush()
+
+        print(f"\n批量下载完成!" if not stop_reason else f"\n批量下载已停止: {stop_reason}")
+        print(f"成功: {len(successful_articles)} 篇")
+        print(f"失败: {len(failed_urls)} 篇")
+        if skipped_urls:
+            print(f"未下载: {len(skipped_urls)} 篇")
+        blocked = CircuitBreaker.delta(self.breaker.counts(), blocked_before)
+        if any(blocked.values()):
+            print(f"受限页面: {CircuitBreaker.format(blocked)}")
+        print(f"传输: {TransferStats.format(self.transfer_stats.delta(transfer_before))}")
+        images = self.images.stats.delta(images_before) if images_before is not None else None
+        if images and any(images.values()):
+            print(f"图片: {ImageStats.format(images)}")
+        self._print_concurrency(self.limiter.snapshot(), hosts)
+        self._print_proxies()
+        if archive_writer:
+            print(f"归档文件: {archive_writer.path}")
+
+        return successful_articles
+
+    def _run_batch(self, run_deadline, items, process, delay=0, url_of=None, priorities=None):
+        """
+        按主机公平调度处理 items：各站点轮流开始，每个站点同时进行的数量不超过 limiter 的当前上限，
+        熔断中的站点暂停调度，慢站点不会挡住其他站点；self.workers 为1时在当前线程中逐个处理。
+        遇到限流或验证页面的条目放回调度器，熔断冷却（半开）后再试，最多 self.blocked_retries 次
+
+        Args:
+            run_deadline (Deadline): 整个任务的截止时间，工作线程中的截止时间继承它的时限和取消令牌
+            items (list): 待处理的条目
+            process (function): process(序号, 条目)，返回结果，失败时返回 None 或抛出异常，
+                受限时抛出 PageBlocked / CircuitOpen
+            delay (float): 单线程处理时相邻条目之间的等待秒数
+            url_of (function, optional): 从条目取得URL，默认条目本身就是URL
+            priorities (dict, optional): URL -> 优先级，数值越大越先开始
+
+        Returns:
+            tuple: ([(条目, 结果), ...]（按 items 顺序，失败的结果为 None）, 未处理的条目, 停止原因,
+                各站点的吞吐量和排队时间（HostScheduler.snapshot()）)
+        """
+        workers = max(1, int(self.workers or 1))
+        scheduler = HostScheduler(self._host_capacity)
+        for index, item in enumerate(items):
+            url = url_of(item) if url_of else item
+            scheduler.add(index, item, url, (priorities or {}).get(url, 0))
+        results = {}
+        # 条目 -> 开始的序号，重试时沿用第一次的序号
+        numbers = {}
+        stop_reason = None
+
+        def run(job, number):
+            with Deadline(parent=run_deadline):
+                return self._process_item(process, number, job.item, job.retries < self.blocked_retries)
+
+        def finish(job, result):
+            if result is _RETRY:
+                scheduler.retry(job)
+            else:
+                scheduler.done(job)
+                results[job.index] = result
+
+        executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        futures = {}
+        try:
+            while True:
+                while len(futures) < workers:
+                    stop_reason = run_deadline.stop_reason()
+                    if stop_reason:
+                        break
+                    job = scheduler.next()
+                    if job is None:
+                        break
+                    number = numbers.setdefault(job.index, len(numbers) + 1)
+                    if executor is None:
+                        # 单线程：在当前线程中执行（性能分析等只针对当前线程）
+                        finish(job, self._process_item(process, number, job.item, job.retries < self.blocked_retries))
+                        # 添加延迟避免请求过快（取消时不再等待）
+                        if delay and scheduler.pending():
+                            self.cancel_token.wait(delay)
+                        continue
+                    futures[executor.submit(run, job, number)] = job
+                if not futures:
+                    if stop_reason or not scheduler.pending():
+                        break
+                    # 剩余站点都在熔断中，等待冷却
+                    self.cancel_token.wait(0.5)
+                    continue
+                try:
+                    # 定时醒来，熔断结束或上限提高后及时调度新的任务
+                    done, _ = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+                except KeyboardInterrupt:
+                    # 没有安装信号处理时的 Ctrl-C：正在下载的文章立即中断，不再开始新的文章
+                    self.cancel_token.cancel('用户中断')
+                    continue
+                for future in done:
+                    finish(futures.pop(future), future.result())
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        skipped = [job.item for job in scheduler.drain()]
+        if skipped:
+            print(f"\n⏹ {stop_reason}，剩余 {len(skipped)} 篇不再下载")
+        ordered = [(items[index], results[index]) for index in sorted(results)]
+        return ordered, skipped, stop_reason, scheduler.snapshot()
+
+    def _host_capacity(self, host):
+        """调度时每个站点允许同时进行的文章数：熔断中为 0，否则为 limiter 的当前上限"""
+        if self.breaker.blocked_for(host) > 0:
+            return 0
+        return self.limiter.limit(host)
+
+    def _process_item(self, process, i, item, retry=False):
+        """处理一个条目；retry 为 True 时限流/验证页面和熔断返回 _RETRY，由调用方放回队列"""
+        try:
+            return process(i, item)
+        except (PageBlocked, CircuitOpen) as e:
+            if retry and (isinstance(e, CircuitOpen) or e.kind in (BLOCKED, VERIFY)):
+                print(f"⏸ {e}，稍后重试")
+                return _RETRY
+            print(f"❌ 下载失败: {e}")
+        except KeyboardInterrupt:
+            # 没有安装信号处理时的 Ctrl-C：当前文章记为失败，停止后续下载并保存汇总
+            self.cancel_token.cancel('用户中断')
+        except Exception as e:
+            print(f"❌ 下载失败: {e}")
+        return None
+
+    @staticmethod
+    def _print_concurrency(snapshot, hosts=None):
+        for line in HostLimiter.format(snapshot):
+            print(f"并发: {line}")
+        for line in HostScheduler.format(hosts or {}):
+            print(f"站点: {line}")
+
+    def _print_proxies(self):
+        if self.proxy_pool is not None:
+            for line in ProxyPool.format(self.proxy_pool.snapshot()):
+                print(f"代理: {line}")
+
+    def _archive_article(self, archive_writer, url, include_html=False, extra=None):
+        """获取文章并写入归档，返回不含正文的文章信息"""
+        with self._article_deadline():
+            article = self.fetch(url)
+            mapping = {}
+            if self.images is not None and archive_writer.supports_images:
+                mapping = self._archive_images(archive_writer, article)
+            with use_local_images(mapping):
+                markdown = article.markdown
+            check('convert')
+        html = encode_html(article, self._detect_site(article.url), self.html_mode) if include_html else None
+        name = archive_writer.add(article, markdown, include_html, extra, html=html)
+        print(f"已写入归档: {name}")
+        return {
+            'title': article.title,
+            'author': article.author,
+            'publish_time': article.publish_time,
+            'url': article.url,
+        }
+
+    def _archive_images(self, archive_writer, article):
+        """下载文章图片并写入归档，返回图片URL -> 归档内相对路径"""
+        urls = image_urls(article.content_html)
+        if not urls:
+            return {}
+        with stage('images'):
+            results, stats = self.images.fetch(urls, exists=archive_writer.has_image)
+        mapping = {}
+        for url, (name, data) in results.items():
+            if data is not None:
+                archive_writer.add_image(name, data)
+            mapping[url] = f"{IMAGE_DIR}/{name}"
+        print(f"图片: {ImageStats.format(stats)}")
+        return mapping
+
+    def _save_album_summary(self, successful_articles, failed_articles, album_url, output_dir, album_name, transfer=None,
+                            skipped_articles=None, stop_reason=None, concurrency=None, blocked=None, images=None,
+                            proxies=None):
+        """
+        保存专辑下载汇总信息（transfer 为本次任务的传输统计；任务提前停止时
+        skipped_articles 为未下载的文章，stop_reason 为停止原因；concurrency 为各站点的并发上限及其变化（limits）
+        和吞吐量、排队时间（hosts）；
+        blocked 为识别到的限流/验证/已删除页面数量；images 为图片数量和压缩前后的大小；
+        proxies 为使用代理池时各代理的请求结果和延迟）
+        """
+        skipped_articles = skipped_articles or []
         summary = {
             'album_url': album_url,
             'download_time': time.strftime('%Y-%m-%d %H:%M:%S'),
             'statistics': {
-                'total_count': len(successful_articles) + len(failed_articles),
+                'total_count': len(successful_articles) + len(failed_articles) + len(skipped_articles),
                 'successful_count': len(successful_articles),
-                'failed_count': len(failed_articles)
+                'failed_count': len(failed_articles),
+                'skipped_count': len(skipped_articles),
+                'blocked_count': sum((blocked or {}).values()),
             },
+            'blocked_pages': blocked,
+            'stopped': stop_reason,
+            'transfer': transfer,
+            'concurrency': concurrency,
+            'images': images,
+            'proxies': proxies,
             'successful_articles': [
                 {
                     'title': article.get('title', ''),
@@ -283,12 +740,20 @@ class ArticleFetcher:
                     'error': '下载失败'
                 }
                 for article in failed_articles
+            ],
+            'skipped_articles': [
+                {
+                    'title': article.get('title', ''),
+                    'url': article.get('url', ''),
+                    'msgid': article.get('msgid', ''),
+                }
+                for article in skipped_articles
             ]
         }
 
         summary_file = os.path.join(output_dir, f"{album_name}_summary.json")
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        self.writer.write_text(summary_file, json.dumps(summary, ensure_ascii=False, indent=2))
+        self.writer.flush()
 
         print(f"专辑汇总信息已保存: {summary_file}")
 
@@ -307,72 +772,238 @@ class ArticleFetcher:
             dict: 包含文章信息的字典
         """
         try:
-            # 特殊处理微信专辑URL
-            if self.album_fetcher.is_album_url(url):
-                print("检测到微信专辑URL，将批量下载专辑中的所有文章")
-                return self.fetch_album_articles(url, output_dir, max_articles=10, save_html=save_html, save_json=save_json, save_markdown=save_markdown)
+            return self._fetch_article(url, output_dir, save_html, save_json, save_markdown)
+        except CircuitOpen:
+            # breaker.wait 为 False 时由调用方安排重试
+            raise
+        except Exception as e:
+            print(f"获取文章失败: {e}")
+            return None
+
+    def _fetch_article(self, url, output_dir, save_html=False, save_json=False, save_markdown=True):
+        """同 fetch_article，但失败时抛出异常（包括 PageBlocked），供批量任务区分受限页面"""
+        # 特殊处理微信专辑URL
+        if self.album_fetcher.is_album_url(url):
+            print("检测到微信专辑URL，将批量下载专辑中的所有文章")
+            return self.fetch_album_articles(url, output_dir, max_articles=10, save_html=save_html, save_json=save_json, save_markdown=save_markdown)
+        # 站点处于熔断状态时先等待冷却结束，等待时间不计入单篇文章的时限
+        self.breaker.pause(url)
+        with self._article_deadline():
             # 特殊处理微信公众号链接
-            elif 'mp.weixin.qq.com' in url:
+            if 'mp.weixin.qq.com' in url:
                 return self._fetch_wechat_article(url, output_dir, save_html, save_json, save_markdown)
             # 特殊处理掘金链接
             elif 'juejin.cn' in url:
-                return self.juejin_fetcher.fetch_article(url, output_dir, save_html, save_json, save_markdown)
+                return self.juejin_fetcher._fetch_juejin_article(url, output_dir, save_html, save_json, save_markdown)
             else:
                 return self._fetch_general_article(url, output_dir, save_html, save_json, save_markdown)
-                
-        except Exception as e:
-            print(f"获取文章失败: {e}")
-            return None
+    
+    def fetch(self, url):
+        """
+        获取并解析文章，不写文件也不打印，供库调用使用
+
+        Args:
+            url (str): 文章URL（不支持专辑URL，专辑请使用 fetch_album_articles）
+
+        Returns:
+            Article: 文章对象，content_html / text / markdown 在首次访问时才计算
+
+        Raises:
+            ValueError: 传入了专辑URL
+            requests.RequestException: 网络请求失败
+            DeadlineExceeded: 超过 article_timeout 或外层截止时间
+            Cancelled: cancel_token 已取消
+            PageBlocked: 下载到的是限流、验证或已删除页面
+            CircuitOpen: 站点处于熔断状态且 breaker.wait 为 False
+        """
+        if self.album_fetcher.is_album_url(url):
+            raise ValueError("专辑URL请使用 fetch_album_articles")
+
+        self.breaker.pause(url)
+        with self._article_deadline():
+            site = self._detect_site(url)
+            page = self._download(url, site)
+            check('parse')
+            return self._parse_article(url, site, page)
+
+    def _article_deadline(self):
+        """单篇文章的截止时间：article_timeout 与外层（任务）截止时间中较早的一个"""
+        return self._run_deadline(self.article_timeout)
+
+    @contextmanager
+    def _run_deadline(self, seconds):
+        """
+        进入一次任务的截止时间
+
+        顶层任务（没有外层截止时间，且没有其他任务在进行）开始时清除上一次任务遗留的取消状态，
+        例如 Ctrl-C 或调用方的 cancel()；外层截止时间（如 watch / crawl）由外层负责结束
+        """
+        with self._runs_lock:
+            if self._runs == 0 and current() is None and self.cancel_token.cancelled:
+                self.cancel_token.reset()
+            self._runs += 1
+        try:
+            with Deadline(seconds, self.cancel_token) as deadline:
+                yield deadline
+        finally:
+            with self._runs_lock:
+                self._runs -= 1
+    
+    def save(self, article, output_dir="articles", save_html=False, save_json=False, save_markdown=True):
+        """
+        保存 fetch() 得到的文章
+
+        Returns:
+            list: 已保存文件列表 [(格式, 路径), ...]
+        """
+        return self._save_article(article, output_dir, save_html, save_json, save_markdown)
+    
+    def _detect_site(self, url):
+        """根据URL判断站点类型"""
+        if 'mp.weixin.qq.com' in url:
+            return 'wechat'
+        if 'juejin.cn' in url:
+            return 'juejin'
+        return 'general'
+    
+    @staged('fetch')
+    def _download(self, url, site):
+        """按站点设置请求头和编码，返回原始网页（RawHTML）；受限页面抛出 PageBlocked"""
+        try:
+            return self.breaker.guard(url, site, lambda: self._download_page(url, site))
+        except PageBlocked as e:
+            # 受限页面不留在响应缓存中，稍后重试时重新下载
+            self.coalescer.forget(url)
+            if self.proxy_pool is not None and e.kind in (BLOCKED, VERIFY):
+                # 换一个出口再试
+                self.proxy_pool.report_blocked(url)
+            raise
+
+    def _download_page(self, url, site):
+        # 保留响应体字节和编码，不生成 response.text：解析器直接读取字节，保存原始网页时也不需要重新编码
+        if site == 'wechat':
+            # 设置微信特定的请求头
+            headers = self.session.headers.copy()
+            headers['Referer'] = 'https://mp.weixin.qq.com/'
+            return RawHTML.from_response(timed_get(self.session, url, headers=headers), 'utf-8')
+        if site == 'juejin':
+            session = self.juejin_fetcher.session
+            headers = session.headers.copy()
+            headers['Referer'] = 'https://juejin.cn/'
+            return RawHTML.from_response(timed_get(session, url, headers=headers), 'utf-8')
+        # 没有声明编码时按内容检测
+        return RawHTML.from_response(timed_get(self.session, url))
+    
+    @staged('parse')
+    def _parse_article(self, url, site, html):
+        """
+        解析网页，只提取元数据和正文节点，正文的序列化推迟到访问时
+
+        html 为下载到的原始网页（RawHTML）或HTML文本（如 wespy rerender 读取的文件）
+        """
+        soup = self._build_soup(html, site)
+        # 在定位正文之前提取：正文识别会移除 nav/aside 等节点
+        links = self._extract_links(soup, url) if self.collect_links else None
+
+        tags = None
+        view_count = ''
+        if site == 'wechat':
+            meta = self._extract_wechat_meta(soup)
+            content_elem = self._find_wechat_content(soup)
+        elif site == 'juejin':
+            meta = self.juejin_fetcher._extract_juejin_meta(soup)
+            content_elem = self.juejin_fetcher._find_juejin_content(soup)
+            tags = meta['tags']
+            view_count = meta['view_count']
+        else:
+            meta = self._extract_general_meta(soup)
+            content_elem = self._find_general_content(soup)
+
+        return Article(
+            url,
+            meta['title'],
+            meta['author'],
+            meta['publish_time'],
+            source=site,
+            raw_html=html,
+            content_elem=content_elem,
+            renderer=self,
+            tags=tags,
+            view_count=view_count,
+            links=links,
+        )
+
+    @staticmethod
+    def _extract_links(soup, base_url):
+        """页面中的 http(s) 链接，转换为绝对地址并去掉 #锚点，按出现顺序去重"""
+        links = []
+        seen = set()
+        for a in soup.find_all('a', href=True):
+            link = urllib.parse.urldefrag(urllib.parse.urljoin(base_url, a['href'].strip()))[0]
+            if link.startswith(('http://', 'https://')) and link not in seen:
+                seen.add(link)
+                links.append(link)
+        return links
+    
+    def _build_soup(self, html, site):
+        """
+        构建解析树：已知站点先预扫描，只对正文容器和元数据节点建树；
+        找不到正文容器时回退到完整解析。RawHTML 直接以字节交给解析器，
+        UTF-8 页面在字节上预扫描，只有截取出的片段需要解码
+        """
+        prescan = self.prescan and site in PRESCAN_TARGETS
+        if isinstance(html, RawHTML) and (html.is_utf8 or not prescan):
+            source, encoding = html.data, html.encoding
+        else:
+            # 预扫描只支持 UTF-8 字节，其他编码先解码
+            source, encoding = getattr(html, 'text', html), None
+        if prescan:
+            targets, required = PRESCAN_TARGETS[site]
+            fragment = extract_fragments(source, targets, required)
+            if fragment is not None:
+                return self._soup(fragment, encoding)
+        return self._soup(source, encoding)
+
+    @staticmethod
+    def _soup(markup, encoding):
+        if encoding is None:
+            return BeautifulSoup(markup, 'html.parser')
+        return BeautifulSoup(markup, 'html.parser', from_encoding=encoding)
     
     def _fetch_wechat_article(self, url, output_dir, save_html=False, save_json=False, save_markdown=True):
         """获取微信公众号文章"""
         print(f"正在获取微信文章: {url}")
         
-        # 设置微信特定的请求头
-        headers = self.session.headers.copy()
-        headers['Referer'] = 'https://mp.weixin.qq.com/'
+        article = self.fetch(url)
         
-        response = self.session.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        response.encoding = 'utf-8'
+        # 保存文章（原始网页直接从下载到的缓冲区写出）
+        self._save_article(article, output_dir, save_html, save_json, save_markdown)
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # 提取文章信息
-        article_info = self._extract_wechat_info(soup)
-        article_info['url'] = url
-        article_info['html_content'] = response.text
-        
-        # 保存文章
-        self._save_article(article_info, output_dir, save_html, save_json, save_markdown)
-        
-        return article_info
+        # 序列化正文和原始网页单独统计，不计入解析阶段
+        with stage('serialize'):
+            return article.to_dict()
     
     def _fetch_general_article(self, url, output_dir, save_html=False, save_json=False, save_markdown=True):
         """获取普通网页文章"""
         print(f"正在获取文章: {url}")
         
-        response = self.session.get(url, timeout=30)
-        response.raise_for_status()
-        
-        # 尝试检测编码
-        if response.encoding == 'ISO-8859-1':
-            response.encoding = response.apparent_encoding or 'utf-8'
+        article = self.fetch(url)
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # 保存文章（原始网页直接从下载到的缓冲区写出）
+        self._save_article(article, output_dir, save_html, save_json, save_markdown)
         
-        # 提取文章信息
-        article_info = self._extract_general_info(soup)
-        article_info['url'] = url
-        article_info['html_content'] = response.text
-        
-        # 保存文章
-        self._save_article(article_info, output_dir, save_html, save_json, save_markdown)
-        
-        return article_info
+        # 序列化正文和原始网页单独统计，不计入解析阶段
+        with stage('serialize'):
+            return article.to_dict()
     
     def _extract_wechat_info(self, soup):
         """提取微信文章信息"""
+        info = self._extract_wechat_meta(soup)
+        self._fill_content(info, self._find_wechat_content(soup))
+        return info
+    
+    def _extract_wechat_meta(self, soup):
+        """提取微信文章的标题、作者和发布时间"""
         info = {}
         
         # 标题
@@ -389,19 +1020,30 @@ class ArticleFetcher:
         time_elem = soup.find('em', {'id': 'publish_time'}) or soup.find('span', {'class': 'publish_time'})
         info['publish_time'] = time_elem.get_text().strip() if time_elem else ""
         
-        # 内容区域
-        content_elem = soup.find('div', {'id': 'js_content'})
+        return info
+    
+    def _find_wechat_content(self, soup):
+        """定位微信文章正文节点"""
+        return soup.find('div', {'id': 'js_content'})
+    
+    @staticmethod
+    def _fill_content(info, content_elem):
+        """把正文节点的HTML和纯文本写入信息字典"""
         if content_elem:
             info['content_html'] = str(content_elem)
             info['content_text'] = content_elem.get_text().strip()
         else:
             info['content_html'] = ""
             info['content_text'] = ""
-        
-        return info
     
     def _extract_general_info(self, soup):
         """提取普通网页信息"""
+        info = self._extract_general_meta(soup)
+        self._fill_content(info, self._find_general_content(soup))
+        return info
+    
+    def _extract_general_meta(self, soup):
+        """提取普通网页的标题、作者和发布时间"""
         info = {}
         
         # 标题 - 尝试多种方式获取
@@ -445,6 +1087,10 @@ class ArticleFetcher:
         else:
             info['publish_time'] = ""
         
+        return info
+    
+    def _find_general_content(self, soup):
+        """定位普通网页正文节点"""
         # 内容区域 - 尝试多种选择器
         content_selectors = [
             'article',
@@ -457,30 +1103,22 @@ class ArticleFetcher:
             'main'
         ]
         
-        content_elem = None
-        for selector in content_selectors:
-            content_elem = soup.select_one(selector)
-            if content_elem:
-                break
+        # 所有选择器在一次遍历中匹配，结果与依次 select_one 相同
+        content_elem = select_first(soup, content_selectors)
         
         if not content_elem:
-            # 如果没找到特定内容区域，使用body
-            content_elem = soup.find('body')
+            # 没找到特定内容区域时，按文本/链接密度在body中选出正文子树
+            body = soup.find('body')
+            if body is not None:
+                content_elem = find_main_content(body)
         
-        if content_elem:
-            info['content_html'] = str(content_elem)
-            info['content_text'] = content_elem.get_text().strip()
-        else:
-            info['content_html'] = ""
-            info['content_text'] = ""
-        
-        return info
+        return content_elem
     
+    @staged('save')
     def _save_article(self, article_info, output_dir, save_html=False, save_json=False, save_markdown=True):
         """保存文章到文件"""
-        # 创建输出目录
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        # 创建输出目录（同一目录只创建一次）
+        self.writer.ensure_dir(output_dir)
         
         # 生成安全的文件名
         safe_title = re.sub(r'[<>:"/\\|?*]', '_', article_info['title'])[:50]
@@ -493,8 +1131,7 @@ class ArticleFetcher:
             html_filename = f"{safe_title}_{timestamp}.html"
             html_path = os.path.join(output_dir, html_filename)
             
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(article_info['html_content'])
+            self.writer.write_bytes(html_path, encode_html(article_info, self._detect_site(article_info['url']), self.html_mode))
             
             print(f"HTML文件已保存: {html_path}")
             saved_files.append(('HTML', html_path))
@@ -513,8 +1150,7 @@ class ArticleFetcher:
                 'fetch_time': time.strftime('%Y-%m-%d %H:%M:%S')
             }
             
-            with open(info_path, 'w', encoding='utf-8') as f:
-                json.dump(info_to_save, f, ensure_ascii=False, indent=2)
+            self.writer.write_text(info_path, json.dumps(info_to_save, ensure_ascii=False, indent=2))
             
             print(f"文章信息已保存: {info_path}")
             saved_files.append(('JSON', info_path))
@@ -522,26 +1158,117 @@ class ArticleFetcher:
         # 转换为Markdown (默认保存)
         if save_markdown:
             try:
-                markdown_content = self._convert_to_markdown(article_info['content_html'])
                 md_filename = f"{safe_title}_{timestamp}.md"
                 md_path = os.path.join(output_dir, md_filename)
                 
-                with open(md_path, 'w', encoding='utf-8') as f:
-                    f.write(f"# {article_info['title']}\n\n")
-                    f.write(f"**作者**: {article_info['author']}\n")
-                    f.write(f"**发布时间**: {article_info['publish_time']}\n")
-                    f.write(f"**原文链接**: {article_info['url']}\n\n")
-                    f.write("---\n\n")
-                    f.write(markdown_content)
+                mapping = {}
+                if self.images is not None:
+                    with stage('images'):
+                        mapping = save_images(self.images, self.writer, output_dir, article_info['content_html'])
+
+                # 边转换边写入临时文件，完成后才重命名，转换失败时不会留下半个文件；
+                # 只有需要更新搜索索引时才保留完整内容
+                parts = [] if self.search_index is not None else None
+
+                def chunks():
+                    for chunk in self.iter_markdown(article_info):
+                        check('convert')
+                        if parts is not None:
+                            parts.append(chunk)
+                        yield chunk
+
+                with stage('convert'), use_local_images(mapping):
+                    self.writer.stream_text(md_path, chunks())
                 
                 print(f"Markdown文件已保存: {md_path}")
                 saved_files.append(('Markdown', md_path))
                 
+            except (Cancelled, DeadlineExceeded):
+                raise
             except Exception as e:
                 print(f"转换Markdown失败: {e}")
+            else:
+                if parts is not None:
+                    self._index_markdown(self.search_index, md_path, ''.join(parts))
         
         return saved_files
     
+    @staticmethod
+    def _index_markdown(search_index, md_path, markdown_content):
+        """把刚保存的文章加入全文索引，索引出错不影响保存"""
+        if search_index is None:
+            return
+        try:
+            search_index.add_markdown(md_path, markdown_content)
+            search_index.commit()
+        except Exception as e:
+            print(f"更新搜索索引失败: {e}")
+    
+    def iter_markdown(self, article, chunk_size=8192):
+        """
+        以生成器方式输出文章的完整Markdown（元数据头部 + 正文），在遍历HTML树的同时产出
+
+        Args:
+            article (dict): fetch_article 返回的文章信息，需包含 title/author/publish_time/url/content_html
+            chunk_size (int): 合并小片段后的大致块大小（字符数），0 表示不合并
+
+        Yields:
+            str: Markdown 片段，拼接后与保存到文件的内容一致
+        """
+        chunks = self._iter_markdown_document(article)
+        if chunk_size <= 0:
+            yield from chunks
+            return
+
+        buffer = []
+        size = 0
+        for chunk in chunks:
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer)
+    
+    def write_markdown(self, article, fp, chunk_size=8192):
+        """
+        将文章Markdown流式写入文件对象（文件、socket包装等任何有 write(str) 的对象）
+
+        Args:
+            article (dict): 文章信息
+            fp: 可写的文本文件对象
+            chunk_size (int): 每次 write 的大致字符数
+
+        Returns:
+            int: 写入的字符数
+        """
+        written = 0
+        for chunk in self.iter_markdown(article, chunk_size):
+            fp.write(chunk)
+            written += len(chunk)
+        return written
+    
+    def _iter_markdown_document(self, article):
+        """产出Markdown头部和正文片段"""
+        yield f"# {article['title']}\n\n"
+        yield f"**作者**: {article['author']}\n"
+        yield f"**发布时间**: {article['publish_time']}\n"
+        if article.get('view_count'):
+            yield f"**阅读量**: {article['view_count']}\n"
+        if article.get('tags'):
+            yield f"**标签**: {', '.join(article['tags'])}\n"
+        yield f"**原文链接**: {article['url']}\n\n"
+        yield "---\n\n"
+        content_elem = article.get('content_elem')
+        if content_elem is not None:
+            # Article 直接遍历解析时得到的正文节点，不再序列化后重新解析
+            yield from self._iter_markdown_nodes([content_elem])
+        elif article.get('content_html'):
+            soup = BeautifulSoup(article['content_html'], 'html.parser')
+            yield from self._iter_markdown_recursive(soup)
+    
     def _convert_to_markdown(self, html_content):
         """将HTML内容转换为Markdown"""
         if not html_content:
@@ -552,85 +1279,110 @@ class ArticleFetcher:
     
     def _html_to_markdown_recursive(self, element):
         """递归转换HTML元素为Markdown"""
-        markdown = ""
-        
-        for child in element.children:
+        return ''.join(self._iter_markdown_recursive(element))
+    
+    def _iter_markdown_recursive(self, element):
+        """递归转换HTML元素为Markdown，按遍历顺序逐段产出"""
+        return self._iter_markdown_nodes(element.children)
+
+    def _iter_markdown_nodes(self, nodes):
+        """依次转换一组兄弟节点"""
+        for child in nodes:
             if child.name is None:  # 文本节点
                 text = str(child).strip()
                 if text:
-                    markdown += text
+                    yield text
             elif child.name == 'br':
-                markdown += '\n'
+                yield '\n'
             elif child.name in ['p', 'div', 'section']:
-                content = self._html_to_markdown_recursive(child).strip()
-                if content:
-                    markdown += '\n\n' + content + '\n'
+                yield from self._iter_wrapped(self._iter_markdown_recursive(child), '\n\n', '\n')
             elif child.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
                 level = int(child.name[1])
-                content = self._html_to_markdown_recursive(child).strip()
-                if content:
-                    markdown += '\n' + '#' * level + ' ' + content + '\n'
+                yield from self._iter_wrapped(self._iter_markdown_recursive(child), '\n' + '#' * level + ' ', '\n')
             elif child.name in ['strong', 'b']:
-                content = self._html_to_markdown_recursive(child).strip()
-                if content:
-                    markdown += '**' + content + '**'
+                yield from self._iter_wrapped(self._iter_markdown_recursive(child), '**', '**')
             elif child.name in ['em', 'i']:
-                content = self._html_to_markdown_recursive(child).strip()
-                if content:
-                    markdown += '*' + content + '*'
+                yield from self._iter_wrapped(self._iter_markdown_recursive(child), '*', '*')
             elif child.name == 'img':
                 src = child.get('data-src') or child.get('src', '')
                 alt = child.get('alt', '')
                 if src:
                     # 使用代理服务处理图片防盗链
                     proxy_src = self._get_proxy_image_url(src)
-                    markdown += f'\n![{alt}]({proxy_src})\n'
+                    yield f'\n![{alt}]({proxy_src})\n'
             elif child.name == 'a':
                 href = child.get('href', '')
                 text = self._html_to_markdown_recursive(child).strip()
                 if href and text:
-                    markdown += f'[{text}]({href})'
+                    yield f'[{text}]({href})'
                 elif text:
-                    markdown += text
+                    yield text
             elif child.name in ['ul', 'ol']:
-                list_content = self._convert_list_to_markdown(child)
-                if list_content:
-                    markdown += '\n' + list_content + '\n'
+                started = False
+                for item in self._iter_list_items(child):
+                    if not started:
+                        yield '\n'
+                        started = True
+                    yield item
+                if started:
+                    yield '\n'
             elif child.name == 'code':
                 # 处理行内代码
                 code_content = child.get_text().strip()
                 if code_content:
-                    markdown += '`' + code_content + '`'
+                    yield '`' + code_content + '`'
             elif child.name == 'pre':
                 # 处理代码块
                 code_content = self._extract_code_from_pre(child)
                 language = self._detect_code_language(child)
                 if code_content:
                     if language:
-                        markdown += f'\n```{language}\n{code_content}\n```\n'
+                        yield f'\n```{language}\n{code_content}\n```\n'
                     else:
-                        markdown += f'\n```\n{code_content}\n```\n'
+                        yield f'\n```\n{code_content}\n```\n'
             else:
                 # 递归处理其他元素
-                content = self._html_to_markdown_recursive(child)
-                markdown += content
-        
-        return markdown
+                yield from self._iter_markdown_recursive(child)
+    
+    @staticmethod
+    def _iter_wrapped(chunks, prefix, suffix):
+        """
+        等价于 prefix + ''.join(chunks).strip() + suffix（内容为空时不输出），
+        但不需要先拼出完整字符串：首部空白直接丢弃，尾部空白暂存到确认后面还有内容时再输出
+        """
+        started = False
+        pending = ''
+        for chunk in chunks:
+            if not started:
+                chunk = chunk.lstrip()
+                if not chunk:
+                    continue
+                started = True
+                yield prefix
+            stripped = chunk.rstrip()
+            if stripped:
+                yield pending + stripped
+                pending = chunk[len(stripped):]
+            else:
+                pending += chunk
+        if started:
+            yield suffix
     
     def _convert_list_to_markdown(self, list_element):
         """转换列表为Markdown"""
-        markdown = ""
+        return ''.join(self._iter_list_items(list_element))
+    
+    def _iter_list_items(self, list_element):
+        """逐项产出列表的Markdown"""
         items = list_element.find_all('li', recursive=False)
         
         for i, item in enumerate(items):
             content = self._html_to_markdown_recursive(item).strip()
             if content:
                 if list_element.name == 'ol':
-                    markdown += f"{i+1}. {content}\n"
+                    yield f"{i+1}. {content}\n"
                 else:
-                    markdown += f"- {content}\n"
-        
-        return markdown
+                    yield f"- {content}\n"
     
     def _extract_code_from_pre(self, pre_element):
         """从pre元素中提取代码内容"""
@@ -737,9 +1489,12 @@ class ArticleFetcher:
         return None
     
     def _get_proxy_image_url(self, original_url):
-        """获取代理图片URL，解决防盗链问题"""
+        """获取代理图片URL，解决防盗链问题；图片已保存到本地时返回本地路径"""
         if not original_url or not original_url.startswith('http'):
             return original_url
+        local_path = local_image(original_url)
+        if local_path:
+            return local_path
         
         encoded_url = urllib.parse.quote(original_url, safe='')
         base_url = f"https://images.weserv.nl/?url={encoded_url}"
@@ -750,27 +1505,121 @@ class ArticleFetcher:
         
         return base_url
 
+# 子命令 -> 实现模块，模块需提供 main(argv) 入口
+SUBCOMMANDS = {
+    'serve': 'wespy.server',
+    'archive': 'wespy.archive',
+    'rerender': 'wespy.rerender',
+    'index': 'wespy.search:index_main',
+    'search': 'wespy.search:search_main',
+    'enqueue': 'wespy.jobqueue:enqueue_main',
+    'worker': 'wespy.jobqueue:worker_main',
+    'mockserver': 'wespy.mockserver',
+    'loadtest': 'wespy.loadtest',
+    'watch': 'wespy.watch',
+    'feed': 'wespy.discovery',
+    'crawl': 'wespy.crawler',
+    'html-size': 'wespy.htmlmode',
+    'density-bench': 'wespy.density',
+    'write-bench': 'wespy.writer',
+}
+
+def _run_subcommand(argv):
+    """执行子命令（如 wespy serve），返回是否已处理"""
+    if not argv or argv[0] not in SUBCOMMANDS:
+        return False
+    import importlib
+    # "模块" 调用模块的 main()，"模块:函数" 调用指定函数
+    module_name, _, function_name = SUBCOMMANDS[argv[0]].partition(':')
+    module = importlib.import_module(module_name)
+    getattr(module, function_name or 'main')(argv[1:])
+    return True
+
+def read_url_file(path):
+    """
+    读取URL列表文件：每行一个URL，# 开头的行为注释；URL后可以跟一个整数优先级（数值越大越先下载）
+
+    Returns:
+        tuple: (URL列表, {URL: 优先级})
+    """
+    urls = []
+    priorities = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith('#'):
+                continue
+            urls.append(parts[0])
+            if len(parts) > 1 and re.fullmatch(r'-?\d+', parts[1]):
+                priorities[parts[0]] = int(parts[1])
+    return urls, priorities
+
+def _install_interrupt_handler(token):
+    """第一次 Ctrl-C 取消任务（中断当前下载、保存已完成部分和汇总），第二次立即退出"""
+    def handler(signum, frame):
+        if token.cancelled:
+            raise KeyboardInterrupt
+        print("\n正在停止，已完成的文章和汇总会照常保存（再按一次 Ctrl-C 立即退出）...")
+        token.cancel('用户中断')
+
+    try:
+        signal.signal(signal.SIGINT, handler)
+    except ValueError:
+        # 不在主线程中（例如被其他程序以线程方式调用）时保持默认行为
+        pass
+
 def main():
+    # 子命令模式，"wespy <url>" 的原有用法保持不变
+    if _run_subcommand(sys.argv[1:]):
+        return
+
     parser = argparse.ArgumentParser(description='获取文章内容并转换为Markdown')
-    parser.add_argument('url', nargs='?', help='文章URL')
+    parser.add_argument('url', nargs='*', help='文章URL（提供多个时批量下载）')
+    parser.add_argument('--url-file', help='从文件读取URL列表，每行一个（URL后可以跟优先级，数值越大越先下载）')
     parser.add_argument('-o', '--output', default='articles', help='输出目录 (默认: articles)')
     parser.add_argument('-v', '--verbose', action='store_true', help='显示详细信息')
     parser.add_argument('--html', action='store_true', help='同时保存HTML文件')
     parser.add_argument('--json', action='store_true', help='同时保存JSON信息文件')
+    parser.add_argument('--html-mode', choices=HTML_MODES,
+                        help='保存的HTML内容：raw 原始网页（默认）/ content 元数据和正文 / compact 精简后的正文；指定时同时保存HTML')
     parser.add_argument('--all', action='store_true', help='保存所有格式文件 (HTML, JSON, Markdown)')
     parser.add_argument('--max-articles', type=int, help='微信专辑最大下载文章数量 (默认: 10)')
     parser.add_argument('--album-only', action='store_true', help='仅获取专辑文章列表，不下载内容')
+    parser.add_argument('--background-writes', action='store_true', help='由后台线程写文件，使磁盘IO与下载并行')
+    parser.add_argument('--archive', choices=ARCHIVE_FORMATS, help='将专辑/批量下载的文章写入单个归档文件')
+    parser.add_argument('--index', action='store_true', help='保存时同时更新输出目录的全文索引（索引已存在时自动更新）')
+    parser.add_argument('--article-timeout', type=float, help='单篇文章的总时限（秒，含连接、下载、解析和转换）')
+    parser.add_argument('--deadline', type=float, help='整个任务的总时限（秒），到时停止剩余文章并保存已完成部分')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='批量/专辑下载的工作线程数，每个站点的实际并发根据延迟和错误自动调整 (默认: 4)')
+    parser.add_argument('--response-cache', type=float, default=32,
+                        help='最近响应的缓存大小（MB），同一URL的并发请求总是合并为一次，0 表示只合并不缓存 (默认: 32)')
+    parser.add_argument('--proxy-pool', metavar='FILE',
+                        help='代理池文件（YAML/JSON），请求分散到多个 HTTP/SOCKS 代理，格式见 wespy/proxypool.py')
+    parser.add_argument('--images', choices=IMAGE_FORMATS,
+                        help='下载文章图片到本地并转换格式（original 为不转换），Markdown 改为引用本地图片')
+    parser.add_argument('--image-max-width', type=int, default=1280, help='图片最大宽度，超过时等比缩小，0 表示不缩放 (默认: 1280)')
+    parser.add_argument('--image-quality', type=int, default=80, help='图片压缩质量 1-100 (默认: 80)')
+    parser.add_argument('--image-processes', type=int, help='压缩图片的进程数 (默认: CPU核数，0 表示不使用进程池)')
+    parser.add_argument('--profile', choices=PROFILE_MODES, help='按下载/解析/转换/保存阶段分析CPU或内存，结果写入输出目录（分析时只使用 1 个工作线程）')
     
     args = parser.parse_args()
+
+    urls = list(args.url)
+    priorities = {}
+    if args.url_file:
+        file_urls, priorities = read_url_file(args.url_file)
+        urls.extend(file_urls)
     
     # 如果没有提供URL，进入交互模式
-    if not args.url:
+    if not urls:
         print("文章获取工具")
         print("=" * 40)
         url = input("请输入文章URL: ").strip()
         if not url:
             print("URL不能为空!")
             sys.exit(1)
+        urls = [url]
         output_dir = input("输出目录 (回车使用默认 'articles'): ").strip() or 'articles'
         
         # 交互模式询问输出格式
@@ -797,9 +1646,11 @@ def main():
         # 交互模式默认值
         max_articles = 10
         album_only = False
+        background_writes = False
+        archive = None
 
     else:
-        url = args.url
+        url = urls[0]
         output_dir = args.output
         
         # 命令行模式处理输出格式
@@ -808,69 +1659,122 @@ def main():
             save_json = True
             save_markdown = True
         else:
-            save_html = args.html
+            save_html = args.html or bool(args.html_mode)
             save_json = args.json
             save_markdown = True  # 默认总是保存Markdown
 
         max_articles = args.max_articles or 10
         album_only = args.album_only
+        background_writes = args.background_writes
+        archive = args.archive
 
     if args.verbose:
-        print(f"URL: {url}")
+        print(f"URL: {', '.join(urls)}")
         print(f"输出目录: {output_dir}")
         print(f"输出格式: HTML={save_html}, JSON={save_json}, Markdown={save_markdown}")
         if hasattr(args, 'max_articles'):
             print(f"最大文章数量: {max_articles}")
         if hasattr(args, 'album_only'):
             print(f"仅获取列表: {album_only}")
+        if archive:
+            print(f"归档格式: {archive}")
 
-    fetcher = ArticleFetcher()
-
-    # 检查是否为专辑URL
-    if fetcher.album_fetcher.is_album_url(url):
-        if album_only:
-            # 仅获取专辑文章列表
-            print("仅获取专辑文章列表...")
-            articles = fetcher.album_fetcher.fetch_album_articles(url, max_articles)
-            if articles:
-                print(f"\n获取到 {len(articles)} 篇文章:")
-                for i, article in enumerate(articles, 1):
-                    print(f"{i:2d}. {article['title']}")
-                    print(f"     URL: {article['url']}")
-                    print(f"     时间: {article.get('create_time', 'N/A')}")
-                    if i < len(articles):
-                        print()
-
-                # 保存文章列表到文件
-                list_file = os.path.join(output_dir, f"album_articles_{int(time.time())}.json")
-                os.makedirs(output_dir, exist_ok=True)
-                with open(list_file, 'w', encoding='utf-8') as f:
-                    json.dump(articles, f, ensure_ascii=False, indent=2)
-                print(f"\n文章列表已保存到: {list_file}")
-            else:
-                print("未获取到任何文章")
+    fetcher = ArticleFetcher(background_writes=background_writes)
+    fetcher.article_timeout = getattr(args, 'article_timeout', None)
+    fetcher.workers = getattr(args, 'workers', 4)
+    if getattr(args, 'html_mode', None):
+        fetcher.html_mode = args.html_mode
+    fetcher.coalescer.cache.max_bytes = int(getattr(args, 'response_cache', 32) * 1024 * 1024)
+    if getattr(args, 'proxy_pool', None):
+        try:
+            fetcher.proxy_pool = load_pool(args.proxy_pool)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"读取代理池失败: {e}")
+            sys.exit(1)
+    if getattr(args, 'images', None):
+        fetcher.images = ImagePipeline(fetcher.session, args.images, args.image_max_width, args.image_quality,
+                                       processes=args.image_processes)
+    deadline = getattr(args, 'deadline', None)
+    _install_interrupt_handler(fetcher.cancel_token)
+
+    # 输出目录已有全文索引（或指定了 --index）时，保存的文章同时加入索引
+    search_index = None
+    index_path = os.path.join(output_dir, INDEX_NAME)
+    if not archive and (getattr(args, 'index', False) or os.path.exists(index_path)):
+        os.makedirs(output_dir, exist_ok=True)
+        search_index = SearchIndex(index_path, root=output_dir)
+        fetcher.search_index = search_index
+
+    profiler = None
+    if getattr(args, 'profile', None):
+        if fetcher.workers > 1:
+            # cProfile 和 tracemalloc 快照只能统计启动分析的线程，线程池中处理的文章不会被分析
+            print(f"性能分析时只使用 1 个工作线程（忽略 --workers {fetcher.workers}）")
+            fetcher.workers = 1
+        profiler = Profiler(args.profile, output_dir)
+        profiler.start()
+
+    try:
+        # 多个URL，或单篇文章写入归档时按批量处理
+        if len(urls) > 1 or (archive and not fetcher.album_fetcher.is_album_url(url)):
+            result = fetcher.fetch_articles(urls, output_dir, save_html, save_json, save_markdown, archive=archive, deadline=deadline,
+                                            priorities=priorities)
+            if not result:
+                print("批量下载失败!")
                 sys.exit(1)
+        # 检查是否为专辑URL
+        elif fetcher.album_fetcher.is_album_url(url):
+            if album_only:
+                # 仅获取专辑文章列表
+                print("仅获取专辑文章列表...")
+                articles = fetcher.album_fetcher.fetch_album_articles(url, max_articles)
+                if articles:
+                    print(f"\n获取到 {len(articles)} 篇文章:")
+                    for i, article in enumerate(articles, 1):
+                        print(f"{i:2d}. {article['title']}")
+                        print(f"     URL: {article['url']}")
+                        print(f"     时间: {article.get('create_time', 'N/A')}")
+                        if i < len(articles):
+                            print()
+
+                    # 保存文章列表到文件
+                    list_file = os.path.join(output_dir, f"album_articles_{int(time.time())}.json")
+                    os.makedirs(output_dir, exist_ok=True)
+                    with open(list_file, 'w', encoding='utf-8') as f:
+                        json.dump(articles, f, ensure_ascii=False, indent=2)
+                    print(f"\n文章列表已保存到: {list_file}")
+                else:
+                    print("未获取到任何文章")
+                    sys.exit(1)
+            else:
+                # 批量下载专辑文章
+                result = fetcher.fetch_album_articles(url, output_dir, max_articles, save_html, save_json, save_markdown, archive=archive, deadline=deadline)
+                if result:
+                    print(f"\n批量下载完成!")
+                    print(f"成功下载: {len(result)} 篇文章")
+                else:
+                    print("专辑文章下载失败!")
+                    sys.exit(1)
         else:
-            # 批量下载专辑文章
-            result = fetcher.fetch_album_articles(url, output_dir, max_articles, save_html, save_json, save_markdown)
+            # 单篇文章处理
+            with Deadline(deadline, fetcher.cancel_token):
+                result = fetcher.fetch_article(url, output_dir, save_html, save_json, save_markdown)
+
             if result:
-                print(f"\n批量下载完成!")
-                print(f"成功下载: {len(result)} 篇文章")
+                print(f"\n成功获取文章!")
+                print(f"标题: {result['title']}")
+                print(f"作者: {result['author']}")
+                print(f"发布时间: {result['publish_time']}")
             else:
-                print("专辑文章下载失败!")
+                print("文章获取失败!")
                 sys.exit(1)
-    else:
-        # 单篇文章处理
-        result = fetcher.fetch_article(url, output_dir, save_html, save_json, save_markdown)
-
-        if result:
-            print(f"\n成功获取文章!")
-            print(f"标题: {result['title']}")
-            print(f"作者: {result['author']}")
-            print(f"发布时间: {result['publish_time']}")
-        else:
-            print("文章获取失败!")
-            sys.exit(1)
+    finally:
+        # 确保后台写入全部完成
+        fetcher.close()
+        if search_index is not None:
+            search_index.close()
+        if profiler is not None:
+            profiler.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
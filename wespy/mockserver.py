@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟站点
+在本机模拟微信公众号文章、专辑列表接口（action=getalbum 分页）和掘金文章，用于压测和回归测试，
+不访问真实网站。可以配置响应延迟、错误率、429限流、验证页面和慢速响应体
+
+服务以HTTP代理方式工作：把 session 的 http 代理指向它，并使用 http:// 开头的真实域名URL
+（如 http://mp.weixin.qq.com/s/1），站点识别、请求头等逻辑与访问真实网站时完全一致
+
+    wespy mockserver --port 8900 --latency 50 --error-rate 0.01
+"""
+
+import argparse
+import gzip
+import html
+import json
+import os
+import random
+import socketserver
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+ALBUM_BIZ = 'MzMockBiz=='
+ALBUM_ID = '1000'
+# 专辑中的文章按 msgid 从大到小排列，与真实接口一致
+_FIRST_MSGID = 2247480000
+
+_PARAGRAPH = (
+    '在高并发的抓取任务中，连接复用、压缩传输和解析开销共同决定了吞吐量，'
+    '这一段文字用于模拟正文内容，包含中文标点，逗号，以及 English words, numbers 123 和代码片段。'
+)
+
+
+class MockConfig:
+    """
+    模拟站点的行为配置
+
+    Args:
+        latency (float): 每个响应的基础延迟（毫秒）
+        jitter (float): 在基础延迟上随机增加的最大延迟（毫秒）
+        error_rate (float): 返回500的概率
+        throttle_rate (float): 返回429（带 Retry-After）的概率
+        block_rate (float): 返回状态码为200的"环境异常"验证页面的概率（文章页面）
+        block_first (int): 最先的若干个文章请求总是返回验证页面，之后按 block_rate，用于复现限流后恢复
+        slow_rate (float): 以慢速分块发送响应体的概率
+        slow_ms (float): 慢速响应体的总发送时长（毫秒）
+        paragraphs (int): 生成的文章正文段落数
+        album_size (int): 专辑中的文章数
+        push_size (int): 专辑中每次推送的文章数，同一次推送的文章 msgid 相同、itemidx 从 1 开始
+        pages_dir (str, optional): 录制的网页目录，其中的 .html 文件按特征识别为微信/掘金文章，按文章ID选取返回
+        seed (int, optional): 随机数种子，便于复现
+        content_encoding (str, optional): 网页响应的 Content-Encoding，不看请求的 Accept-Encoding；
+            gzip / deflate 按该格式压缩，其他名称只设置响应头、原样发送（模拟返回了无法解码格式的服务器）
+    """
+
+    def __init__(self, latency=0, jitter=0, error_rate=0, throttle_rate=0, slow_rate=0, slow_ms=1000,
+                 paragraphs=30, album_size=100, pages_dir=None, seed=None, block_rate=0, push_size=1,
+                 content_encoding=None, block_first=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.block_rate = block_rate
+        self.block_first = block_first
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.paragraphs = paragraphs
+        self.album_size = album_size
+        self.push_size = max(1, push_size)
+        self.content_encoding = content_encoding
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.recorded = {'wechat': [], 'juejin': []}
+        if pages_dir:
+            self._load_pages(pages_dir)
+
+    def _load_pages(self, pages_dir):
+        for name in sorted(os.listdir(pages_dir)):
+            if not name.endswith('.html'):
+                continue
+            with open(os.path.join(pages_dir, name), 'rb') as f:
+                page = f.read()
+            if b'id="js_content"' in page:
+                self.recorded['wechat'].append(page)
+            elif b'article-root' in page:
+                self.recorded['juejin'].append(page)
+
+    def take_block(self):
+        """block_first 还有剩余时消耗一个并返回 True（多线程安全）"""
+        with self.random_lock:
+            if self.block_first <= 0:
+                return False
+            self.block_first -= 1
+            return True
+
+    def roll(self):
+        """返回一个 [0, 1) 的随机数（多线程安全）"""
+        with self.random_lock:
+            return self.random.random()
+
+
+def _album_items(config):
+    """专辑中的全部文章（msgid 从大到小，同一次推送中 itemidx 从小到大）"""
+    for i in range(config.album_size):
+        push, itemidx = divmod(i, config.push_size)
+        msgid = _FIRST_MSGID - push
+        itemidx += 1
+        article_id = msgid if config.push_size == 1 else f'{msgid}_{itemidx}'
+        yield {
+            'title': f'模拟文章 {i + 1}',
+            'url': f'http://mp.weixin.qq.com/s/{article_id}#rd',
+            'msgid': str(msgid),
+            'itemidx': str(itemidx),
+            'create_time': str(1700000000 - push * 86400),
+            'cover_img_1_1': '',
+            'key': f'{msgid}_{itemidx}',
+        }
+
+
+def album_page(config, begin_msgid=0, count=10, begin_itemidx=0):
+    """
+    模拟 appmsgalbum?action=getalbum 的一页响应
+
+    Args:
+        begin_msgid (int): 上一页最后一篇文章的 msgid，0 表示第一页
+        count (int): 每页数量
+        begin_itemidx (int): 上一页最后一篇文章的 itemidx
+    """
+    items = [
+        item for item in _album_items(config)
+        if not begin_msgid or int(item['msgid']) < begin_msgid
+        or (int(item['msgid']) == begin_msgid and int(item['itemidx']) > begin_itemidx)
+    ]
+    page = items[:count]
+    return {
+        'base_resp': {'ret': 0},
+        'getalbum_resp': {
+            'article_list': page,
+            'continue_flag': '1' if len(items) > count else '0',
+            'base_info': {'title': '模拟专辑', 'article_count': str(config.album_size)},
+        },
+    }
+
+
+def author_page(config, user_id, cursor=0, count=10):
+    """
+    模拟掘金作者文章列表接口（content_api/v1/article/query_list）的一页响应，
+    作者的文章数与专辑相同，按发布时间从新到旧
+
+    Args:
+        user_id (str): 作者ID
+        cursor (int): 翻页位置
+        count (int): 每页数量
+    """
+    items = [
+        {
+            'article_id': str(7300000000000000000 + config.album_size - i),
+            'article_info': {
+                'title': f'掘金模拟文章 {user_id}-{config.album_size - i}',
+                'ctime': str(1700000000 - i * 86400),
+                'user_id': str(user_id),
+            },
+        }
+        for i in range(cursor, min(cursor + count, config.album_size))
+    ]
+    return {
+        'err_no': 0,
+        'err_msg': 'success',
+        'data': items,
+        'cursor': str(cursor + len(items)),
+        'has_more': cursor + count < config.album_size,
+    }
+
+
+def wechat_page(config, article_id):
+    """生成一篇微信公众号文章页面"""
+    if config.recorded['wechat']:
+        pages = config.recorded['wechat']
+        return pages[zlib.crc32(article_id.encode('utf-8')) % len(pages)]
+    body = ''.join(
+        f'<section><p>{_PARAGRAPH}（第 {i + 1} 段）</p></section>'
+        + (f'<p><img data-src="http://mmbiz.qpic.cn/mock/{article_id}_{i}.png?wx_fmt=png"/></p>' if i % 10 == 5 else '')
+        + ('<pre class="language-python"><code>for i in range(10):\n    print(i)</code></pre>' if i % 10 == 9 else '')
+        for i in range(config.paragraphs)
+    )
+    title = html.escape(f'模拟文章 {article_id}')
+    page = (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>'
+        '<script>var msg_title = "{title}"; var appmsg = {{}};</script>'
+        '<style>.rich_media_content {{ color: #333 }}</style></head><body>'
+        '<div class="rich_media_area_primary"><h1 class="rich_media_title" id="activity-name">{title}</h1>'
+        '<a id="js_name">模拟公众号</a><em id="publish_time">2024-01-01 08:00</em>'
+        '<div class="rich_media_content" id="js_content">{body}</div></div>'
+        '<div class="qr_code_pc">扫码关注</div><script>window.__report = 1;</script></body></html>'
+    ).format(title=title, body=body)
+    return page.encode('utf-8')
+
+
+def juejin_page(config, article_id):
+    """生成一篇掘金文章页面"""
+    if config.recorded['juejin']:
+        pages = config.recorded['juejin']
+        return pages[zlib.crc32(article_id.encode('utf-8')) % len(pages)]
+    body = ''.join(f'<p>{_PARAGRAPH}（第 {i + 1} 段）</p>' for i in range(config.paragraphs))
+    title = html.escape(f'掘金模拟文章 {article_id}')
+    page = (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title></head><body>'
+        '<h1 class="article-title">{title}</h1><span class="name">模拟作者</span>'
+        '<span class="time">2024-01-01</span><span class="view-count">1024</span>'
+        '<a class="tag">Python</a><a class="tag">性能</a>'
+        '<div id="article-root"><div class="markdown-body">{body}'
+        '<pre><code class="language-python">print("hello")</code></pre></div></div></body></html>'
+    ).format(title=title, body=body)
+    return page.encode('utf-8')
+
+
+_IMAGE_CACHE = {}
+_IMAGE_LOCK = threading.Lock()
+
+
+def mock_image(width=1600, height=900):
+    """生成一张PNG图片（渐变色），供 wespy.images 压测缩放和重新压缩，同一尺寸只生成一次"""
+    with _IMAGE_LOCK:
+        image = _IMAGE_CACHE.get((width, height))
+        if image is None:
+            rows = b''.join(
+                b'\0' + bytes(((i // 3) * 255 // width) ^ (y & 0x3f) ^ (i % 3 * 40) for i in range(width * 3))
+                for y in range(height)
+            )
+
+            def chunk(kind, data):
+                return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+            # 8位RGB，无隔行扫描
+            header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+            image = _IMAGE_CACHE[(width, height)] = (
+                b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(rows, 6)) + chunk(b'IEND', b'')
+            )
+        return image
+
+
+def _blog_posts(config):
+    """博客中的全部文章 (编号, 发布时间)，按发布时间从新到旧"""
+    return [(config.album_size - i, 1700000000 - i * 86400) for i in range(config.album_size)]
+
+
+def _w3c_date(timestamp):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(timestamp))
+
+
+def blog_page(config, post_id):
+    """生成一篇普通博客文章页面（由通用提取器解析）"""
+    body = ''.join(f'<p>{_PARAGRAPH}（第 {i + 1} 段）</p>' for i in range(config.paragraphs))
+    title = html.escape(f'博客模拟文章 {post_id}')
+    page = (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>'
+        '<meta name="author" content="模拟博主"></head><body>'
+        '<nav><a href="/blog/">首页</a></nav><article><h1>{title}</h1><time>2024-01-01</time>{body}</article>'
+        '<footer>模拟博客</footer></body></html>'
+    ).format(title=title, body=body)
+    return page.encode('utf-8')
+
+
+def cluttered_page(config, post_id):
+    """
+    生成一篇没有常见正文容器（article、.content 等）的普通网页：正文在无特征的 div 中，
+    周围是导航、侧栏、评论、页脚和大段脚本/样式，供 wespy.density 的基准测试使用；
+    同一编号总是生成相同的页面，不同编号的版式和杂项数量不同
+    """
+    rng = random.Random(zlib.crc32(str(post_id).encode('utf-8')))
+    title = html.escape(f'普通网站模拟文章 {post_id}')
+    nav = ''.join(f'<li><a href="/c/{i}">栏目 {i}</a></li>' for i in range(rng.randint(8, 30)))
+    sidebar = ''.join(
+        f'<div class="widget"><h3>推荐阅读 {i}</h3><ul>'
+        + ''.join(f'<li><a href="/p/{i}-{j}">相关文章标题 {i}-{j}，点击查看</a></li>' for j in range(6))
+        + '</ul></div>'
+        for i in range(rng.randint(2, 6))
+    )
+    comments = ''.join(
+        f'<div class="cmt"><span>用户{i}</span><p>写得不错，收藏了。</p><a href="/reply/{i}">回复</a></div>'
+        for i in range(rng.randint(0, 40))
+    )
+    body = ''.join(f'<p>{_PARAGRAPH}（第 {i + 1} 段）</p>' for i in range(config.paragraphs))
+    script = '<script>window.dataLayer=window.dataLayer||[];dataLayer.push({"event":"view"});</script>' * rng.randint(5, 40)
+    style = '<style>' + '.widget li a{color:#333;text-decoration:none}' * rng.randint(20, 200) + '</style>'
+    page = (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>{style}</head><body>'
+        '<div id="top"><div class="logo"><a href="/">模拟站点</a></div><ul class="menu">{nav}</ul></div>'
+        '<div class="wrap"><div class="col-left"><div class="post-wrap"><h1>{title}</h1>'
+        '<div class="meta">2024-01-01 · 模拟作者</div><div class="post-body">{body}</div>'
+        '<div class="share"><a href="#">分享到微博</a><a href="#">分享到微信</a></div></div>'
+        '<div class="comments">{comments}</div></div><div class="col-right">{sidebar}</div></div>'
+        '<div class="foot"><p>© 2024 模拟站点 版权所有 | <a href="/about">关于我们</a> | <a href="/contact">联系我们</a></p></div>'
+        '{script}</body></html>'
+    ).format(title=title, style=style, nav=nav, body=body, comments=comments, sidebar=sidebar, script=script)
+    return page.encode('utf-8')
+
+
+def blog_index(config, page=1, per_page=10):
+    """博客首页：声明订阅地址，按页列出文章链接（供 wespy crawl 沿链接抓取）"""
+    posts = _blog_posts(config)
+    start = (page - 1) * per_page
+    items = ''.join(f'<li><a href="/blog/{post_id}">博客模拟文章 {post_id}</a></li>'
+                    for post_id, _ in posts[start:start + per_page])
+    pager = f'<a href="/blog/?page={page + 1}">下一页</a>' if start + per_page < len(posts) else ''
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>模拟博客</title>'
+        '<link rel="alternate" type="application/rss+xml" title="RSS" href="/feed.xml"></head>'
+        f'<body><h1>模拟博客</h1><ul>{items}</ul>{pager}</body></html>'
+    ).encode('utf-8')
+
+
+def blog_rss(config, host, count=10):
+    """最新 count 篇文章的 RSS"""
+    items = ''.join(
+        f'<item><title>博客模拟文章 {post_id}</title><link>http://{host}/blog/{post_id}</link>'
+        f'<pubDate>{time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime(published))}</pubDate></item>'
+        for post_id, published in _blog_posts(config)[:count]
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>模拟博客</title>'
+        f'<link>http://{host}/blog/</link>{items}</channel></rss>'
+    ).encode('utf-8')
+
+
+def blog_sitemap(config, host, part=None):
+    """
+    sitemap：不指定 part 时为索引（posts 为 gzip 压缩的 .xml.gz，pages 为普通 xml），
+    posts 包含全部文章，pages 包含首页
+    """
+    posts = _blog_posts(config)
+    if part == 'posts':
+        urls = ''.join(
+            f'<url><loc>http://{host}/blog/{post_id}</loc><lastmod>{_w3c_date(published)}</lastmod></url>'
+            for post_id, published in posts
+        )
+    elif part == 'pages':
+        urls = f'<url><loc>http://{host}/blog/</loc></url>'
+    else:
+        latest = _w3c_date(posts[0][1]) if posts else _w3c_date(0)
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f'<sitemap><loc>http://{host}/sitemap-posts.xml.gz</loc><lastmod>{latest}</lastmod></sitemap>'
+            f'<sitemap><loc>http://{host}/sitemap-pages.xml</loc><lastmod>{_w3c_date(0)}</lastmod></sitemap>'
+            '</sitemapindex>'
+        ).encode('utf-8')
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f'{urls}</urlset>'
+    ).encode('utf-8')
+
+
+# 受限页面（与真实站点的提示文字一致，供 wespy.blocking.classify_page 识别）
+WECHAT_VERIFY_PAGE = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><title></title></head><body>'
+    '<div class="weui-msg"><h2 class="weui-msg__title">环境异常</h2>'
+    '<p class="weui-msg__desc">当前环境异常，完成验证后即可继续访问。</p>'
+    '<a class="weui-btn weui-btn_primary" id="js_verify">去验证</a></div></body></html>'
+).encode('utf-8')
+WECHAT_DELETED_PAGE = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><title></title></head><body>'
+    '<div class="weui-msg"><p class="weui-msg__title warn">该内容已被发布者删除</p></div></body></html>'
+).encode('utf-8')
+JUEJIN_VERIFY_PAGE = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><title>验证码中间页</title></head>'
+    '<body><div id="captcha_container"></div></body></html>'
+).encode('utf-8')
+JUEJIN_DELETED_PAGE = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><title>掘金</title></head>'
+    '<body><div class="not-found">文章不存在</div></body></html>'
+).encode('utf-8')
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """
+    接口说明（按路径匹配，主机名可以是任意值）:
+        GET /s/<id>                              微信文章
+        GET /mp/appmsgalbum?action=getalbum&...  专辑文章列表（JSON分页）
+        GET /mp/appmsgalbum?...                  专辑页面
+        GET /post/<id>                           掘金文章
+        GET /mock/<name>.png                     文章中的图片
+        POST /content_api/v1/article/query_list  掘金作者文章列表（JSON分页）
+        GET /blog/[?page=N] /blog/<id>          普通博客首页（声明RSS地址，分页列出文章）和文章
+        GET /feed.xml /robots.txt                博客RSS（最新10篇）和 robots.txt（声明sitemap）
+        GET /sitemap.xml /sitemap-<part>.xml[.gz]  sitemap 索引和子 sitemap
+    以 deleted 开头的文章ID返回"文章已删除"页面
+    """
+
+    server_version = "WeSpyMock"
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        # 代理方式下请求行是完整URL，直接访问时只有路径
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        config = self.config
+
+        delay = config.latency + config.jitter * config.roll()
+        if delay:
+            time.sleep(delay / 1000.0)
+        if config.error_rate and config.roll() < config.error_rate:
+            self._send(500, b'mock error', 'text/plain')
+            return
+        if config.throttle_rate and config.roll() < config.throttle_rate:
+            self._send(429, b'too many requests', 'text/plain', {'Retry-After': '1'})
+            return
+
+        path = parsed.path
+        blocked = config.block_rate and config.roll() < config.block_rate
+        if path.startswith(('/s/', '/post/')) and config.take_block():
+            blocked = True
+        if path.startswith('/s/'):
+            article_id = path[len('/s/'):]
+            if blocked:
+                self._send(200, WECHAT_VERIFY_PAGE)
+            elif article_id.startswith('deleted'):
+                self._send(200, WECHAT_DELETED_PAGE)
+            else:
+                self._send(200, wechat_page(config, article_id))
+        elif path.startswith('/post/'):
+            article_id = path[len('/post/'):]
+            if blocked:
+                self._send(200, JUEJIN_VERIFY_PAGE)
+            elif article_id.startswith('deleted'):
+                self._send(200, JUEJIN_DELETED_PAGE)
+            else:
+                self._send(200, juejin_page(config, article_id))
+        elif path == '/mp/appmsgalbum' and query.get('action', [''])[0] == 'getalbum':
+            data = album_page(
+                config,
+                begin_msgid=int(query.get('begin_msgid', ['0'])[0] or 0),
+                count=int(query.get('count', ['10'])[0] or 10),
+                begin_itemidx=int(query.get('begin_itemidx', ['0'])[0] or 0),
+            )
+            self._send(200, json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json')
+        elif path == '/blog/':
+            self._send(200, blog_index(config, page=int(query.get('page', ['1'])[0] or 1)))
+        elif path.startswith('/blog/'):
+            self._send(200, blog_page(config, path[len('/blog/'):]))
+        elif path == '/feed.xml':
+            self._send(200, blog_rss(config, self._host()), 'application/rss+xml')
+        elif path == '/robots.txt':
+            self._send(200, f'User-agent: *\nSitemap: http://{self._host()}/sitemap.xml\n'.encode('utf-8'), 'text/plain')
+        elif path == '/sitemap.xml':
+            self._send(200, blog_sitemap(config, self._host()), 'application/xml')
+        elif path == '/sitemap-posts.xml.gz':
+            self._send(200, gzip.compress(blog_sitemap(config, self._host(), 'posts')), 'application/gzip')
+        elif path == '/sitemap-pages.xml':
+            self._send(200, blog_sitemap(config, self._host(), 'pages'), 'application/xml')
+        elif path.startswith('/mock/') and path.endswith('.png'):
+            self._send(200, mock_image(), 'image/png')
+        elif path == '/mp/appmsgalbum':
+            self._send(200, '<html><body><div class="album">模拟专辑</div></body></html>'.encode('utf-8'))
+        else:
+            self._send(404, b'not found', 'text/plain')
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+        except ValueError:
+            payload = {}
+        config = self.config
+        delay = config.latency + config.jitter * config.roll()
+        if delay:
+            time.sleep(delay / 1000.0)
+        if parsed.path == '/content_api/v1/article/query_list':
+            data = author_page(config, payload.get('user_id', ''), int(payload.get('cursor') or 0))
+            self._send(200, json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json')
+        else:
+            self._send(404, b'not found', 'text/plain')
+
+    def _host(self):
+        return urlparse(self.path).netloc or self.headers.get('Host', '')
+
+    def _send(self, status, body, content_type='text/html', headers=None):
+        config = self.config
+        encoding = config.content_encoding
+        if status == 200 and content_type == 'text/html' and encoding:
+            body = CONTENT_ENCODERS.get(encoding, bytes)(body)
+            headers = dict(headers or {}, **{'Content-Encoding': encoding})
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        try:
+            if status == 200 and config.slow_rate and config.roll() < config.slow_rate:
+                # 慢速响应体：分成若干块，在 slow_ms 内陆续发送
+                chunks = 10
+                step = max(1, len(body) // chunks + 1)
+                for start in range(0, len(body), step):
+                    self.wfile.write(body[start:start + step])
+                    self.wfile.flush()
+                    time.sleep(config.slow_ms / 1000.0 / chunks)
+            else:
+                self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端超时或取消后断开连接，属于正常情况
+            self.close_connection = True
+
+
+# content_encoding 能实际压缩的格式
+CONTENT_ENCODERS = {'gzip': gzip.compress, 'deflate': zlib.compress}
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def create_server(host='127.0.0.1', port=0, config=None):
+    """创建模拟站点服务（不启动），port 为 0 时自动选择端口"""
+    handler = type('BoundMockRequestHandler', (MockRequestHandler,), {'config': config or MockConfig()})
+    return _ThreadingHTTPServer((host, port), handler)
+
+
+def start_background(config=None, host='127.0.0.1', port=0):
+    """
+    在后台线程中启动模拟站点
+
+    Returns:
+        tuple: (server, 代理地址 如 http://127.0.0.1:端口)
+    """
+    server = create_server(host, port, config)
+    thread = threading.Thread(target=server.serve_forever, name='wespy-mockserver', daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def use_proxy(fetcher, proxy):
+    """让 ArticleFetcher 的所有 session 通过模拟站点访问 http:// 地址"""
+    for session in (fetcher.session, fetcher.juejin_fetcher.session, fetcher.album_fetcher.session):
+        session.proxies = {'http': proxy}
+    # 专辑接口改用 http，翻页不再等待
+    fetcher.album_fetcher.API_URL = 'http://mp.weixin.qq.com/mp/appmsgalbum'
+    fetcher.album_fetcher.PAGE_DELAY = 0
+
+
+def add_config_arguments(parser):
+    """模拟站点的行为参数（wespy mockserver 和 wespy loadtest 共用）"""
+    parser.add_argument('--latency', type=float, default=0, help='基础响应延迟（毫秒，默认: 0）')
+    parser.add_argument('--jitter', type=float, default=0, help='随机增加的最大延迟（毫秒，默认: 0）')
+    parser.add_argument('--error-rate', type=float, default=0, help='返回500的概率 (默认: 0)')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='返回429的概率 (默认: 0)')
+    parser.add_argument('--block-rate', type=float, default=0, help='返回"环境异常"验证页面的概率 (默认: 0)')
+    parser.add_argument('--block-first', type=int, default=0, help='最先的若干个文章请求返回验证页面 (默认: 0)')
+    parser.add_argument('--slow-rate', type=float, default=0, help='慢速发送响应体的概率 (默认: 0)')
+    parser.add_argument('--slow-ms', type=float, default=1000, help='慢速响应体的发送时长（毫秒，默认: 1000）')
+    parser.add_argument('--paragraphs', type=int, default=30, help='生成文章的段落数 (默认: 30)')
+    parser.add_argument('--album-size', type=int, default=100, help='专辑中的文章数 (默认: 100)')
+    parser.add_argument('--pages', help='录制的网页目录（.html 文件），代替生成的文章')
+    parser.add_argument('--seed', type=int, help='随机数种子')
+    parser.add_argument('--content-encoding', help='网页响应的 Content-Encoding（gzip/deflate 会实际压缩）')
+
+
+def config_from_args(args):
+    return MockConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        block_rate=args.block_rate,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        paragraphs=args.paragraphs,
+        album_size=args.album_size,
+        pages_dir=args.pages,
+        seed=args.seed,
+        content_encoding=args.content_encoding,
+        block_first=args.block_first,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='wespy mockserver', description='启动本地模拟站点（微信/掘金），用于压测')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8900, help='监听端口 (默认: 8900)')
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = create_server(args.host, args.port, config_from_args(args))
+    print(f"模拟站点已启动，作为HTTP代理使用: http://{args.host}:{args.port}")
+    print(f"示例: http://mp.weixin.qq.com/s/1 、http://juejin.cn/post/1 、"
+          f"http://mp.weixin.qq.com/mp/appmsgalbum?__biz={ALBUM_BIZ}&action=getalbum&album_id={ALBUM_ID}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在停止...")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析前预扫描
+在构建 BeautifulSoup 树之前线性扫描一遍原始HTML，只截取提取器真正会读取的节点
+（正文容器和少量元数据节点），再只对这些片段建树。跳过页面中大段的内联脚本、
+分享组件和评论脚手架，显著减少解析时间和内存
+
+扫描时维护打开标签栈，结束标签的处理方式与 BeautifulSoup(html.parser) 建树一致。
+也可以直接扫描 UTF-8 编码的原始字节，只有截取出的片段需要解码
+"""
+
+import re
+
+# 注释、script/style 原始文本块、普通标签
+_TOKEN_PATTERN = (
+    r'<!--.*?-->'
+    r'|<(script|style)\b(?:[^>"\']|"[^"]*"|\'[^\']*\')*>.*?</\1\s*>'
+    r'|<(/?)([a-zA-Z][a-zA-Z0-9:-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>'
+)
+_TOKEN_RE = re.compile(_TOKEN_PATTERN, re.S | re.I)
+# 扫描字节时使用：标签和属性的分隔符都是ASCII字符，在 UTF-8 的多字节序列中不会出现
+_TOKEN_RE_BYTES = re.compile(_TOKEN_PATTERN.encode('ascii'), re.S | re.I)
+_ATTR_RE = re.compile(r'([^\s=/>]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+))?')
+
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr',
+])
+
+
+class Target:
+    """
+    需要保留的节点
+
+    Args:
+        tag (str): 标签名
+        id (str, optional): 要求 id 等于该值
+        class_ (str, optional): 要求 class 中包含该值
+        all (bool): 保留所有匹配的节点（默认只保留第一个）
+    """
+
+    __slots__ = ('tag', 'id', 'class_', 'all')
+
+    def __init__(self, tag, id=None, class_=None, all=False):
+        self.tag = tag
+        self.id = id
+        self.class_ = class_
+        self.all = all
+
+    def matches(self, name, attrs):
+        if name != self.tag:
+            return False
+        if self.id is not None and attrs.get('id') != self.id:
+            return False
+        if self.class_ is not None and self.class_ not in attrs.get('class', '').split():
+            return False
+        return True
+
+
+def _parse_attrs(attr_text):
+    attrs = {}
+    for name, value in _ATTR_RE.findall(attr_text):
+        name = name.lower()
+        if name in attrs:
+            continue
+        if value[:1] in ('"', "'"):
+            value = value[1:-1]
+        attrs[name] = value
+    return attrs
+
+
+def extract_fragments(html, targets, required=()):
+    """
+    截取目标节点的HTML片段
+
+    Args:
+        html (str | bytes): 原始HTML，或 UTF-8 编码的原始字节
+        targets (list): Target 列表
+        required (tuple): 至少要找到其中一个的 target 下标（通常是正文容器的各种候选）
+
+    Returns:
+        str | bytes: 按原文顺序拼接的片段（类型与 html 相同，嵌套在其他片段中的节点不重复输出），
+            必需节点一个都没找到或有目标节点未闭合时返回 None，调用方应回退到完整解析
+    """
+    is_text = isinstance(html, str)
+    token_re, slash = (_TOKEN_RE, '/') if is_text else (_TOKEN_RE_BYTES, b'/')
+    found = [False] * len(targets)
+    stack = []     # 当前打开的标签名
+    captures = []  # [元素在stack中的位置, 标签名, 起始位置, 命中的target下标]
+    spans = []
+
+    for match in token_re.finditer(html):
+        name = match.group(3)
+        if name is None:
+            # 注释或 script/style 块
+            continue
+        name = (name if is_text else name.decode('ascii')).lower()
+        attr_text = match.group(4)
+
+        if match.group(2):
+            # 结束标签：与 BeautifulSoup 一致，弹出到最近的同名标签，没有同名标签时忽略
+            for depth in range(len(stack) - 1, -1, -1):
+                if stack[depth] == name:
+                    break
+            else:
+                continue
+            while captures and captures[-1][0] >= depth:
+                capture = captures.pop()
+                if capture[0] == depth:
+                    spans.append((capture[2], match.end(), ''))
+                else:
+                    # 被外层结束标签隐式关闭，补上它及其内部仍打开的结束标签，使片段可以独立解析
+                    closing = ''.join(f"</{open_name}>" for open_name in reversed(stack[capture[0]:]))
+                    spans.append((capture[2], match.start(), closing))
+                for index in capture[3]:
+                    found[index] = True
+            del stack[depth:]
+            continue
+
+        if name in VOID_ELEMENTS or attr_text.rstrip().endswith(slash):
+            continue
+
+        stack.append(name)
+        attrs = None
+        hits = []
+        for index, target in enumerate(targets):
+            if target.tag != name or (found[index] and not target.all):
+                continue
+            if attrs is None:
+                attrs = _parse_attrs(attr_text if is_text else attr_text.decode('utf-8', 'replace'))
+            if target.matches(name, attrs):
+                hits.append(index)
+        if hits:
+            # 首个匹配在闭合前就标记，避免同一个"只取第一个"的目标被重复截取
+            for index in hits:
+                if not targets[index].all:
+                    found[index] = True
+            captures.append([len(stack) - 1, name, match.start(), hits])
+
+    # 目标节点直到文档结束都未闭合时，交给完整解析处理
+    if captures:
+        return None
+    if required and not any(found[index] for index in required):
+        return None
+
+    spans.sort()
+    # 字节通过 memoryview 切片，拼接时只复制一次
+    source = html if is_text else memoryview(html)
+    pieces = []
+    last_end = -1
+    for start, end, closing in spans:
+        if start >= last_end:
+            pieces.append(source[start:end])
+            if closing:
+                pieces.append(closing if is_text else closing.encode('ascii'))
+            last_end = end
+    return ''.join(pieces) if is_text else b''.join(pieces)
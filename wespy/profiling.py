@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段性能分析
+把一次运行按 下载(fetch) / 解析(parse) / 序列化(serialize) / 转换(convert) / 保存(save) 各阶段分别统计，
+CPU 模式为每个阶段单独运行 cProfile，内存模式用 tracemalloc 记录每个阶段新增的内存分配，
+结果写入输出目录下的 profile_<模式>_<时间戳>/ 目录
+
+    wespy "https://mp.weixin.qq.com/s/xxxxx" --profile cpu
+
+    from wespy.profiling import Profiler
+    with Profiler('mem', 'articles') as profiler:
+        fetcher.fetch_article(url)
+    print(profiler.report_dir)
+
+代码中用 stage('parse') 或 @staged('parse') 标记阶段；没有启用分析时 stage() 几乎没有开销。
+cProfile 和 tracemalloc 快照只针对启动分析的线程，其他线程只统计各阶段耗时；
+命令行启用 --profile 时批量/专辑下载改为单线程处理，所有文章都在该线程中执行
+"""
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+PROFILE_MODES = ('cpu', 'mem')
+STAGES = ('fetch', 'parse', 'serialize', 'convert', 'save')
+
+# 当前启用的分析器（同一时间只有一个）
+_active = None
+
+
+class _NoopStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+def stage(name):
+    """
+    标记一个阶段，用法: with stage('parse'): ...
+
+    Args:
+        name (str): 阶段名，通常为 STAGES 之一；同名阶段的统计会累加
+    """
+    profiler = _active
+    if profiler is None:
+        return _NOOP_STAGE
+    return _Stage(profiler, name)
+
+
+def staged(name):
+    """装饰器：把整个函数标记为一个阶段"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit(self.name)
+        return False
+
+
+class _StageStats:
+    """单个阶段的累计统计"""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.profile = None
+        # 内存模式: 按代码行累计的净分配 {行: [字节数, 块数]}，以及阶段内的峰值
+        self.allocations = {}
+        self.peak = 0
+
+
+class Profiler:
+    """
+    分阶段性能分析器，可用作上下文管理器
+
+    Args:
+        mode (str): 'cpu' 或 'mem'
+        output_dir (str): 输出目录，分析结果写入其中的 profile_<模式>_<时间戳>/
+        top (int): 报告中每个阶段列出的函数/代码行数量
+    """
+
+    def __init__(self, mode, output_dir='articles', top=25):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"不支持的分析模式: {mode}")
+        self.mode = mode
+        self.output_dir = output_dir
+        self.top = top
+        self.report_dir = None
+        self.stages = {}
+        self._thread = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+        self._start_time = None
+        self._elapsed = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self):
+        global _active
+        if _active is not None:
+            raise RuntimeError("已有正在运行的分析器")
+        self._thread = threading.get_ident()
+        if self.mode == 'mem' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._start_time = time.perf_counter()
+        _active = self
+
+    def stop(self):
+        """停止分析并写入报告，返回报告目录"""
+        global _active
+        if _active is not self:
+            return self.report_dir
+        _active = None
+        self._elapsed = time.perf_counter() - self._start_time
+        try:
+            self.report_dir = self._write_report()
+        finally:
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        print(f"性能分析结果已保存: {self.report_dir}")
+        return self.report_dir
+
+    def _stats(self, name):
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = _StageStats(name)
+            return stats
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, name):
+        stack = self._stack()
+        frame = [name, time.perf_counter(), None]
+        if threading.get_ident() == self._thread:
+            # 嵌套阶段：先暂停外层阶段的分析，各阶段的统计互不包含
+            if stack:
+                self._pause(stack[-1])
+            frame[2] = self._resume(name)
+        stack.append(frame)
+
+    def _exit(self, name):
+        stack = self._stack()
+        if not stack or stack[-1][0] != name:
+            return
+        _, started, token = stack.pop()
+        stats = self._stats(name)
+        with self._lock:
+            stats.calls += 1
+            stats.seconds += time.perf_counter() - started
+        if threading.get_ident() == self._thread:
+            self._pause([name, started, token])
+            if stack:
+                stack[-1][2] = self._resume(stack[-1][0])
+
+    def _resume(self, name):
+        """开始（或继续）统计某个阶段，返回暂停时需要的状态"""
+        stats = self._stats(name)
+        if self.mode == 'cpu':
+            if stats.profile is None:
+                stats.profile = cProfile.Profile()
+            stats.profile.enable()
+            return None
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        return self._snapshot()
+
+    def _pause(self, frame):
+        name, _, token = frame
+        stats = self._stats(name)
+        if self.mode == 'cpu':
+            if stats.profile is not None:
+                stats.profile.disable()
+            return
+        if token is None:
+            return
+        stats.peak = max(stats.peak, tracemalloc.get_traced_memory()[1])
+        for diff in self._snapshot().compare_to(token, 'lineno'):
+            if not diff.size_diff:
+                continue
+            entry = stats.allocations.setdefault(str(diff.traceback[0]), [0, 0])
+            entry[0] += diff.size_diff
+            entry[1] += diff.count_diff
+
+    @staticmethod
+    def _snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        ))
+
+    def _ordered_stages(self):
+        known = [self.stages[name] for name in STAGES if name in self.stages]
+        return known + [stats for name, stats in sorted(self.stages.items()) if name not in STAGES]
+
+    def _write_report(self):
+        report_dir = os.path.join(self.output_dir, f"profile_{self.mode}_{time.strftime('%Y%m%d_%H%M%S')}")
+        os.makedirs(report_dir, exist_ok=True)
+
+        lines = [
+            f"模式: {self.mode}",
+            f"总耗时: {self._elapsed:.3f} 秒",
+            "",
+            f"{'阶段':<10}{'次数':>8}{'耗时(秒)':>12}{'平均(毫秒)':>14}",
+        ]
+        for stats in self._ordered_stages():
+            average = stats.seconds / stats.calls * 1000 if stats.calls else 0
+            lines.append(f"{stats.name:<10}{stats.calls:>8}{stats.seconds:>12.3f}{average:>14.1f}")
+        lines.append("（嵌套阶段的耗时同时计入外层阶段，例如 convert 计入 save）")
+        if self.mode == 'mem':
+            lines.append("（内存模式下的耗时包含 tracemalloc 快照的开销，只适合相互比较）")
+
+        for stats in self._ordered_stages():
+            lines.append("")
+            lines.append(f"===== {stats.name} =====")
+            if self.mode == 'cpu':
+                lines.extend(self._cpu_section(stats, report_dir))
+            else:
+                lines.extend(self._mem_section(stats))
+
+        name = 'summary.txt' if self.mode == 'cpu' else 'memory.txt'
+        with open(os.path.join(report_dir, name), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        return report_dir
+
+    def _cpu_section(self, stats, report_dir):
+        if stats.profile is None:
+            return ["（该阶段没有在主线程中执行，只有耗时统计）"]
+        # 每个阶段单独保存，可用 python -m pstats 或 snakeviz 等工具查看
+        stats.profile.dump_stats(os.path.join(report_dir, f"{stats.name}.pstats"))
+        stream = io.StringIO()
+        pstats.Stats(stats.profile, stream=stream).sort_stats('cumulative').print_stats(self.top)
+        return [f"文件: {stats.name}.pstats", stream.getvalue().strip()]
+
+    def _mem_section(self, stats):
+        if not stats.allocations:
+            return ["（该阶段没有在主线程中执行，或没有留下新的内存分配）"]
+        lines = [
+            f"阶段内已跟踪内存的峰值: {stats.peak / 1024:.1f} KB",
+            f"净分配合计: {sum(size for size, _ in stats.allocations.values()) / 1024:.1f} KB",
+            f"{'净分配(KB)':>12}{'块数':>10}  代码位置",
+        ]
+        ordered = sorted(stats.allocations.items(), key=lambda item: -abs(item[1][0]))
+        for location, (size, count) in ordered[:self.top]:
+            lines.append(f"{size / 1024:>12.1f}{count:>10}  {location}")
+        return lines
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线重新生成Markdown
+转换器改进后，用 --html 保存过的原始网页重新提取正文并转换，覆盖旧的 .md 文件，不访问网络
+
+目录下会生成 .wespy-rerender.json 清单，记录每个文件的源文件哈希和转换器版本，
+两者都没有变化的文件在下次运行时直接跳过
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from wespy.images import local_images, use_local_images
+from wespy.writer import OutputWriter
+
+MANIFEST_NAME = '.wespy-rerender.json'
+
+_URL_LINE_RE = re.compile(r'^\*\*原文链接\*\*: (\S+)', re.M)
+
+# 每个工作进程各自持有一个 ArticleFetcher
+_fetcher = None
+
+
+def _get_fetcher():
+    global _fetcher
+    if _fetcher is None:
+        from wespy.main import ArticleFetcher
+        _fetcher = ArticleFetcher()
+    return _fetcher
+
+
+def _read_mapped(path, digest=None):
+    """用内存映射读取整个文件并解码，同时更新哈希；文件不存在时返回 None"""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ''
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if digest is not None:
+                digest.update(data)
+            return str(data, 'utf-8', 'replace')
+
+
+def find_sources(directory):
+    """
+    查找目录（含子目录）下保存的HTML文件
+
+    Returns:
+        list: (html路径, _info.json路径, .md路径) 元组，按路径排序
+    """
+    sources = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith('.html') or name.startswith('.'):
+                continue
+            stem = os.path.join(root, name[:-len('.html')])
+            sources.append((stem + '.html', stem + '_info.json', stem + '.md'))
+    return sources
+
+
+def _guess_site(fetcher, url, html):
+    """根据URL判断站点；没有URL时根据页面特征判断"""
+    if url:
+        return fetcher._detect_site(url)
+    if 'id="js_content"' in html:
+        return 'wechat'
+    if 'juejin.cn' in html and 'article-root' in html:
+        return 'juejin'
+    return 'general'
+
+
+def render_markdown(fetcher, url, html, output_dir=None):
+    """
+    从保存的原始网页重新生成Markdown，内容与下载时保存的 .md 格式一致
+
+    Args:
+        fetcher: ArticleFetcher 实例
+        url (str): 文章URL（未知时为空字符串）
+        html (str): 原始网页HTML
+        output_dir (str, optional): 文章所在目录；其中 images/ 下已保存的图片（--images）继续引用本地文件
+
+    Returns:
+        str: 完整的Markdown文档
+    """
+    site = _guess_site(fetcher, url, html)
+    article = fetcher._parse_article(url, site, html)
+    mapping = local_images(output_dir, article.content_html) if output_dir else {}
+    with use_local_images(mapping):
+        return _render_article(fetcher, url, site, article)
+
+
+def _render_article(fetcher, url, site, article):
+    if site != 'juejin':
+        return article.markdown
+
+    # 掘金文章下载时使用掘金自己的转换器，这里保持一致
+    parts = [
+        f"# {article.title}\n\n",
+        f"**作者**: {article.author}\n",
+        f"**发布时间**: {article.publish_time}\n",
+    ]
+    if article.view_count:
+        parts.append(f"**阅读量**: {article.view_count}\n")
+    if article.tags:
+        parts.append(f"**标签**: {', '.join(article.tags)}\n")
+    parts.append(f"**原文链接**: {url}\n\n")
+    parts.append("---\n\n")
+    parts.append(fetcher.juejin_fetcher._convert_to_markdown(article.content_html))
+    return ''.join(parts)
+
+
+def rerender_one(task):
+    """
+    重新生成单个文件（在工作进程中执行）
+
+    Args:
+        task (tuple): (html路径, _info.json路径, .md路径, 清单中的旧记录, 转换器版本, 是否强制)
+
+    Returns:
+        tuple: (.md路径, 状态 'rendered'/'skipped'/'failed', 新的清单记录或错误信息)
+    """
+    html_path, info_path, md_path, previous, version, force = task
+    try:
+        digest = hashlib.sha1()
+        html = _read_mapped(html_path, digest)
+        info_text = _read_mapped(info_path, digest)
+        record = {'source': digest.hexdigest(), 'converter': version}
+        if not force and previous == record and os.path.exists(md_path):
+            return md_path, 'skipped', record
+
+        url = ''
+        if info_text:
+            url = json.loads(info_text).get('url') or ''
+        if not url:
+            # 没有保存 _info.json 时，从旧的Markdown头部取回原文链接
+            old_markdown = _read_mapped(md_path)
+            match = _URL_LINE_RE.search(old_markdown or '')
+            if match:
+                url = match.group(1)
+
+        fetcher = _get_fetcher()
+        markdown = render_markdown(fetcher, url, html, os.path.dirname(md_path))
+        fetcher.writer.write_text(md_path, markdown)
+        return md_path, 'rendered', record
+    except Exception as e:
+        return md_path, 'failed', str(e)
+
+
+def rerender_directory(directory, jobs=None, force=False):
+    """
+    重新生成目录下所有Markdown文件
+
+    Args:
+        directory (str): 保存文章的目录
+        jobs (int, optional): 工作进程数，默认为CPU核数；1 表示在当前进程中执行
+        force (bool): 忽略清单，全部重新生成
+
+    Returns:
+        dict: 各状态的文件数 {'rendered': n, 'skipped': n, 'failed': n}
+    """
+    from wespy.main import CONVERTER_VERSION
+
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+    files = manifest.setdefault('files', {})
+
+    tasks = []
+    for html_path, info_path, md_path in find_sources(directory):
+        key = os.path.relpath(md_path, directory)
+        tasks.append((html_path, info_path, md_path, files.get(key), CONVERTER_VERSION, force))
+
+    counts = {'rendered': 0, 'skipped': 0, 'failed': 0}
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) <= 1:
+        results = map(rerender_one, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        # 每次派发一批文件，减少进程间通信次数
+        results = executor.map(rerender_one, tasks, chunksize=max(1, min(64, len(tasks) // (jobs * 4))))
+
+    try:
+        for md_path, status, detail in results:
+            counts[status] += 1
+            key = os.path.relpath(md_path, directory)
+            if status == 'failed':
+                print(f"重新生成失败: {md_path}: {detail}")
+                files.pop(key, None)
+            else:
+                files[key] = detail
+                if status == 'rendered':
+                    print(f"已重新生成: {md_path}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        # 中途中断时也保存已完成部分的记录
+        manifest['converter'] = CONVERTER_VERSION
+        manifest['updated'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        OutputWriter().write_text(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2))
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='wespy rerender', description='用已保存的HTML离线重新生成Markdown')
+    parser.add_argument('directory', help='保存文章的目录（含子目录）')
+    parser.add_argument('-j', '--jobs', type=int, help='工作进程数 (默认: CPU核数)')
+    parser.add_argument('--force', action='store_true', help='忽略清单，全部重新生成')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"目录不存在: {args.directory}")
+
+    start = time.time()
+    counts = rerender_directory(args.directory, jobs=args.jobs, force=args.force)
+    print(f"\n完成: 重新生成 {counts['rendered']} 篇，跳过 {counts['skipped']} 篇，"
+          f"失败 {counts['failed']} 篇，用时 {time.time() - start:.1f} 秒")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按主机公平调度
+批量任务按主机分成多个队列，轮流从各主机取任务，并限制每个主机同时执行的任务数；
+某个站点变慢或被限流时只有它自己的队列在等待，其他站点的文章照常下载
+
+    scheduler = HostScheduler(capacity=limiter.limit)
+    for i, url in enumerate(urls):
+        scheduler.add(i, url, url, priority=0)
+    job = scheduler.next()      # 没有可以开始的任务时返回 None
+    ...
+    scheduler.done(job)         # 或 scheduler.retry(job)：受限未完成，放回队列稍后重试
+
+同一主机内按优先级（数值越大越先）和加入顺序排队，不同主机之间优先级高的先开始，
+优先级相同时轮流。调度器只在调度线程中使用，不是线程安全的
+"""
+
+import heapq
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+
+class Job:
+    """调度中的一个任务"""
+
+    def __init__(self, index, item, url, host, priority, seq):
+        self.index = index
+        self.item = item
+        self.url = url
+        self.host = host
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        # 已经放回队列重试的次数
+        self.retries = 0
+
+    def __lt__(self, other):
+        return (-self.priority, self.seq) < (-other.priority, other.seq)
+
+
+class _HostStats:
+    def __init__(self):
+        self.done = 0
+        self.retried = 0
+        self.waits = []
+        self.busy = 0.0
+        self.first_start = None
+        self.last_done = None
+
+
+class HostScheduler:
+    """
+    按主机分队列、轮流取任务的调度器
+
+    Args:
+        capacity (function): capacity(主机名) 返回该主机当前允许同时执行的任务数，
+            返回 0 表示暂停该主机（例如熔断中）；默认每个主机不限
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self._queues = {}
+        self._rotation = deque()
+        self._in_flight = {}
+        self._stats = {}
+        self._seq = 0
+
+    def add(self, index, item, url, priority=0):
+        """
+        加入任务
+
+        Args:
+            index (int): 任务在原列表中的位置
+            item: 任务内容，原样返回给调用方
+            url (str): 用于确定主机的地址
+            priority (int): 优先级，数值越大越先开始
+        """
+        host = urlparse(url).hostname or ''
+        self._seq += 1
+        job = Job(index, item, url, host, priority, self._seq)
+        self._push(job)
+        return job
+
+    def _push(self, job):
+        queue = self._queues.get(job.host)
+        if queue is None:
+            queue = self._queues[job.host] = []
+            self._rotation.append(job.host)
+            self._stats.setdefault(job.host, _HostStats())
+        heapq.heappush(queue, job)
+
+    def pending(self):
+        """尚未开始的任务数"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def in_flight(self):
+        return sum(self._in_flight.values())
+
+    def next(self):
+        """
+        取出下一个可以开始的任务：在未达到并发上限的主机中选队首优先级最高的，
+        优先级相同时按轮转顺序
+
+        Returns:
+            Job: 任务，所有主机都没有任务或都已达到上限时返回 None
+        """
+        best = None
+        for host in self._rotation:
+            queue = self._queues[host]
+            # 不同主机之间只比较优先级，相同时保持轮转顺序
+            if best is not None and queue[0].priority <= best[0].priority:
+                continue
+            limit = self.capacity(host) if self.capacity is not None else None
+            if limit is not None and self._in_flight.get(host, 0) >= limit:
+                continue
+            best = (queue[0], host)
+        if best is None:
+            return None
+
+        host = best[1]
+        queue = self._queues[host]
+        job = heapq.heappop(queue)
+        # 被选中的主机移到轮转末尾
+        self._rotation.remove(host)
+        if queue:
+            self._rotation.append(host)
+        else:
+            del self._queues[host]
+
+        job.started_at = time.monotonic()
+        self._in_flight[host] = self._in_flight.get(host, 0) + 1
+        stats = self._stats[host]
+        stats.waits.append(job.started_at - job.enqueued_at)
+        if stats.first_start is None:
+            stats.first_start = job.started_at
+        return job
+
+    def done(self, job):
+        """任务结束（无论成功与否）"""
+        now = time.monotonic()
+        self._in_flight[job.host] -= 1
+        stats = self._stats[job.host]
+        stats.done += 1
+        stats.busy += now - job.started_at
+        stats.last_done = now
+
+    def retry(self, job):
+        """
+        任务没有完成（如遇到限流或验证页面），放回该主机队列中相同优先级的末尾；
+        capacity 返回 0 期间（熔断中）不会再取出，冷却结束后重新开始
+        """
+        now = time.monotonic()
+        self._in_flight[job.host] -= 1
+        stats = self._stats[job.host]
+        stats.retried += 1
+        stats.busy += now - job.started_at
+        self._seq += 1
+        job.seq = self._seq
+        job.retries += 1
+        job.enqueued_at = now
+        job.started_at = None
+        self._push(job)
+
+    def drain(self):
+        """取出所有尚未开始的任务（按原列表顺序），用于任务提前停止时"""
+        jobs = [job for queue in self._queues.values() for job in queue]
+        self._queues.clear()
+        self._rotation.clear()
+        return sorted(jobs, key=lambda job: job.index)
+
+    def snapshot(self):
+        """各主机完成的任务数、吞吐量（篇/秒）和排队等待时间（秒）"""
+        result = {}
+        for host, stats in self._stats.items():
+            waits = sorted(stats.waits)
+            span = (stats.last_done - stats.first_start) if stats.last_done is not None else 0
+            result[host] = {
+                'done': stats.done,
+                'pending': len(self._queues.get(host, ())),
+                'retried': stats.retried,
+                'per_sec': round(stats.done / span, 2) if span > 0 else None,
+                'avg_seconds': round(stats.busy / stats.done, 3) if stats.done else None,
+                'wait_avg': round(sum(waits) / len(waits), 3) if waits else None,
+                'wait_p95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+                'wait_max': round(waits[-1], 3) if waits else None,
+            }
+        return result
+
+    @staticmethod
+    def format(snapshot):
+        """把 snapshot() 的结果格式化为每个主机一行"""
+        lines = []
+        for host, info in sorted(snapshot.items()):
+            line = f"{host or '(无主机)'}: 完成 {info['done']} 篇"
+            if info['per_sec'] is not None:
+                line += f"，{info['per_sec']} 篇/秒"
+            if info['wait_avg'] is not None:
+                line += f"，排队 平均 {info['wait_avg']} 秒 / p95 {info['wait_p95']} 秒 / 最长 {info['wait_max']} 秒"
+            if info['retried']:
+                line += f"，受限重试 {info['retried']} 次"
+            if info['pending']:
+                line += f"，未开始 {info['pending']} 篇"
+            lines.append(line)
+        return lines
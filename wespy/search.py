@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全文搜索索引
+对输出目录中的Markdown文章建立 SQLite FTS5 索引，可以按正文、标题、作者、标签和所属专辑搜索
+
+FTS5 自带的 unicode61 分词器会把连续的中日韩文字当成一个词，无法搜索其中的片段。
+这里在写入和查询前把中日韩文字切成重叠的二元组（"数据库" -> "数据 据库"），
+查询时按短语匹配相邻的二元组；写入时每段的最后一个字另外作为单字保存（"数据 据库 库"），
+单个汉字按前缀匹配，位于段末时也能命中，任意长度的中文片段都能找到
+
+    wespy index articles            # 建立/增量更新索引（只处理新增或改动过的文件）
+    wespy search 数据库 -d articles  # 搜索
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+INDEX_NAME = '.wespy-index.db'
+
+# 索引格式版本，分词方式改变时加一，旧索引会自动重建
+SCHEMA_VERSION = 2
+
+# 可以用 "列名:词" 限定搜索范围的列，以及 bm25 排序时各列的权重
+COLUMNS = ('title', 'author', 'tags', 'album', 'content')
+COLUMN_WEIGHTS = (10.0, 5.0, 5.0, 2.0, 1.0)
+
+# 平假名/片假名、CJK统一汉字（含扩展A和兼容汉字）、韩文音节
+_CJK_RUN_RE = re.compile('[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+')
+_HEADER_FIELDS = {
+    '**作者**: ': 'author',
+    '**发布时间**: ': 'publish_time',
+    '**标签**: ': 'tags',
+    '**原文链接**: ': 'url',
+}
+_COMMIT_EVERY = 500
+
+
+def _bigrams(run):
+    if len(run) == 1:
+        return f' {run} '
+    return ' ' + ' '.join(run[i:i + 2] for i in range(len(run) - 1)) + ' '
+
+
+def _index_tokens(match):
+    run = match.group()
+    if len(run) == 1:
+        return f' {run} '
+    # 段末的字不是任何二元组的开头，另外保存为单字，查询单个汉字时才能按前缀命中
+    return _bigrams(run) + run[-1] + ' '
+
+
+def segment(text, query=False):
+    """
+    把文本中的中日韩文字切成重叠的二元组，其余文字保持不变（交给 unicode61 分词）
+
+    Args:
+        text (str): 文本
+        query (bool): 用于查询时不追加段末的单字，多字片段按相邻二元组的短语匹配
+    """
+    return _CJK_RUN_RE.sub(lambda match: _bigrams(match.group()) if query else _index_tokens(match), text or '')
+
+
+def build_query(text):
+    """
+    把用户输入转换为 FTS5 查询
+
+    空格分隔的各个词之间为 AND 关系；"title:xxx" 只在指定列中搜索；
+    英文词末尾的 * 表示前缀匹配；单个汉字按前缀匹配以它开头的二元组和段末的单字
+
+    Returns:
+        str: FTS5 MATCH 表达式，没有有效的词时返回空字符串
+    """
+    expressions = []
+    for term in text.split():
+        column = None
+        if ':' in term:
+            name, rest = term.split(':', 1)
+            if name in COLUMNS and rest:
+                column, term = name, rest
+
+        prefix = term.endswith('*')
+        term = term.rstrip('*')
+        tokens = segment(term, query=True).split()
+        if not tokens:
+            continue
+        if len(tokens) == 1 and len(tokens[0]) == 1 and _CJK_RUN_RE.match(tokens[0]):
+            prefix = True
+
+        expression = '"' + ' '.join(tokens).replace('"', '""') + '"'
+        if prefix:
+            expression += '*'
+        if column:
+            expression = f"{column} : {expression}"
+        expressions.append(expression)
+    return ' AND '.join(expressions)
+
+
+def parse_markdown(text):
+    """
+    从保存的Markdown文件中取出元数据头部和正文
+
+    Returns:
+        dict: title / author / publish_time / tags / url / content
+    """
+    head, separator, body = text.partition('\n---\n\n')
+    if not separator:
+        head, body = '', text
+
+    info = {'title': '', 'author': '', 'publish_time': '', 'tags': '', 'url': '', 'content': body}
+    for line in head.splitlines():
+        if line.startswith('# ') and not info['title']:
+            info['title'] = line[2:].strip()
+            continue
+        for label, key in _HEADER_FIELDS.items():
+            if line.startswith(label):
+                info[key] = line[len(label):].strip()
+                break
+    return info
+
+
+class SearchIndex:
+    """
+    输出目录的全文索引
+
+    Args:
+        path (str): 索引数据库路径
+        root (str, optional): 文章所在的根目录，索引中保存相对于它的路径；默认为数据库所在目录
+    """
+
+    def __init__(self, path, root=None):
+        self.path = path
+        self.root = os.path.abspath(root or os.path.dirname(path) or '.')
+        self._lock = threading.Lock()
+        self._pending = 0
+        # 专辑目录名 -> 专辑URL
+        self.albums = {}
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            # 分词方式已改变，旧索引作废
+            self.conn.execute('DROP TABLE IF EXISTS articles_fts')
+            self.conn.execute('DROP TABLE IF EXISTS articles')
+        try:
+            self.conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts
+                USING fts5(title, author, tags, album, content)
+            ''')
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"当前Python自带的SQLite不支持FTS5，无法建立全文索引: {e}")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                url TEXT,
+                title TEXT,
+                author TEXT,
+                publish_time TEXT,
+                tags TEXT,
+                album TEXT,
+                mtime_ns INTEGER,
+                size INTEGER,
+                hash TEXT
+            )
+        ''')
+        self.conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+        self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def _relpath(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root)
+
+    def add_markdown(self, path, text, album=None, mtime_ns=None, size=None, digest=None):
+        """
+        添加或更新一篇文章（保存文章时调用）
+
+        Args:
+            path (str): Markdown文件路径
+            text (str): Markdown内容
+            album (str, optional): 所属专辑，默认根据所在的 album_xxx 目录和 register_album() 的记录确定
+            mtime_ns (int, optional): 文件修改时间；保存时文件可能还在后台写入，可以不传，
+                下次 update() 时按内容哈希确认后补上
+            size (int, optional): 文件字节数
+            digest (str, optional): 内容的 sha1，未传时根据 text 计算
+        """
+        data = None
+        if digest is None or size is None:
+            data = text.encode('utf-8')
+        if digest is None:
+            digest = hashlib.sha1(data).hexdigest()
+        if size is None:
+            size = len(data)
+
+        info = parse_markdown(text)
+        rel = self._relpath(path)
+        if album is None:
+            album = self._album_for(rel, self.albums)
+        values = (info['url'], info['title'], info['author'], info['publish_time'], info['tags'], album or '', mtime_ns, size, digest)
+        fts_values = (segment(info['title']), segment(info['author']), segment(info['tags']), segment(album or ''), segment(info['content']))
+
+        with self._lock:
+            row = self.conn.execute('SELECT id FROM articles WHERE path = ?', (rel,)).fetchone()
+            if row:
+                self.conn.execute(
+                    'UPDATE articles SET url=?, title=?, author=?, publish_time=?, tags=?, album=?, mtime_ns=?, size=?, hash=? WHERE id=?',
+                    values + (row[0],),
+                )
+                self.conn.execute('DELETE FROM articles_fts WHERE rowid = ?', (row[0],))
+                rowid = row[0]
+            else:
+                cursor = self.conn.execute(
+                    'INSERT INTO articles (url, title, author, publish_time, tags, album, mtime_ns, size, hash, path) VALUES (?,?,?,?,?,?,?,?,?,?)',
+                    values + (rel,),
+                )
+                rowid = cursor.lastrowid
+            self.conn.execute(
+                'INSERT INTO articles_fts (rowid, title, author, tags, album, content) VALUES (?,?,?,?,?,?)',
+                (rowid,) + fts_values,
+            )
+            self._pending += 1
+            if self._pending >= _COMMIT_EVERY:
+                self.conn.commit()
+                self._pending = 0
+
+    def register_album(self, album_name, album_url):
+        """记录专辑目录对应的专辑URL，之后保存到该目录的文章都会带上专辑信息"""
+        self.albums[album_name] = album_url
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+            self._pending = 0
+
+    def remove(self, rel_paths):
+        """按相对路径删除文章"""
+        with self._lock:
+            for rel in rel_paths:
+                row = self.conn.execute('SELECT id FROM articles WHERE path = ?', (rel,)).fetchone()
+                if row:
+                    self.conn.execute('DELETE FROM articles_fts WHERE rowid = ?', (row[0],))
+                    self.conn.execute('DELETE FROM articles WHERE id = ?', (row[0],))
+            self.conn.commit()
+
+    def update(self, rebuild=False):
+        """
+        扫描根目录，增量更新索引
+
+        修改时间和大小都没变的文件直接跳过；有变化时比较内容哈希，内容相同只更新文件状态，
+        不重新分词；已删除的文件从索引中移除
+
+        Args:
+            rebuild (bool): 清空后全部重新索引
+
+        Returns:
+            dict: {'added', 'updated', 'unchanged', 'removed'} 各自的文件数
+        """
+        if rebuild:
+            with self._lock:
+                self.conn.execute('DELETE FROM articles_fts')
+                self.conn.execute('DELETE FROM articles')
+                self.conn.commit()
+
+        with self._lock:
+            known = {
+                row[0]: row[1:]
+                for row in self.conn.execute('SELECT path, mtime_ns, size, hash FROM articles')
+            }
+        self.albums.update(self._load_album_urls())
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+        seen = set()
+
+        for directory, dirs, files in os.walk(self.root):
+            dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+            for name in sorted(files):
+                if not name.endswith('.md') or name.startswith('.'):
+                    continue
+                path = os.path.join(directory, name)
+                rel = self._relpath(path)
+                seen.add(rel)
+                stat = os.stat(path)
+                previous = known.get(rel)
+                if previous and previous[0] == stat.st_mtime_ns and previous[1] == stat.st_size:
+                    counts['unchanged'] += 1
+                    continue
+
+                with open(path, 'rb') as f:
+                    data = f.read()
+                digest = hashlib.sha1(data).hexdigest()
+                if previous and previous[2] == digest:
+                    # 内容没变（例如保存时刚写入的文件），只记下文件状态
+                    with self._lock:
+                        self.conn.execute('UPDATE articles SET mtime_ns=?, size=? WHERE path=?', (stat.st_mtime_ns, stat.st_size, rel))
+                    counts['unchanged'] += 1
+                    continue
+
+                self.add_markdown(
+                    path, data.decode('utf-8', 'replace'),
+                    mtime_ns=stat.st_mtime_ns, size=stat.st_size, digest=digest,
+                )
+                counts['updated' if previous else 'added'] += 1
+
+        removed = [rel for rel in known if rel not in seen]
+        if removed:
+            self.remove(removed)
+        counts['removed'] = len(removed)
+        self.commit()
+        return counts
+
+    def _load_album_urls(self):
+        """读取专辑汇总文件（album_xxx_summary.json），得到专辑目录名 -> 专辑URL"""
+        albums = {}
+        for directory, dirs, files in os.walk(self.root):
+            dirs[:] = [name for name in dirs if not name.startswith('.')]
+            for name in files:
+                if name.startswith('album_') and name.endswith('_summary.json'):
+                    try:
+                        with open(os.path.join(directory, name), encoding='utf-8') as f:
+                            albums[name[:-len('_summary.json')]] = json.load(f).get('album_url', '')
+                    except (OSError, ValueError):
+                        continue
+        return albums
+
+    @staticmethod
+    def _album_for(rel, albums):
+        """专辑文章保存在 album_xxx 目录中，以目录名和专辑URL作为专辑字段"""
+        parts = rel.replace(os.sep, '/').split('/')
+        for part in parts[:-1]:
+            if part.startswith('album_'):
+                return album_label(part, albums.get(part, ''))
+        return ''
+
+    def search(self, query, limit=20):
+        """
+        搜索文章
+
+        Args:
+            query (str): 查询词，见 build_query()
+            limit (int): 最多返回的结果数
+
+        Returns:
+            list: 按相关度排序的结果字典（path 为绝对路径）
+        """
+        expression = build_query(query)
+        if not expression:
+            return []
+        weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+        with self._lock:
+            rows = self.conn.execute(f'''
+                SELECT a.path, a.title, a.author, a.publish_time, a.url, a.tags, a.album,
+                       bm25(articles_fts, {weights}) AS score
+                FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid
+                WHERE articles_fts MATCH ?
+                ORDER BY score
+                LIMIT ?
+            ''', (expression, limit)).fetchall()
+
+        keys = ('path', 'title', 'author', 'publish_time', 'url', 'tags', 'album', 'score')
+        results = []
+        for row in rows:
+            result = dict(zip(keys, row))
+            result['path'] = os.path.join(self.root, result['path'])
+            results.append(result)
+        return results
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+
+def album_label(album_name, album_url=''):
+    """专辑字段的内容：专辑目录名和专辑URL"""
+    return f"{album_name} {album_url}".strip()
+
+
+def make_snippet(path, query, width=60):
+    """从Markdown文件中截取第一个命中词附近的文字，用于显示搜索结果"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            body = parse_markdown(f.read())['content']
+    except OSError:
+        return ''
+    lowered = body.lower()
+    position = -1
+    for term in query.split():
+        term = term.split(':', 1)[-1].rstrip('*').lower()
+        if term:
+            position = lowered.find(term)
+            if position >= 0:
+                break
+    start = max(0, position - width // 3) if position >= 0 else 0
+    snippet = ' '.join(body[start:start + width].split())
+    return ('...' if start > 0 else '') + snippet + '...'
+
+
+def _default_db(directory, db):
+    return db or os.path.join(directory, INDEX_NAME)
+
+
+def index_main(argv=None):
+    parser = argparse.ArgumentParser(prog='wespy index', description='为输出目录中的Markdown文章建立全文索引（增量更新）')
+    parser.add_argument('directory', nargs='?', default='articles', help='文章目录 (默认: articles)')
+    parser.add_argument('--db', help=f'索引文件路径 (默认: <目录>/{INDEX_NAME})')
+    parser.add_argument('--rebuild', action='store_true', help='清空后重新建立索引')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"目录不存在: {args.directory}")
+
+    start = time.time()
+    index = SearchIndex(_default_db(args.directory, args.db), root=args.directory)
+    try:
+        counts = index.update(rebuild=args.rebuild)
+        total = index.count()
+    finally:
+        index.close()
+    print(f"索引已更新: 新增 {counts['added']} 篇，更新 {counts['updated']} 篇，"
+          f"未变 {counts['unchanged']} 篇，移除 {counts['removed']} 篇，共 {total} 篇，"
+          f"用时 {time.time() - start:.1f} 秒")
+
+
+def search_main(argv=None):
+    parser = argparse.ArgumentParser(prog='wespy search', description='搜索已索引的文章')
+    parser.add_argument('query', nargs='+', help='搜索词，多个词同时匹配；可用 title:/author:/tags:/album:/content: 限定范围')
+    parser.add_argument('-d', '--directory', default='articles', help='文章目录 (默认: articles)')
+    parser.add_argument('--db', help=f'索引文件路径 (默认: <目录>/{INDEX_NAME})')
+    parser.add_argument('-n', '--limit', type=int, default=20, help='最多显示的结果数 (默认: 20)')
+    parser.add_argument('--json', action='store_true', help='以JSON输出结果')
+    args = parser.parse_args(argv)
+
+    db = _default_db(args.directory, args.db)
+    if not os.path.exists(db):
+        print(f"索引不存在: {db}，请先运行 wespy index {args.directory}")
+        sys.exit(1)
+
+    query = ' '.join(args.query)
+    index = SearchIndex(db, root=args.directory)
+    try:
+        start = time.time()
+        results = index.search(query, args.limit)
+        elapsed = time.time() - start
+    finally:
+        index.close()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    if not results:
+        print("没有找到匹配的文章")
+        return
+    for i, result in enumerate(results, 1):
+        print(f"{i:3d}. {result['title']}")
+        print(f"     {result['author']}  {result['publish_time']}  {result['path']}")
+        snippet = make_snippet(result['path'], query)
+        if snippet:
+            print(f"     {snippet}")
+    print(f"\n共 {len(results)} 条结果，用时 {elapsed * 1000:.1f} 毫秒")
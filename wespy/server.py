@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WeSpy HTTP 服务模式
+常驻进程中保持一个预热的 ArticleFetcher（共享连接池），通过本地 HTTP/JSON 接口接收
+单篇、批量和专辑任务，任务在有界队列上由固定数量的工作线程执行
+"""
+
+import codecs
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+import uuid
+import argparse
+from collections import deque
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from wespy.main import ArticleFetcher
+
+JOB_TYPES = ('article', 'batch', 'album')
+# 提交任务时的 format：json 在结果中包含Markdown，markdown 之后通过 GET ?format=markdown 流式获取，none 只返回元数据
+SUBMIT_FORMATS = ('json', 'markdown', 'none')
+RESULT_FORMATS = ('json', 'markdown')
+
+
+class Job:
+    """一个待执行的抓取任务"""
+
+    def __init__(self, job_type, params):
+        self.id = uuid.uuid4().hex
+        self.type = job_type
+        self.params = params
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # format 为 markdown 的单篇任务保留文章对象，首次 GET ?format=markdown 时流式转换；
+        # 文章对象持有原始网页和整棵解析树，转换后只保留Markdown文本，超过 JobRunner.article_ttl 未取走时释放
+        self.article = None
+        self.markdown = None
+        self.done = threading.Event()
+
+    def to_dict(self, include_result=True):
+        """转换为可JSON序列化的字典"""
+        data = {
+            'job_id': self.id,
+            'type': self.type,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.result is not None:
+            data['result'] = self.result
+        return data
+
+
+class LatencyStats:
+    """记录最近若干次任务耗时，用于计算分位数"""
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def snapshot(self):
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            if not ordered:
+                return None
+            index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+            return round(ordered[index], 4)
+
+        return {
+            'count': self.count,
+            'avg': round(self.total / self.count, 4) if self.count else None,
+            'p50': percentile(50),
+            'p95': percentile(95),
+            'p99': percentile(99),
+        }
+
+
+class JobRunner:
+    """有界任务队列 + 工作线程池，所有任务共享同一个 ArticleFetcher"""
+
+    def __init__(self, fetcher=None, workers=4, queue_size=100, output_dir="articles", keep_jobs=1000, article_ttl=300):
+        self.fetcher = fetcher or ArticleFetcher()
+        self.output_dir = output_dir
+        self.article_ttl = article_ttl
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.jobs = {}
+        self.job_order = deque()
+        self.keep_jobs = keep_jobs
+        self.lock = threading.Lock()
+        self.running = 0
+        self.counters = {'submitted': 0, 'rejected': 0, 'succeeded': 0, 'failed': 0}
+        self.latency = {job_type: LatencyStats() for job_type in JOB_TYPES}
+        self.queue_wait = LatencyStats()
+        self.threads = []
+        self._stopping = False
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"wespy-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, job_type, params):
+        """
+        提交任务
+
+        Returns:
+            Job: 队列已满时返回 None（由调用方返回 503 实现背压）
+        """
+        job = Job(job_type, params)
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            with self.lock:
+                self.counters['rejected'] += 1
+            return None
+
+        with self.lock:
+            self.jobs[job.id] = job
+            self.job_order.append(job.id)
+            self.counters['submitted'] += 1
+            # 只保留最近的任务记录，避免常驻进程内存无限增长
+            while len(self.job_order) > self.keep_jobs:
+                old_job = self.jobs.get(self.job_order[0])
+                if old_job and not old_job.done.is_set():
+                    break
+                self.jobs.pop(self.job_order.popleft(), None)
+            # 长时间没有取走Markdown的文章对象不再保留
+            expired = time.time() - self.article_ttl
+            for old_job in self.jobs.values():
+                if old_job.article is not None and old_job.finished_at and old_job.finished_at < expired:
+                    old_job.article = None
+        return job
+
+    def resolve_output_dir(self, path):
+        """
+        请求中的 output_dir 解析为输出根目录（--output）下的路径
+
+        Raises:
+            ValueError: 路径不在输出根目录中
+        """
+        root = os.path.realpath(self.output_dir)
+        resolved = os.path.realpath(os.path.join(root, path))
+        if resolved != root and not resolved.startswith(root + os.sep):
+            raise ValueError(f"output_dir 必须位于输出目录 {self.output_dir} 中")
+        return resolved
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def metrics(self):
+        """返回队列深度、运行数以及各类任务的耗时统计"""
+        with self.lock:
+            return {
+                'queue_depth': self.queue.qsize(),
+                'queue_capacity': self.queue.maxsize,
+                'running': self.running,
+                'workers': len(self.threads),
+                'jobs': dict(self.counters),
+                'queue_wait': self.queue_wait.snapshot(),
+                'latency': {job_type: stats.snapshot() for job_type, stats in self.latency.items()},
+                'transfer': self.fetcher.transfer_stats.snapshot(),
+                'concurrency': self.fetcher.limiter.snapshot(),
+            }
+
+    def stop(self, timeout=None):
+        """停止工作线程（正在执行的任务会先完成），然后关闭抓取器的后台写入和会话"""
+        self._stopping = True
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
+        self.fetcher.close()
+
+    def _worker_loop(self):
+        while True:
+            job = self.queue.get()
+            if job is None or self._stopping:
+                break
+
+            job.started_at = time.time()
+            job.status = 'running'
+            with self.lock:
+                self.running += 1
+                self.queue_wait.add(job.started_at - job.created_at)
+
+            try:
+                job.result = self._run_job(job)
+                job.status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+            finally:
+                job.finished_at = time.time()
+                with self.lock:
+                    self.running -= 1
+                    self.counters['succeeded' if job.status == 'done' else 'failed'] += 1
+                    self.latency[job.type].add(job.finished_at - job.started_at)
+                job.done.set()
+
+    def _run_job(self, job):
+        params = job.params
+        if job.type == 'article':
+            info = self._fetch_one(params['url'], params)
+            if info is None:
+                raise RuntimeError(f"文章获取失败: {params['url']}")
+            data = self._public_info(info, params)
+            if 'markdown' in data:
+                job.markdown = data['markdown']
+            else:
+                job.article = info
+            return data
+        if job.type == 'batch':
+            results = []
+            for url in params['urls']:
+                try:
+                    info = self._fetch_one(url, params)
+                except Exception as e:
+                    results.append({'url': url, 'error': str(e)})
+                    continue
+                results.append(self._public_info(info, params) if info else {'url': url, 'error': '获取失败'})
+            return results
+        # 专辑任务总是落盘，返回成功文章的元数据
+        articles = self.fetcher.fetch_album_articles(
+            params['url'],
+            params.get('output_dir') or self.output_dir,
+            params.get('max_articles'),
+            params.get('save_html', False),
+            params.get('save_json', False),
+            params.get('save_markdown', True),
+        )
+        return [self._public_info(article, dict(params, format='none')) for article in articles]
+
+    def _fetch_one(self, url, params):
+        """获取单篇文章；未指定 output_dir 时不落盘"""
+        output_dir = params.get('output_dir')
+        if output_dir:
+            info = self.fetcher.fetch_article(
+                url,
+                output_dir,
+                params.get('save_html', False),
+                params.get('save_json', False),
+                params.get('save_markdown', True),
+            )
+            if not isinstance(info, dict):
+                return None
+            return info
+        # 不落盘时直接使用库接口：不写文件、不打印，正文按需生成
+        return self.fetcher.fetch(url)
+
+    def _public_info(self, info, params):
+        """
+        生成返回给调用方的结果
+
+        format 为 json（默认）时结果中包含完整Markdown；为 markdown 时调用方会通过
+        GET /jobs/<id>?format=markdown 流式获取，这里不再提前生成
+        """
+        data = {
+            'title': info.get('title', ''),
+            'author': info.get('author', ''),
+            'publish_time': info.get('publish_time', ''),
+            'url': info.get('url', ''),
+        }
+        for key in ('tags', 'view_count', 'msgid', 'create_time'):
+            if info.get(key):
+                data[key] = info[key]
+        if params.get('format', 'json') == 'json':
+            data['markdown'] = ''.join(self.fetcher.iter_markdown(info))
+        if params.get('include_html'):
+            data['content_html'] = info.get('content_html', '')
+        return data
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class WeSpyRequestHandler(BaseHTTPRequestHandler):
+    """
+    接口说明:
+        POST /jobs          提交任务 {"type": "article|batch|album", "url": ..., "urls": [...], "wait": false}
+        GET  /jobs/<id>     查询任务状态与结果，?format=markdown 直接返回Markdown文本
+        GET  /metrics       队列深度、任务耗时等指标
+        GET  /healthz       存活检查
+    """
+
+    server_version = "WeSpy"
+    runner = None
+
+    def log_message(self, format, *args):
+        # 默认会写stderr，服务模式下只在出错时输出
+        pass
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip('/')
+
+        if path == '/healthz':
+            self._send_json(200, {'status': 'ok'})
+        elif path == '/metrics':
+            self._send_json(200, self.runner.metrics())
+        elif path.startswith('/jobs/'):
+            job = self.runner.get(path[len('/jobs/'):])
+            if not job:
+                self._send_json(404, {'error': '任务不存在'})
+                return
+            query = parse_qs(parsed.query)
+            fmt = query.get('format', ['json'])[0]
+            if fmt not in RESULT_FORMATS:
+                self._send_json(400, {'error': f"不支持的 format: {fmt}"})
+                return
+            self._send_job(job, fmt)
+        else:
+            self._send_json(404, {'error': '未知接口'})
+
+    def do_POST(self):
+        path = urlparse(self.path).path.rstrip('/')
+        if path != '/jobs':
+            self._send_json(404, {'error': '未知接口'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            params = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+        except (ValueError, UnicodeDecodeError) as e:
+            self._send_json(400, {'error': f"请求体不是合法JSON: {e}"})
+            return
+
+        error = self._validate(params)
+        if error:
+            self._send_json(400, {'error': error})
+            return
+
+        job = self.runner.submit(params['type'], params)
+        if job is None:
+            self._send_json(503, {'error': '任务队列已满，请稍后重试'}, {'Retry-After': '1'})
+            return
+
+        if params.get('wait'):
+            job.done.wait(params.get('timeout'))
+            if job.done.is_set():
+                self._send_job(job, params.get('format', 'json'))
+                return
+        self._send_json(202, {'job_id': job.id, 'status': job.status})
+
+    def _stream_markdown(self, job, article, markdown):
+        """
+        边转换边写入socket，不设置Content-Length，以关闭连接标识结束；转换后释放文章对象，只保留Markdown文本
+
+        article / markdown 是在任务锁内取得的引用：同时有多个请求读取同一任务时，
+        其他请求释放 job.article 不影响这里正在进行的转换
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/markdown; charset=utf-8')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        writer = codecs.getwriter('utf-8')(self.wfile)
+        if markdown is not None:
+            writer.write(markdown)
+            return
+        chunks = []
+        for chunk in self.runner.fetcher.iter_markdown(article):
+            writer.write(chunk)
+            chunks.append(chunk)
+        with self.runner.lock:
+            job.markdown = ''.join(chunks)
+            job.article = None
+
+    def _send_job(self, job, fmt):
+        if fmt == 'markdown' and job.status == 'done':
+            # 单篇文章可直接返回Markdown文本
+            with self.runner.lock:
+                article, markdown = job.article, job.markdown
+            if article is not None or markdown is not None:
+                self._stream_markdown(job, article, markdown)
+                return
+            if job.type == 'article':
+                self._send_json(410, {'error': '文章已超过保留时间被释放，请重新提交任务'})
+                return
+        # 获取文章失败是上游站点的问题，以 502 返回，错误信息在 error 字段中
+        status = 502 if job.status == 'failed' else 200
+        self._send_json(status, job.to_dict())
+
+    def _validate(self, params):
+        if not isinstance(params, dict):
+            return "请求体必须是JSON对象"
+        if params.get('output_dir'):
+            try:
+                params['output_dir'] = self.runner.resolve_output_dir(str(params['output_dir']))
+            except ValueError as e:
+                return str(e)
+        job_type = params.get('type', 'article')
+        params['type'] = job_type
+        if job_type not in JOB_TYPES:
+            return f"不支持的任务类型: {job_type}"
+        if job_type == 'batch':
+            urls = params.get('urls')
+            if not isinstance(urls, list) or not urls:
+                return "batch 任务需要非空的 urls 列表"
+        elif not params.get('url'):
+            return f"{job_type} 任务需要 url"
+        if not isinstance(params.get('wait', False), bool):
+            return "wait 必须是 true 或 false"
+        timeout = params.get('timeout')
+        if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout < 0):
+            return "timeout 必须是不小于 0 的秒数"
+        max_articles = params.get('max_articles')
+        if max_articles is not None and (isinstance(max_articles, bool) or not isinstance(max_articles, int) or max_articles < 1):
+            return "max_articles 必须是正整数"
+        if params.get('format', 'json') not in SUBMIT_FORMATS:
+            return f"不支持的 format: {params['format']}"
+        return None
+
+
+def create_server(host='127.0.0.1', port=8765, runner=None):
+    """创建HTTP服务实例（不启动）"""
+    handler = type('BoundWeSpyRequestHandler', (WeSpyRequestHandler,), {'runner': runner or JobRunner()})
+    return _ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='wespy serve', description='以常驻HTTP服务方式运行WeSpy')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口 (默认: 8765)')
+    parser.add_argument('--workers', type=int, default=4, help='工作线程数 (默认: 4)')
+    parser.add_argument('--queue-size', type=int, default=100, help='任务队列容量，满时返回503 (默认: 100)')
+    parser.add_argument('-o', '--output', default='articles', help='输出根目录，专辑任务默认写入这里，请求中的 output_dir 必须位于其中 (默认: articles)')
+    args = parser.parse_args(argv)
+
+    runner = JobRunner(workers=args.workers, queue_size=args.queue_size, output_dir=args.output)
+    server = create_server(args.host, args.port, runner)
+    print(f"WeSpy 服务已启动: http://{args.host}:{args.port}")
+    print(f"工作线程: {args.workers}, 队列容量: {args.queue_size}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在停止服务...")
+    finally:
+        server.server_close()
+        runner.stop()
+
+
+if __name__ == "__main__":
+    main()
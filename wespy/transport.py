@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP传输层
+只声明实际能解码的压缩格式（Accept-Encoding），brotli / zstd 通过可选依赖支持，
+并统计每个请求在网络上传输的字节数和解压后的字节数，用于估算大批量下载的带宽
+
+    pip install wespy[brotli]   # 支持 br
+    pip install wespy[zstd]     # 支持 zstd
+"""
+
+import threading
+import time
+import zlib
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class _GzipStream:
+    """流式gzip解码，支持多个连续的gzip成员（与 urllib3 的处理一致）"""
+
+    def __init__(self):
+        self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._members = 0
+
+    def __call__(self, data):
+        output = []
+        while data:
+            try:
+                output.append(self._obj.decompress(data))
+            except zlib.error:
+                if self._members:
+                    # 第一个成员之后的无效数据直接丢弃
+                    break
+                raise
+            if not self._obj.eof:
+                break
+            self._members += 1
+            data = self._obj.unused_data
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return b''.join(output)
+
+    def flush(self):
+        return b''
+
+
+class _DeflateStream:
+    """流式deflate解码，兼容带zlib头和不带头（raw deflate）两种格式"""
+
+    def __init__(self):
+        self._obj = zlib.decompressobj()
+        self._first = b''
+
+    def __call__(self, data):
+        if self._first is None:
+            return self._obj.decompress(data)
+        self._first += data
+        try:
+            output = self._obj.decompress(data)
+        except zlib.error:
+            # 不是 zlib 格式，按 raw deflate 重新解码已收到的数据
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            output = self._obj.decompress(self._first)
+        if output:
+            self._first = None
+        return output
+
+    def flush(self):
+        return self._obj.flush()
+
+
+class _BrotliStream:
+    """流式brotli解码"""
+
+    def __init__(self):
+        self._obj = brotli.Decompressor()
+        self._process = getattr(self._obj, 'process', None) or self._obj.decompress
+
+    def __call__(self, data):
+        return self._process(data)
+
+    def flush(self):
+        return b''
+
+
+class _ZstdStream:
+    """流式zstd解码，支持多个连续的帧"""
+
+    def __init__(self):
+        self._obj = zstandard.ZstdDecompressor().decompressobj()
+
+    def __call__(self, data):
+        output = [self._obj.decompress(data)]
+        while self._obj.eof and self._obj.unused_data:
+            unused = self._obj.unused_data
+            self._obj = zstandard.ZstdDecompressor().decompressobj()
+            output.append(self._obj.decompress(unused))
+        return b''.join(output)
+
+    def flush(self):
+        return self._obj.flush() if hasattr(self._obj, 'flush') else b''
+
+
+# 可以解码的格式，br / zstd 取决于是否安装了可选依赖
+DECODERS = {
+    'gzip': _GzipStream,
+    'x-gzip': _GzipStream,
+    'deflate': _DeflateStream,
+}
+if brotli is not None:
+    DECODERS['br'] = _BrotliStream
+if zstandard is not None:
+    DECODERS['zstd'] = _ZstdStream
+
+# 压缩率较高的格式排在前面
+SUPPORTED_ENCODINGS = tuple(name for name in ('zstd', 'br', 'gzip', 'deflate') if name in DECODERS)
+ACCEPT_ENCODING = ', '.join(SUPPORTED_ENCODINGS)
+
+_EXTRA_HINTS = {'br': 'wespy[brotli]', 'zstd': 'wespy[zstd]'}
+
+
+def _format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+class TransferStats:
+    """
+    传输统计：请求数、网络字节数（压缩后的响应体）、解压后字节数，按压缩格式分别累计
+
+    响应体读完（或连接关闭）时记录一次；不包含HTTP头部的字节数。
+    合并到其他请求（coalesced）或直接使用缓存（cached）的请求没有网络传输，单独计数
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.by_encoding = {}
+        self.coalesced = 0
+        self.cached = 0
+
+    def record(self, encoding, wire_bytes, decoded_bytes):
+        with self._lock:
+            self.requests += 1
+            self.wire_bytes += wire_bytes
+            self.decoded_bytes += decoded_bytes
+            entry = self.by_encoding.setdefault(encoding or 'identity', [0, 0, 0])
+            entry[0] += 1
+            entry[1] += wire_bytes
+            entry[2] += decoded_bytes
+
+    def record_shared(self, cached):
+        """记录一个没有发出的请求：cached 为 True 时使用了缓存，否则等待并共享了同一URL正在进行的请求"""
+        with self._lock:
+            if cached:
+                self.cached += 1
+            else:
+                self.coalesced += 1
+
+    def snapshot(self):
+        """返回当前统计的字典副本"""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'wire_bytes': self.wire_bytes,
+                'decoded_bytes': self.decoded_bytes,
+                'coalesced': self.coalesced,
+                'cached': self.cached,
+                'by_encoding': {
+                    name: {'requests': entry[0], 'wire_bytes': entry[1], 'decoded_bytes': entry[2]}
+                    for name, entry in self.by_encoding.items()
+                },
+            }
+
+    def delta(self, before):
+        """
+        计算从某次 snapshot() 之后新增的统计，用于单次专辑/批量任务的汇总
+
+        Args:
+            before (dict): 之前的 snapshot() 结果
+
+        Returns:
+            dict: 与 snapshot() 格式相同
+        """
+        now = self.snapshot()
+        by_encoding = {}
+        for name, entry in now['by_encoding'].items():
+            old = before['by_encoding'].get(name, {})
+            diff = {key: value - old.get(key, 0) for key, value in entry.items()}
+            if diff['requests']:
+                by_encoding[name] = diff
+        return {
+            'requests': now['requests'] - before['requests'],
+            'wire_bytes': now['wire_bytes'] - before['wire_bytes'],
+            'decoded_bytes': now['decoded_bytes'] - before['decoded_bytes'],
+            'coalesced': now['coalesced'] - before.get('coalesced', 0),
+            'cached': now['cached'] - before.get('cached', 0),
+            'by_encoding': by_encoding,
+        }
+
+    @staticmethod
+    def format(stats):
+        """把 snapshot()/delta() 的结果格式化为一行说明"""
+        line = f"{stats['requests']} 个请求，网络传输 {_format_size(stats['wire_bytes'])}，解压后 {_format_size(stats['decoded_bytes'])}"
+        if stats['decoded_bytes'] > stats['wire_bytes'] > 0:
+            saved = 1 - stats['wire_bytes'] / stats['decoded_bytes']
+            line += f"（压缩节省 {saved:.1%}）"
+        if stats.get('coalesced'):
+            line += f"，合并重复请求 {stats['coalesced']} 个"
+        if stats.get('cached'):
+            line += f"，缓存命中 {stats['cached']} 个"
+        return line
+
+
+class _CountingRaw:
+    """
+    包装 urllib3 响应：始终读取未解码的原始字节（即网络上传输的字节数），
+    再由对应格式的解码器流式解码；其余属性和方法直接转发给原响应
+    """
+
+    def __init__(self, raw, stats, encoding, decoder=None):
+        self._raw = raw
+        self._stats = stats
+        self._encoding = encoding
+        self._decoder = decoder
+        self._wire = 0
+        self._decoded = 0
+        self._recorded = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        decoder = self._decoder if decode_content is not False else None
+        try:
+            for chunk in self._raw.stream(amt, decode_content=False):
+                self._wire += len(chunk)
+                data = self._decode(decoder, chunk) if decoder is not None else chunk
+                if data:
+                    self._decoded += len(data)
+                    yield data
+            if decoder is not None:
+                data = self._decode(decoder, None)
+                if data:
+                    self._decoded += len(data)
+                    yield data
+        finally:
+            self._record()
+
+    def _decode(self, decoder, chunk):
+        try:
+            return decoder(chunk) if chunk is not None else decoder.flush()
+        except Exception as e:
+            raise urllib3.exceptions.DecodeError(f"解码 {self._encoding} 响应失败: {e}") from e
+
+    def close(self):
+        self._record()
+        self._raw.close()
+
+    def _record(self):
+        if not self._recorded:
+            self._recorded = True
+            self._stats.record(self._encoding, self._wire, self._decoded)
+
+
+class TransferAdapter(HTTPAdapter):
+    """为每个响应（包括重定向中间响应）挂上统计和解码"""
+
+    def __init__(self, session, **kwargs):
+        self._session = session
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        pool = getattr(self._session, 'proxy_pool', None)
+        if pool is None:
+            return super().send(request, **kwargs)
+        # 代理池（wespy.proxypool.ProxyPool）：每个请求（包括重定向的每一跳）选择一个代理；
+        # 连不上代理时请求还没有发出，换一个代理重试
+        for attempt in range(len(pool.proxies)):
+            proxy = pool.acquire(request.url)
+            proxies = proxy.proxies()
+            if proxies is not None:
+                kwargs['proxies'] = proxies
+            start = time.monotonic()
+            try:
+                response = super().send(request, **kwargs)
+            except requests.exceptions.ProxyError:
+                pool.report(proxy, False)
+                if attempt == len(pool.proxies) - 1:
+                    raise
+                continue
+            except Exception:
+                pool.report(proxy, False)
+                raise
+            ok = response.status_code not in pool.failure_status
+            pool.report(proxy, ok, time.monotonic() - start if ok else None)
+            return response
+
+    def build_response(self, req, resp):
+        response = super().build_response(req, resp)
+        encoding = response.headers.get('Content-Encoding', '').strip().lower()
+        decoder = None
+        if encoding and encoding not in ('identity', 'none'):
+            if encoding in DECODERS:
+                decoder = DECODERS[encoding]()
+            else:
+                # 没有声明过的格式，服务器仍然返回了；不能把压缩后的字节当作网页内容交给调用方
+                response.close()
+                hint = f"，请安装 {_EXTRA_HINTS[encoding]}" if encoding in _EXTRA_HINTS else ""
+                raise requests.exceptions.ContentDecodingError(
+                    f"服务器返回了无法解码的 {encoding} 压缩内容{hint}"
+                )
+        response.raw = _CountingRaw(response.raw, self._session.stats, encoding, decoder)
+        return response
+
+
+class TransferSession(requests.Session):
+    """
+    带传输统计的 requests.Session
+
+    默认的 Accept-Encoding 只包含能解码的格式；多个 session 可以共享同一个 stats
+
+    Args:
+        stats (TransferStats, optional): 统计对象，默认新建
+    """
+
+    def __init__(self, stats=None):
+        super().__init__()
+        self.stats = stats or TransferStats()
+        # 按主机的并发控制（wespy.concurrency.HostLimiter），None 表示不限制
+        self.limiter = None
+        # 重复请求合并和响应缓存（wespy.coalesce.RequestCoalescer），None 表示不合并
+        self.coalescer = None
+        # 多出口代理池（wespy.proxypool.ProxyPool），None 表示使用 proxies / 环境变量中的代理
+        self.proxy_pool = None
+        self.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        self.mount('https://', TransferAdapter(self))
+        self.mount('http://', TransferAdapter(self))
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订阅监控
+常驻进程按各自的间隔轮询多个微信专辑和掘金作者，只下载上次之后发布的新文章；
+所有订阅共用一个文章获取器（连接池、并发控制和熔断状态在轮询之间保留）
+
+    wespy watch feeds.yaml
+    wespy watch feeds.yaml --once        # 每个订阅轮询一次后退出（可由 cron 调用）
+
+订阅文件（YAML 需要安装 PyYAML: pip install wespy[watch]，也可以使用相同结构的 JSON）:
+
+    defaults:
+      interval: 1h          # 轮询间隔，可写秒数或 30m / 2h / 1d
+      jitter: 5m            # 每次在间隔上随机增加 0~jitter，使各订阅的请求错开
+      output: articles      # 每个订阅保存到 output/<name>/
+      max_articles: 20      # 每次轮询最多下载的新文章数，其余留到下一次
+      backfill: true        # 首次轮询是否下载最新的 max_articles 篇（false 时只记录位置）
+    feeds:
+      - name: 某公众号专辑
+        album: "https://mp.weixin.qq.com/mp/appmsgalbum?__biz=...&album_id=..."
+      - name: 某掘金作者
+        juejin_author: "1234567890"
+        interval: 6h
+
+每个订阅的位置（专辑为已下载的最大 [msgid, itemidx]，掘金作者为最新文章的发布时间）保存在
+<订阅文件>.state.json 中；下载失败的文章不会推进位置，下次轮询时重试
+"""
+
+import argparse
+import heapq
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from wespy.deadline import Cancelled, Deadline
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+ALBUM = 'album'
+JUEJIN_AUTHOR = 'juejin_author'
+FEED_KINDS = (ALBUM, JUEJIN_AUTHOR)
+
+DEFAULTS = {
+    'interval': 3600,
+    'jitter': None,
+    'output': 'articles',
+    'max_articles': 20,
+    'backfill': True,
+    'html': False,
+    'json': False,
+}
+
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_duration(value):
+    """把 90 / "90s" / "30m" / "2h" / "1d" 转换为秒数"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*', str(value))
+    if not match:
+        raise ValueError(f"无法识别的时间: {value}")
+    return float(match.group(1)) * _UNITS[match.group(2) or 's']
+
+
+class Feed:
+    """一个订阅：微信专辑或掘金作者"""
+
+    def __init__(self, name, kind, target, interval, jitter, output, max_articles, backfill, save_html=False, save_json=False):
+        self.name = name
+        self.kind = kind
+        self.target = target
+        self.interval = interval
+        self.jitter = jitter
+        self.output = output
+        self.max_articles = max_articles
+        self.backfill = backfill
+        self.save_html = save_html
+        self.save_json = save_json
+
+    def __repr__(self):
+        return f"Feed(name={self.name!r}, kind={self.kind!r})"
+
+    def next_delay(self):
+        """距离下一次轮询的秒数：间隔加上 0~jitter 的随机值"""
+        return self.interval + random.uniform(0, self.jitter)
+
+
+def load_feeds(path):
+    """
+    读取订阅文件
+
+    Args:
+        path (str): .yaml / .yml / .json 文件
+
+    Returns:
+        list: Feed 列表
+
+    Raises:
+        ValueError: 文件格式错误
+        RuntimeError: YAML 文件但未安装 PyYAML
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    if path.endswith('.json'):
+        config = json.loads(text)
+    else:
+        if yaml is None:
+            raise RuntimeError("读取 YAML 订阅文件需要安装 PyYAML: pip install wespy[watch]（或改用 JSON 文件）")
+        config = yaml.safe_load(text) or {}
+
+    defaults = dict(DEFAULTS)
+    defaults.update(config.get('defaults') or {})
+    feeds = []
+    names = set()
+    for i, entry in enumerate(config.get('feeds') or [], 1):
+        options = dict(defaults)
+        options.update(entry)
+        kinds = [kind for kind in FEED_KINDS if options.get(kind)]
+        if len(kinds) != 1:
+            raise ValueError(f"第 {i} 个订阅需要且只能指定 {' / '.join(FEED_KINDS)} 之一")
+        kind = kinds[0]
+        target = str(options[kind])
+        name = str(options.get('name') or target)
+        if name in names:
+            raise ValueError(f"订阅名称重复: {name}")
+        names.add(name)
+        interval = parse_duration(options['interval'])
+        # 默认在间隔的 10% 内随机错开
+        jitter = parse_duration(options['jitter']) if options.get('jitter') is not None else interval * 0.1
+        safe_name = re.sub(r'[<>:"/\\|?*\s]', '_', name)[:50]
+        feeds.append(Feed(
+            name, kind, target, interval, jitter,
+            output=os.path.join(options['output'], safe_name),
+            max_articles=int(options['max_articles']) if options.get('max_articles') else None,
+            backfill=bool(options['backfill']),
+            save_html=bool(options.get('html')),
+            save_json=bool(options.get('json')),
+        ))
+    if not feeds:
+        raise ValueError(f"订阅文件中没有订阅: {path}")
+    return feeds
+
+
+class FeedState:
+    """
+    各订阅的位置和轮询记录，保存在JSON文件中（每次更新后整体重写）
+
+    Args:
+        path (str): 状态文件路径
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._feeds = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self._feeds = json.load(f).get('feeds', {})
+
+    def get(self, name):
+        with self._lock:
+            return dict(self._feeds.get(name, {}))
+
+    def update(self, name, **fields):
+        with self._lock:
+            self._feeds.setdefault(name, {}).update(fields)
+            data = json.dumps({'feeds': self._feeds}, ensure_ascii=False, indent=2)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+
+
+class Watcher:
+    """
+    按各自的间隔轮询订阅
+
+    Args:
+        fetcher (ArticleFetcher): 所有订阅共用的文章获取器，其 cancel_token 取消后停止
+        feeds (list): Feed 列表
+        state (FeedState): 位置记录
+        concurrency (int): 同时轮询的订阅数；每次轮询的文章由 fetcher.workers 个线程下载，
+            同时下载的文章数不超过 concurrency * fetcher.workers
+    """
+
+    def __init__(self, fetcher, feeds, state, concurrency=2):
+        self.fetcher = fetcher
+        self.feeds = feeds
+        self.state = state
+        self.concurrency = max(1, concurrency)
+        self.counts = {'polls': 0, 'new': 0, 'failed': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def schedule(self, now=None):
+        """
+        各订阅的首次轮询时间：按上次轮询时间继续；已经超时或从未轮询的订阅在 jitter 内随机错开，
+        避免启动时同时请求
+
+        Returns:
+            list: [(时间戳, 序号, Feed), ...] 小顶堆
+        """
+        now = now if now is not None else time.time()
+        heap = []
+        for seq, feed in enumerate(self.feeds):
+            last_poll = self.state.get(feed.name).get('last_poll')
+            due = last_poll + feed.next_delay() if last_poll else now
+            if due <= now:
+                due = now + random.uniform(0, min(feed.jitter, feed.interval))
+            heapq.heappush(heap, (due, seq, feed))
+        return heap
+
+    def run(self, once=False):
+        """
+        轮询直到 fetcher.cancel_token 被取消
+
+        Args:
+            once (bool): 每个订阅轮询一次后退出（不等待首次轮询时间）
+
+        Returns:
+            dict: 轮询次数、新文章数、失败文章数和出错次数
+        """
+        token = self.fetcher.cancel_token
+        heap = self.schedule()
+        if once:
+            heap = [(0, seq, feed) for _, seq, feed in sorted(heap, key=lambda entry: entry[1])]
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='wespy-watch')
+        try:
+            while not token.cancelled:
+                now = time.time()
+                while heap and heap[0][0] <= now and len(running) < self.concurrency:
+                    _, seq, feed = heapq.heappop(heap)
+                    running[executor.submit(self.poll, feed)] = (seq, feed)
+                if not running and not heap:
+                    break
+
+                timeout = max(0.0, heap[0][0] - now) if heap else 60
+                if running:
+                    # 轮询结束的订阅按间隔重新安排
+                    finished, _ = wait(running, timeout=min(timeout, 1), return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        seq, feed = running.pop(future)
+                        if not once:
+                            heapq.heappush(heap, (time.time() + feed.next_delay(), seq, feed))
+                else:
+                    token.wait(min(timeout, 60))
+        finally:
+            executor.shutdown(wait=True)
+        return self.counts
+
+    def poll(self, feed):
+        """轮询一个订阅并下载新文章，出错时记录后返回（不影响其他订阅）"""
+        started = time.time()
+        state = self.state.get(feed.name)
+        cursor = state.get('cursor')
+        try:
+            with Deadline(None, self.fetcher.cancel_token):
+                new_count, failed_count, cursor = self._poll(feed, cursor)
+        except Cancelled:
+            print(f"\n[{feed.name}] 已停止")
+            return
+        except Exception as e:
+            print(f"\n[{feed.name}] 轮询失败: {e}")
+            with self._lock:
+                self.counts['errors'] += 1
+            self.state.update(feed.name, last_poll=started, last_error=str(e), errors=state.get('errors', 0) + 1)
+            return
+        with self._lock:
+            self.counts['polls'] += 1
+            self.counts['new'] += new_count
+            self.counts['failed'] += failed_count
+        self.state.update(feed.name, cursor=cursor, last_poll=started, last_new=new_count, last_error=None,
+                          total=state.get('total', 0) + new_count - failed_count)
+        print(f"\n[{feed.name}] 新文章 {new_count} 篇" + (f"，失败 {failed_count} 篇（下次重试）" if failed_count else '')
+              + f"，用时 {time.time() - started:.1f} 秒")
+
+    def _poll(self, feed, cursor):
+        """
+        Returns:
+            tuple: (新文章数, 失败数, 新位置)
+        """
+        print(f"\n[{feed.name}] 开始轮询")
+        if cursor is None and not feed.backfill:
+            # 首次轮询只记录当前位置，之后发布的文章才下载；取第一页，包含最新一次推送中的所有文章
+            items = self._list(feed, None, 10)
+            return 0, 0, max((position for position, _ in items), default=None)
+
+        # 有位置时列出全部新文章，从最早的开始下载，超出 max_articles 的留到下一次
+        items = self._list(feed, cursor, None if cursor is not None else feed.max_articles)
+        items.sort(key=lambda item: item[0])
+        if cursor is not None and feed.max_articles:
+            items = items[:feed.max_articles]
+        if not items:
+            return 0, 0, cursor
+
+        urls = [url for _, url in items]
+        results = self.fetcher.fetch_articles(urls, feed.output, feed.save_html, feed.save_json)
+        succeeded = {result.get('url') for result in results}
+        # 位置推进到第一篇失败的文章之前，失败的文章下次重试
+        for position, url in items:
+            if url not in succeeded:
+                break
+            cursor = position
+        return len(items), len(items) - len(succeeded & set(urls)), cursor
+
+    def _list(self, feed, cursor, max_articles):
+        """
+        列出订阅中位置大于 cursor 的文章，返回 [(位置, URL), ...]
+
+        专辑的位置为 (msgid, itemidx)：同一次推送的多篇文章 msgid 相同，只按 msgid 记录位置时
+        其中一篇失败或被 max_articles 截断会导致同一推送的其他文章被跳过
+        """
+        if feed.kind == ALBUM:
+            if isinstance(cursor, list):
+                cursor = tuple(cursor)
+            articles = self.fetcher.album_fetcher.fetch_album_articles(feed.target, max_articles, cursor)
+            return [((int(article['msgid']), int(article.get('itemidx') or 0)), article['url'])
+                    for article in articles if article.get('url')]
+        articles = self.fetcher.juejin_fetcher.fetch_author_articles(feed.target, max_articles, cursor)
+        return [(article['create_time'], article['url']) for article in articles]
+
+
+def main(argv=None):
+    from wespy.main import ArticleFetcher, _install_interrupt_handler
+
+    parser = argparse.ArgumentParser(prog='wespy watch', description='常驻轮询微信专辑和掘金作者，只下载新文章')
+    parser.add_argument('feeds', help='订阅文件（.yaml / .yml / .json）')
+    parser.add_argument('--state', help='位置记录文件 (默认: <订阅文件>.state.json)')
+    parser.add_argument('--concurrency', type=int, default=2, help='同时轮询的订阅数 (默认: 2)')
+    parser.add_argument('--workers', type=int, default=1, help='每次轮询下载文章的线程数 (默认: 1)')
+    parser.add_argument('--once', action='store_true', help='每个订阅轮询一次后退出')
+    args = parser.parse_args(argv)
+
+    try:
+        feeds = load_feeds(args.feeds)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"读取订阅文件失败: {e}")
+        sys.exit(1)
+
+    state = FeedState(args.state or f"{args.feeds}.state.json")
+    fetcher = ArticleFetcher()
+    fetcher.workers = args.workers
+    _install_interrupt_handler(fetcher.cancel_token)
+    watcher = Watcher(fetcher, feeds, state, args.concurrency)
+    print(f"正在监控 {len(feeds)} 个订阅（同时轮询 {watcher.concurrency} 个），按 Ctrl-C 停止")
+    try:
+        counts = watcher.run(once=args.once)
+    finally:
+        fetcher.close()
+    print(f"\n监控结束: 轮询 {counts['polls']} 次，新文章 {counts['new']} 篇，失败 {counts['failed']} 篇，出错 {counts['errors']} 次")
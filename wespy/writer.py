@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件输出器
+目录只创建一次，每个文件在内存中组装好后一次写入，写入临时文件后原子重命名，
+中断时不会留下写了一半的文件；可选由后台线程执行写入，让磁盘IO与网络获取并行
+
+原子重命名在本地磁盘上比直接写入多一次元数据操作；实际效果与文件系统有关，
+可以在目标目录上运行 wespy write-bench 比较
+
+    wespy write-bench /mnt/nas/articles --files 2000 --fetch-ms 5
+"""
+
+import argparse
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+_OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+
+class OutputWriter:
+    """
+    批量文件写入器
+
+    Args:
+        background (bool): 是否由后台线程执行写入
+        max_pending (int): 后台模式下排队等待写入的最大文件数，超过时调用方阻塞
+    """
+
+    def __init__(self, background=False, max_pending=64):
+        self.background = background
+        self._known_dirs = set()
+        self._dir_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'files': 0, 'bytes': 0, 'seconds': 0.0}
+        self._errors = []
+        # 后台模式下已排队、尚未写入磁盘的文件
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue(maxsize=max_pending)
+            self._thread = threading.Thread(target=self._writer_loop, name='wespy-writer', daemon=True)
+            self._thread.start()
+
+    def ensure_dir(self, path):
+        """创建目录（同一目录只检查一次）"""
+        path = os.path.abspath(path)
+        if path in self._known_dirs:
+            return
+        with self._dir_lock:
+            if path not in self._known_dirs:
+                os.makedirs(path, exist_ok=True)
+                self._known_dirs.add(path)
+
+    def write_text(self, path, content, encoding='utf-8'):
+        """
+        写入文本文件
+
+        Args:
+            path (str): 目标路径
+            content (str | iterable): 文本，或按顺序拼接的文本片段（在调用线程中拼接）
+            encoding (str): 文件编码
+        """
+        if not isinstance(content, str):
+            content = ''.join(content)
+        self.write_bytes(path, content.encode(encoding))
+
+    def stream_text(self, path, chunks, encoding='utf-8'):
+        """
+        边生成边写入文本文件：片段逐个编码写入临时文件，全部写完后才重命名，
+        生成片段时出错不会留下写了一半的文件。在调用线程中执行，不经过后台队列
+
+        Args:
+            path (str): 目标路径
+            chunks (iterable): 按顺序产出的文本片段
+            encoding (str): 文件编码
+        """
+        self.ensure_dir(os.path.dirname(path) or '.')
+        self._raise_pending_error()
+        self._write_atomic(path, (chunk.encode(encoding) for chunk in chunks))
+
+    def write_bytes(self, path, data):
+        """写入二进制文件（bytes / bytearray / memoryview）"""
+        self.ensure_dir(os.path.dirname(path) or '.')
+        if self._queue is not None:
+            self._raise_pending_error()
+            with self._pending_lock:
+                self._pending.add(path)
+            self._queue.put((path, data))
+        else:
+            self._write_atomic(path, data)
+
+    def exists(self, path):
+        """文件已经存在，或已经排队等待后台写入"""
+        with self._pending_lock:
+            if path in self._pending:
+                return True
+        return os.path.exists(path)
+
+    def flush(self):
+        """等待所有排队的写入完成；后台写入出错时在这里抛出"""
+        if self._queue is not None:
+            self._queue.join()
+        self._raise_pending_error()
+
+    def close(self):
+        """写完剩余文件并停止后台线程"""
+        if self._queue is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_pending_error()
+
+    def _raise_pending_error(self):
+        if self._errors:
+            error = self._errors.pop(0)
+            raise error
+
+    def _writer_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write_atomic(*item)
+            except Exception as e:
+                self._errors.append(e)
+            finally:
+                if item is not None:
+                    with self._pending_lock:
+                        self._pending.discard(item[0])
+                self._queue.task_done()
+
+    def _write_atomic(self, path, data):
+        """
+        写入同目录下的临时文件后重命名，读者不会看到写了一半的文件
+
+        data 为 bytes / bytearray / memoryview，或按顺序产出这些对象的可迭代对象
+        """
+        start = time.time()
+        directory = os.path.dirname(path) or '.'
+        # 临时文件名按进程和线程区分，避免并发写同一文件时互相覆盖
+        tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            fd = os.open(tmp_path, _OPEN_FLAGS, 0o666)
+        except FileNotFoundError:
+            # 目录在运行期间被删除，重新创建后重试一次
+            with self._dir_lock:
+                self._known_dirs.discard(os.path.abspath(directory))
+            self.ensure_dir(directory)
+            fd = os.open(tmp_path, _OPEN_FLAGS, 0o666)
+
+        size = 0
+        try:
+            for chunk in (data,) if isinstance(data, (bytes, bytearray, memoryview)) else data:
+                view = memoryview(chunk)
+                size += view.nbytes
+                # 一次 write 通常即可写完，循环只为处理部分写入
+                while view:
+                    written = os.write(fd, view)
+                    view = view[written:]
+            os.close(fd)
+            fd = None
+            os.replace(tmp_path, path)
+        except BaseException:
+            if fd is not None:
+                os.close(fd)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._stats_lock:
+            self.stats['files'] += 1
+            self.stats['bytes'] += size
+            self.stats['seconds'] += time.time() - start
+
+
+def _article_parts(i, size):
+    """模拟一篇文章的Markdown片段（元数据头部 + 正文）"""
+    return [
+        f"# 模拟文章 {i}\n\n",
+        "**作者**: 模拟作者\n",
+        "**发布时间**: 2024-01-01\n",
+        f"**原文链接**: http://mp.weixin.qq.com/s/{i}\n\n",
+        "---\n\n",
+        '正' * (size // 3),
+    ]
+
+
+def _write_open(directory, files, size, fetch_seconds):
+    """原来的保存方式：每篇检查目录，逐行写入目标文件"""
+    for i in range(files):
+        time.sleep(fetch_seconds)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(os.path.join(directory, f"{i}.md"), 'w', encoding='utf-8') as f:
+            for part in _article_parts(i, size):
+                f.write(part)
+
+
+def _write_with(writer, directory, files, size, fetch_seconds):
+    try:
+        for i in range(files):
+            time.sleep(fetch_seconds)
+            writer.write_text(os.path.join(directory, f"{i}.md"), _article_parts(i, size))
+    finally:
+        writer.close()
+
+
+METHODS = {
+    'open': _write_open,
+    'writer': lambda *args: _write_with(OutputWriter(), *args),
+    'background': lambda *args: _write_with(OutputWriter(background=True), *args),
+}
+
+
+def benchmark(directory, files=2000, size=2048, repeat=3, fetch_ms=0):
+    """
+    在 directory 所在的文件系统上比较逐行写入、OutputWriter 和后台写入保存一批小文件的耗时
+
+    每种方式每次写入新的子目录，结束后删除；取 repeat 次中最快的一次。
+    fetch_ms 模拟每篇文章下载所需的时间，用于观察后台写入能否与下载重叠
+
+    Args:
+        directory (str): 测试目录（应位于要评估的文件系统上）
+        files (int): 每次写入的文件数
+        size (int): 每个文件正文的大约字节数
+        repeat (int): 重复次数
+        fetch_ms (float): 每篇文章写入前等待的毫秒数
+
+    Returns:
+        dict: 方式（'open' / 'writer' / 'background'）-> {'seconds': 耗时, 'files_per_second': 每秒文件数}
+    """
+    os.makedirs(directory, exist_ok=True)
+    results = {}
+    for name, method in METHODS.items():
+        best = None
+        for _ in range(max(1, repeat)):
+            target = tempfile.mkdtemp(prefix='.wespy-write-bench-', dir=directory)
+            shutil.rmtree(target)
+            try:
+                start = time.perf_counter()
+                method(target, files, size, fetch_ms / 1000.0)
+                elapsed = time.perf_counter() - start
+            finally:
+                shutil.rmtree(target, ignore_errors=True)
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = {'seconds': best, 'files_per_second': files / best if best else None}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='wespy write-bench', description='比较保存大量小文件时几种写入方式的耗时')
+    parser.add_argument('directory', nargs='?', default='.', help='测试目录，应位于要评估的文件系统上 (默认: 当前目录)')
+    parser.add_argument('--files', type=int, default=2000, help='每次写入的文件数 (默认: 2000)')
+    parser.add_argument('--size', type=int, default=2048, help='每个文件的大约字节数 (默认: 2048)')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快的一次 (默认: 3)')
+    parser.add_argument('--fetch-ms', type=float, default=0, help='模拟每篇文章的下载时间（毫秒，默认: 0）')
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.directory, args.files, args.size, args.repeat, args.fetch_ms)
+    print(f"{args.files} 个约 {args.size} 字节的文件，目录: {os.path.abspath(args.directory)}")
+    baseline = results['open']['seconds']
+    for name, label in (('open', '逐行写入'), ('writer', 'OutputWriter'), ('background', '后台写入')):
+        info = results[name]
+        print(f"{label}: {info['seconds']:.3f} 秒，{info['files_per_second']:.0f} 个/秒，"
+              f"为逐行写入的 {info['seconds'] / baseline:.0%}")